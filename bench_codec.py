@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+序列化基准测试：to_dict()/from_dict() + json 与编解码层（JSON/msgpack）
+
+每种模型编码、解码各若干次，输出每次的耗时（µs）和编码后的字节数。
+未安装 msgpack 时跳过 msgpack。
+
+用法: python bench_codec.py [次数]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.audio.models import AudioFile, Playlist
+from src.utils import codec
+from src.utils.codec import get_codec
+from codec_samples import sample_models
+
+
+def timed(func, rounds: int) -> float:
+    """平均每次调用的耗时（µs）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench_to_dict(model, rounds: int):
+    """基线：to_dict() + json.dumps，解码为 json.loads + from_dict()（仅音频模型有 from_dict）"""
+    encoded = json.dumps(model.to_dict(), ensure_ascii=False).encode('utf-8')
+    encode_us = timed(lambda: json.dumps(model.to_dict(), ensure_ascii=False).encode('utf-8'), rounds)
+    decode_us = None
+    if isinstance(model, (AudioFile, Playlist)):
+        decode_us = timed(lambda: type(model).from_dict(json.loads(encoded)), rounds)
+    return encode_us, decode_us, len(encoded)
+
+
+def bench_codec(current, model, rounds: int):
+    encoded = current.dumps(model)
+    encode_us = timed(lambda: current.dumps(model), rounds)
+    decode_us = timed(lambda: current.loads(encoded), rounds)
+    return encode_us, decode_us, len(encoded)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    codecs = [get_codec('json')]
+    if codec.msgpack is not None:
+        codecs.append(get_codec('msgpack'))
+
+    json_name = 'orjson' if codec.orjson is not None else 'json'
+    print(f"每项 {rounds} 次，编解码: {', '.join(json_name if c.name == 'json' else c.name for c in codecs)}")
+    print(f"{'模型':<20} {'格式':<10} {'编码 µs':>9} {'解码 µs':>9} {'字节':>6}")
+
+    def row(name, fmt, result):
+        encode_us, decode_us, size = result
+        decode = f"{decode_us:>9.2f}" if decode_us is not None else f"{'-':>9}"
+        print(f"{name:<20} {fmt:<10} {encode_us:>9.2f} {decode} {size:>6}")
+
+    for model in sample_models():
+        name = type(model).__name__
+        row(name, 'to_dict', bench_to_dict(model, rounds))
+        for current in codecs:
+            row(name, json_name if current.name == 'json' else current.name, bench_codec(current, model, rounds))
+
+
+if __name__ == "__main__":
+    main()
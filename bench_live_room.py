@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+无头浏览器采集基准测试（本地模拟直播间，不需要网络和登录）
+
+启动 MockLiveRoomServer，用 headless Chrome 打开模拟直播间，按指定的采集模式
+运行 DouyinClient 的消息监听，结束后报告：
+
+- 采集速率（条/秒）和丢失率：页面生成的弹幕中有多少条被回调收到
+- 重复率：回调收到的弹幕中重复的比例（页面重新渲染产生的重复节点未被去重）
+- 采集延迟分位数：弹幕内容中的生成时间到回调收到的时间
+
+用法:
+    python bench_live_room.py --mode push --chat-rate 200 --duration 30
+    python bench_live_room.py --mode poll --chromedriver /usr/bin/chromedriver
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.platforms.douyin_client import DouyinClient
+from src.platforms.mock_live_room import MockLiveRoomServer
+from src.platforms.models import MessageType
+from src.utils.config import Config
+
+CHAT_PATTERN = re.compile(r"#(\d+) @(\d+)")
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def create_browser(client: DouyinClient, chromedriver: str = None):
+    """启动浏览器：默认使用客户端自己的 undetected_chromedriver，指定 chromedriver 时使用 selenium"""
+    if not chromedriver:
+        await client._init_browser()
+        return
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    await client.browser.create(lambda: webdriver.Chrome(service=Service(chromedriver), options=options))
+
+
+async def run(args) -> dict:
+    config = Config({'douyin': {
+        'headless': True,
+        'capture': {'mode': args.mode, 'interval': args.interval, 'poll_interval': args.interval}
+    }})
+    client = DouyinClient(config)
+
+    received = []
+    gifts = 0
+
+    def on_chat(message):
+        received.append((message.content, time.time() * 1000))
+
+    def on_gift(message):
+        nonlocal gifts
+        gifts += 1
+
+    client.add_message_callback(MessageType.CHAT, on_chat, maxsize=100000)
+    client.add_message_callback(MessageType.GIFT, on_gift, maxsize=100000)
+
+    with MockLiveRoomServer(chat_rate=args.chat_rate, gift_rate=args.gift_rate, like_rate=args.like_rate,
+                            rerender=args.rerender, max_nodes=args.max_nodes) as server:
+        await create_browser(client, args.chromedriver)
+        try:
+            client.is_logged_in = True
+            if not await client.connect_to_room(server.room_url('bench')):
+                raise RuntimeError("打开模拟直播间失败")
+
+            # 从此刻起统计页面生成的消息
+            baseline = await client.browser.execute_script("return window.__mockRoom")
+            started = time.time() * 1000
+            await client.start_message_listener()
+            await asyncio.sleep(args.duration)
+            client.is_connected = False
+            page = await client.browser.execute_script("return window.__mockRoom")
+            await asyncio.sleep(args.interval * 2)
+            await client.event_bus.join()
+            stats = client.get_capture_stats()
+        finally:
+            await client.stop()
+
+    first_seq = baseline['chat'] + 1
+    latencies = []
+    seen = set()
+    duplicates = 0
+    for content, receive_ms in received:
+        match = CHAT_PATTERN.search(content)
+        if not match:
+            continue
+        seq, emit_ms = int(match.group(1)), int(match.group(2))
+        if seq < first_seq:
+            continue  # 监听开始前生成的历史消息
+        if seq in seen:
+            duplicates += 1
+            continue
+        seen.add(seq)
+        if emit_ms >= started:
+            latencies.append(receive_ms - emit_ms)
+
+    emitted = page['chat'] - baseline['chat']
+    delivered = len(seen) + duplicates
+    return {
+        'mode': args.mode,
+        'emitted': emitted,
+        'captured': len(seen),
+        'captured_per_second': len(seen) / args.duration,
+        'drop_rate': 1 - len(seen) / emitted if emitted else 0.0,
+        'duplicate_rate': duplicates / delivered if delivered else 0.0,
+        'gifts_emitted': page['gift'] - baseline['gift'],
+        'gifts_received': gifts,
+        'rerendered': page['rerendered'] - baseline['rerendered'],
+        'latency_ms': {q: percentile(latencies, q) for q in (0.5, 0.95, 0.99)},
+        'latency_ms_max': max(latencies) if latencies else 0.0,
+        'capture': stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无头浏览器采集基准测试")
+    parser.add_argument('--mode', choices=['push', 'poll'], default='push')
+    parser.add_argument('--duration', type=float, default=20.0, help="采集时长（秒）")
+    parser.add_argument('--chat-rate', type=float, default=100.0, help="每秒弹幕数")
+    parser.add_argument('--gift-rate', type=float, default=10.0, help="每秒礼物数")
+    parser.add_argument('--like-rate', type=float, default=20.0, help="每秒点赞数")
+    parser.add_argument('--rerender', type=float, default=0.1, help="每条弹幕被重新渲染的平均次数")
+    parser.add_argument('--max-nodes', type=int, default=200, help="页面保留的弹幕节点数")
+    parser.add_argument('--interval', type=float, default=0.2, help="采集间隔（秒）")
+    parser.add_argument('--chromedriver', help="chromedriver 路径（不指定时使用 undetected_chromedriver）")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    capture = result['capture']
+    print(f"模式: {result['mode']}，时长 {args.duration:.0f}s，弹幕 {args.chat_rate:.0f}/s，礼物 {args.gift_rate:.0f}/s")
+    print(f"弹幕: 生成 {result['emitted']}，采集 {result['captured']}（{result['captured_per_second']:.1f} 条/秒），"
+          f"丢失率 {result['drop_rate']:.2%}，重复率 {result['duplicate_rate']:.2%}（页面重新渲染 {result['rerendered']} 次）")
+    print(f"礼物: 生成 {result['gifts_emitted']}，收到 {result['gifts_received']}")
+    latency = result['latency_ms']
+    print(f"采集延迟: p50 {latency[0.5]:.0f}ms，p95 {latency[0.95]:.0f}ms，p99 {latency[0.99]:.0f}ms，"
+          f"最大 {result['latency_ms_max']:.0f}ms")
+    print(f"WebDriver 往返 {capture['round_trips']} 次，去重: {capture['dedup']}，WebDriver: {capture['webdriver']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+消息模型基准测试：完整数据类与紧凑元组模型的单条消息分配和 CPU 开销
+
+模拟推送式采集以 1000 条/秒的速率产生消息（80% 弹幕、20% 礼物），
+通过 DouyinClient 的消息构造函数创建消息，再按两个消费者（日志、Web UI）
+各序列化一次计算 CPU 时间；分配量为保留 1 秒积压（1000 条）时 tracemalloc
+统计的字节数。
+
+用法: python bench_messages.py [消息数]
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.platforms.douyin_client import DouyinClient
+from src.utils.config import Config
+
+RATE = 1000  # 条/秒
+
+
+def make_items(total: int) -> list:
+    """生成采集脚本返回的原始数据"""
+    now = time.time()
+    items = []
+    for i in range(total):
+        user = f"观众{i % 300}"
+        ts = now + i / RATE
+        if i % 5:
+            items.append(('chat', f"chat_{i}", user, f"主播晚上好 {i}", ts))
+        else:
+            items.append(('gift', f"gift_{i}", user, "小心心", ts))
+    return items
+
+
+def build(client: DouyinClient, items: list) -> list:
+    """用客户端的消息构造函数创建消息"""
+    messages = []
+    for kind, message_id, user, content, ts in items:
+        if kind == 'chat':
+            messages.append(client._make_chat_message(message_id, user, content, ts))
+        else:
+            messages.append(client._make_gift_message(message_id, user, content, 1, ts))
+    return messages
+
+
+def serialize_full(messages: list):
+    for message in messages:
+        json.dumps(message.to_dict(), ensure_ascii=False)
+        json.dumps(message.to_dict(), ensure_ascii=False)
+
+
+def serialize_compact(messages: list):
+    # 紧凑消息本身就是元组，直接作为 JSON 数组输出
+    for message in messages:
+        json.dumps(message, ensure_ascii=False)
+        json.dumps(message, ensure_ascii=False)
+
+
+def measure(name: str, compact: bool, items: list) -> dict:
+    """测量一种模型的 CPU 和分配开销"""
+    client = DouyinClient(Config({'douyin': {'capture': {'compact_messages': compact}}}))
+    serialize = serialize_compact if compact else serialize_full
+
+    start = time.process_time()
+    messages = build(client, items)
+    build_cpu = time.process_time() - start
+
+    start = time.process_time()
+    serialize(messages)
+    serialize_cpu = time.process_time() - start
+    del messages
+
+    tracemalloc.start()
+    backlog = build(client, items[:RATE])
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del backlog
+
+    total = len(items)
+    cpu_us = (build_cpu + serialize_cpu) / total * 1e6
+    return {
+        'name': name,
+        'build_us': build_cpu / total * 1e6,
+        'serialize_us': serialize_cpu / total * 1e6,
+        'cpu_us': cpu_us,
+        'cpu_percent': cpu_us * RATE / 1e4,
+        'bytes_per_message': retained / RATE
+    }
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    items = make_items(total)
+
+    results = [measure('dataclass', False, items), measure('compact', True, items)]
+
+    print(f"消息数: {total}，速率: {RATE} 条/秒")
+    print(f"{'模型':<10} {'构造 µs':>9} {'序列化 µs':>10} {'合计 µs':>9} {'CPU%@1k/s':>10} {'字节/条':>9}")
+    for r in results:
+        print(f"{r['name']:<10} {r['build_us']:>9.2f} {r['serialize_us']:>10.2f} {r['cpu_us']:>9.2f} "
+              f"{r['cpu_percent']:>10.2f} {r['bytes_per_message']:>9.0f}")
+
+    full, compact = results
+    print(f"CPU 降低 {1 - compact['cpu_us'] / full['cpu_us']:.0%}，"
+          f"内存降低 {1 - compact['bytes_per_message'] / full['bytes_per_message']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
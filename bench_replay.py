@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+消息管线离线压测：合成弹幕刷屏 + 礼物刷屏，录制后经 DouyinClient 回放
+
+订阅者为一个弹幕计数回调和礼物答谢调度器，输出回放吞吐量、回放相对计划
+时间的延迟，以及事件总线上各订阅者的排队延迟和处理延迟。
+
+用法: python bench_replay.py [时长秒] [弹幕/秒] [送礼/秒] [倍速，0 为不等待]
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.gift_scheduler import GiftMappingIndex, GiftScheduler
+from src.platforms.douyin_client import DouyinClient
+from src.platforms.models import MessageType
+from src.platforms.replay import MessageReplayer, generate_chat_flood, generate_gift_storm, merge_streams, write_stream
+from src.utils.config import Config
+
+
+async def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    chat_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1000.0
+    gift_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    speed = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    client = DouyinClient(Config({}))
+    scheduler = GiftScheduler(GiftMappingIndex(default_audio='thanks.mp3'), max_queue_size=20)
+    chats = 0
+
+    def count_chat(message):
+        nonlocal chats
+        chats += 1
+
+    client.add_message_callback(MessageType.CHAT, count_chat)
+    client.add_message_callback(MessageType.GIFT, scheduler.offer)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.rec"
+        total = write_stream(path, merge_streams(
+            generate_gift_storm(gift_rate, duration, start=0.0),
+            generate_chat_flood(chat_rate, duration, start=0.0)
+        ))
+        size = path.stat().st_size
+
+        stats = await MessageReplayer(path).replay(client, speed=speed or None)
+        await client.event_bus.join()
+
+    print(f"录制: {total} 条，{size / 1024:.0f} KiB（{size / total:.0f} 字节/条）")
+    print(f"回放: {stats['messages']} 条，耗时 {stats['elapsed']:.2f}s，{stats['throughput']:.0f} 条/秒，"
+          f"计划延迟 p95 {stats['lag_ms_p95']:.1f}ms / 最大 {stats['lag_ms_max']:.1f}ms")
+    print(f"弹幕回调: {chats} 条；礼物调度: {scheduler.get_stats()}")
+    for sub in client.event_bus.get_stats()['subscribers']:
+        print(f"  {sub['name']}: 排队 p95 {sub['lag_ms_p95']:.2f}ms，处理 p95 {sub['latency_ms_p95']:.3f}ms，"
+              f"丢弃 {sub.get('dropped', 0)}")
+
+    await client.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+"""
+编解码测试和基准共用的样例模型
+"""
+
+from datetime import datetime
+
+from src.audio.models import AudioFile, Playlist, PlaylistItem
+from src.platforms.models import (
+    User, Gift, GiftType, ChatMessage, GiftMessage, LikeMessage, FollowMessage, LiveRoomInfo,
+    CompactChatMessage, CompactGiftMessage
+)
+
+
+def sample_models() -> list:
+    """各类已注册模型的样例"""
+    now = datetime(2024, 5, 1, 20, 30, 15, 250000)
+    user = User('douyin_1', '小明', avatar_url='https://example.com/a.png', level=12, vip_level=3,
+                is_following=True)
+    audio_file = AudioFile(id=7, filename='rose.wav', title='玫瑰', duration=2.5, file_size=44144,
+                           format='wav', file_path='/data/rose.wav', tags='["gift"]', category='gift',
+                           file_mtime=1714566615123456789, pcm_gain_db=-3.2, created_at=now, updated_at=now)
+    return [
+        ChatMessage('c1', user, '主播晚上好', now),
+        GiftMessage('g1', user, Gift('g', '火箭', price=500.0, gift_type=GiftType.SPECIAL),
+                    count=2, combo_count=5, timestamp=now),
+        LikeMessage('l1', user, count=30, timestamp=now),
+        FollowMessage('f1', user, timestamp=now),
+        LiveRoomInfo('123', '助眠', '主播', 'a1', viewer_count=1200),
+        CompactChatMessage('c2', 'douyin_2', '小红', '来了', now.timestamp()),
+        CompactGiftMessage('g2', 'douyin_2', '小红', '小心心', now.timestamp(), count=3, total_value=3.0),
+        audio_file,
+        Playlist(id=1, name='睡前', description=None, is_active=True, created_at=now, items=[
+            PlaylistItem(id=1, playlist_id=1, audio_file_id=7, position=0, volume=0.8,
+                         created_at=now, audio_file=audio_file),
+            PlaylistItem(id=2, playlist_id=1, audio_file_id=8, position=1)
+        ]),
+    ]
@@ -0,0 +1,207 @@
+"""
+音频分析
+
+一次流式遍历计算积分响度、真峰值、首尾静音位置和缩略波形（每个点的峰值与 RMS），
+全部为 NumPy 向量运算。结果存入 audio_analysis 表，界面绘制波形、混音时跳过静音
+和设置增益都不需要再读取音频。
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+from .loudness import subblock_energies, gated_loudness
+from .models import AudioAnalysis
+from .stream import open_pcm_stream
+
+
+# 真峰值按 BS.1770 附录 2 做 4 倍过采样
+TRUE_PEAK_OVERSAMPLE = 4
+TRUE_PEAK_TAPS_PER_PHASE = 12
+
+ANALYSIS_BLOCK_SECONDS = 10
+
+
+def _true_peak_filter(oversample: int = TRUE_PEAK_OVERSAMPLE,
+                      taps_per_phase: int = TRUE_PEAK_TAPS_PER_PHASE) -> np.ndarray:
+    """
+    过采样插值滤波器（加窗 sinc），按相位拆分
+
+    Returns:
+        np.ndarray: 形状为 (oversample, taps_per_phase) 的多相系数
+    """
+    taps = oversample * taps_per_phase
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(n / oversample) * np.kaiser(taps, 8.0)
+    phases = h.reshape(taps_per_phase, oversample).T
+    # 每个相位的直流增益为 1
+    return phases / phases.sum(axis=1, keepdims=True)
+
+
+_TRUE_PEAK_PHASES = _true_peak_filter()
+
+
+def _db(value: float) -> Optional[float]:
+    """线性幅度转换为分贝"""
+    return 20 * math.log10(value) if value > 0 else None
+
+
+class AudioAnalyzer:
+    """
+    逐块累积的音频分析器
+
+    按顺序 feed() 引擎格式的 PCM 块，最后调用 result()。
+    """
+
+    def __init__(self, sample_rate: int, channels: int, silence_threshold_db: float = -60.0,
+                 waveform_resolution: float = 20.0):
+        """
+        初始化分析器
+
+        Args:
+            sample_rate: 采样率
+            channels: 声道数
+            silence_threshold_db: 静音阈值（dBFS）
+            waveform_resolution: 波形每秒的点数
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.silence_threshold = 10 ** (silence_threshold_db / 20)
+        self.waveform_resolution = waveform_resolution
+
+        self._frames = 0
+        self._energies = []
+        self._sample_peak = 0.0
+        self._true_peak = 0.0
+        self._first_sound: Optional[int] = None
+        self._last_sound: Optional[int] = None
+
+        # 插值滤波器需要上一块末尾的采样
+        self._history = np.zeros((TRUE_PEAK_TAPS_PER_PHASE - 1, channels), dtype=np.float32)
+
+        self._bin_frames = max(1, int(round(sample_rate / waveform_resolution)))
+        self._bin_pending = np.zeros((0, channels), dtype=np.float32)
+        self._peaks = []
+        self._rms = []
+
+    def feed(self, block: np.ndarray):
+        """
+        累积一块 PCM
+
+        Args:
+            block: 形状为 (帧数, channels) 的 float32 数组
+        """
+        if not len(block):
+            return
+
+        magnitude = np.abs(block)
+        frame_level = magnitude.max(axis=1)
+
+        self._energies.append(subblock_energies(block, self.sample_rate))
+        self._sample_peak = max(self._sample_peak, float(frame_level.max()))
+        self._true_peak = max(self._true_peak, self._block_true_peak(block))
+
+        audible = np.flatnonzero(frame_level > self.silence_threshold)
+        if audible.size:
+            if self._first_sound is None:
+                self._first_sound = self._frames + int(audible[0])
+            self._last_sound = self._frames + int(audible[-1])
+
+        self._feed_waveform(block)
+        self._frames += len(block)
+
+    def result(self, audio_file_id: int = None) -> AudioAnalysis:
+        """
+        生成分析结果
+
+        Args:
+            audio_file_id: 音频文件ID
+
+        Returns:
+            AudioAnalysis: 分析结果
+        """
+        if len(self._bin_pending):
+            self._append_bins(self._bin_pending[None])
+            self._bin_pending = self._bin_pending[:0]
+
+        loudness = gated_loudness(np.concatenate(self._energies)) if self._energies else float('-inf')
+        duration = self._frames / self.sample_rate
+
+        if self._first_sound is None:
+            leading, trailing = duration, 0.0
+        else:
+            leading = self._first_sound / self.sample_rate
+            trailing = (self._frames - 1 - self._last_sound) / self.sample_rate
+
+        peaks = np.concatenate(self._peaks) if self._peaks else np.zeros(0)
+        rms = np.concatenate(self._rms) if self._rms else np.zeros(0)
+        waveform = np.stack([peaks, rms], axis=1)
+        waveform = np.clip(np.round(waveform * 255), 0, 255).astype(np.uint8)
+
+        return AudioAnalysis(
+            audio_file_id=audio_file_id,
+            loudness=loudness if math.isfinite(loudness) else None,
+            true_peak=_db(max(self._true_peak, self._sample_peak)),
+            sample_peak=_db(self._sample_peak),
+            leading_silence=leading,
+            trailing_silence=trailing,
+            duration=duration,
+            waveform_resolution=self.sample_rate / self._bin_frames,
+            waveform=waveform.tobytes()
+        )
+
+    def _block_true_peak(self, block: np.ndarray) -> float:
+        """过采样后的峰值（多相滤波，每个相位一次卷积）"""
+        taps = TRUE_PEAK_TAPS_PER_PHASE
+        signal = np.concatenate([self._history, block])
+        self._history = signal[-(taps - 1):]
+
+        peak = 0.0
+        for channel in range(signal.shape[1]):
+            for phase in _TRUE_PEAK_PHASES:
+                filtered = np.convolve(signal[:, channel], phase, mode='valid')
+                peak = max(peak, float(np.abs(filtered).max()))
+        return peak
+
+    def _feed_waveform(self, block: np.ndarray):
+        """按固定帧数分箱计算峰值和 RMS，不足一箱的部分留到下一块"""
+        if len(self._bin_pending):
+            block = np.concatenate([self._bin_pending, block])
+
+        count = len(block) // self._bin_frames
+        if count:
+            self._append_bins(block[:count * self._bin_frames].reshape(count, self._bin_frames, -1))
+        self._bin_pending = block[count * self._bin_frames:]
+
+    def _append_bins(self, bins: np.ndarray):
+        """记录一组波形点（多声道合并）"""
+        self._peaks.append(np.abs(bins).max(axis=(1, 2)))
+        self._rms.append(np.sqrt(np.mean(np.square(bins), axis=(1, 2))))
+
+
+def analyze_audio(file_path: str, sample_rate: int, channels: int,
+                  silence_threshold_db: float = -60.0, waveform_resolution: float = 20.0,
+                  audio_file_id: int = None) -> AudioAnalysis:
+    """
+    流式分析音频文件（在工作线程或进程中执行）
+
+    Args:
+        file_path: 文件路径
+        sample_rate: 分析采样率
+        channels: 分析声道数
+        silence_threshold_db: 静音阈值（dBFS）
+        waveform_resolution: 波形每秒的点数
+        audio_file_id: 音频文件ID
+
+    Returns:
+        AudioAnalysis: 分析结果
+    """
+    analyzer = AudioAnalyzer(sample_rate, channels, silence_threshold_db, waveform_resolution)
+    with open_pcm_stream(file_path, sample_rate, channels) as stream:
+        while True:
+            block = stream.read(sample_rate * ANALYSIS_BLOCK_SECONDS)
+            if not len(block):
+                break
+            analyzer.feed(block)
+    return analyzer.result(audio_file_id)
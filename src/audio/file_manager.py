@@ -4,17 +4,176 @@
 
 import os
 import json
+import time
 import shutil
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Callable, Set, AsyncIterator, Iterable
 from datetime import datetime
 
 from pydub import AudioSegment
 from pydub.utils import mediainfo
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 from ..utils.logger import LoggerMixin
 from ..core.database import DatabaseManager
-from .models import AudioFile
+from .models import AudioFile, AudioAnalysis, ImportFailure, ImportProgress, ImportReport, SyncReport
+from .analysis import analyze_audio
+from .probe import probe_audio_header, PROBE_DECODE
+from .search import build_search_tokens, build_match_query
+from .transcode import AudioTranscoder, save_analysis
+
+
+# 批量导入流水线中各阶段之间传递的结束标记
+_STAGE_DONE = object()
+
+# 计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Linux FICLONE ioctl（btrfs/xfs 等文件系统上的写时复制克隆）
+_FICLONE = 0x40049409
+
+# 增量同步时按 IN 查询的每批参数个数（低于 SQLite 默认的变量数上限）
+SYNC_QUERY_CHUNK = 500
+
+
+def _hash_file(file_path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    分块流式计算文件的 SHA-256
+    
+    Args:
+        file_path: 文件路径
+        chunk_size: 每次读取的字节数
+        
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_signature(file_path: str) -> Tuple[int, int, int]:
+    """
+    读取文件签名，用于增量同步判断文件是否变化
+    
+    Args:
+        file_path: 文件路径
+        
+    Returns:
+        Tuple[int, int, int]: (大小, 修改时间纳秒, inode)
+    """
+    st = os.stat(file_path)
+    # SQLite 的 INTEGER 是有符号 64 位，个别文件系统的 inode 会超出范围
+    return st.st_size, st.st_mtime_ns, st.st_ino & 0x7FFFFFFFFFFFFFFF
+
+
+def _store_file(source_path: Path, target_path: Path, allow_hardlink: bool = True) -> str:
+    """
+    将文件放入内容寻址存储，依次尝试 reflink、硬链接和复制
+    
+    目标文件已存在时（相同内容）直接复用。
+    
+    Args:
+        source_path: 源文件路径
+        target_path: 目标路径
+        allow_hardlink: 是否允许使用硬链接
+        
+    Returns:
+        str: 实际使用的方式（existing、reflink、hardlink 或 copy）
+    """
+    if target_path.exists():
+        return 'existing'
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # 先写入临时文件再原子替换，避免并发导入相同内容时产生半写文件
+    temp_path = target_path.with_name(f".{target_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    
+    if fcntl is not None:
+        try:
+            with open(source_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            os.replace(temp_path, target_path)
+            return 'reflink'
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+    
+    if allow_hardlink:
+        try:
+            os.link(source_path, target_path)
+            return 'hardlink'
+        except FileExistsError:
+            return 'existing'
+        except OSError:
+            pass
+    
+    try:
+        shutil.copy2(source_path, temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return 'copy'
+
+
+def _analyze_audio_file(file_path: str, decode_fallback: bool = True,
+                        with_hash: bool = False) -> Dict[str, Any]:
+    """
+    读取音频信息并按需计算内容哈希（在进程池中执行）
+    
+    Args:
+        file_path: 文件路径
+        decode_fallback: 文件头探测失败时是否完整解码
+        with_hash: 是否计算内容哈希
+        
+    Returns:
+        Dict[str, Any]: 音频信息，with_hash 时包含 content_hash
+    """
+    info = _probe_audio_file(file_path, decode_fallback)
+    if with_hash:
+        info['content_hash'] = _hash_file(file_path)
+    return info
+
+
+def _probe_audio_file(file_path: str, decode_fallback: bool = True) -> Dict[str, Any]:
+    """
+    读取音频文件信息（模块级函数，可在进程池中执行）
+    
+    优先只解析文件头；文件头无法识别时，若允许则退回到完整解码。
+    返回值中的 probe_method 标明实际使用的方式（header 或 decode）。
+    
+    Args:
+        file_path: 文件路径
+        decode_fallback: 文件头探测失败时是否完整解码
+        
+    Returns:
+        Dict[str, Any]: 音频信息，读取失败时抛出异常
+    """
+    info = probe_audio_header(file_path)
+    if info:
+        return info
+    
+    if not decode_fallback:
+        raise ValueError(f"无法从文件头识别音频信息: {file_path}")
+    
+    audio = AudioSegment.from_file(file_path)
+    
+    return {
+        'duration': len(audio) / 1000.0,  # 转换为秒
+        'channels': audio.channels,
+        'frame_rate': audio.frame_rate,
+        'sample_width': audio.sample_width,
+        'probe_method': PROBE_DECODE
+    }
 
 
 class AudioFileManager(LoggerMixin):
@@ -30,18 +189,35 @@ class AudioFileManager(LoggerMixin):
         '.flac': 'flac'
     }
     
-    def __init__(self, db_manager: DatabaseManager, storage_path: str = "assets/audio"):
+    # 增量同步需要读取的 audio_files 列
+    _SYNC_COLUMNS = ("id, filename, title, category, tags, file_path, "
+                     "file_size, file_mtime, file_inode, pcm_path")
+    
+    def __init__(self, db_manager: DatabaseManager, storage_path: str = "assets/audio",
+                 decode_fallback: bool = True, content_addressed: bool = False,
+                 allow_hardlink: bool = True, transcoder: AudioTranscoder = None):
         """
         初始化音频文件管理器
         
         Args:
             db_manager: 数据库管理器
             storage_path: 音频文件存储路径
+            decode_fallback: 文件头探测失败时是否退回完整解码获取音频信息
+            content_addressed: 是否启用内容寻址存储（按内容哈希去重，相同内容只存一份）
+            allow_hardlink: 内容寻址存储无法使用 reflink 时是否允许硬链接源文件
+            transcoder: 后台转码器，导入成功的文件会加入转码队列
         """
         self.db_manager = db_manager
         self.storage_path = Path(storage_path)
+        self.decode_fallback = decode_fallback
+        self.content_addressed = content_addressed
+        self.allow_hardlink = allow_hardlink
+        self.transcoder = transcoder
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
+        # 正在导入（已写入存储目录但尚未入库）的文件，增量同步时跳过
+        self._importing: Set[str] = set()
+        
         self.logger.info(f"音频文件管理器初始化完成，存储路径: {self.storage_path}")
     
     async def import_audio_file(self, file_path: str, title: str = None, 
@@ -68,52 +244,102 @@ class AudioFileManager(LoggerMixin):
         if source_path.suffix.lower() not in self.SUPPORTED_FORMATS:
             raise ValueError(f"不支持的音频格式: {source_path.suffix}")
         
+        loop = asyncio.get_running_loop()
+        target_path = None
+        created = False
+        content_hash = None
+        
         try:
-            # 获取音频信息
-            audio_info = self._get_audio_info(source_path)
+            # 内容寻址模式下先按哈希查重，重复内容直接返回已有记录
+            if self.content_addressed:
+                content_hash = await loop.run_in_executor(None, _hash_file, str(source_path))
+                existing = await self.find_by_hash(content_hash)
+                if existing:
+                    self.logger.info(f"音频内容已存在，跳过导入: {source_path.name} -> {existing.filename}")
+                    return existing
+            
+            # 获取音频信息（解码和复制都在线程池中执行，避免阻塞事件循环）
+            audio_info = await loop.run_in_executor(None, self._get_audio_info, source_path)
             
-            # 生成目标文件名
-            filename = self._generate_filename(source_path.name)
-            target_path = self.storage_path / filename
+            # 生成目标文件名并放入存储目录
+            if content_hash:
+                filename, target_path = self._content_target(content_hash, source_path.suffix)
+                self._importing.add(str(target_path))
+                method = await loop.run_in_executor(
+                    None, _store_file, source_path, target_path, self.allow_hardlink
+                )
+                created = method != 'existing'
+            else:
+                filename = self._generate_filename(source_path.name)
+                target_path = self.storage_path / filename
+                self._importing.add(str(target_path))
+                await loop.run_in_executor(None, shutil.copy2, source_path, target_path)
+                created = True
             
-            # 复制文件到存储目录
-            shutil.copy2(source_path, target_path)
+            file_size, file_mtime, file_inode = _file_signature(str(target_path))
             
             # 创建音频文件对象
             audio_file = AudioFile(
                 filename=filename,
                 title=title or source_path.stem,
                 duration=audio_info.get('duration'),
-                file_size=target_path.stat().st_size,
+                file_size=file_size,
                 format=self.SUPPORTED_FORMATS[source_path.suffix.lower()],
                 file_path=str(target_path),
                 tags=json.dumps(tags) if tags else None,
                 category=category,
+                content_hash=content_hash,
+                file_mtime=file_mtime,
+                file_inode=file_inode,
                 created_at=datetime.now(),
                 updated_at=datetime.now()
             )
             
             # 保存到数据库
-            audio_file.id = await self.db_manager.insert('audio_files', {
-                'filename': audio_file.filename,
-                'title': audio_file.title,
-                'duration': audio_file.duration,
-                'file_size': audio_file.file_size,
-                'format': audio_file.format,
-                'file_path': audio_file.file_path,
-                'tags': audio_file.tags,
-                'category': audio_file.category
-            })
+            audio_file.id = await self.db_manager.insert('audio_files', self._audio_file_row(audio_file))
+            
+            if self.transcoder:
+                self.transcoder.enqueue([audio_file.id])
             
             self.logger.info(f"音频文件导入成功: {filename}")
             return audio_file
             
+        except sqlite3.IntegrityError:
+            # 并发导入相同内容时，另一方已写入记录
+            if content_hash:
+                existing = await self.find_by_hash(content_hash)
+                if existing:
+                    return existing
+            raise
+            
         except Exception as e:
             self.logger.error(f"导入音频文件失败: {e}")
-            # 清理已复制的文件
-            if 'target_path' in locals() and target_path.exists():
+            # 清理本次写入的文件
+            if created and target_path is not None and target_path.exists():
                 target_path.unlink()
             raise
+            
+        finally:
+            if target_path is not None:
+                self._importing.discard(str(target_path))
+    
+    async def find_by_hash(self, content_hash: str) -> Optional[AudioFile]:
+        """
+        按内容哈希查找音频文件（走唯一索引）
+        
+        Args:
+            content_hash: 内容哈希
+            
+        Returns:
+            Optional[AudioFile]: 音频文件对象
+        """
+        data = await self.db_manager.fetchone(
+            "SELECT * FROM audio_files WHERE content_hash = ?", (content_hash,)
+        )
+        
+        if data:
+            return AudioFile.from_dict(data)
+        return None
     
     async def get_audio_file(self, file_id: int) -> Optional[AudioFile]:
         """
@@ -133,27 +359,97 @@ class AudioFileManager(LoggerMixin):
             return AudioFile.from_dict(data)
         return None
     
+    async def get_analysis(self, file_id: int) -> Optional[AudioAnalysis]:
+        """
+        获取音频分析结果（响度、峰值、首尾静音、缩略波形）
+        
+        Args:
+            file_id: 文件ID
+            
+        Returns:
+            Optional[AudioAnalysis]: 分析结果，尚未分析时返回 None
+        """
+        data = await self.db_manager.fetchone(
+            "SELECT * FROM audio_analysis WHERE audio_file_id = ?", (file_id,)
+        )
+        
+        if data:
+            return AudioAnalysis.from_dict(data)
+        return None
+    
+    async def analyze_audio_file(self, file_id: int, sample_rate: int = 44100, channels: int = 2,
+                                 force: bool = False) -> Optional[AudioAnalysis]:
+        """
+        分析音频文件并保存结果（启用转码器时导入后会自动完成）
+        
+        Args:
+            file_id: 文件ID
+            sample_rate: 分析采样率
+            channels: 分析声道数
+            force: 已有结果时是否重新分析
+            
+        Returns:
+            Optional[AudioAnalysis]: 分析结果，文件不存在或分析失败时返回 None
+        """
+        if not force:
+            analysis = await self.get_analysis(file_id)
+            if analysis:
+                return analysis
+        
+        audio_file = await self.get_audio_file(file_id)
+        if not audio_file:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        try:
+            analysis = await loop.run_in_executor(
+                None, analyze_audio, audio_file.file_path, sample_rate, channels
+            )
+        except Exception as e:
+            self.logger.error(f"分析音频文件失败: {audio_file.file_path}, 错误: {e}")
+            return None
+        
+        analysis.audio_file_id = file_id
+        await save_analysis(self.db_manager, file_id, analysis)
+        return analysis
+    
     async def list_audio_files(self, category: str = None, 
-                              limit: int = None, offset: int = 0) -> List[AudioFile]:
+                              limit: int = None, offset: int = 0,
+                              after: Tuple[Any, int] = None) -> List[AudioFile]:
         """
-        列出音频文件
+        列出音频文件（按创建时间倒序）
+        
+        翻页时建议传入 after（上一页最后一条的 (created_at, id)）做键集分页，
+        查询直接沿索引定位，深分页不会随 offset 线性变慢。
         
         Args:
             category: 分类过滤
             limit: 限制数量
-            offset: 偏移量
+            offset: 偏移量（与 after 同时使用时在游标之后再跳过）
+            after: 游标，只返回排在该 (created_at, id) 之后的记录
             
         Returns:
             List[AudioFile]: 音频文件列表
         """
         sql = "SELECT * FROM audio_files"
+        conditions = []
         params = []
         
         if category:
-            sql += " WHERE category = ?"
+            conditions.append("category = ?")
             params.append(category)
         
-        sql += " ORDER BY created_at DESC"
+        if after:
+            created_at, file_id = after
+            if isinstance(created_at, datetime):
+                created_at = str(created_at)
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend([created_at, file_id])
+        
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        
+        sql += " ORDER BY created_at DESC, id DESC"
         
         if limit:
             sql += " LIMIT ? OFFSET ?"
@@ -162,6 +458,29 @@ class AudioFileManager(LoggerMixin):
         data_list = await self.db_manager.fetchall(sql, tuple(params) if params else None)
         return [AudioFile.from_dict(data) for data in data_list]
     
+    async def iter_audio_files(self, category: str = None,
+                               chunk_size: int = 500) -> AsyncIterator[AudioFile]:
+        """
+        流式遍历音频文件，按块做键集分页查询，不一次性加载全部记录
+        
+        Args:
+            category: 分类过滤
+            chunk_size: 每次查询的记录数
+            
+        Yields:
+            AudioFile: 音频文件对象
+        """
+        after = None
+        while True:
+            chunk = await self.list_audio_files(category, limit=chunk_size, after=after)
+            for audio_file in chunk:
+                yield audio_file
+            
+            if len(chunk) < chunk_size:
+                return
+            last = chunk[-1]
+            after = (last.created_at, last.id)
+    
     async def update_audio_file(self, file_id: int, **kwargs) -> bool:
         """
         更新音频文件信息
@@ -180,6 +499,15 @@ class AudioFileManager(LoggerMixin):
         if 'tags' in kwargs and isinstance(kwargs['tags'], list):
             kwargs['tags'] = json.dumps(kwargs['tags'])
         
+        # 检索字段变化时重新分词
+        if {'title', 'filename', 'category', 'tags'} & kwargs.keys():
+            current = await self.db_manager.fetchone(
+                "SELECT title, filename, category, tags FROM audio_files WHERE id = ?", (file_id,)
+            )
+            if current:
+                current.update({k: v for k, v in kwargs.items() if k in current})
+                kwargs['search_tokens'] = build_search_tokens(**current)
+        
         rows_affected = await self.db_manager.update(
             'audio_files', kwargs, 'id = ?', (file_id,)
         )
@@ -218,6 +546,8 @@ class AudioFileManager(LoggerMixin):
                     if file_path.exists():
                         file_path.unlink()
                         self.logger.info(f"物理文件已删除: {file_path}")
+                    if audio_file.pcm_path:
+                        Path(audio_file.pcm_path).unlink(missing_ok=True)
                 
                 self.logger.info(f"音频文件删除成功: {file_id}")
                 return True
@@ -227,26 +557,723 @@ class AudioFileManager(LoggerMixin):
         
         return False
     
-    async def search_audio_files(self, query: str) -> List[AudioFile]:
+    async def import_directory(self, directory: str, recursive: bool = True,
+                               workers: int = None, category: str = None,
+                               tags: List[str] = None, batch_size: int = 100,
+                               queue_size: int = 256, use_processes: bool = True,
+                               progress: Callable[[ImportProgress], Any] = None) -> ImportReport:
+        """
+        批量导入目录中的音频文件
+        
+        流水线分为四个阶段：扫描目录 -> 进程池读取音频信息 -> 线程池复制文件 -> 批量写入数据库。
+        各阶段之间使用有界队列连接，事件循环只负责调度，不执行解码和文件IO。
+        
+        Args:
+            directory: 目录路径
+            recursive: 是否递归扫描子目录
+            workers: 读取信息和复制文件的并发数，默认为CPU核数
+            category: 分类
+            tags: 标签列表
+            batch_size: 每批写入数据库的记录数
+            queue_size: 阶段间队列的容量
+            use_processes: 是否使用进程池读取音频信息（否则使用线程池）
+            progress: 进度回调，支持同步或异步函数
+            
+        Returns:
+            ImportReport: 导入结果报告（包含每个失败文件的错误信息）
+        """
+        root = Path(directory)
+        if not root.is_dir():
+            raise NotADirectoryError(f"目录不存在: {directory}")
+        
+        workers = max(1, workers or os.cpu_count() or 1)
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        
+        report = ImportReport(directory=str(root))
+        state = ImportProgress(stage='scan')
+        reserved: Set[str] = set()
+        inflight: Dict[str, asyncio.Future] = {}
+        tags_json = json.dumps(tags) if tags else None
+        
+        scan_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        copy_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        insert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        
+        async def emit(stage: str, file_path: Optional[Path] = None):
+            if progress is None:
+                return
+            state.stage = stage
+            state.file_path = str(file_path) if file_path else None
+            try:
+                result = progress(ImportProgress(**state.__dict__))
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.warning(f"导入进度回调出错: {e}")
+        
+        async def fail(file_path: Path, stage: str, error: Exception):
+            report.failures.append(ImportFailure(str(file_path), stage, str(error)))
+            state.failed += 1
+            self.logger.warning(f"导入失败 [{stage}] {file_path}: {error}")
+            await emit(stage, file_path)
+        
+        # 任一阶段出错时通知扫描线程停止（否则它可能永远阻塞在已满的队列上）
+        aborted = threading.Event()
+        claimed: Set[str] = set()  # 本次导入占用的目标路径，中止时释放
+        
+        def scan():
+            # 在线程中遍历目录；队列满时阻塞扫描线程，形成背压
+            for file_path in self._scan_directory(root, recursive):
+                if aborted.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(scan_queue.put(file_path), loop).result()
+        
+        async def finish(queue: asyncio.Queue, count: int = 1):
+            # 通知下游本阶段的一个任务已结束（中止时下游也已取消，不再等待）
+            if not aborted.is_set():
+                for _ in range(count):
+                    await queue.put(_STAGE_DONE)
+        
+        async def scan_stage():
+            try:
+                await loop.run_in_executor(None, scan)
+            except Exception as e:
+                await fail(root, 'scan', e)
+            finally:
+                await finish(scan_queue, workers)
+        
+        async def probe_worker(probe_pool: Executor):
+            try:
+                while True:
+                    source_path = await scan_queue.get()
+                    if source_path is _STAGE_DONE:
+                        break
+                    state.scanned += 1
+                    
+                    try:
+                        audio_info = await loop.run_in_executor(
+                            probe_pool, _analyze_audio_file, str(source_path),
+                            self.decode_fallback, self.content_addressed
+                        )
+                    except Exception as e:
+                        await fail(source_path, 'probe', e)
+                        continue
+                    state.probed += 1
+                    method = audio_info['probe_method']
+                    report.probe_methods[method] = report.probe_methods.get(method, 0) + 1
+                    await emit('probe', source_path)
+                    
+                    content_hash = audio_info.get('content_hash')
+                    if content_hash:
+                        filename, target_path = self._content_target(content_hash, source_path.suffix)
+                    else:
+                        filename = self._generate_filename(source_path.name, reserved)
+                        target_path = self.storage_path / filename
+                    
+                    audio_file = AudioFile(
+                        filename=filename,
+                        title=source_path.stem,
+                        duration=audio_info.get('duration'),
+                        format=self.SUPPORTED_FORMATS[source_path.suffix.lower()],
+                        file_path=str(target_path),
+                        tags=tags_json,
+                        category=category,
+                        content_hash=content_hash,
+                        created_at=datetime.now(),
+                        updated_at=datetime.now()
+                    )
+                    
+                    # 内容寻址模式：本次导入中或库中已有相同内容时跳过复制
+                    if content_hash:
+                        owner = inflight.get(content_hash)
+                        if owner is None:
+                            # 第一个遇到该哈希的任务负责查库，其余任务等待查询结果
+                            owner = inflight[content_hash] = loop.create_future()
+                            try:
+                                owner.set_result(await self.find_by_hash(content_hash) or audio_file)
+                            except Exception as e:
+                                owner.set_exception(e)
+                        try:
+                            existing = await owner
+                        except Exception as e:
+                            await fail(source_path, 'dedup', e)
+                            continue
+                        if existing is not audio_file:
+                            report.duplicates.append(existing)
+                            state.duplicates += 1
+                            await emit('dedup', source_path)
+                            continue
+                    
+                    await copy_queue.put((source_path, audio_file))
+            finally:
+                await finish(copy_queue)
+        
+        async def copy_worker(copy_pool: Executor):
+            try:
+                while True:
+                    item = await copy_queue.get()
+                    if item is _STAGE_DONE:
+                        break
+                    source_path, audio_file = item
+                    target_path = Path(audio_file.file_path)
+                    content_hash = audio_file.content_hash
+                    
+                    self._importing.add(str(target_path))
+                    claimed.add(str(target_path))
+                    try:
+                        if content_hash:
+                            created = await loop.run_in_executor(
+                                copy_pool, _store_file, source_path, target_path, self.allow_hardlink
+                            ) != 'existing'
+                        else:
+                            created = True
+                            await loop.run_in_executor(copy_pool, shutil.copy2, source_path, target_path)
+                        audio_file.file_size, audio_file.file_mtime, audio_file.file_inode = \
+                            _file_signature(str(target_path))
+                    except Exception as e:
+                        self._importing.discard(str(target_path))
+                        if not content_hash:
+                            reserved.discard(audio_file.filename)
+                            if target_path.exists():
+                                target_path.unlink()
+                        await fail(source_path, 'copy', e)
+                        continue
+                    state.copied += 1
+                    await emit('copy', source_path)
+                    
+                    await insert_queue.put((source_path, audio_file, created))
+            finally:
+                await finish(insert_queue)
+        
+        async def insert_stage():
+            remaining = workers
+            batch = []
+            
+            while remaining:
+                item = await insert_queue.get()
+                if item is _STAGE_DONE:
+                    remaining -= 1
+                else:
+                    batch.append(item)
+                
+                # 批次已满或上游暂时没有数据时写入数据库
+                if batch and (len(batch) >= batch_size or insert_queue.empty() or not remaining):
+                    await self._insert_import_batch(batch, report, fail)
+                    self._importing.difference_update(audio_file.file_path for _, audio_file, _ in batch)
+                    state.imported = len(report.imported)
+                    await emit('insert', batch[-1][0])
+                    batch = []
+        
+        probe_pool = (ProcessPoolExecutor(max_workers=workers) if use_processes
+                      else ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audio-probe'))
+        copy_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audio-copy')
+        
+        self.logger.info(f"开始批量导入目录: {root} (并发数: {workers})")
+        
+        tasks = [
+            asyncio.ensure_future(scan_stage()),
+            asyncio.ensure_future(insert_stage()),
+            *[asyncio.ensure_future(probe_worker(probe_pool)) for _ in range(workers)],
+            *[asyncio.ensure_future(copy_worker(copy_pool)) for _ in range(workers)]
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 某个阶段出错或导入被取消：停止扫描并取消其余阶段
+            aborted.set()
+            for task in tasks:
+                task.cancel()
+            while not scan_queue.empty():
+                scan_queue.get_nowait()  # 让阻塞在 put 上的扫描线程继续并看到中止标志
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._importing.difference_update(claimed)
+            raise
+        finally:
+            probe_pool.shutdown(wait=False, cancel_futures=True)
+            copy_pool.shutdown(wait=False, cancel_futures=True)
+        
+        report.scanned = state.scanned
+        report.elapsed = time.monotonic() - started
+        state.scan_finished = True
+        await emit('done')
+        
+        self.logger.info(f"批量导入完成: 扫描 {report.scanned} 个文件, 导入 {len(report.imported)} 个, "
+                         f"失败 {len(report.failures)} 个, 耗时 {report.elapsed:.2f}s")
+        return report
+    
+    async def _insert_import_batch(self, batch: List[Tuple[Path, AudioFile, bool]],
+                                   report: ImportReport, fail: Callable):
+        """将一批已复制的文件写入数据库，批量写入失败时逐条重试以定位错误"""
+        rows = [self._audio_file_row(audio_file) for _, audio_file, _ in batch]
+        
+        try:
+            await self.db_manager.insert_many('audio_files', rows)
+        except Exception:
+            for (source_path, audio_file, created), row in zip(batch, rows):
+                try:
+                    audio_file.id = await self.db_manager.insert('audio_files', row)
+                    report.imported.append(audio_file)
+                    if self.transcoder:
+                        self.transcoder.enqueue([audio_file.id])
+                except Exception as e:
+                    if created:
+                        Path(audio_file.file_path).unlink(missing_ok=True)
+                    await fail(source_path, 'insert', e)
+            return
+        
+        # 回填自增ID
+        filenames = [audio_file.filename for _, audio_file, _ in batch]
+        placeholders = ', '.join(['?'] * len(filenames))
+        id_rows = await self.db_manager.fetchall(
+            f"SELECT id, filename FROM audio_files WHERE filename IN ({placeholders})",
+            tuple(filenames)
+        )
+        ids = {row['filename']: row['id'] for row in id_rows}
+        
+        for _, audio_file, _ in batch:
+            audio_file.id = ids.get(audio_file.filename)
+            report.imported.append(audio_file)
+        
+        if self.transcoder:
+            self.transcoder.enqueue(audio_file.id for _, audio_file, _ in batch)
+    
+    def _scan_directory(self, root: Path, recursive: bool):
+        """遍历目录，逐个产出支持格式的音频文件路径"""
+        pending = [root]
+        while pending:
+            current = pending.pop()
+            with os.scandir(current) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(Path(entry.path))
+                    elif entry.is_file() and Path(entry.name).suffix.lower() in self.SUPPORTED_FORMATS:
+                        yield Path(entry.path)
+    
+    async def sync_storage(self, remove_missing: bool = True, import_new: bool = True,
+                           category: str = None, roots: Iterable[str] = None) -> SyncReport:
+        """
+        增量同步存储目录与数据库
+        
+        比较磁盘上每个文件的大小、修改时间和 inode 与库中记录的签名，只对发生变化的
+        文件重新读取音频信息并作废转码缓存；按 inode 识别重命名和移动，保留原记录
+        （及播放列表引用）。未入库的新文件就地登记，已消失的文件删除记录。
+        所有数据库改动分批写入。
+        
+        Args:
+            remove_missing: 是否删除文件已不存在的记录（否则只在报告中列出）
+            import_new: 是否登记存储目录中尚未入库的文件
+            category: 新登记文件的分类
+            roots: 只同步这些子目录（目录创建、删除、移动时），默认为整个存储目录
+            
+        Returns:
+            SyncReport: 同步结果报告
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        
+        roots = [Path(root) for root in roots] if roots is not None else [self.storage_path]
+        disk = await loop.run_in_executor(None, self._stat_storage, roots)
+        prefixes = tuple(os.path.join(str(root), '') for root in roots)
+        rows = [
+            row for row in await self.db_manager.fetchall(f"SELECT {self._SYNC_COLUMNS} FROM audio_files")
+            if row['file_path'].startswith(prefixes)
+        ]
+        
+        report = await self._sync_entries(disk, rows, remove_missing, import_new, category)
+        report.elapsed = time.monotonic() - started
+        self._log_sync(report)
+        return report
+    
+    async def sync_paths(self, paths: Iterable[str], remove_missing: bool = True,
+                         import_new: bool = True, category: str = None) -> SyncReport:
+        """
+        只同步指定路径（监视模式下按文件系统事件调用）
+        
+        移动事件的源路径和目标路径都应传入；若只收到目标路径，会按 inode
+        在库中查找原路径已不存在的记录作为重命名处理。
+        
+        Args:
+            paths: 发生变化的文件路径
+            remove_missing: 是否删除文件已不存在的记录
+            import_new: 是否登记尚未入库的文件
+            category: 新登记文件的分类
+            
+        Returns:
+            SyncReport: 同步结果报告
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        paths = {str(Path(path)) for path in paths}
+        
+        disk = await loop.run_in_executor(None, self._stat_paths, paths)
+        rows = await self._fetch_sync_rows('file_path', paths)
+        
+        known = {row['file_path'] for row in rows}
+        inodes = {signature[2] for path, signature in disk.items() if path not in known}
+        if inodes:
+            candidates = [row for row in await self._fetch_sync_rows('file_inode', inodes)
+                          if row['file_path'] not in known]
+            rows.extend(await loop.run_in_executor(
+                None, lambda: [row for row in candidates if not os.path.exists(row['file_path'])]
+            ))
+        
+        report = await self._sync_entries(disk, rows, remove_missing, import_new, category)
+        report.elapsed = time.monotonic() - started
+        self._log_sync(report)
+        return report
+    
+    async def _fetch_sync_rows(self, column: str, values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """按某列分批 IN 查询增量同步需要的记录"""
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), SYNC_QUERY_CHUNK):
+            chunk = values[start:start + SYNC_QUERY_CHUNK]
+            rows.extend(await self.db_manager.fetchall(
+                f"SELECT {self._SYNC_COLUMNS} FROM audio_files "
+                f"WHERE {column} IN ({', '.join(['?'] * len(chunk))})",
+                tuple(chunk)
+            ))
+        return rows
+    
+    async def _sync_entries(self, disk: Dict[str, Tuple[int, int, int]], rows: List[Dict[str, Any]],
+                            remove_missing: bool, import_new: bool, category: str) -> SyncReport:
+        """
+        根据磁盘签名和库中记录计算差异并批量写入
+        
+        Args:
+            disk: 路径 -> (大小, 修改时间纳秒, inode)
+            rows: 对应范围内的库中记录
+            remove_missing: 是否删除文件已不存在的记录
+            import_new: 是否登记尚未入库的文件
+            category: 新登记文件的分类
+            
+        Returns:
+            SyncReport: 同步结果报告（不含耗时）
+        """
+        loop = asyncio.get_running_loop()
+        report = SyncReport(storage_path=str(self.storage_path), scanned=len(disk))
+        
+        async def fail(file_path: Path, stage: str, error: Exception):
+            report.failures.append(ImportFailure(str(file_path), stage, str(error)))
+            self.logger.warning(f"同步失败 [{stage}] {file_path}: {error}")
+        
+        by_path = {row['file_path']: row for row in rows}
+        updates: List[Dict[str, Any]] = []
+        stale: List[Dict[str, Any]] = []  # 内容变化，需要作废转码缓存和分析结果的记录
+        retranscode: List[int] = []
+        changed: List[Dict[str, Any]] = []
+        
+        for file_path, row in by_path.items():
+            signature = disk.get(file_path)
+            if signature is None:
+                continue
+            size, mtime, inode = signature
+            if (row['file_size'], row['file_mtime'], row['file_inode']) == signature:
+                report.unchanged += 1
+            elif row['file_mtime'] is None and row['file_size'] == size:
+                # 旧版本导入的记录没有修改时间和 inode，大小一致时只补全签名
+                updates.append({'id': row['id'], 'file_mtime': mtime, 'file_inode': inode})
+                report.backfilled += 1
+            else:
+                changed.append(row)
+        
+        # 重命名或移动后 inode、大小和修改时间都不变
+        moved_from = {
+            (row['file_inode'], row['file_size'], row['file_mtime']): row
+            for file_path, row in by_path.items()
+            if file_path not in disk and row['file_inode'] is not None
+        }
+        new_paths = []
+        for file_path, (size, mtime, inode) in disk.items():
+            if file_path in by_path or file_path in self._importing:
+                continue
+            row = moved_from.pop((inode, size, mtime), None)
+            if row is None:
+                new_paths.append(file_path)
+                continue
+            
+            filename = self._storage_filename(file_path)
+            update = {
+                'id': row['id'],
+                'file_path': file_path,
+                'filename': filename,
+                'search_tokens': build_search_tokens(row['title'], filename, row['category'], row['tags'])
+            }
+            if row['pcm_path'] and not os.path.exists(row['pcm_path']):
+                # 缓存没有随原文件一起移动，分析结果仍然有效，只需重新转码
+                update.update(pcm_path=None, pcm_sample_rate=None, pcm_channels=None, pcm_gain_db=None)
+                retranscode.append(row['id'])
+            updates.append(update)
+            report.renamed.append(row['id'])
+        
+        renamed = set(report.renamed)
+        missing = [row for file_path, row in by_path.items()
+                   if file_path not in disk and row['id'] not in renamed]
+        
+        # 只对内容变化的文件重新读取音频信息
+        results = await asyncio.gather(*[
+            loop.run_in_executor(None, _analyze_audio_file, row['file_path'],
+                                 self.decode_fallback, self.content_addressed)
+            for row in changed
+        ], return_exceptions=True)
+        
+        hashes = {}
+        for row, info in zip(changed, results):
+            if isinstance(info, BaseException):
+                await fail(Path(row['file_path']), 'probe', info)
+                continue
+            size, mtime, inode = disk[row['file_path']]
+            update = {
+                'id': row['id'],
+                'duration': info.get('duration'),
+                'file_size': size,
+                'file_mtime': mtime,
+                'file_inode': inode,
+                'pcm_path': None,
+                'pcm_sample_rate': None,
+                'pcm_channels': None,
+                'pcm_gain_db': None
+            }
+            if self.content_addressed:
+                update['content_hash'] = info['content_hash']
+                hashes[row['id']] = info['content_hash']
+            updates.append(update)
+            stale.append(row)
+            retranscode.append(row['id'])
+            report.updated.append(row['id'])
+        
+        if hashes:
+            await self._release_conflicting_hashes(updates, hashes)
+        
+        if updates:
+            await self.db_manager.update_many('audio_files', updates)
+        
+        if stale:
+            await loop.run_in_executor(None, lambda: [
+                Path(row['pcm_path']).unlink(missing_ok=True) for row in stale if row['pcm_path']
+            ])
+            await self._delete_where_in('audio_analysis', 'audio_file_id', [row['id'] for row in stale])
+        
+        if missing:
+            ids = [row['id'] for row in missing]
+            if remove_missing:
+                await self._delete_where_in('audio_files', 'id', ids)
+                await loop.run_in_executor(None, lambda: [
+                    Path(row['pcm_path']).unlink(missing_ok=True) for row in missing if row['pcm_path']
+                ])
+                report.removed.extend(ids)
+            else:
+                report.missing.extend(ids)
+        
+        if new_paths and import_new:
+            await self._register_new_files(new_paths, disk, category, report, fail)
+        
+        if self.transcoder and retranscode:
+            self.transcoder.enqueue(retranscode)
+        
+        return report
+    
+    async def _register_new_files(self, paths: List[str], disk: Dict[str, Tuple[int, int, int]],
+                                  category: str, report: SyncReport, fail: Callable):
+        """就地登记存储目录中尚未入库的文件（不复制）"""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(None, _analyze_audio_file, file_path,
+                                 self.decode_fallback, self.content_addressed)
+            for file_path in paths
+        ], return_exceptions=True)
+        
+        batch = []
+        for file_path, info in zip(paths, results):
+            if isinstance(info, BaseException):
+                await fail(Path(file_path), 'probe', info)
+                continue
+            size, mtime, inode = disk[file_path]
+            batch.append((Path(file_path), AudioFile(
+                filename=self._storage_filename(file_path),
+                title=Path(file_path).stem,
+                duration=info.get('duration'),
+                file_size=size,
+                format=self.SUPPORTED_FORMATS[Path(file_path).suffix.lower()],
+                file_path=file_path,
+                category=category,
+                content_hash=info.get('content_hash'),
+                file_mtime=mtime,
+                file_inode=inode,
+                created_at=datetime.now(),
+                updated_at=datetime.now()
+            ), False))
+        
+        if batch:
+            await self._insert_import_batch(batch, report, fail)
+    
+    async def _release_conflicting_hashes(self, updates: List[Dict[str, Any]], hashes: Dict[int, str]):
+        """内容变化后与其它记录哈希相同的文件不再参与去重（唯一索引允许多个空值）"""
+        owners = {}
+        values = list(set(hashes.values()))
+        for start in range(0, len(values), SYNC_QUERY_CHUNK):
+            chunk = values[start:start + SYNC_QUERY_CHUNK]
+            for row in await self.db_manager.fetchall(
+                f"SELECT id, content_hash FROM audio_files "
+                f"WHERE content_hash IN ({', '.join(['?'] * len(chunk))})",
+                tuple(chunk)
+            ):
+                owners[row['content_hash']] = row['id']
+        
+        for update in updates:
+            content_hash = update.get('content_hash')
+            if content_hash is None:
+                continue
+            owner = owners.setdefault(content_hash, update['id'])
+            if owner != update['id']:
+                self.logger.warning(f"文件内容与已有记录重复，取消内容寻址: {update['id']} -> {owner}")
+                update['content_hash'] = None
+    
+    async def _delete_where_in(self, table: str, column: str, values: List[Any]):
+        """分批按 IN 条件删除"""
+        for start in range(0, len(values), SYNC_QUERY_CHUNK):
+            chunk = values[start:start + SYNC_QUERY_CHUNK]
+            await self.db_manager.delete(table, f"{column} IN ({', '.join(['?'] * len(chunk))})", tuple(chunk))
+    
+    def _stat_storage(self, roots: Iterable[Path]) -> Dict[str, Tuple[int, int, int]]:
+        """遍历存储目录（或其中的子目录），读取每个音频文件的签名（在线程中执行）"""
+        signatures = {}
+        for root in roots:
+            if not root.is_dir():
+                continue  # 已删除或移走的目录，其中的记录按缺失处理
+            for file_path in self._scan_directory(root, True):
+                try:
+                    signatures[str(file_path)] = _file_signature(str(file_path))
+                except FileNotFoundError:
+                    continue  # 遍历期间被删除
+        return signatures
+    
+    def _stat_paths(self, paths: Iterable[str]) -> Dict[str, Tuple[int, int, int]]:
+        """读取指定路径中仍然存在的音频文件的签名（在线程中执行）"""
+        signatures = {}
+        for file_path in paths:
+            if Path(file_path).suffix.lower() not in self.SUPPORTED_FORMATS or not os.path.isfile(file_path):
+                continue
+            try:
+                signatures[file_path] = _file_signature(file_path)
+            except FileNotFoundError:
+                continue
+        return signatures
+    
+    def _storage_filename(self, file_path: str) -> str:
+        """存储目录中文件的记录名（相对存储目录的路径）"""
+        try:
+            return Path(file_path).relative_to(self.storage_path).as_posix()
+        except ValueError:
+            return Path(file_path).name
+    
+    def _log_sync(self, report: SyncReport):
+        """输出同步结果"""
+        message = (f"存储同步完成: 检查 {report.scanned} 个文件, 未变 {report.unchanged} 个, "
+                   f"更新 {len(report.updated)} 个, 重命名 {len(report.renamed)} 个, "
+                   f"新增 {len(report.imported)} 个, 删除 {len(report.removed)} 个, "
+                   f"失败 {len(report.failures)} 个, 耗时 {report.elapsed:.2f}s")
+        if report.changed or report.failures:
+            self.logger.info(message)
+        else:
+            self.logger.debug(message)
+    
+    @staticmethod
+    def _audio_file_row(audio_file: AudioFile) -> Dict[str, Any]:
+        """构建 audio_files 表的数据行"""
+        return {
+            'filename': audio_file.filename,
+            'title': audio_file.title,
+            'duration': audio_file.duration,
+            'file_size': audio_file.file_size,
+            'format': audio_file.format,
+            'file_path': audio_file.file_path,
+            'tags': audio_file.tags,
+            'category': audio_file.category,
+            'content_hash': audio_file.content_hash,
+            'file_mtime': audio_file.file_mtime,
+            'file_inode': audio_file.file_inode,
+            'search_tokens': build_search_tokens(
+                audio_file.title, audio_file.filename, audio_file.category, audio_file.tags
+            )
+        }
+    
+    async def search_audio_files(self, query: str, limit: int = None,
+                                 offset: int = 0) -> List[AudioFile]:
         """
         搜索音频文件
         
+        使用 FTS5 全文索引检索标题、文件名、分类和标签，按 bm25 相关度排序；
+        中文关键词会先分词。数据库不支持 FTS5 时退回到 LIKE 查询。
+        
         Args:
             query: 搜索关键词
+            limit: 限制数量
+            offset: 偏移量
             
         Returns:
             List[AudioFile]: 搜索结果
         """
+        if not self.db_manager.fts_enabled:
+            return await self._search_audio_files_like(query, limit, offset)
+        
+        match = build_match_query(query)
+        if not match:
+            return []
+        
+        # 列权重依次为 title, filename, category, tags, search_tokens
+        sql = """
+            SELECT af.* FROM audio_files_fts
+            JOIN audio_files af ON af.id = audio_files_fts.rowid
+            WHERE audio_files_fts MATCH ?
+            ORDER BY bm25(audio_files_fts, 10.0, 2.0, 5.0, 1.0, 8.0), af.id
+        """
+        params = [match]
+        
+        if limit:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        
+        data_list = await self.db_manager.fetchall(sql, tuple(params))
+        return [AudioFile.from_dict(data) for data in data_list]
+    
+    async def rebuild_search_index(self) -> int:
+        """
+        重新计算所有音频文件的分词并刷新全文索引
+        
+        Returns:
+            int: 更新的记录数
+        """
+        data_list = await self.db_manager.fetchall(
+            "SELECT id, title, filename, category, tags FROM audio_files"
+        )
+        rows = [
+            {'id': data.pop('id'), 'search_tokens': build_search_tokens(**data)}
+            for data in data_list
+        ]
+        
+        updated = await self.db_manager.update_many('audio_files', rows)
+        self.logger.info(f"全文索引重建完成: {updated} 条记录")
+        return updated
+    
+    async def _search_audio_files_like(self, query: str, limit: int = None,
+                                       offset: int = 0) -> List[AudioFile]:
+        """使用 LIKE 搜索音频文件（不支持 FTS5 时使用）"""
         sql = """
             SELECT * FROM audio_files 
             WHERE title LIKE ? OR filename LIKE ? OR category LIKE ?
             ORDER BY created_at DESC
         """
         search_term = f"%{query}%"
+        params = [search_term, search_term, search_term]
         
-        data_list = await self.db_manager.fetchall(
-            sql, (search_term, search_term, search_term)
-        )
+        if limit:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        
+        data_list = await self.db_manager.fetchall(sql, tuple(params))
         
         return [AudioFile.from_dict(data) for data in data_list]
     
@@ -261,25 +1288,34 @@ class AudioFileManager(LoggerMixin):
             Dict[str, Any]: 音频信息
         """
         try:
-            # 使用pydub获取音频信息
-            audio = AudioSegment.from_file(str(file_path))
-            
-            return {
-                'duration': len(audio) / 1000.0,  # 转换为秒
-                'channels': audio.channels,
-                'frame_rate': audio.frame_rate,
-                'sample_width': audio.sample_width
-            }
+            info = _probe_audio_file(str(file_path), self.decode_fallback)
+            self.logger.debug(f"音频信息探测方式: {info['probe_method']} ({file_path.name})")
+            return info
         except Exception as e:
             self.logger.warning(f"获取音频信息失败: {e}")
             return {}
     
-    def _generate_filename(self, original_name: str) -> str:
+    def _content_target(self, content_hash: str, suffix: str) -> Tuple[str, Path]:
+        """
+        内容寻址存储的文件名和路径：objects/<哈希前两位>/<哈希><扩展名>
+        
+        Args:
+            content_hash: 内容哈希
+            suffix: 扩展名
+            
+        Returns:
+            Tuple[str, Path]: (文件名, 存储路径)
+        """
+        filename = f"{content_hash}{suffix.lower()}"
+        return filename, self.storage_path / "objects" / content_hash[:2] / filename
+    
+    def _generate_filename(self, original_name: str, reserved: Set[str] = None) -> str:
         """
         生成唯一的文件名
         
         Args:
             original_name: 原始文件名
+            reserved: 已被占用但尚未落盘的文件名（并发复制时使用）
             
         Returns:
             str: 生成的文件名
@@ -294,9 +1330,11 @@ class AudioFileManager(LoggerMixin):
         
         # 如果文件已存在，添加序号
         counter = 1
-        while target_path.exists():
+        while target_path.exists() or (reserved is not None and base_name in reserved):
             base_name = f"{name_part}_{timestamp}_{counter}{extension}"
             target_path = self.storage_path / base_name
             counter += 1
         
+        if reserved is not None:
+            reserved.add(base_name)
         return base_name
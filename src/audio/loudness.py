@@ -0,0 +1,172 @@
+"""
+响度测量（ITU-R BS.1770）
+
+K 加权在频域完成：把信号切成 100ms 的子块做 FFT，乘以 K 加权滤波器的功率响应后
+按 Parseval 定理求均方值；400ms、75% 重叠的门限块由相邻 4 个子块合成。
+全部为 NumPy 向量运算，也可以逐段累积子块能量，对长文件流式测量。
+"""
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+# 门限块由 4 个 100ms 子块组成（400ms，步长 100ms）
+SUBBLOCK_SECONDS = 0.1
+SUBBLOCKS_PER_GATE = 4
+
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+
+def _biquad_power(b: Tuple[float, float, float], a: Tuple[float, float, float],
+                  omega: np.ndarray) -> np.ndarray:
+    """二阶节在给定角频率上的功率响应"""
+    z1 = np.exp(-1j * omega)
+    z2 = z1 * z1
+    response = (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+    return np.abs(response) ** 2
+
+
+def k_weighting_power(frequencies: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    K 加权滤波器（高频搁架 + 高通）的功率响应
+
+    系数按 BS.1770 给出的模拟原型在任意采样率下重新计算。
+
+    Args:
+        frequencies: 频率（Hz）
+        sample_rate: 采样率
+
+    Returns:
+        np.ndarray: 功率增益
+    """
+    omega = 2 * np.pi * np.asarray(frequencies, dtype=np.float64) / sample_rate
+
+    # 第一级：约 +4dB 的高频搁架
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = _biquad_power(
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        omega
+    )
+
+    # 第二级：38Hz 高通
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = _biquad_power(
+        (1.0, -2.0, 1.0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        omega
+    )
+
+    return shelf * highpass
+
+
+def subblock_energies(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    计算 K 加权后每个 100ms 子块的均方值
+
+    末尾不足一个子块的部分被忽略；整段不足一个子块时把整段作为一个子块。
+
+    Args:
+        samples: 形状为 (帧数, 声道数) 的数组
+        sample_rate: 采样率
+
+    Returns:
+        np.ndarray: 形状为 (子块数, 声道数) 的均方值
+    """
+    size = int(sample_rate * SUBBLOCK_SECONDS)
+    if len(samples) < size:
+        size = len(samples)
+    if size == 0:
+        return np.zeros((0, samples.shape[1]))
+
+    count = len(samples) // size
+    blocks = samples[:count * size].reshape(count, size, samples.shape[1])
+    spectrum = np.fft.rfft(blocks, axis=1)
+
+    # Parseval：实数 FFT 除直流和奈奎斯特分量外都要计两次
+    weights = np.full(spectrum.shape[1], 2.0)
+    weights[0] = 1.0
+    if size % 2 == 0:
+        weights[-1] = 1.0
+    weights *= k_weighting_power(np.fft.rfftfreq(size, 1.0 / sample_rate), sample_rate)
+
+    power = (spectrum.real ** 2 + spectrum.imag ** 2) * weights[None, :, None]
+    return power.sum(axis=1) / (size * size)
+
+
+def gated_loudness(energies: np.ndarray) -> float:
+    """
+    由子块能量计算门限后的积分响度
+
+    Args:
+        energies: subblock_energies() 的结果（可以是多段拼接）
+
+    Returns:
+        float: 积分响度（LUFS），静音时为 -inf
+    """
+    if not len(energies):
+        return float('-inf')
+
+    if len(energies) < SUBBLOCKS_PER_GATE:
+        # 不足 400ms 的短片段按一个门限块处理
+        blocks = energies.mean(axis=0, keepdims=True)
+    else:
+        cumulative = np.concatenate([np.zeros((1, energies.shape[1])), np.cumsum(energies, axis=0)])
+        blocks = (cumulative[SUBBLOCKS_PER_GATE:] - cumulative[:-SUBBLOCKS_PER_GATE]) / SUBBLOCKS_PER_GATE
+
+    power = blocks.sum(axis=1)
+    with np.errstate(divide='ignore'):
+        loudness = -0.691 + 10 * np.log10(power)
+
+    gated = loudness > ABSOLUTE_GATE
+    if not gated.any():
+        return float('-inf')
+
+    threshold = -0.691 + 10 * math.log10(power[gated].mean()) + RELATIVE_GATE
+    gated &= loudness > threshold
+    return float(-0.691 + 10 * math.log10(power[gated].mean()))
+
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    计算积分响度
+
+    Args:
+        samples: 形状为 (帧数, 声道数) 的数组
+        sample_rate: 采样率
+
+    Returns:
+        float: 积分响度（LUFS），静音时为 -inf
+    """
+    return gated_loudness(subblock_energies(samples, sample_rate))
+
+
+def normalization_gain(loudness: float, peak: float, target_loudness: float,
+                       max_peak_db: float) -> float:
+    """
+    计算响度归一化增益（受峰值上限约束）
+
+    Args:
+        loudness: 积分响度（LUFS）
+        peak: 峰值（线性）
+        target_loudness: 目标响度（LUFS）
+        max_peak_db: 归一化后允许的最大峰值（dBFS）
+
+    Returns:
+        float: 增益（dB），静音时为 0
+    """
+    if not math.isfinite(loudness) or peak <= 0:
+        return 0.0
+
+    gain_db = target_loudness - loudness
+    headroom_db = max_peak_db - 20 * math.log10(peak)
+    return min(gain_db, headroom_db)
@@ -0,0 +1,756 @@
+"""
+实时混音引擎
+
+输出线程按固定的 buffer_size 逐块渲染：先取出 asyncio 侧投递的命令，
+再用 NumPy 向量化地叠加所有声部（背景环境音 + 触发的音效），
+每个声部带独立的增益和淡入淡出包络，最后写入输出设备。
+"""
+
+import asyncio
+import itertools
+import queue
+import threading
+import time
+import wave
+from collections import deque
+from typing import Optional, Dict, Any, Callable
+
+import numpy as np
+
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+from .models import PlaybackState, AudioAnalysis
+from .pcm_cache import PCMCache
+from .stream import PCMStream, open_pcm_stream
+
+
+class AudioSink:
+    """音频输出基类"""
+
+    # 为 True 时 write() 自身会按实时速率阻塞（例如声卡），否则由混音线程计时
+    blocking = False
+
+    def open(self, sample_rate: int, channels: int, buffer_size: int):
+        """打开输出"""
+
+    def write(self, block: np.ndarray):
+        """
+        写入一块音频
+
+        Args:
+            block: 形状为 (buffer_size, channels) 的 float32 数组
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """关闭输出"""
+
+
+class NullSink(AudioSink):
+    """丢弃所有输出，用于无声卡环境和测试"""
+
+    def __init__(self):
+        self.frames_written = 0
+        self.peak = 0.0
+
+    def write(self, block: np.ndarray):
+        self.frames_written += len(block)
+        if len(block):
+            self.peak = max(self.peak, float(np.abs(block).max()))
+
+
+class WavFileSink(AudioSink):
+    """写入16位WAV文件，便于离线检查混音结果"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._wav = None
+
+    def open(self, sample_rate: int, channels: int, buffer_size: int):
+        self._wav = wave.open(self.file_path, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    def write(self, block: np.ndarray):
+        self._wav.writeframes((block * 32767.0).astype('<i2').tobytes())
+
+    def close(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+class PyAudioSink(AudioSink):
+    """通过 PyAudio 输出到声卡"""
+
+    blocking = True
+
+    def __init__(self, device_index: int = None):
+        self.device_index = device_index
+        self._pyaudio = None
+        self._stream = None
+
+    def open(self, sample_rate: int, channels: int, buffer_size: int):
+        import pyaudio
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(
+            format=pyaudio.paFloat32, channels=channels, rate=sample_rate,
+            output=True, frames_per_buffer=buffer_size,
+            output_device_index=self.device_index
+        )
+
+    def write(self, block: np.ndarray):
+        self._stream.write(block.tobytes())
+
+    def close(self):
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+
+class Voice:
+    """
+    混音声部
+
+    持有一段 PCM 数据和播放位置，render() 把自己的下一块数据乘以包络后叠加到输出缓冲区。
+    """
+
+    def __init__(self, voice_id: int, samples: np.ndarray, sample_rate: int,
+                 gain: float = 1.0, fade_in: float = 0.0, fade_out: float = 0.0,
+                 loop: bool = False, bus: str = 'clip'):
+        self.voice_id = voice_id
+        self.samples = samples
+        self.gain = gain
+        self.target_gain = gain
+        self.loop = loop
+        self.bus = bus
+        self.position = 0
+        self.fade_in_frames = int(fade_in * sample_rate)
+        self.fade_out_frames = int(fade_out * sample_rate)
+        self.finished = False
+        # 循环播放回到开头后不再淡入
+        self._looped = False
+
+        # 停止时的淡出（剩余帧数 / 总帧数）
+        self._stop_remaining = None
+        self._stop_total = 0
+
+    @property
+    def length(self) -> int:
+        """总帧数"""
+        return len(self.samples)
+
+    @property
+    def nbytes(self) -> int:
+        """占用的PCM内存"""
+        return self.samples.nbytes
+
+    def seek(self, frame: int):
+        """定位到指定帧（在输出线程中调用）"""
+        self.position = max(0, min(frame, self.length))
+
+    def close(self):
+        """声部结束后释放资源"""
+
+    def stop(self, fade_frames: int = 0):
+        """停止播放，可选淡出"""
+        if fade_frames <= 0:
+            self.finished = True
+        elif self._stop_remaining is None:
+            self._stop_remaining = self._stop_total = fade_frames
+
+    def read(self, start: int, frames: int) -> np.ndarray:
+        """读取 [start, start + frames) 区间的 PCM"""
+        return self.samples[start:start + frames]
+
+    def render(self, out: np.ndarray, ramp: np.ndarray):
+        """
+        把下一块数据叠加到输出缓冲区
+
+        Args:
+            out: 形状为 (frames, channels) 的输出缓冲区
+            ramp: 预先分配的 0..frames-1 序列，用于计算包络
+        """
+        frames = len(out)
+        filled = 0
+
+        while filled < frames and not self.finished:
+            take = min(frames - filled, self.length - self.position)
+            if take <= 0:
+                if self.loop and self.length:
+                    self.position = 0
+                    self._looped = True
+                    continue
+                self.finished = True
+                break
+
+            envelope = self._envelope(take, ramp[:take], filled, frames)
+            out[filled:filled + take] += self.read(self.position, take) * envelope[:, None]
+
+            self.position += take
+            filled += take
+
+            if self._stop_remaining is not None:
+                self._stop_remaining -= take
+                if self._stop_remaining <= 0:
+                    self.finished = True
+
+        self.gain = self.target_gain
+
+    def _envelope(self, take: int, ramp: np.ndarray, offset: int, block: int) -> np.ndarray:
+        """计算增益包络：增益渐变 × 淡入 × 淡出 × 停止淡出"""
+        if self.gain != self.target_gain:
+            # 增益在一个块内线性过渡，避免咔哒声
+            envelope = self.gain + (self.target_gain - self.gain) * (ramp + offset) / block
+        else:
+            envelope = np.full(take, self.gain, dtype=np.float32)
+
+        position = ramp + self.position
+
+        if self.fade_in_frames and not self._looped and self.position < self.fade_in_frames:
+            envelope = envelope * np.minimum(position / self.fade_in_frames, 1.0)
+
+        if self.fade_out_frames and not self.loop:
+            fade_start = self.length - self.fade_out_frames
+            if self.position + take > fade_start:
+                envelope = envelope * np.clip((self.length - position) / self.fade_out_frames, 0.0, 1.0)
+
+        if self._stop_remaining is not None:
+            envelope = envelope * np.clip((self._stop_remaining - ramp) / self._stop_total, 0.0, 1.0)
+
+        return envelope.astype(np.float32, copy=False)
+
+
+class StreamVoice(Voice):
+    """
+    流式声部
+
+    后台线程从 PCMStream 预读固定数量的块，输出线程只从队列中取数据，
+    因此内存占用与音频时长无关。预读跟不上时输出静音并记录一次欠载，
+    之后跳过相应的帧，使数据与播放位置保持一致。
+    """
+
+    def __init__(self, voice_id: int, stream: PCMStream, gain: float = 1.0,
+                 fade_in: float = 0.0, fade_out: float = 0.0, loop: bool = False,
+                 bus: str = 'clip', start: int = 0, block_frames: int = 4096, read_ahead: int = 8):
+        super().__init__(voice_id, np.zeros((0, stream.channels), dtype=np.float32),
+                         stream.sample_rate, gain, fade_in, fade_out, loop, bus)
+        self.stream = stream
+        self.block_frames = block_frames
+        self.read_ahead = read_ahead
+        self.position = start
+        self.underruns = 0
+        self.error: Optional[Exception] = None
+
+        # 队列元素为 (定位代数, 块)，块为 None 表示到达结尾；定位后丢弃旧代数的块
+        self._blocks: queue.Queue = queue.Queue(maxsize=read_ahead)
+        self._generation = 0
+        self._seek_request = (0, start)
+        self._current: Optional[np.ndarray] = None
+        self._current_offset = 0
+        self._skip = 0
+        self._ended = False
+        self._closed = threading.Event()
+
+        self._reader = threading.Thread(target=self._read_loop, name='audio-stream', daemon=True)
+        self._reader.start()
+
+    @property
+    def length(self) -> int:
+        return self.stream.frames
+
+    @property
+    def nbytes(self) -> int:
+        return (self.read_ahead + 1) * self.block_frames * self.stream.channels * 4
+
+    @property
+    def is_ready(self) -> bool:
+        """预读队列中是否已有数据"""
+        return not self._blocks.empty() or not self._reader.is_alive()
+
+    def seek(self, frame: int):
+        self.position = max(0, min(frame, self.length))
+        self._generation += 1
+        self._seek_request = (self._generation, self.position)
+        self._current = None
+        self._skip = 0
+        self._ended = False
+
+    def read(self, start: int, frames: int) -> np.ndarray:
+        out = np.zeros((frames, self.stream.channels), dtype=np.float32)
+        filled = 0
+
+        while filled < frames and not self._ended:
+            if self._current is None:
+                try:
+                    generation, block = self._blocks.get_nowait()
+                except queue.Empty:
+                    self.underruns += 1
+                    self._skip += frames - filled
+                    break
+                if generation != self._generation:
+                    continue
+                if block is None:
+                    self._ended = True
+                    break
+                self._current, self._current_offset = block, 0
+
+            if self._skip:
+                skipped = min(self._skip, len(self._current) - self._current_offset)
+                self._skip -= skipped
+                self._current_offset += skipped
+                if self._current_offset >= len(self._current):
+                    self._current = None
+                continue
+
+            take = min(frames - filled, len(self._current) - self._current_offset)
+            out[filled:filled + take] = self._current[self._current_offset:self._current_offset + take]
+            filled += take
+            self._current_offset += take
+            if self._current_offset >= len(self._current):
+                self._current = None
+
+        return out
+
+    def close(self):
+        self._closed.set()
+
+    def _read_loop(self):
+        """预读线程"""
+        generation = -1
+
+        try:
+            while not self._closed.is_set():
+                request = self._seek_request
+                if request[0] != generation:
+                    generation = request[0]
+                    self.stream.seek(request[1])
+
+                block = self.stream.read(self.block_frames)
+                if not len(block):
+                    if self.loop and self.stream.frames:
+                        self.stream.seek(0)
+                        continue
+                    block = None
+
+                while not self._closed.is_set() and self._seek_request[0] == generation:
+                    try:
+                        self._blocks.put((generation, block), timeout=0.05)
+                        break
+                    except queue.Full:
+                        continue
+
+                if block is None:
+                    # 到达结尾，等待定位或关闭
+                    while not self._closed.is_set() and self._seek_request[0] == generation:
+                        self._closed.wait(0.05)
+        except Exception as e:
+            # 解码失败时按结尾处理
+            self.error = e
+            try:
+                self._blocks.put_nowait((generation, None))
+            except queue.Full:
+                pass
+        finally:
+            self.stream.close()
+
+
+class AudioMixer(LoggerMixin):
+    """实时混音引擎"""
+
+    def __init__(self, sink: AudioSink = None, sample_rate: int = 44100, channels: int = 2,
+                 buffer_size: int = 1024, max_volume: float = 1.0):
+        """
+        初始化混音引擎
+
+        Args:
+            sink: 音频输出，默认为 NullSink
+            sample_rate: 采样率
+            channels: 声道数
+            buffer_size: 每块帧数（固定）
+            max_volume: 主音量上限
+        """
+        self.sink = sink or NullSink()
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.buffer_size = buffer_size
+        self.max_volume = max_volume
+        self.state = PlaybackState()
+
+        # asyncio 侧只向双端队列追加命令，输出线程在每块开始时取出（deque 的 append/popleft 是原子操作）
+        self._commands: deque = deque()
+        self._voice_ids = itertools.count(1)
+        self._voices: Dict[int, Voice] = {}
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # 预分配的缓冲区
+        self._mix = np.zeros((buffer_size, channels), dtype=np.float32)
+        self._ramp = np.arange(buffer_size, dtype=np.float32)
+        self._master_gain = 1.0
+
+        self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()
+        self._frames_rendered = 0
+        self._stats = {'blocks': 0, 'xruns': 0, 'max_render_ms': 0.0, 'total_render_ms': 0.0}
+
+        self.on_voice_finished: Optional[Callable[[int], Any]] = None
+
+        self.logger.info(f"混音引擎初始化完成: {sample_rate}Hz, {channels}声道, 块大小 {buffer_size}")
+
+    @classmethod
+    def from_config(cls, config: Config, sink: AudioSink = None) -> 'AudioMixer':
+        """
+        根据 audio.playback.* 配置创建混音引擎
+
+        Args:
+            config: 配置对象
+            sink: 音频输出
+
+        Returns:
+            AudioMixer: 混音引擎
+        """
+        return cls(
+            sink,
+            sample_rate=config.get('audio.playback.sample_rate', 44100),
+            channels=config.get('audio.playback.channels', 2),
+            buffer_size=config.get('audio.playback.buffer_size', 1024),
+            max_volume=config.get('audio.processing.max_volume', 1.0)
+        )
+
+    @property
+    def block_duration(self) -> float:
+        """每块的时长（秒）"""
+        return self.buffer_size / self.sample_rate
+
+    @property
+    def is_running(self) -> bool:
+        """输出线程是否在运行"""
+        return self._running.is_set()
+
+    def start(self):
+        """打开输出并启动输出线程"""
+        if self.is_running:
+            return
+
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+        self.sink.open(self.sample_rate, self.channels, self.buffer_size)
+        self._running.set()
+        self._thread = threading.Thread(target=self._output_loop, name='audio-mixer', daemon=True)
+        self._thread.start()
+        self.state.is_playing = True
+        self.logger.info("混音引擎已启动")
+
+    def stop(self):
+        """停止输出线程并关闭输出"""
+        if not self.is_running:
+            return
+
+        self._running.clear()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.sink.close()
+        self.state.is_playing = False
+        self.logger.info("混音引擎已停止")
+
+    def play(self, samples: np.ndarray, gain: float = 1.0, fade_in: float = 0.0,
+             fade_out: float = 0.0, loop: bool = False, bus: str = 'clip') -> int:
+        """
+        播放一段PCM（非阻塞，下一块开始生效）
+
+        Args:
+            samples: 形状为 (帧数, channels) 的 float32 数组
+            gain: 声部增益
+            fade_in: 淡入时长（秒）
+            fade_out: 淡出时长（秒）
+            loop: 是否循环（背景环境音）
+            bus: 声部分组（ambient 或 clip）
+
+        Returns:
+            int: 声部ID
+        """
+        if samples.ndim != 2 or samples.shape[1] != self.channels:
+            raise ValueError(f"PCM 形状应为 (帧数, {self.channels})，实际为 {samples.shape}")
+
+        voice = Voice(next(self._voice_ids), samples, self.sample_rate,
+                      gain, fade_in, fade_out, loop, bus)
+        return self.add_voice(voice)
+
+    async def play_audio_file(self, cache: PCMCache, audio_file_id: int,
+                              analysis: AudioAnalysis = None, **kwargs) -> int:
+        """
+        从PCM缓存播放音频文件（命中时不等待解码）
+
+        Args:
+            cache: PCM缓存
+            audio_file_id: 音频文件ID
+            analysis: 分析结果，提供时跳过首尾静音（切片不复制数据）
+            **kwargs: 传给 play() 的参数
+
+        Returns:
+            int: 声部ID
+        """
+        samples = await cache.get(audio_file_id)
+        if analysis is not None:
+            start, end = analysis.trim_range(self.sample_rate, len(samples))
+            samples = samples[start:end]
+        return self.play(samples, **kwargs)
+
+    async def play_stream(self, file_path: str, gain: float = 1.0, fade_in: float = 0.0,
+                          fade_out: float = 0.0, loop: bool = False, bus: str = 'ambient',
+                          start: float = 0.0) -> int:
+        """
+        流式播放长音频文件（内存占用固定，等待预读出第一块后开始）
+
+        Args:
+            file_path: 文件路径
+            gain: 声部增益
+            fade_in: 淡入时长（秒）
+            fade_out: 淡出时长（秒）
+            loop: 是否循环
+            bus: 声部分组
+            start: 起始位置（秒）
+
+        Returns:
+            int: 声部ID
+        """
+        event_loop = asyncio.get_running_loop()
+        stream = await event_loop.run_in_executor(
+            None, open_pcm_stream, file_path, self.sample_rate, self.channels
+        )
+        voice = StreamVoice(self.new_voice_id(), stream, gain, fade_in, fade_out, loop, bus,
+                            start=int(start * self.sample_rate))
+        while not voice.is_ready:
+            await asyncio.sleep(0.005)
+        return self.add_voice(voice)
+
+    def add_voice(self, voice: Voice) -> int:
+        """
+        添加一个已构建的声部
+
+        Args:
+            voice: 声部
+
+        Returns:
+            int: 声部ID
+        """
+        self._commands.append(('add', voice))
+        return voice.voice_id
+
+    def new_voice_id(self) -> int:
+        """分配声部ID（自行构建 Voice 时使用）"""
+        return next(self._voice_ids)
+
+    def stop_voice(self, voice_id: int, fade_out: float = 0.0):
+        """
+        停止声部
+
+        Args:
+            voice_id: 声部ID
+            fade_out: 淡出时长（秒）
+        """
+        self._commands.append(('stop', voice_id, int(fade_out * self.sample_rate)))
+
+    def seek_voice(self, voice_id: int, position: float):
+        """
+        定位声部
+
+        Args:
+            voice_id: 声部ID
+            position: 位置（秒）
+        """
+        self._commands.append(('seek', voice_id, int(position * self.sample_rate)))
+
+    def stop_all(self, fade_out: float = 0.0, bus: str = None):
+        """
+        停止所有声部
+
+        Args:
+            fade_out: 淡出时长（秒）
+            bus: 只停止指定分组
+        """
+        self._commands.append(('stop_all', bus, int(fade_out * self.sample_rate)))
+
+    def set_voice_gain(self, voice_id: int, gain: float):
+        """
+        调整声部增益（在一个块内平滑过渡）
+
+        Args:
+            voice_id: 声部ID
+            gain: 新增益
+        """
+        self._commands.append(('gain', voice_id, gain))
+
+    def set_volume(self, volume: float):
+        """设置主音量"""
+        self.state.volume = max(0.0, min(1.0, volume))
+
+    def set_muted(self, muted: bool):
+        """设置静音"""
+        self.state.is_muted = muted
+
+    async def wait_voice(self, voice_id: int):
+        """
+        等待声部播放结束
+
+        Args:
+            voice_id: 声部ID
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        future = self._waiters.get(voice_id)
+        if future is None:
+            future = self._waiters[voice_id] = self._loop.create_future()
+        await future
+
+    def active_voices(self) -> int:
+        """当前声部数量"""
+        return len(self._voices)
+
+    def render(self, frames: int = None) -> np.ndarray:
+        """
+        渲染一块音频（输出回调）
+
+        也可被基于回调的音频后端直接调用。返回的数组在下一次调用前有效。
+
+        Args:
+            frames: 帧数，必须等于 buffer_size
+
+        Returns:
+            np.ndarray: 形状为 (buffer_size, channels) 的 float32 数组
+        """
+        if frames is not None and frames != self.buffer_size:
+            raise ValueError(f"块大小固定为 {self.buffer_size}")
+
+        started = time.perf_counter()
+        self._drain_commands()
+
+        mix = self._mix
+        mix.fill(0.0)
+
+        finished = []
+        for voice in self._voices.values():
+            voice.render(mix, self._ramp)
+            if voice.finished:
+                finished.append(voice.voice_id)
+
+        for voice_id in finished:
+            self._voices.pop(voice_id).close()
+            self._notify_finished(voice_id)
+
+        # 主音量同样逐块平滑过渡
+        target = 0.0 if self.state.is_muted else self.state.volume * self.max_volume
+        if target != self._master_gain:
+            mix *= (self._master_gain + (target - self._master_gain) * self._ramp / self.buffer_size)[:, None]
+            self._master_gain = target
+        elif target != 1.0:
+            mix *= target
+        np.clip(mix, -1.0, 1.0, out=mix)
+
+        self._frames_rendered += self.buffer_size
+        self.state.current_position = self._frames_rendered / self.sample_rate
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._stats['blocks'] += 1
+        self._stats['total_render_ms'] += elapsed_ms
+        self._stats['max_render_ms'] = max(self._stats['max_render_ms'], elapsed_ms)
+        return mix
+
+    def process(self, blocks: int):
+        """
+        同步渲染若干块并写入输出（不启动线程，用于离线渲染和测试）
+
+        Args:
+            blocks: 块数
+        """
+        for _ in range(blocks):
+            self.sink.write(self.render())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取引擎统计信息"""
+        blocks = self._stats['blocks']
+        return {
+            'blocks': blocks,
+            'xruns': self._stats['xruns'],
+            'max_render_ms': self._stats['max_render_ms'],
+            'avg_render_ms': self._stats['total_render_ms'] / blocks if blocks else 0.0,
+            'block_ms': self.block_duration * 1000,
+            'voices': len(self._voices)
+        }
+
+    def _output_loop(self):
+        """输出线程：逐块渲染并写入输出"""
+        period = self.block_duration
+        deadline = time.perf_counter()
+
+        while self._running.is_set():
+            try:
+                self.sink.write(self.render())
+            except Exception as e:
+                self.logger.error(f"混音输出出错: {e}")
+                self._running.clear()
+                break
+
+            if self.sink.blocking:
+                continue
+
+            # 非阻塞输出由线程自己按实时速率计时，错过截止时间记为一次 xrun
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -period:
+                self._stats['xruns'] += 1
+                deadline = time.perf_counter()
+
+    def _drain_commands(self):
+        """执行所有待处理命令"""
+        commands = self._commands
+        while commands:
+            command = commands.popleft()
+            action = command[0]
+
+            if action == 'add':
+                voice = command[1]
+                self._voices[voice.voice_id] = voice
+            elif action == 'stop':
+                voice = self._voices.get(command[1])
+                if voice:
+                    voice.stop(command[2])
+            elif action == 'stop_all':
+                for voice in self._voices.values():
+                    if command[1] is None or voice.bus == command[1]:
+                        voice.stop(command[2])
+            elif action == 'seek':
+                voice = self._voices.get(command[1])
+                if voice:
+                    voice.seek(command[2])
+            elif action == 'gain':
+                voice = self._voices.get(command[1])
+                if voice:
+                    voice.target_gain = command[2]
+
+    def _notify_finished(self, voice_id: int):
+        """通知 asyncio 侧声部已结束"""
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        def resolve():
+            future = self._waiters.pop(voice_id, None)
+            if future and not future.done():
+                future.set_result(voice_id)
+            if self.on_voice_finished:
+                self.on_voice_finished(voice_id)
+
+        self._loop.call_soon_threadsafe(resolve)
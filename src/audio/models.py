@@ -7,6 +7,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from pathlib import Path
 
+from ..utils.codec import register_model
+
 
 @dataclass
 class AudioFile:
@@ -20,6 +22,13 @@ class AudioFile:
     file_path: str = ""
     tags: Optional[str] = None  # JSON字符串
     category: Optional[str] = None
+    content_hash: Optional[str] = None  # 内容哈希（SHA-256），内容寻址存储时使用
+    file_mtime: Optional[int] = None  # 修改时间（纳秒），增量同步时判断文件是否变化
+    file_inode: Optional[int] = None
+    pcm_path: Optional[str] = None  # 转码后的 float32 PCM 缓存
+    pcm_sample_rate: Optional[int] = None
+    pcm_channels: Optional[int] = None
+    pcm_gain_db: Optional[float] = None  # 转码时应用的响度归一化增益
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
@@ -35,6 +44,13 @@ class AudioFile:
             'file_path': self.file_path,
             'tags': self.tags,
             'category': self.category,
+            'content_hash': self.content_hash,
+            'file_mtime': self.file_mtime,
+            'file_inode': self.file_inode,
+            'pcm_path': self.pcm_path,
+            'pcm_sample_rate': self.pcm_sample_rate,
+            'pcm_channels': self.pcm_channels,
+            'pcm_gain_db': self.pcm_gain_db,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -52,6 +68,13 @@ class AudioFile:
             file_path=data.get('file_path', ''),
             tags=data.get('tags'),
             category=data.get('category'),
+            content_hash=data.get('content_hash'),
+            file_mtime=data.get('file_mtime'),
+            file_inode=data.get('file_inode'),
+            pcm_path=data.get('pcm_path'),
+            pcm_sample_rate=data.get('pcm_sample_rate'),
+            pcm_channels=data.get('pcm_channels'),
+            pcm_gain_db=data.get('pcm_gain_db'),
             created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else None,
             updated_at=datetime.fromisoformat(data['updated_at']) if data.get('updated_at') else None
         )
@@ -175,3 +198,229 @@ class PlaybackState:
             'repeat_mode': self.repeat_mode,
             'shuffle': self.shuffle
         }
+
+
+@dataclass
+class ImportFailure:
+    """导入失败记录"""
+    file_path: str
+    stage: str  # scan, probe, dedup, copy, insert（增量同步时为 probe、insert）
+    error: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'file_path': self.file_path,
+            'stage': self.stage,
+            'error': self.error
+        }
+
+
+@dataclass
+class ImportProgress:
+    """批量导入进度事件"""
+    stage: str  # scan, probe, dedup, copy, insert, done
+    file_path: Optional[str] = None
+    scanned: int = 0
+    probed: int = 0
+    copied: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    scan_finished: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'stage': self.stage,
+            'file_path': self.file_path,
+            'scanned': self.scanned,
+            'probed': self.probed,
+            'copied': self.copied,
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'failed': self.failed,
+            'scan_finished': self.scan_finished
+        }
+
+
+@dataclass
+class ImportReport:
+    """批量导入结果报告"""
+    directory: str
+    scanned: int = 0
+    imported: List[AudioFile] = None
+    failures: List[ImportFailure] = None
+    duplicates: List[AudioFile] = None  # 内容已存在于库中而跳过的文件（对应已有记录）
+    probe_methods: Dict[str, int] = None  # 各探测方式（header/decode）使用次数
+    elapsed: float = 0.0  # 秒
+    
+    def __post_init__(self):
+        if self.imported is None:
+            self.imported = []
+        if self.failures is None:
+            self.failures = []
+        if self.duplicates is None:
+            self.duplicates = []
+        if self.probe_methods is None:
+            self.probe_methods = {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'directory': self.directory,
+            'scanned': self.scanned,
+            'imported': [audio_file.to_dict() for audio_file in self.imported],
+            'failures': [failure.to_dict() for failure in self.failures],
+            'duplicates': [audio_file.to_dict() for audio_file in self.duplicates],
+            'probe_methods': self.probe_methods,
+            'elapsed': self.elapsed
+        }
+
+
+@dataclass
+class SyncReport:
+    """存储目录增量同步结果报告"""
+    storage_path: str
+    scanned: int = 0  # 本次检查的磁盘文件数
+    unchanged: int = 0
+    backfilled: int = 0  # 旧记录缺少修改时间和 inode，只补全了文件签名
+    updated: List[int] = None  # 内容变化、已重新读取音频信息的记录ID
+    renamed: List[int] = None  # 按 inode 识别出的重命名或移动
+    removed: List[int] = None  # 文件已不存在而删除的记录ID
+    missing: List[int] = None  # 文件已不存在但保留的记录ID（remove_missing=False）
+    imported: List[AudioFile] = None  # 新登记入库的文件
+    failures: List[ImportFailure] = None
+    elapsed: float = 0.0  # 秒
+    
+    def __post_init__(self):
+        if self.updated is None:
+            self.updated = []
+        if self.renamed is None:
+            self.renamed = []
+        if self.removed is None:
+            self.removed = []
+        if self.missing is None:
+            self.missing = []
+        if self.imported is None:
+            self.imported = []
+        if self.failures is None:
+            self.failures = []
+    
+    @property
+    def changed(self) -> bool:
+        """数据库是否有改动"""
+        return bool(self.backfilled or self.updated or self.renamed or self.removed or self.imported)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'storage_path': self.storage_path,
+            'scanned': self.scanned,
+            'unchanged': self.unchanged,
+            'backfilled': self.backfilled,
+            'updated': self.updated,
+            'renamed': self.renamed,
+            'removed': self.removed,
+            'missing': self.missing,
+            'imported': [audio_file.to_dict() for audio_file in self.imported],
+            'failures': [failure.to_dict() for failure in self.failures],
+            'elapsed': self.elapsed
+        }
+
+
+@dataclass
+class AudioAnalysis:
+    """音频分析结果模型（响度、峰值、首尾静音和缩略波形）"""
+    audio_file_id: Optional[int] = None
+    loudness: Optional[float] = None  # 积分响度（LUFS），静音时为空
+    true_peak: Optional[float] = None  # 真峰值（dBTP）
+    sample_peak: Optional[float] = None  # 采样峰值（dBFS）
+    leading_silence: float = 0.0  # 开头静音（秒）
+    trailing_silence: float = 0.0  # 结尾静音（秒）
+    duration: float = 0.0  # 秒
+    waveform_resolution: float = 0.0  # 波形每秒的点数
+    waveform: Optional[bytes] = None  # 每个点两个字节：峰值、RMS（0-255 线性量化）
+    
+    @property
+    def waveform_peaks(self) -> List[int]:
+        """波形峰值序列"""
+        return list(self.waveform[0::2]) if self.waveform else []
+    
+    @property
+    def waveform_rms(self) -> List[int]:
+        """波形 RMS 序列"""
+        return list(self.waveform[1::2]) if self.waveform else []
+    
+    def trim_range(self, sample_rate: int, frames: int) -> tuple:
+        """
+        去掉首尾静音后的帧区间
+        
+        Args:
+            sample_rate: 采样率
+            frames: 总帧数
+            
+        Returns:
+            tuple: (起始帧, 结束帧)
+        """
+        start = min(int(self.leading_silence * sample_rate), frames)
+        end = max(frames - int(self.trailing_silence * sample_rate), start)
+        return start, end
+    
+    def gain_to(self, target_loudness: float, max_peak_db: float = -1.0) -> float:
+        """
+        达到目标响度所需的增益（受真峰值上限约束）
+        
+        Args:
+            target_loudness: 目标响度（LUFS）
+            max_peak_db: 峰值上限（dBTP）
+            
+        Returns:
+            float: 增益（dB），无法测量响度时为 0
+        """
+        if self.loudness is None:
+            return 0.0
+        gain_db = target_loudness - self.loudness
+        if self.true_peak is not None:
+            gain_db = min(gain_db, max_peak_db - self.true_peak)
+        return gain_db
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'audio_file_id': self.audio_file_id,
+            'loudness': self.loudness,
+            'true_peak': self.true_peak,
+            'sample_peak': self.sample_peak,
+            'leading_silence': self.leading_silence,
+            'trailing_silence': self.trailing_silence,
+            'duration': self.duration,
+            'waveform_resolution': self.waveform_resolution,
+            'waveform_peaks': self.waveform_peaks,
+            'waveform_rms': self.waveform_rms
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AudioAnalysis':
+        """从字典（或数据库行）创建实例"""
+        waveform = data.get('waveform')
+        if waveform is None and data.get('waveform_peaks') is not None:
+            waveform = bytes(value for pair in zip(data['waveform_peaks'], data['waveform_rms'])
+                             for value in pair)
+        return cls(
+            audio_file_id=data.get('audio_file_id'),
+            loudness=data.get('loudness'),
+            true_peak=data.get('true_peak'),
+            sample_peak=data.get('sample_peak'),
+            leading_silence=data.get('leading_silence') or 0.0,
+            trailing_silence=data.get('trailing_silence') or 0.0,
+            duration=data.get('duration') or 0.0,
+            waveform_resolution=data.get('waveform_resolution') or 0.0,
+            waveform=waveform
+        )
+
+
+# 注册到序列化编解码（类型标签写入编码结果，不要修改）
+register_model('audio_file', AudioFile)
+register_model('playlist', Playlist)
+register_model('playlist_item', PlaylistItem)
@@ -0,0 +1,158 @@
+"""
+PCM 解码与格式转换
+
+音频引擎内部统一使用 float32、形状为 (帧数, 声道数) 的 NumPy 数组，
+采样率和声道数由 audio.playback.* 配置决定。
+"""
+
+import wave
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from pydub import AudioSegment
+
+from .models import AudioFile
+
+
+def pcm_from_bytes(data: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """
+    把交错的整数 PCM 字节转换为 float32 数组
+
+    Args:
+        data: PCM 字节
+        sample_width: 采样位宽（字节）
+        channels: 声道数
+
+    Returns:
+        np.ndarray: 形状为 (帧数, 声道数) 的 float32 数组，取值范围 [-1, 1]
+    """
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) |
+                (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"不支持的采样位宽: {sample_width}")
+
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels)
+
+
+def convert_pcm(samples: np.ndarray, source_rate: int, sample_rate: int,
+                channels: int) -> np.ndarray:
+    """
+    转换采样率和声道数
+
+    Args:
+        samples: 形状为 (帧数, 声道数) 的数组
+        source_rate: 原采样率
+        sample_rate: 目标采样率
+        channels: 目标声道数
+
+    Returns:
+        np.ndarray: 转换后的 float32 连续数组
+    """
+    source_channels = samples.shape[1]
+
+    if source_channels != channels:
+        if channels == 1:
+            samples = samples.mean(axis=1, keepdims=True)
+        elif source_channels == 1:
+            samples = np.repeat(samples, channels, axis=1)
+        else:
+            samples = samples[:, :channels] if source_channels > channels else \
+                np.pad(samples, ((0, 0), (0, channels - source_channels)))
+
+    if source_rate != sample_rate and len(samples):
+        # 线性插值重采样
+        frames = int(round(len(samples) * sample_rate / source_rate))
+        positions = np.arange(frames, dtype=np.float64) * (source_rate / sample_rate)
+        index = np.arange(len(samples), dtype=np.float64)
+        samples = np.stack(
+            [np.interp(positions, index, samples[:, c]) for c in range(samples.shape[1])],
+            axis=1
+        )
+
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+def load_pcm(file_path: str, sample_rate: int, channels: int) -> np.ndarray:
+    """
+    完整解码音频文件为引擎格式的 PCM
+
+    WAV 文件直接读取，其它格式通过 pydub (ffmpeg) 解码。
+
+    Args:
+        file_path: 文件路径
+        sample_rate: 目标采样率
+        channels: 目标声道数
+
+    Returns:
+        np.ndarray: 形状为 (帧数, channels) 的 float32 数组
+    """
+    path = Path(file_path)
+
+    if path.suffix.lower() == '.wav':
+        try:
+            with wave.open(str(path), 'rb') as wav:
+                samples = pcm_from_bytes(
+                    wav.readframes(wav.getnframes()), wav.getsampwidth(), wav.getnchannels()
+                )
+                return convert_pcm(samples, wav.getframerate(), sample_rate, channels)
+        except wave.Error:
+            pass  # 非 PCM 编码的 WAV，交给 ffmpeg
+
+    audio = AudioSegment.from_file(str(path))
+    samples = pcm_from_bytes(audio.raw_data, audio.sample_width, audio.channels)
+    return convert_pcm(samples, audio.frame_rate, sample_rate, channels)
+
+
+def load_cached_pcm(audio_file: AudioFile, sample_rate: int, channels: int) -> Optional[np.ndarray]:
+    """
+    内存映射转码缓存（只读，不复制）
+
+    Args:
+        audio_file: 音频文件
+        sample_rate: 引擎采样率
+        channels: 引擎声道数
+
+    Returns:
+        Optional[np.ndarray]: 形状为 (帧数, channels) 的 float32 数组，没有匹配的缓存时返回 None
+    """
+    if (not audio_file.pcm_path or audio_file.pcm_sample_rate != sample_rate or
+            audio_file.pcm_channels != channels):
+        return None
+
+    path = Path(audio_file.pcm_path)
+    try:
+        if path.stat().st_size < 4 * channels:
+            return np.zeros((0, channels), dtype=np.float32)
+        return np.memmap(path, dtype='<f4', mode='r').reshape(-1, channels)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def load_audio_file_pcm(audio_file: AudioFile, sample_rate: int, channels: int) -> np.ndarray:
+    """
+    获取音频文件的引擎格式PCM，优先使用转码缓存，没有缓存时完整解码原文件
+
+    Args:
+        audio_file: 音频文件
+        sample_rate: 引擎采样率
+        channels: 引擎声道数
+
+    Returns:
+        np.ndarray: 形状为 (帧数, channels) 的 float32 数组
+    """
+    samples = load_cached_pcm(audio_file, sample_rate, channels)
+    if samples is not None:
+        return samples
+    return load_pcm(audio_file.file_path, sample_rate, channels)
@@ -0,0 +1,305 @@
+"""
+解码后 PCM 的内存缓存
+"""
+
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable, List
+
+import numpy as np
+
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+from .file_manager import AudioFileManager
+from .playlist_manager import PlaylistManager
+from .pcm import load_audio_file_pcm
+
+
+class PCMCache(LoggerMixin):
+    """
+    解码后 PCM 的内存缓存
+
+    以 audio_files.id 为键，按内存预算淘汰（LRU 或 LFU）。礼物音效等热点片段可以固定
+    在缓存中不被淘汰，激活的播放列表可以预加载，命中时只需一次字典查找。
+    """
+
+    EVICTION_POLICIES = ('lru', 'lfu')
+
+    def __init__(self, file_manager: AudioFileManager, memory_budget: int = 256 * 1024 * 1024,
+                 sample_rate: int = 44100, channels: int = 2, policy: str = 'lru'):
+        """
+        初始化PCM缓存
+
+        Args:
+            file_manager: 音频文件管理器
+            memory_budget: 内存预算（字节）
+            sample_rate: 解码目标采样率
+            channels: 解码目标声道数
+            policy: 淘汰策略（lru 或 lfu）
+        """
+        if policy not in self.EVICTION_POLICIES:
+            raise ValueError(f"不支持的淘汰策略: {policy}")
+
+        self.file_manager = file_manager
+        self.memory_budget = memory_budget
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.policy = policy
+
+        # 按访问顺序排列，最久未使用的在最前
+        self._entries: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._frequency: Dict[int, int] = {}
+        self._pinned: set = set()
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._bytes = 0
+
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'load_errors': 0}
+
+        self.logger.info(f"PCM缓存初始化完成: 预算 {memory_budget / 1024 / 1024:.0f}MB, 策略 {policy}")
+
+    @classmethod
+    def from_config(cls, file_manager: AudioFileManager, config: Config) -> 'PCMCache':
+        """
+        根据 audio.* 配置创建PCM缓存
+
+        Args:
+            file_manager: 音频文件管理器
+            config: 配置对象
+
+        Returns:
+            PCMCache: PCM缓存
+        """
+        return cls(
+            file_manager,
+            memory_budget=int(config.get('audio.cache.memory_budget_mb', 256) * 1024 * 1024),
+            sample_rate=config.get('audio.playback.sample_rate', 44100),
+            channels=config.get('audio.playback.channels', 2),
+            policy=config.get('audio.cache.policy', 'lru')
+        )
+
+    def get_nowait(self, audio_file_id: int) -> Optional[np.ndarray]:
+        """
+        查询缓存（不加载），供实时播放路径使用
+
+        Args:
+            audio_file_id: 音频文件ID
+
+        Returns:
+            Optional[np.ndarray]: PCM 数据，未缓存时返回 None
+        """
+        samples = self._entries.get(audio_file_id)
+        if samples is None:
+            self._stats['misses'] += 1
+            return None
+
+        self._touch(audio_file_id)
+        self._stats['hits'] += 1
+        return samples
+
+    async def get(self, audio_file_id: int) -> np.ndarray:
+        """
+        获取PCM数据，未缓存时在线程池中解码并放入缓存
+
+        同一文件的并发请求只会解码一次。
+
+        Args:
+            audio_file_id: 音频文件ID
+
+        Returns:
+            np.ndarray: 形状为 (帧数, 声道数) 的 float32 数组
+        """
+        samples = self.get_nowait(audio_file_id)
+        if samples is not None:
+            return samples
+
+        loading = self._loading.get(audio_file_id)
+        if loading is None:
+            loading = self._loading[audio_file_id] = asyncio.ensure_future(self._load(audio_file_id))
+            loading.add_done_callback(lambda _: self._loading.pop(audio_file_id, None))
+        return await asyncio.shield(loading)
+
+    async def preload(self, audio_file_ids: Iterable[int]) -> int:
+        """
+        预加载一组音频文件
+
+        Args:
+            audio_file_ids: 音频文件ID列表
+
+        Returns:
+            int: 成功加载的数量
+        """
+        ids = list(dict.fromkeys(i for i in audio_file_ids if i is not None))
+        results = await asyncio.gather(*[self.get(i) for i in ids], return_exceptions=True)
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
+    async def preload_playlist(self, playlist_manager: PlaylistManager,
+                               playlist_id: int = None) -> int:
+        """
+        预加载播放列表（默认为当前激活的播放列表）
+
+        Args:
+            playlist_manager: 播放列表管理器
+            playlist_id: 播放列表ID，为空时使用激活的播放列表
+
+        Returns:
+            int: 成功加载的数量
+        """
+        if playlist_id is None:
+            active = await playlist_manager.list_playlists(active_only=True)
+            if not active:
+                return 0
+            playlist_id = active[0].id
+
+        playlist = await playlist_manager.get_playlist(playlist_id, include_items=True)
+        if not playlist:
+            return 0
+
+        loaded = await self.preload(item.audio_file_id for item in playlist.items)
+        self.logger.info(f"播放列表预加载完成: {playlist.name} ({loaded}/{len(playlist.items)})")
+        return loaded
+
+    async def pin(self, audio_file_ids: Iterable[int]) -> int:
+        """
+        固定音频文件（加载并在淘汰时跳过）
+
+        Args:
+            audio_file_ids: 音频文件ID列表
+
+        Returns:
+            int: 成功固定的数量
+        """
+        ids = [i for i in audio_file_ids if i is not None]
+        self._pinned.update(ids)
+        loaded = await self.preload(ids)
+
+        if self.pinned_bytes > self.memory_budget:
+            self.logger.warning(f"固定的音频超出内存预算: {self.pinned_bytes / 1024 / 1024:.1f}MB")
+        return loaded
+
+    def unpin(self, audio_file_ids: Iterable[int]):
+        """
+        取消固定
+
+        Args:
+            audio_file_ids: 音频文件ID列表
+        """
+        self._pinned.difference_update(audio_file_ids)
+        self._evict()
+
+    async def pin_gift_clips(self, gift_mappings: Dict[str, str] = None) -> int:
+        """
+        固定礼物触发的音效
+
+        包括 gift_mappings 表中启用的映射，以及配置 gift_mapping.mappings 中
+        的文件名（按存储文件名或标题匹配，导入时标题默认取原文件名）。
+
+        Args:
+            gift_mappings: 礼物名到音频文件名的映射
+
+        Returns:
+            int: 成功固定的数量
+        """
+        db_manager = self.file_manager.db_manager
+        rows = await db_manager.fetchall(
+            "SELECT audio_file_id FROM gift_mappings WHERE enabled = 1 AND audio_file_id IS NOT NULL"
+        )
+        ids = [row['audio_file_id'] for row in rows]
+
+        for filename in (gift_mappings or {}).values():
+            row = await db_manager.fetchone(
+                "SELECT id FROM audio_files WHERE filename = ? OR title = ? ORDER BY id LIMIT 1",
+                (filename, Path(filename).stem)
+            )
+            if row:
+                ids.append(row['id'])
+            else:
+                self.logger.warning(f"礼物音效未导入音频库: {filename}")
+
+        return await self.pin(ids)
+
+    def invalidate(self, audio_file_id: int):
+        """
+        移除缓存条目（文件被修改或删除时调用）
+
+        Args:
+            audio_file_id: 音频文件ID
+        """
+        samples = self._entries.pop(audio_file_id, None)
+        if samples is not None:
+            self._bytes -= samples.nbytes
+        self._frequency.pop(audio_file_id, None)
+
+    def clear(self):
+        """清空缓存（保留固定标记）"""
+        self._entries.clear()
+        self._frequency.clear()
+        self._bytes = 0
+
+    @property
+    def pinned_bytes(self) -> int:
+        """固定条目占用的内存"""
+        return sum(self._entries[i].nbytes for i in self._pinned if i in self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'pinned': len(self._pinned),
+            'bytes': self._bytes,
+            'memory_budget': self.memory_budget
+        }
+
+    async def _load(self, audio_file_id: int) -> np.ndarray:
+        """解码音频文件（有转码缓存时直接内存映射）并放入缓存"""
+        audio_file = await self.file_manager.get_audio_file(audio_file_id)
+        if not audio_file:
+            self._stats['load_errors'] += 1
+            raise KeyError(f"音频文件不存在: {audio_file_id}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            samples = await loop.run_in_executor(
+                None, load_audio_file_pcm, audio_file, self.sample_rate, self.channels
+            )
+        except Exception as e:
+            self._stats['load_errors'] += 1
+            self.logger.error(f"解码音频失败: {audio_file.file_path}, 错误: {e}")
+            raise
+
+        # 缓存中的数据会被多个播放声部共享，禁止写入
+        samples.setflags(write=False)
+        self._put(audio_file_id, samples)
+        return samples
+
+    def _put(self, audio_file_id: int, samples: np.ndarray):
+        """放入缓存并按预算淘汰"""
+        self.invalidate(audio_file_id)
+        self._entries[audio_file_id] = samples
+        self._frequency[audio_file_id] = 1
+        self._bytes += samples.nbytes
+        self._evict()
+
+    def _touch(self, audio_file_id: int):
+        """记录一次访问"""
+        self._entries.move_to_end(audio_file_id)
+        self._frequency[audio_file_id] = self._frequency.get(audio_file_id, 0) + 1
+
+    def _evict(self):
+        """淘汰非固定条目直到满足内存预算"""
+        while self._bytes > self.memory_budget:
+            candidates: List[int] = [i for i in self._entries if i not in self._pinned]
+            if not candidates:
+                return
+
+            if self.policy == 'lfu':
+                # 访问次数相同时淘汰最久未使用的
+                victim = min(candidates, key=lambda i: self._frequency.get(i, 0))
+            else:
+                victim = candidates[0]
+
+            self.invalidate(victim)
+            self._stats['evictions'] += 1
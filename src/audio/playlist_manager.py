@@ -323,7 +323,8 @@ class PlaylistManager(LoggerMixin):
     async def _get_playlist_items(self, playlist_id: int) -> List[PlaylistItem]:
         """获取播放列表项目"""
         sql = """
-            SELECT pi.*, af.filename, af.title, af.duration, af.format, af.file_path
+            SELECT pi.*, af.filename, af.title, af.duration, af.format, af.file_path,
+                   af.pcm_path, af.pcm_sample_rate, af.pcm_channels
             FROM playlist_items pi
             LEFT JOIN audio_files af ON pi.audio_file_id = af.id
             WHERE pi.playlist_id = ?
@@ -344,7 +345,10 @@ class PlaylistManager(LoggerMixin):
                     title=data['title'],
                     duration=data['duration'],
                     format=data['format'],
-                    file_path=data['file_path']
+                    file_path=data['file_path'],
+                    pcm_path=data['pcm_path'],
+                    pcm_sample_rate=data['pcm_sample_rate'],
+                    pcm_channels=data['pcm_channels']
                 )
             
             items.append(item)
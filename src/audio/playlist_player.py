@@ -0,0 +1,407 @@
+"""
+播放列表调度
+
+PlaylistPlayer 在 asyncio 侧按 repeat_mode / shuffle 决定播放顺序，在线程池中
+提前解码接下来的若干项目；PlaylistVoice 作为混音引擎中的一个声部，在输出线程里
+逐帧精确地衔接各项目，并按每个项目的 fade_out / fade_in 交叉淡化。
+"""
+
+import asyncio
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable, Iterator
+
+import numpy as np
+
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+from .mixer import AudioMixer, Voice, StreamVoice
+from .models import PlaylistItem
+from .pcm import load_audio_file_pcm
+from .playlist_manager import PlaylistManager
+from .stream import open_audio_file_stream
+
+
+class PlaylistVoice(Voice):
+    """
+    连续播放多个项目的声部
+
+    准备好的项目声部由 asyncio 侧追加到 queue，输出线程在前一项目进入淡出区间时
+    取出下一项目开始播放；两者重叠的帧数为前一项目的 fade_out（不超过两者长度），
+    fade_out 为 0 时首尾直接相接。
+    """
+
+    def __init__(self, voice_id: int, sample_rate: int, channels: int, buffer_size: int,
+                 gain: float = 1.0):
+        super().__init__(voice_id, np.zeros((0, channels), dtype=np.float32), sample_rate,
+                         gain=gain, bus='playlist')
+        self.sample_rate = sample_rate
+
+        # (PlaylistItem, Voice) 队列，由 asyncio 侧追加
+        self.queue: deque = deque()
+        # 没有更多项目时由 asyncio 侧置位，播放完队列后声部结束
+        self.exhausted = False
+        self.underruns = 0
+        self.transitions = 0
+        self.on_item_started: Optional[Callable[[PlaylistItem], Any]] = None
+
+        self._segments: List[Voice] = []
+        self._scratch = np.zeros((buffer_size, channels), dtype=np.float32)
+        self._starved = False
+
+    def render(self, out: np.ndarray, ramp: np.ndarray):
+        """按项目顺序渲染一块音频，在块内的精确位置切换项目"""
+        frames = len(out)
+        mix = self._scratch[:frames]
+        mix.fill(0.0)
+        filled = 0
+
+        while filled < frames and not self.finished:
+            if self.queue and (not self._segments or self._handoff_due()):
+                self._start_next()
+                continue
+
+            if not self._segments:
+                if self.exhausted:
+                    self.finished = True
+                elif not self._starved:
+                    # 下一项目还没解码完，输出静音直到就绪
+                    self._starved = True
+                    self.underruns += 1
+                break
+
+            step = frames - filled
+            lead = self._segments[-1]
+            if self.queue:
+                step = min(step, self._handoff_position(lead, self.queue[0][1]) - lead.position)
+
+            target = mix[filled:filled + step]
+            for segment in list(self._segments):
+                segment.render(target, ramp)
+                if segment.finished:
+                    self._segments.remove(segment)
+            filled += step
+
+        envelope = self._envelope(frames, ramp[:frames], 0, frames)
+        out += mix * envelope[:, None]
+        self.gain = self.target_gain
+
+        if self._stop_remaining is not None:
+            self._stop_remaining -= frames
+            if self._stop_remaining <= 0:
+                self.finished = True
+
+    def close(self):
+        """关闭正在播放和排队的项目（释放流式项目的预读线程）"""
+        for segment in self._segments:
+            segment.close()
+        for _, segment in list(self.queue):
+            segment.close()
+
+    def _handoff_position(self, lead: Voice, next_voice: Voice) -> int:
+        """下一项目开始时前一项目的播放位置"""
+        overlap = min(lead.fade_out_frames, lead.length, next_voice.length)
+        return lead.length - overlap
+
+    def _handoff_due(self) -> bool:
+        """前一项目是否已到交接位置"""
+        lead = self._segments[-1]
+        return lead.position >= self._handoff_position(lead, self.queue[0][1])
+
+    def _start_next(self):
+        """开始播放队列中的下一项目"""
+        item, segment = self.queue.popleft()
+        self._segments.append(segment)
+        self._starved = False
+        self.transitions += 1
+        if self.on_item_started:
+            self.on_item_started(item)
+
+
+class PlaylistPlayer(LoggerMixin):
+    """播放列表播放器"""
+
+    def __init__(self, mixer: AudioMixer, playlist_manager: PlaylistManager,
+                 lookahead: int = 3, prefetch_budget: int = 128 * 1024 * 1024,
+                 workers: int = 2, stream_threshold: float = 120.0):
+        """
+        初始化播放列表播放器
+
+        Args:
+            mixer: 混音引擎
+            playlist_manager: 播放列表管理器
+            lookahead: 提前解码的项目数
+            prefetch_budget: 已解码但尚未开始播放的项目占用的内存上限（字节）
+            workers: 解码线程数
+            stream_threshold: 时长超过该值（秒）的项目流式播放，不整段解码
+        """
+        self.mixer = mixer
+        self.playlist_manager = playlist_manager
+        self.lookahead = max(1, lookahead)
+        self.prefetch_budget = prefetch_budget
+        self.workers = workers
+        self.stream_threshold = stream_threshold
+        self.state = mixer.state
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._voice: Optional[PlaylistVoice] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._items: List[PlaylistItem] = []
+        self._last_decoded = (None, None)
+
+        self._stats = {'decoded': 0, 'streamed': 0, 'decode_errors': 0}
+
+        self.logger.info(f"播放列表播放器初始化完成: 预取 {self.lookahead} 项")
+
+    @classmethod
+    def from_config(cls, mixer: AudioMixer, playlist_manager: PlaylistManager,
+                    config: Config) -> 'PlaylistPlayer':
+        """
+        根据 audio.playlist.* 配置创建播放器
+
+        Args:
+            mixer: 混音引擎
+            playlist_manager: 播放列表管理器
+            config: 配置对象
+
+        Returns:
+            PlaylistPlayer: 播放列表播放器
+        """
+        return cls(
+            mixer, playlist_manager,
+            lookahead=config.get('audio.playlist.lookahead', 3),
+            prefetch_budget=int(config.get('audio.playlist.prefetch_budget_mb', 128) * 1024 * 1024),
+            workers=config.get('audio.playlist.decode_workers', 2),
+            stream_threshold=config.get('audio.playlist.stream_threshold_seconds', 120.0)
+        )
+
+    @property
+    def is_playing(self) -> bool:
+        """是否正在播放播放列表"""
+        return self._voice is not None and not self._voice.finished
+
+    async def play(self, playlist_id: int = None, start_item_id: int = None,
+                   gain: float = 1.0) -> bool:
+        """
+        开始播放播放列表（等待第一个项目解码完成后返回）
+
+        Args:
+            playlist_id: 播放列表ID，为空时使用激活的播放列表
+            start_item_id: 从指定项目开始
+            gain: 播放列表整体增益
+
+        Returns:
+            bool: 是否开始播放
+        """
+        await self.stop()
+
+        if playlist_id is None:
+            active = await self.playlist_manager.list_playlists(active_only=True)
+            if not active:
+                self.logger.warning("没有激活的播放列表")
+                return False
+            playlist_id = active[0].id
+
+        playlist = await self.playlist_manager.get_playlist(playlist_id, include_items=True)
+        items = [item for item in (playlist.items if playlist else [])
+                 if item.audio_file and item.audio_file.file_path]
+        if not items:
+            self.logger.warning(f"播放列表为空: {playlist_id}")
+            return False
+
+        self._items = items
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='playlist-decode')
+
+        mixer = self.mixer
+        voice = PlaylistVoice(mixer.new_voice_id(), mixer.sample_rate, mixer.channels,
+                              mixer.buffer_size, gain)
+        loop = asyncio.get_running_loop()
+        voice.on_item_started = lambda item: loop.call_soon_threadsafe(self._item_started, item)
+        self._voice = voice
+        self.state.current_playlist_id = playlist_id
+
+        start_index = next((i for i, item in enumerate(items) if item.id == start_item_id), 0)
+        self._wakeup.clear()
+        self._prefetch_task = asyncio.create_task(self._prefetch_loop(voice, start_index))
+
+        # 第一个项目就绪后再加入混音，避免开头的静音
+        while not voice.queue and not voice.exhausted and not self._prefetch_task.done():
+            await asyncio.sleep(0.005)
+
+        mixer.add_voice(voice)
+        self.logger.info(f"开始播放播放列表: {playlist.name} ({len(items)} 项)")
+        return True
+
+    async def stop(self, fade_out: float = 0.0):
+        """
+        停止播放
+
+        Args:
+            fade_out: 淡出时长（秒）
+        """
+        if self._prefetch_task:
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+            self._prefetch_task = None
+
+        if self._voice:
+            self.mixer.stop_voice(self._voice.voice_id, fade_out)
+            self._voice = None
+
+        self.state.current_item_id = None
+
+    async def wait(self):
+        """等待播放列表播放结束（repeat_mode 为 none 时）"""
+        if self._voice:
+            await self.mixer.wait_voice(self._voice.voice_id)
+
+    def set_repeat_mode(self, mode: str):
+        """
+        设置循环模式（从下一次选取项目开始生效）
+
+        Args:
+            mode: none、single 或 playlist
+        """
+        if mode not in ('none', 'single', 'playlist'):
+            raise ValueError(f"不支持的循环模式: {mode}")
+        self.state.repeat_mode = mode
+
+    def set_shuffle(self, shuffle: bool):
+        """设置随机播放（从下一轮开始生效）"""
+        self.state.shuffle = shuffle
+
+    async def close(self):
+        """停止播放并关闭解码线程池"""
+        await self.stop()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取播放统计信息"""
+        voice = self._voice
+        return {
+            **self._stats,
+            'underruns': voice.underruns if voice else 0,
+            'transitions': voice.transitions if voice else 0,
+            'queued': len(voice.queue) if voice else 0,
+            'prefetch_bytes': self._queued_bytes(voice) if voice else 0
+        }
+
+    def _order(self, start_index: int) -> Iterator[PlaylistItem]:
+        """按循环模式和随机播放生成播放顺序"""
+        items = self._items
+        index = start_index
+        current = None
+
+        while True:
+            mode = self.state.repeat_mode
+            if current is not None and mode == 'single':
+                yield current
+                continue
+
+            if index >= len(items):
+                if mode != 'playlist' or current is None:
+                    return
+                index = 0
+
+            if index == 0 and self.state.shuffle:
+                # 每一轮重新打乱，避免同一项目在两轮交界处连续出现
+                shuffled = random.sample(items, len(items))
+                if len(shuffled) > 1 and shuffled[0] is current:
+                    shuffled[0], shuffled[-1] = shuffled[-1], shuffled[0]
+                items = shuffled
+            elif index == 0:
+                items = self._items
+
+            current = items[index]
+            index += 1
+            yield current
+
+    async def _prefetch_loop(self, voice: PlaylistVoice, start_index: int):
+        """按顺序解码接下来的项目，保持队列中最多 lookahead 个项目且不超出内存预算"""
+        loop = asyncio.get_running_loop()
+        order = self._order(start_index)
+        pending: deque = deque()
+        # 提前取出下一个项目，以便尽早知道播放列表是否已结束
+        upcoming = next(order, None)
+
+        try:
+            while True:
+                while (upcoming is not None and len(pending) + len(voice.queue) < self.lookahead and
+                       (not voice.queue or self._queued_bytes(voice) < self.prefetch_budget)):
+                    pending.append((upcoming, asyncio.ensure_future(self._prepare(loop, upcoming))))
+                    upcoming = next(order, None)
+
+                if pending:
+                    item, decoding = pending[0]
+                    segment = await decoding
+                    pending.popleft()
+                    if segment is not None:
+                        voice.queue.append((item, segment))
+                    continue
+
+                if upcoming is None:
+                    voice.exhausted = True
+                    return
+
+                # 等待输出线程取走项目后再继续预取
+                self._wakeup.clear()
+                await self._wakeup.wait()
+        finally:
+            for _, decoding in pending:
+                if decoding.done() and not decoding.cancelled() and decoding.result():
+                    decoding.result().close()
+                decoding.cancel()
+
+    async def _prepare(self, loop: asyncio.AbstractEventLoop, item: PlaylistItem) -> Optional[Voice]:
+        """
+        准备一个项目的声部：短项目在线程池中整段解码（有转码缓存时直接内存映射），
+        长项目打开流式解码器
+
+        失败时返回 None（跳过该项目）。
+        """
+        file_path = item.audio_file.file_path
+        sample_rate, channels = self.mixer.sample_rate, self.mixer.channels
+
+        try:
+            if (item.audio_file.duration or 0) > self.stream_threshold:
+                stream = await loop.run_in_executor(
+                    self._executor, open_audio_file_stream, item.audio_file, sample_rate, channels
+                )
+                self._stats['streamed'] += 1
+                return StreamVoice(item.id or 0, stream, gain=item.volume, fade_in=item.fade_in,
+                                   fade_out=item.fade_out, bus='playlist')
+
+            last_id, samples = self._last_decoded
+            if last_id != item.audio_file_id:
+                samples = await loop.run_in_executor(
+                    self._executor, load_audio_file_pcm, item.audio_file, sample_rate, channels
+                )
+                samples.setflags(write=False)
+                self._last_decoded = (item.audio_file_id, samples)
+                self._stats['decoded'] += 1
+        except Exception as e:
+            self._stats['decode_errors'] += 1
+            self.logger.error(f"解码播放列表项目失败: {file_path}, 错误: {e}")
+            return None
+
+        return Voice(item.id or 0, samples, sample_rate, gain=item.volume,
+                     fade_in=item.fade_in, fade_out=item.fade_out, bus='playlist')
+
+    def _item_started(self, item: PlaylistItem):
+        """输出线程开始播放新项目（在事件循环中调用）"""
+        self.state.current_item_id = item.id
+        self._wakeup.set()
+
+    @staticmethod
+    def _queued_bytes(voice: PlaylistVoice) -> int:
+        """队列中已准备项目占用的内存"""
+        return sum(segment.nbytes for _, segment in list(voice.queue))
@@ -0,0 +1,432 @@
+"""
+音频文件头信息探测
+
+只读取容器/帧头部信息获取时长、声道数和采样率，不解码音频数据。
+支持 WAV、FLAC、OGG (Vorbis/Opus)、MP3、AAC (ADTS) 和 M4A/MP4。
+"""
+
+import struct
+from pathlib import Path
+from typing import Optional, Dict, Any, BinaryIO, Tuple
+
+
+# 探测方式标识
+PROBE_HEADER = "header"
+PROBE_DECODE = "decode"
+
+# MP3 比特率表（kbps），按 (MPEG版本是否为1, 层) 索引
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# MP3 采样率表，按版本位索引（0: MPEG2.5, 2: MPEG2, 3: MPEG1）
+_MP3_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+# AAC/ADTS 采样率表
+_ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000,
+                      22050, 16000, 12000, 11025, 8000, 7350]
+
+# MP4 中需要向下查找的容器 atom
+_MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+# 查找帧同步时最多扫描的字节数
+_SYNC_SEARCH_LIMIT = 64 * 1024
+
+
+def probe_audio_header(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    通过文件头探测音频信息
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        Optional[Dict[str, Any]]: 音频信息（duration、channels、frame_rate，
+        可能包含 sample_width 和 bitrate），无法识别（包括文件头截断或损坏）时返回 None
+    """
+    path = Path(file_path)
+
+    try:
+        file_size = path.stat().st_size
+        with open(path, 'rb') as f:
+            head = f.read(12)
+
+            if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+                info = _probe_wav(f, file_size)
+            elif head[4:8] == b'ftyp':
+                info = _probe_mp4(f, file_size)
+            elif head[:4] == b'OggS':
+                info = _probe_ogg(f, file_size)
+            else:
+                # FLAC/MP3/AAC 文件可能带有 ID3v2 标签
+                start = _skip_id3v2(f)
+                f.seek(start)
+                marker = f.read(4)
+                if marker == b'fLaC':
+                    info = _probe_flac(f)
+                elif path.suffix.lower() == '.aac':
+                    info = _probe_adts(f, start, file_size) or _probe_mp3(f, start, file_size)
+                else:
+                    info = _probe_mp3(f, start, file_size) or _probe_adts(f, start, file_size)
+    except (struct.error, IndexError, ValueError, OSError):
+        return None
+
+    if not info or not info.get('duration') or not info.get('frame_rate'):
+        return None
+
+    info['probe_method'] = PROBE_HEADER
+    return info
+
+
+def _skip_id3v2(f: BinaryIO) -> int:
+    """跳过 ID3v2 标签，返回音频数据起始位置"""
+    f.seek(0)
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        size = ((header[6] & 0x7F) << 21) | ((header[7] & 0x7F) << 14) | \
+               ((header[8] & 0x7F) << 7) | (header[9] & 0x7F)
+        footer = 10 if header[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _probe_wav(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    """解析 WAV 的 fmt 和 data 块"""
+    f.seek(12)
+    fmt = None
+
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', f.read(16))
+            f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            _, channels, sample_rate, byte_rate, _, bits = fmt
+            # 流式写入的WAV可能没有回填 data 大小
+            data_size = min(chunk_size, file_size - f.tell())
+            if not byte_rate:
+                return None
+            return {
+                'duration': data_size / byte_rate,
+                'channels': channels,
+                'frame_rate': sample_rate,
+                'sample_width': bits // 8
+            }
+        else:
+            f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def _probe_flac(f: BinaryIO) -> Optional[Dict[str, Any]]:
+    """解析 FLAC 的 STREAMINFO 块（紧跟在 fLaC 标记之后）"""
+    block_header = f.read(4)
+    if len(block_header) < 4 or block_header[0] & 0x7F != 0:
+        return None
+
+    data = f.read(34)
+    if len(data) < 34:
+        return None
+
+    packed = int.from_bytes(data[10:18], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    bits = ((packed >> 36) & 0x1F) + 1
+    total_samples = packed & 0xFFFFFFFFF
+
+    if not sample_rate or not total_samples:
+        return None
+    return {
+        'duration': total_samples / sample_rate,
+        'channels': channels,
+        'frame_rate': sample_rate,
+        'sample_width': (bits + 7) // 8
+    }
+
+
+def _probe_ogg(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    """解析 OGG 首个数据包（Vorbis/Opus 标识头）和最后一页的 granule position"""
+    f.seek(0)
+    page_header = f.read(27)
+    if len(page_header) < 27:
+        return None
+    segments = page_header[26]
+    f.seek(segments, 1)
+    packet = f.read(64)
+
+    if packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+        granule_rate, pre_skip = sample_rate, 0
+    elif packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+        sample_rate = struct.unpack('<I', packet[12:16])[0] or 48000
+        # Opus 的 granule position 固定以 48kHz 计
+        granule_rate = 48000
+    else:
+        return None
+
+    # 从文件末尾查找最后一页
+    tail_size = min(file_size, 64 * 1024)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+
+    granule = -1
+    index = tail.rfind(b'OggS')
+    while index != -1:
+        if index + 14 <= len(tail):
+            granule = struct.unpack('<q', tail[index + 6:index + 14])[0]
+            if granule > 0:
+                break
+        index = tail.rfind(b'OggS', 0, index)
+
+    if granule <= 0 or not granule_rate:
+        return None
+    return {
+        'duration': max(0, granule - pre_skip) / granule_rate,
+        'channels': channels,
+        'frame_rate': sample_rate
+    }
+
+
+def _parse_mp3_header(header: bytes) -> Optional[Tuple[int, int, int, int, int]]:
+    """
+    解析 MP3 帧头
+
+    Returns:
+        Optional[Tuple]: (帧长度, 采样率, 每帧采样数, 声道数, 比特率kbps)
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    channel_mode = header[3] >> 6
+
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    is_mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(is_mpeg1, layer)][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    elif layer == 2 or is_mpeg1:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate * 1000 // sample_rate + padding
+    else:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate * 1000 // sample_rate + padding
+
+    channels = 1 if channel_mode == 3 else 2
+    return frame_length, sample_rate, samples_per_frame, channels, bitrate
+
+
+def _probe_mp3(f: BinaryIO, start: int, file_size: int) -> Optional[Dict[str, Any]]:
+    """解析 MP3 首帧帧头，优先使用 Xing/Info/VBRI 中的总帧数"""
+    f.seek(start)
+    data = f.read(_SYNC_SEARCH_LIMIT)
+
+    offset = 0
+    frame = None
+    while offset + 4 <= len(data):
+        offset = data.find(b'\xFF', offset)
+        if offset == -1 or offset + 4 > len(data):
+            return None
+        frame = _parse_mp3_header(data[offset:offset + 4])
+        if frame:
+            # 用下一帧校验，避免把数据中的伪同步字当成帧头
+            next_offset = offset + frame[0]
+            if next_offset + 4 > len(data) or _parse_mp3_header(data[next_offset:next_offset + 4]):
+                break
+        offset += 1
+        frame = None
+
+    if not frame:
+        return None
+
+    frame_length, sample_rate, samples_per_frame, channels, bitrate = frame
+    is_mpeg1 = samples_per_frame == 1152 and ((data[offset + 1] >> 3) & 0x03) == 3
+    side_info = (32 if channels == 2 else 17) if is_mpeg1 else (17 if channels == 2 else 9)
+
+    total_frames = None
+    xing_offset = offset + 4 + side_info
+    if data[xing_offset:xing_offset + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing_offset + 4:xing_offset + 8])[0]
+        if flags & 0x01:
+            total_frames = struct.unpack('>I', data[xing_offset + 8:xing_offset + 12])[0]
+    elif data[offset + 36:offset + 40] == b'VBRI':
+        total_frames = struct.unpack('>I', data[offset + 50:offset + 54])[0]
+
+    if total_frames:
+        duration = total_frames * samples_per_frame / sample_rate
+    else:
+        # CBR：按音频数据大小和比特率估算，扣除 ID3v1 标签
+        audio_size = file_size - start - offset
+        f.seek(max(0, file_size - 128))
+        if f.read(3) == b'TAG':
+            audio_size -= 128
+        duration = audio_size * 8 / (bitrate * 1000)
+
+    return {
+        'duration': duration,
+        'channels': channels,
+        'frame_rate': sample_rate,
+        'bitrate': bitrate * 1000
+    }
+
+
+def _probe_adts(f: BinaryIO, start: int, file_size: int,
+                sample_frames: int = 200) -> Optional[Dict[str, Any]]:
+    """解析 AAC ADTS 帧头，按前若干帧的平均帧长估算时长"""
+    f.seek(start)
+    data = f.read(_SYNC_SEARCH_LIMIT)
+
+    offset = 0
+    while offset + 7 <= len(data):
+        if data[offset] == 0xFF and (data[offset + 1] & 0xF6) == 0xF0:
+            break
+        offset += 1
+    else:
+        return None
+
+    header = data[offset:offset + 7]
+    rate_index = (header[2] >> 2) & 0x0F
+    channels = ((header[2] & 0x01) << 2) | (header[3] >> 6)
+    if rate_index >= len(_ADTS_SAMPLE_RATES):
+        return None
+    sample_rate = _ADTS_SAMPLE_RATES[rate_index]
+
+    # 只读取帧头，逐帧跳转统计平均帧长
+    position = start + offset
+    frames = 0
+    total_length = 0
+    while frames < sample_frames:
+        f.seek(position)
+        header = f.read(7)
+        if len(header) < 7 or header[0] != 0xFF or (header[1] & 0xF6) != 0xF0:
+            break
+        frame_length = ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+        if frame_length < 7:
+            break
+        frames += 1
+        total_length += frame_length
+        position += frame_length
+
+    if not frames:
+        return None
+
+    estimated_frames = (file_size - start - offset) / (total_length / frames)
+    return {
+        'duration': estimated_frames * 1024 / sample_rate,
+        'channels': channels or 2,
+        'frame_rate': sample_rate
+    }
+
+
+def _iter_mp4_atoms(data: bytes, start: int = 0, end: int = None):
+    """遍历内存中的 MP4 atom，产出 (类型, 内容起始, 内容结束)"""
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        size, atom_type = struct.unpack('>I4s', data[position:position + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[position + 8:position + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield atom_type, position + header, min(position + size, end)
+        position += size
+
+
+def _probe_mp4(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    """定位 moov atom（跳过 mdat），解析音频轨道的 mdhd 和 stsd"""
+    position = 0
+    moov = None
+
+    while position + 8 <= file_size:
+        f.seek(position)
+        header = f.read(16)
+        size, atom_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - position
+        if size < header_size:
+            return None
+
+        if atom_type == b'moov':
+            f.seek(position + header_size)
+            moov = f.read(size - header_size)
+            break
+        position += size
+
+    if moov is None:
+        return None
+
+    result = {}
+
+    def walk(start: int, end: int, in_sound_track: bool):
+        for atom_type, body_start, body_end in _iter_mp4_atoms(moov, start, end):
+            if atom_type == b'trak':
+                # 每个轨道单独判断是否为音频轨道
+                is_sound = any(
+                    t == b'hdlr' and moov[b + 8:b + 12] == b'soun'
+                    for t, b, _ in _iter_nested(moov, body_start, body_end)
+                )
+                if is_sound and 'frame_rate' not in result:
+                    walk(body_start, body_end, True)
+            elif atom_type in _MP4_CONTAINERS:
+                walk(body_start, body_end, in_sound_track)
+            elif atom_type == b'mdhd' and in_sound_track:
+                version = moov[body_start]
+                if version == 1:
+                    timescale, duration = struct.unpack('>IQ', moov[body_start + 20:body_start + 32])
+                else:
+                    timescale, duration = struct.unpack('>II', moov[body_start + 12:body_start + 20])
+                if timescale:
+                    result['duration'] = duration / timescale
+            elif atom_type == b'stsd' and in_sound_track:
+                entry = body_start + 8
+                payload = entry + 8
+                channels, sample_size = struct.unpack('>HH', moov[payload + 16:payload + 20])
+                sample_rate = struct.unpack('>I', moov[payload + 24:payload + 28])[0] >> 16
+                result['channels'] = channels
+                result['frame_rate'] = sample_rate
+                if sample_size:
+                    result['sample_width'] = sample_size // 8
+
+    walk(0, len(moov), False)
+    return result or None
+
+
+def _iter_nested(data: bytes, start: int, end: int):
+    """递归遍历容器内的所有 atom"""
+    for atom_type, body_start, body_end in _iter_mp4_atoms(data, start, end):
+        yield atom_type, body_start, body_end
+        if atom_type in _MP4_CONTAINERS:
+            yield from _iter_nested(data, body_start, body_end)
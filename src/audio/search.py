@@ -0,0 +1,95 @@
+"""
+音频库全文检索的分词与查询构建
+
+FTS5 的 unicode61 分词器不会切分连续的中文字符，因此入库时用 jieba
+预先分词，把结果写入 audio_files.search_tokens 列，由触发器同步到 FTS 索引。
+未安装 jieba 时退回到中文二元切分。
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import jieba
+    jieba.setLogLevel(60)
+except ImportError:
+    jieba = None
+
+
+# 连续的中日韩字符
+_CJK_RUN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+
+# 非中文部分按字母数字切分
+_WORD = re.compile(r'[0-9a-zA-ZÀ-ɏ]+')
+
+
+def segment_text(text: Optional[str]) -> List[str]:
+    """
+    分词（小写、去重并保持顺序）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        List[str]: 词列表
+    """
+    if not text:
+        return []
+
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if jieba is not None:
+            tokens.extend(word for word in jieba.cut_for_search(run) if word.strip())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+
+    tokens.extend(word.lower() for word in _WORD.findall(_CJK_RUN.sub(' ', text)))
+    return list(dict.fromkeys(tokens))
+
+
+def build_search_tokens(title: Optional[str], filename: Optional[str],
+                        category: Optional[str], tags: Optional[str]) -> str:
+    """
+    构建写入 search_tokens 列的分词文本
+
+    Args:
+        title: 标题
+        filename: 文件名
+        category: 分类
+        tags: 标签（JSON字符串）
+
+    Returns:
+        str: 空格分隔的词
+    """
+    parts = [title, Path(filename).stem if filename else None, category]
+
+    if tags:
+        try:
+            parts.extend(str(tag) for tag in json.loads(tags))
+        except (ValueError, TypeError):
+            parts.append(tags)
+
+    tokens = []
+    for part in parts:
+        tokens.extend(segment_text(part))
+    return ' '.join(dict.fromkeys(tokens))
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    把用户输入转换为 FTS5 MATCH 表达式（所有词均需命中，按前缀匹配）
+
+    Args:
+        query: 搜索关键词
+
+    Returns:
+        Optional[str]: MATCH 表达式，没有可检索的词时返回 None
+    """
+    tokens = segment_text(query)
+    if not tokens:
+        return None
+    return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
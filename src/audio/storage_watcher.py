@@ -0,0 +1,252 @@
+"""
+存储目录监视
+
+通过 watchdog 接收文件系统事件，把变化的路径合并后延迟一段时间（去抖），
+再一次性调用 AudioFileManager.sync_paths() 批量更新数据库。目录的创建、
+删除和移动退回到对该子目录的增量同步；目录的修改事件（inotify 在目录中
+每次增删文件时都会产生）忽略，其中的文件有各自的事件。
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Set, List
+
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+from .file_manager import AudioFileManager
+from .models import SyncReport
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _StorageEventHandler(FileSystemEventHandler):
+    """把 watchdog 事件转发给 StorageWatcher（在观察者线程中调用）"""
+
+    def __init__(self, watcher: 'StorageWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type not in ('created', 'modified', 'deleted', 'moved', 'closed'):
+            return
+        if event.is_directory and event.event_type not in ('created', 'deleted', 'moved'):
+            return  # 目录中增删文件时的目录修改事件，文件本身另有事件
+        paths = [event.src_path]
+        if getattr(event, 'dest_path', None):
+            paths.append(event.dest_path)
+        for path in paths:
+            self.watcher.notify(path, is_directory=event.is_directory)
+
+
+class StorageWatcher(LoggerMixin):
+    """存储目录监视器（去抖后批量同步）"""
+
+    def __init__(self, file_manager: AudioFileManager, debounce: float = 1.0,
+                 max_delay: float = 10.0, sync_on_start: bool = True):
+        """
+        初始化监视器
+
+        Args:
+            file_manager: 音频文件管理器
+            debounce: 最后一个事件之后等待的时间（秒），期间的事件合并为一批
+            max_delay: 事件持续不断时，第一个事件之后最多等待的时间（秒）
+            sync_on_start: 启动时是否先做一次完整的增量同步（补上未运行期间的变化）
+        """
+        self.file_manager = file_manager
+        self.debounce = debounce
+        self.max_delay = max(debounce, max_delay)
+        self.sync_on_start = sync_on_start
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._observer = None
+        self._dirty: Set[str] = set()
+        self._dirty_dirs: Set[str] = set()
+        self._first_event: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        self.last_report: Optional[SyncReport] = None
+        self._stats = {'events': 0, 'batches': 0, 'full_syncs': 0, 'subtree_syncs': 0, 'paths': 0, 'errors': 0}
+
+    @classmethod
+    def from_config(cls, file_manager: AudioFileManager, config: Config) -> 'StorageWatcher':
+        """
+        根据 audio.storage.* 配置创建监视器
+
+        Args:
+            file_manager: 音频文件管理器
+            config: 配置对象
+
+        Returns:
+            StorageWatcher: 监视器
+        """
+        return cls(
+            file_manager,
+            debounce=config.get('audio.storage.watch_debounce', 1.0),
+            max_delay=config.get('audio.storage.watch_max_delay', 10.0),
+            sync_on_start=config.get('audio.storage.sync_on_startup', True)
+        )
+
+    @property
+    def is_running(self) -> bool:
+        """是否在监视"""
+        return self._observer is not None
+
+    async def start(self):
+        """启动监视（需要 watchdog）"""
+        if self._observer is not None:
+            return
+        if Observer is None:
+            raise RuntimeError("存储目录监视需要安装 watchdog")
+
+        self._loop = asyncio.get_running_loop()
+        if self.sync_on_start:
+            self.last_report = await self.file_manager.sync_storage()
+            self._stats['full_syncs'] += 1
+
+        self._observer = Observer()
+        self._observer.schedule(_StorageEventHandler(self), str(self.file_manager.storage_path), recursive=True)
+        self._observer.start()
+        self.logger.info(f"开始监视存储目录: {self.file_manager.storage_path}")
+
+    async def stop(self):
+        """停止监视，并处理尚未同步的事件"""
+        if self._observer is not None:
+            observer, self._observer = self._observer, None
+            observer.stop()
+            await asyncio.get_running_loop().run_in_executor(None, observer.join)
+            self.logger.info("存储目录监视已停止")
+
+        await self.flush()
+
+    def notify(self, path: str, is_directory: bool = False):
+        """
+        记录一个发生变化的路径（可在任意线程调用）
+
+        Args:
+            path: 文件或目录路径
+            is_directory: 是否为目录事件
+        """
+        loop = self._loop
+        if loop is None:
+            loop = self._loop = asyncio.get_running_loop()
+        loop.call_soon_threadsafe(self._mark, str(path), is_directory)
+
+    async def flush(self) -> Optional[SyncReport]:
+        """
+        立即同步已记录的变化（不等待去抖）
+
+        Returns:
+            Optional[SyncReport]: 同步结果，没有待同步的变化时返回 None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None and self._task is not asyncio.current_task():
+            await asyncio.gather(self._task, return_exceptions=True)
+        return await self._sync()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取监视统计信息"""
+        return {
+            **self._stats,
+            'pending': len(self._dirty) + len(self._dirty_dirs),
+            'running': self.is_running
+        }
+
+    def _mark(self, path: str, is_directory: bool):
+        """在事件循环中合并事件并重新安排同步时间"""
+        if is_directory:
+            self._dirty_dirs.add(path)
+        elif Path(path).suffix.lower() in AudioFileManager.SUPPORTED_FORMATS:
+            self._dirty.add(path)
+        else:
+            return  # 转码缓存、临时文件等
+
+        self._stats['events'] += 1
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = min(self.debounce, self._first_event + self.max_delay - now)
+        self._timer = self._loop.call_later(max(0.0, delay), self._schedule_sync)
+
+    def _schedule_sync(self):
+        """去抖时间到，启动同步任务（上一批仍在同步时顺延到其完成之后）"""
+        self._timer = None
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._sync())
+
+    async def _sync(self) -> Optional[SyncReport]:
+        """同步一批变化"""
+        async with self._lock:
+            if not self._dirty and not self._dirty_dirs:
+                return None
+
+            paths, self._dirty = self._dirty, set()
+            directories, self._dirty_dirs = self._dirty_dirs, set()
+            self._first_event = None
+
+            try:
+                if directories:
+                    # 目录内的文件由目录同步覆盖，其余文件仍按路径同步
+                    roots = _outermost(directories)
+                    prefixes = tuple(os.path.join(root, '') for root in roots)
+                    paths = {path for path in paths if not path.startswith(prefixes)}
+                    report = await self.file_manager.sync_storage(roots=roots)
+                    self._stats['subtree_syncs'] += 1
+                    if paths:
+                        report = _merge_reports(report, await self.file_manager.sync_paths(paths))
+                else:
+                    report = await self.file_manager.sync_paths(paths)
+                self._stats['paths'] += len(paths)
+                self._stats['batches'] += 1
+                self.last_report = report
+            except Exception as e:
+                self._stats['errors'] += 1
+                self.logger.error(f"存储目录同步失败: {e}")
+                # 保留这批路径，等下一个事件时重试
+                self._dirty |= paths
+                self._dirty_dirs |= directories
+                return None
+
+        # 同步期间又收到的事件
+        if (self._dirty or self._dirty_dirs) and self._timer is None:
+            self._timer = self._loop.call_later(self.debounce, self._schedule_sync)
+        return report
+
+
+def _outermost(directories: Set[str]) -> List[str]:
+    """去掉包含在其他目录中的子目录"""
+    roots = []
+    for directory in sorted(directories):
+        if not roots or not directory.startswith(os.path.join(roots[-1], '')):
+            roots.append(directory)
+    return roots
+
+
+def _merge_reports(first: SyncReport, second: SyncReport) -> SyncReport:
+    """合并同一批事件的两次同步结果"""
+    return SyncReport(
+        storage_path=first.storage_path,
+        scanned=first.scanned + second.scanned,
+        unchanged=first.unchanged + second.unchanged,
+        backfilled=first.backfilled + second.backfilled,
+        updated=first.updated + second.updated,
+        renamed=first.renamed + second.renamed,
+        removed=first.removed + second.removed,
+        missing=first.missing + second.missing,
+        imported=first.imported + second.imported,
+        failures=first.failures + second.failures,
+        elapsed=first.elapsed + second.elapsed
+    )
@@ -0,0 +1,363 @@
+"""
+流式 PCM 解码
+
+长时间的环境音（数小时的雨声、图书馆背景音）不能整段解码进内存。PCMStream
+按需读取固定大小的块，输出与 load_pcm 相同格式（float32、(帧数, 声道数)）的 PCM，
+并支持按帧定位。WAV 和原始 PCM 通过内存映射随机访问，其它格式使用 soundfile
+顺序解码，最后退回到 ffmpeg 管道。
+"""
+
+import struct
+import subprocess
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .models import AudioFile
+from .pcm import convert_pcm, pcm_from_bytes
+from .probe import probe_audio_header
+
+try:
+    import soundfile
+except (ImportError, OSError):
+    soundfile = None
+
+
+# WAV 格式标签
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class PCMStream:
+    """
+    流式 PCM 基类
+
+    子类只需实现 _read_source()，按源采样率随机读取源帧；基类负责按目标采样率
+    线性插值（与 convert_pcm 的结果一致）和声道转换，因此定位后无需额外状态。
+    """
+
+    def __init__(self, source_rate: int, source_channels: int, source_frames: int,
+                 sample_rate: int, channels: int):
+        self.source_rate = source_rate
+        self.source_channels = source_channels
+        self.source_frames = source_frames
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = int(round(source_frames * sample_rate / source_rate)) if source_rate else 0
+        self._position = 0
+
+    @property
+    def duration(self) -> float:
+        """时长（秒）"""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def tell(self) -> int:
+        """当前位置（目标采样率下的帧）"""
+        return self._position
+
+    def seek(self, frame: int):
+        """
+        定位到指定帧
+
+        Args:
+            frame: 目标采样率下的帧位置
+        """
+        self._position = max(0, min(int(frame), self.frames))
+
+    def read(self, frames: int) -> np.ndarray:
+        """
+        读取下一块 PCM
+
+        Args:
+            frames: 帧数
+
+        Returns:
+            np.ndarray: 形状为 (n, channels) 的 float32 数组，到达结尾时 n 小于 frames
+        """
+        count = min(frames, self.frames - self._position)
+        if count <= 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        start = self._position
+        if self.source_rate == self.sample_rate:
+            samples = self._read_source(start, count)
+        else:
+            ratio = self.source_rate / self.sample_rate
+            positions = (np.arange(count, dtype=np.float64) + start) * ratio
+            first = int(positions[0])
+            last = min(int(positions[-1]) + 1, self.source_frames - 1)
+            source = self._read_source(first, last - first + 1)
+            if not len(source):
+                self.frames = start
+                return np.zeros((0, self.channels), dtype=np.float32)
+
+            offsets = positions - first
+            lower = np.minimum(offsets.astype(np.int64), len(source) - 1)
+            upper = np.minimum(lower + 1, len(source) - 1)
+            weight = (offsets - lower).astype(np.float32)[:, None]
+            samples = source[lower] * (1.0 - weight) + source[upper] * weight
+
+        if len(samples) < count:
+            # 实际数据比文件头声明的短
+            self.frames = start + len(samples)
+
+        self._position = start + len(samples)
+        return convert_pcm(samples, self.sample_rate, self.sample_rate, self.channels)
+
+    def close(self):
+        """释放资源"""
+
+    def _read_source(self, start: int, count: int) -> np.ndarray:
+        """读取 [start, start + count) 区间的源帧（源采样率和声道数）"""
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class MemmapPCMStream(PCMStream):
+    """内存映射的 WAV / 原始 PCM 流，随机访问不需要解码"""
+
+    def __init__(self, file_path: str, source_rate: int, source_channels: int, dtype: str,
+                 sample_rate: int, channels: int, offset: int = 0, data_size: int = None):
+        """
+        初始化内存映射流
+
+        Args:
+            file_path: 文件路径
+            source_rate: 文件采样率
+            source_channels: 文件声道数
+            dtype: 采样格式（u1、<i2、i3、<i4、<f4）
+            sample_rate: 输出采样率
+            channels: 输出声道数
+            offset: PCM 数据在文件中的偏移
+            data_size: PCM 数据字节数，默认到文件结尾
+        """
+        self.file_path = file_path
+        self.dtype = dtype
+        self.sample_width = 3 if dtype == 'i3' else np.dtype(dtype).itemsize
+
+        available = Path(file_path).stat().st_size - offset
+        data_size = available if data_size is None else min(data_size, available)
+        frame_size = self.sample_width * source_channels
+        source_frames = max(data_size, 0) // frame_size
+
+        super().__init__(source_rate, source_channels, source_frames, sample_rate, channels)
+
+        self._map = None
+        if source_frames:
+            self._map = np.memmap(file_path, dtype=np.uint8, mode='r', offset=offset,
+                                  shape=(source_frames * frame_size,))
+
+    @classmethod
+    def from_wav(cls, file_path: str, sample_rate: int, channels: int) -> Optional['MemmapPCMStream']:
+        """
+        打开 WAV 文件
+
+        Args:
+            file_path: 文件路径
+            sample_rate: 输出采样率
+            channels: 输出声道数
+
+        Returns:
+            Optional[MemmapPCMStream]: 非 PCM/浮点编码的 WAV 返回 None
+        """
+        layout = read_wav_layout(file_path)
+        if layout is None:
+            return None
+
+        format_tag, source_channels, source_rate, bits, offset, data_size = layout
+        if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+            dtype = '<f4'
+        elif format_tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+            dtype = {8: 'u1', 16: '<i2', 24: 'i3', 32: '<i4'}[bits]
+        else:
+            return None
+
+        return cls(file_path, source_rate, source_channels, dtype, sample_rate, channels,
+                   offset=offset, data_size=data_size)
+
+    def close(self):
+        self._map = None
+
+    def _read_source(self, start: int, count: int) -> np.ndarray:
+        frame_size = self.sample_width * self.source_channels
+        raw = self._map[start * frame_size:(start + count) * frame_size]
+
+        if self.dtype == '<f4':
+            return raw.view('<f4').reshape(-1, self.source_channels).astype(np.float32)
+        return pcm_from_bytes(raw.tobytes(), self.sample_width, self.source_channels)
+
+
+class SoundFilePCMStream(PCMStream):
+    """通过 soundfile (libsndfile) 顺序解码 FLAC/OGG 等格式"""
+
+    def __init__(self, file_path: str, sample_rate: int, channels: int):
+        self.file_path = file_path
+        self._file = soundfile.SoundFile(file_path)
+        self._source_position = 0
+        # 插值需要上一块的最后一帧，缓存以避免回退定位
+        self._carry: Optional[Tuple[int, np.ndarray]] = None
+
+        super().__init__(self._file.samplerate, self._file.channels, self._file.frames,
+                         sample_rate, channels)
+
+    def close(self):
+        self._file.close()
+
+    def _read_source(self, start: int, count: int) -> np.ndarray:
+        prefix = None
+        if self._carry is not None and self._carry[0] == start and start + 1 == self._source_position:
+            prefix = self._carry[1]
+            start += 1
+            count -= 1
+
+        if start != self._source_position:
+            self._file.seek(start)
+
+        samples = self._file.read(count, dtype='float32', always_2d=True)
+        self._source_position = start + len(samples)
+        if len(samples):
+            self._carry = (self._source_position - 1, samples[-1:])
+
+        if prefix is not None:
+            samples = np.concatenate([prefix, samples])
+        return samples
+
+
+class FFmpegPCMStream(PCMStream):
+    """
+    通过 ffmpeg 管道解码（由 ffmpeg 完成重采样），定位时重启进程
+
+    时长取自文件头探测结果，实际数据更短时以实际结尾为准；文件头无法识别时
+    一直解码到 ffmpeg 输出结束，此前 frames 为 UNKNOWN_FRAMES，length_known 为 False。
+    """
+
+    # 时长未知时的帧数上限（读到结尾后更新为实际帧数）
+    UNKNOWN_FRAMES = 1 << 62
+
+    def __init__(self, file_path: str, sample_rate: int, channels: int,
+                 ffmpeg_path: str = 'ffmpeg'):
+        self.file_path = file_path
+        self.ffmpeg_path = ffmpeg_path
+        self._process: Optional[subprocess.Popen] = None
+        self._source_position = 0
+
+        info = probe_audio_header(file_path) or {}
+        source_frames = int(round(info.get('duration', 0) * sample_rate))
+        self._length_known = source_frames > 0
+        super().__init__(sample_rate, channels, source_frames or self.UNKNOWN_FRAMES, sample_rate, channels)
+
+    @property
+    def length_known(self) -> bool:
+        """帧数是否已知（文件头探测成功或已读到结尾）"""
+        return self._length_known or self.frames != self.UNKNOWN_FRAMES
+
+    def close(self):
+        if self._process:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def _read_source(self, start: int, count: int) -> np.ndarray:
+        if self._process is None or start != self._source_position:
+            self.close()
+            self._process = subprocess.Popen(
+                [self.ffmpeg_path, '-v', 'quiet', '-ss', f'{start / self.sample_rate:.6f}',
+                 '-i', self.file_path, '-f', 's16le', '-acodec', 'pcm_s16le',
+                 '-ac', str(self.channels), '-ar', str(self.sample_rate), '-'],
+                stdout=subprocess.PIPE, stdin=subprocess.DEVNULL
+            )
+            self._source_position = start
+
+        data = self._process.stdout.read(count * 2 * self.channels)
+        samples = pcm_from_bytes(data, 2, self.channels)
+        self._source_position += len(samples)
+        return samples
+
+
+def read_wav_layout(file_path: str) -> Optional[Tuple[int, int, int, int, int, int]]:
+    """
+    读取 WAV 的数据布局
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        Optional[Tuple]: (格式标签, 声道数, 采样率, 位深, data 块偏移, data 块大小)，
+        不是 WAV 时返回 None
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(12)
+        if head[:4] != b'RIFF' or head[8:12] != b'WAVE':
+            return None
+
+        fmt = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+
+            if chunk_id == b'fmt ':
+                data = f.read(chunk_size + (chunk_size & 1))
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', data[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(data) >= 26:
+                    # 子格式 GUID 的前两个字节是实际格式标签
+                    format_tag = struct.unpack('<H', data[24:26])[0]
+                fmt = (format_tag, channels, sample_rate, bits)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    return None
+                return fmt + (f.tell(), chunk_size)
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def open_pcm_stream(file_path: str, sample_rate: int, channels: int) -> PCMStream:
+    """
+    打开音频文件的流式解码器
+
+    Args:
+        file_path: 文件路径
+        sample_rate: 输出采样率
+        channels: 输出声道数
+
+    Returns:
+        PCMStream: 流式解码器
+    """
+    if Path(file_path).suffix.lower() == '.wav':
+        stream = MemmapPCMStream.from_wav(file_path, sample_rate, channels)
+        if stream is not None:
+            return stream
+
+    if soundfile is not None:
+        try:
+            return SoundFilePCMStream(file_path, sample_rate, channels)
+        except RuntimeError:
+            pass  # libsndfile 不支持的格式，交给 ffmpeg
+
+    return FFmpegPCMStream(file_path, sample_rate, channels)
+
+
+def open_audio_file_stream(audio_file: AudioFile, sample_rate: int, channels: int) -> PCMStream:
+    """
+    打开音频文件的流式解码器，优先使用转码缓存
+
+    Args:
+        audio_file: 音频文件
+        sample_rate: 输出采样率
+        channels: 输出声道数
+
+    Returns:
+        PCMStream: 流式解码器
+    """
+    if (audio_file.pcm_path and audio_file.pcm_sample_rate == sample_rate and
+            audio_file.pcm_channels == channels and Path(audio_file.pcm_path).exists()):
+        return MemmapPCMStream(audio_file.pcm_path, sample_rate, channels, '<f4', sample_rate, channels)
+    return open_pcm_stream(audio_file.file_path, sample_rate, channels)
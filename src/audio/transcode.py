@@ -0,0 +1,346 @@
+"""
+导入后的后台转码与分析
+
+每个音频文件只解码一次，同时完成分析（响度、真峰值、首尾静音、缩略波形），
+转换为引擎的采样率和声道数并做响度归一化，
+以原始 float32 小端交错 PCM（.f32）的形式存放在原文件旁边。采样率、声道数和
+归一化增益记录在 audio_files 中，播放时直接内存映射，不再解码。
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, List
+
+import numpy as np
+
+from ..core.database import DatabaseManager
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+from .analysis import AudioAnalyzer
+from .models import AudioAnalysis
+from .loudness import normalization_gain
+from .stream import open_pcm_stream
+
+
+# 转码时每次读取的帧数（100ms 子块的整数倍，便于逐段累积响度）
+TRANSCODE_BLOCK_SECONDS = 10
+
+
+def pcm_cache_path(file_path: str, sample_rate: int, channels: int) -> str:
+    """
+    转码缓存的路径（与原文件同目录，文件名带采样率和声道数）
+    
+    Args:
+        file_path: 原文件路径
+        sample_rate: 采样率
+        channels: 声道数
+    
+    Returns:
+        str: 缓存文件路径
+    """
+    return f"{file_path}.{sample_rate}x{channels}.f32"
+
+
+def transcode_to_cache(file_path: str, cache_path: str, sample_rate: int, channels: int,
+                       normalize: bool = True, target_loudness: float = -18.0,
+                       max_peak_db: float = -1.0, silence_threshold_db: float = -60.0,
+                       waveform_resolution: float = 20.0) -> Dict[str, Any]:
+    """
+    把音频文件转码为 float32 PCM 缓存并分析（在工作进程中执行）
+    
+    第一遍流式解码写入临时文件，同时累积分析结果；第二遍通过内存映射
+    原地乘以归一化增益（受真峰值上限约束），最后原子地替换为缓存文件，
+    内存占用与时长无关。分析结果对应归一化之前的原始音频。
+    
+    Args:
+        file_path: 原文件路径
+        cache_path: 缓存文件路径
+        sample_rate: 采样率
+        channels: 声道数
+        normalize: 是否做响度归一化
+        target_loudness: 目标响度（LUFS）
+        max_peak_db: 归一化后的峰值上限（dBTP）
+        silence_threshold_db: 静音阈值（dBFS）
+        waveform_resolution: 波形每秒的点数
+    
+    Returns:
+        Dict[str, Any]: frames、gain_db 和 analysis（AudioAnalysis）
+    """
+    temp_path = Path(f"{cache_path}.{os.getpid()}.tmp")
+    analyzer = AudioAnalyzer(sample_rate, channels, silence_threshold_db, waveform_resolution)
+    frames = 0
+    
+    try:
+        with open_pcm_stream(file_path, sample_rate, channels) as stream, open(temp_path, 'wb') as f:
+            while True:
+                block = stream.read(sample_rate * TRANSCODE_BLOCK_SECONDS)
+                if not len(block):
+                    break
+                f.write(block.astype('<f4', copy=False).tobytes())
+                frames += len(block)
+                analyzer.feed(block)
+        
+        if not frames:
+            # 不能把空缓存记为转码成功，否则播放时一直是静音
+            raise ValueError("解码结果为空")
+        
+        analysis = analyzer.result()
+        gain_db = 0.0
+        if normalize and analysis.loudness is not None:
+            gain_db = normalization_gain(analysis.loudness, 10 ** (analysis.true_peak / 20),
+                                         target_loudness, max_peak_db)
+        
+        if gain_db and frames:
+            gain = np.float32(10 ** (gain_db / 20))
+            samples = np.memmap(temp_path, dtype='<f4', mode='r+', shape=(frames, channels))
+            chunk = sample_rate * TRANSCODE_BLOCK_SECONDS
+            for start in range(0, frames, chunk):
+                samples[start:start + chunk] *= gain
+            samples.flush()
+            del samples
+        
+        os.replace(temp_path, cache_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    
+    return {
+        'frames': frames,
+        'gain_db': gain_db,
+        'analysis': analysis
+    }
+
+
+async def save_analysis(db_manager: DatabaseManager, audio_file_id: int, analysis: AudioAnalysis):
+    """
+    写入（或覆盖）音频分析结果
+    
+    Args:
+        db_manager: 数据库管理器
+        audio_file_id: 音频文件ID
+        analysis: 分析结果
+    """
+    await db_manager.upsert_many('audio_analysis', [{
+        'audio_file_id': audio_file_id,
+        'loudness': analysis.loudness,
+        'true_peak': analysis.true_peak,
+        'sample_peak': analysis.sample_peak,
+        'leading_silence': analysis.leading_silence,
+        'trailing_silence': analysis.trailing_silence,
+        'duration': analysis.duration,
+        'waveform_resolution': analysis.waveform_resolution,
+        'waveform': analysis.waveform
+    }])
+
+
+class AudioTranscoder(LoggerMixin):
+    """后台转码与分析队列"""
+    
+    def __init__(self, db_manager: DatabaseManager, sample_rate: int = 44100, channels: int = 2,
+                 normalize: bool = True, target_loudness: float = -18.0, max_peak_db: float = -1.0,
+                 workers: int = 1, use_processes: bool = True, silence_threshold_db: float = -60.0,
+                 waveform_resolution: float = 20.0):
+        """
+        初始化转码器
+        
+        Args:
+            db_manager: 数据库管理器
+            sample_rate: 目标采样率
+            channels: 目标声道数
+            normalize: 是否做响度归一化
+            target_loudness: 目标响度（LUFS）
+            max_peak_db: 归一化后的峰值上限（dBTP）
+            workers: 并发转码数
+            use_processes: 是否使用进程池（解码是CPU密集型任务）
+            silence_threshold_db: 分析首尾静音的阈值（dBFS）
+            waveform_resolution: 缩略波形每秒的点数
+        """
+        self.db_manager = db_manager
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.normalize = normalize
+        self.target_loudness = target_loudness
+        self.max_peak_db = max_peak_db
+        self.workers = max(1, workers)
+        self.use_processes = use_processes
+        self.silence_threshold_db = silence_threshold_db
+        self.waveform_resolution = waveform_resolution
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: set = set()
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[Executor] = None
+        
+        self._stats = {'transcoded': 0, 'skipped': 0, 'failed': 0}
+        
+        self.logger.info(f"转码器初始化完成: {sample_rate}Hz, {channels}声道, "
+                         f"归一化 {'开启' if normalize else '关闭'}")
+    
+    @classmethod
+    def from_config(cls, db_manager: DatabaseManager, config: Config) -> 'AudioTranscoder':
+        """
+        根据 audio.* 配置创建转码器
+        
+        Args:
+            db_manager: 数据库管理器
+            config: 配置对象
+        
+        Returns:
+            AudioTranscoder: 转码器
+        """
+        return cls(
+            db_manager,
+            sample_rate=config.get('audio.playback.sample_rate', 44100),
+            channels=config.get('audio.playback.channels', 2),
+            normalize=config.get('audio.processing.normalize', True),
+            target_loudness=config.get('audio.processing.target_loudness', -18.0),
+            max_peak_db=config.get('audio.processing.max_peak_db', -1.0),
+            workers=config.get('audio.transcode.workers', 1),
+            silence_threshold_db=config.get('audio.analysis.silence_threshold_db', -60.0),
+            waveform_resolution=config.get('audio.analysis.waveform_resolution', 20.0)
+        )
+    
+    @property
+    def is_running(self) -> bool:
+        """后台任务是否在运行"""
+        return bool(self._tasks)
+    
+    def start(self):
+        """启动后台转码任务"""
+        if self._tasks:
+            return
+        
+        self._queue = asyncio.Queue()
+        self._executor = (ProcessPoolExecutor(max_workers=self.workers) if self.use_processes
+                          else ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='audio-transcode'))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.logger.info("后台转码已启动")
+    
+    async def stop(self):
+        """停止后台转码（未处理的文件留待下次 enqueue_missing）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queued.clear()
+        
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.logger.info("后台转码已停止")
+    
+    def enqueue(self, audio_file_ids: Iterable[int]):
+        """
+        加入转码队列（未启动时忽略）
+        
+        Args:
+            audio_file_ids: 音频文件ID列表
+        """
+        if not self._tasks:
+            return
+        
+        for audio_file_id in audio_file_ids:
+            if audio_file_id is not None and audio_file_id not in self._queued:
+                self._queued.add(audio_file_id)
+                self._queue.put_nowait(audio_file_id)
+    
+    async def enqueue_missing(self) -> int:
+        """
+        把还没有匹配当前采样率和声道数的缓存（或没有分析结果）的文件加入队列
+        
+        Returns:
+            int: 加入的数量
+        """
+        rows = await self.db_manager.fetchall(
+            "SELECT id FROM audio_files WHERE pcm_path IS NULL OR pcm_sample_rate != ? "
+            "OR pcm_channels != ? OR id NOT IN (SELECT audio_file_id FROM audio_analysis) ORDER BY id",
+            (self.sample_rate, self.channels)
+        )
+        ids = [row['id'] for row in rows]
+        self.enqueue(ids)
+        return len(ids)
+    
+    async def join(self):
+        """等待队列中的文件全部处理完"""
+        if self._queue is not None:
+            await self._queue.join()
+    
+    async def transcode(self, audio_file_id: int, force: bool = False) -> bool:
+        """
+        转码并分析一个音频文件，更新 audio_files 和 audio_analysis
+        
+        Args:
+            audio_file_id: 音频文件ID
+            force: 缓存已存在时是否重新转码
+        
+        Returns:
+            bool: 是否成功
+        """
+        row = await self.db_manager.fetchone(
+            "SELECT af.file_path, af.pcm_path, af.pcm_sample_rate, af.pcm_channels, "
+            "aa.audio_file_id AS analyzed FROM audio_files af "
+            "LEFT JOIN audio_analysis aa ON aa.audio_file_id = af.id WHERE af.id = ?",
+            (audio_file_id,)
+        )
+        if not row:
+            return False
+        
+        if (not force and row['pcm_path'] and row['pcm_sample_rate'] == self.sample_rate and
+                row['pcm_channels'] == self.channels and row['analyzed'] is not None and
+                Path(row['pcm_path']).exists()):
+            self._stats['skipped'] += 1
+            return True
+        
+        cache_path = pcm_cache_path(row['file_path'], self.sample_rate, self.channels)
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        if executor is None:
+            executor = self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio-transcode')
+        
+        try:
+            result = await loop.run_in_executor(
+                executor, transcode_to_cache, row['file_path'], cache_path,
+                self.sample_rate, self.channels, self.normalize,
+                self.target_loudness, self.max_peak_db,
+                self.silence_threshold_db, self.waveform_resolution
+            )
+        except Exception as e:
+            self._stats['failed'] += 1
+            self.logger.error(f"转码失败: {row['file_path']}, 错误: {e}")
+            return False
+        
+        await self.db_manager.update('audio_files', {
+            'pcm_path': cache_path,
+            'pcm_sample_rate': self.sample_rate,
+            'pcm_channels': self.channels,
+            'pcm_gain_db': result['gain_db']
+        }, 'id = ?', (audio_file_id,))
+        await save_analysis(self.db_manager, audio_file_id, result['analysis'])
+        
+        # 采样率或声道数变更后旧缓存不再使用
+        if row['pcm_path'] and row['pcm_path'] != cache_path:
+            Path(row['pcm_path']).unlink(missing_ok=True)
+        
+        self._stats['transcoded'] += 1
+        self.logger.debug(f"转码完成: {row['file_path']} (增益 {result['gain_db']:+.1f}dB)")
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取转码统计信息"""
+        return {
+            **self._stats,
+            'pending': self._queue.qsize() if self._queue is not None else 0
+        }
+    
+    async def _worker(self):
+        """后台转码任务"""
+        while True:
+            audio_file_id = await self._queue.get()
+            try:
+                await self.transcode(audio_file_id)
+            except Exception as e:
+                self.logger.error(f"转码任务出错: {audio_file_id}, 错误: {e}")
+            finally:
+                self._queued.discard(audio_file_id)
+                self._queue.task_done()
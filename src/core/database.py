@@ -5,45 +5,221 @@
 import sqlite3
 import asyncio
 import aiosqlite
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Sequence
 from datetime import datetime
 
 from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+
+
+class _PendingWrite:
+    """写回队列中等待提交的写操作"""
+    
+    __slots__ = ('sql', 'params', 'result', 'future', 'durable', 'value', 'error')
+    
+    def __init__(self, sql: Optional[str], params: Optional[tuple], result: Optional[str],
+                 future: asyncio.Future, durable: bool = False):
+        self.sql = sql
+        self.params = params
+        self.result = result
+        self.future = future
+        self.durable = durable
+        self.value = None
+        self.error = None
 
 
 class DatabaseManager(LoggerMixin):
     """数据库管理器"""
     
-    def __init__(self, db_path: str):
+    # synchronous 允许的取值
+    SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+    # journal_mode 允许的取值
+    JOURNAL_MODES = ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF')
+    
+    # upsert_many 使用的冲突键（对应表上的 UNIQUE 约束）
+    UPSERT_CONFLICT_KEYS = {
+        'audio_files': ('filename',),
+        'gift_mappings': ('gift_name',),
+        'users': ('platform_user_id', 'platform'),
+        'audio_analysis': ('audio_file_id',),
+    }
+    
+    def __init__(self, db_path: str, pool_size: int = 0,
+                 journal_mode: str = None, synchronous: str = None,
+                 mmap_size: int = None, cache_size: int = None,
+                 busy_timeout: int = 5000, write_behind: bool = False,
+                 batch_interval_ms: int = 50, batch_max_statements: int = 200):
         """
         初始化数据库管理器
         
         Args:
             db_path: 数据库文件路径
+            pool_size: 只读连接数量，0 表示单连接模式（读写共用一个连接）
+            journal_mode: 日志模式，连接池模式下默认为 WAL
+            synchronous: 同步级别（OFF/NORMAL/FULL/EXTRA）
+            mmap_size: 内存映射大小（字节）
+            cache_size: 页缓存大小（负数表示KiB，正数表示页数）
+            busy_timeout: 锁等待超时（毫秒）
+            write_behind: 是否启用写回队列（多条写操作合并为一个事务提交）
+            batch_interval_ms: 写回队列最长攒批时间（毫秒）
+            batch_max_statements: 单个事务最多包含的语句数
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._connection = None
         
+        # 内存数据库无法在多个连接之间共享，强制使用单连接模式
+        self.pool_size = 0 if str(db_path) == ':memory:' else max(0, int(pool_size))
+        if journal_mode and journal_mode.upper() not in self.JOURNAL_MODES:
+            raise ValueError(f"不支持的 journal_mode 取值: {journal_mode}")
+        self.journal_mode = journal_mode.upper() if journal_mode else ('WAL' if self.pool_size else None)
+        
+        if synchronous and synchronous.upper() not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"不支持的 synchronous 取值: {synchronous}")
+        self.synchronous = synchronous.upper() if synchronous else None
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.busy_timeout = busy_timeout
+        
+        # 全文检索是否可用（由 init_tables 检测）
+        self.fts_enabled = False
+        
+        # 只读连接池
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+        
+        # 写连接上的事务必须互斥，避免不同调用方的语句混入同一个事务
+        self._write_lock = asyncio.Lock()
+        
+        # 写回队列
+        self.write_behind = write_behind
+        self.batch_interval = max(0, batch_interval_ms) / 1000.0
+        self.batch_max_statements = max(1, int(batch_max_statements))
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_stats = {'batches': 0, 'statements': 0, 'failed_statements': 0}
+        
+        # 批量操作的SQL缓存（按表名和列签名），以及表结构缓存
+        self._sql_cache: Dict[Tuple, str] = {}
+        self._table_columns: Dict[str, Tuple[str, ...]] = {}
+    
+    @classmethod
+    def from_config(cls, config: Config) -> 'DatabaseManager':
+        """
+        根据 database.* 配置创建数据库管理器
+        
+        Args:
+            config: 配置对象
+            
+        Returns:
+            DatabaseManager: 数据库管理器
+        """
+        return cls(
+            config.get('database.path', 'data/asmr_ai.db'),
+            pool_size=config.get('database.pool_size', 0),
+            journal_mode=config.get('database.journal_mode'),
+            synchronous=config.get('database.synchronous'),
+            mmap_size=config.get('database.mmap_size'),
+            cache_size=config.get('database.cache_size'),
+            busy_timeout=config.get('database.busy_timeout', 5000),
+            write_behind=config.get('database.write_behind.enabled', False),
+            batch_interval_ms=config.get('database.write_behind.interval_ms', 50),
+            batch_max_statements=config.get('database.write_behind.max_statements', 200)
+        )
+    
+    @property
+    def is_pooled(self) -> bool:
+        """是否启用了读写分离的连接池"""
+        return bool(self._readers)
+        
     async def connect(self):
         """连接数据库"""
         try:
             self._connection = await aiosqlite.connect(self.db_path)
-            await self._connection.execute("PRAGMA foreign_keys = ON")
+            if self.journal_mode:
+                # journal_mode 是持久化在数据库文件上的，只需在写连接上设置
+                await self._connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+            await self._apply_pragmas(self._connection)
             await self._connection.commit()
+            
+            if self.pool_size:
+                self._idle_readers = asyncio.Queue()
+                for _ in range(self.pool_size):
+                    reader = await aiosqlite.connect(self.db_path)
+                    await self._apply_pragmas(reader)
+                    await reader.execute("PRAGMA query_only = ON")
+                    self._readers.append(reader)
+                    self._idle_readers.put_nowait(reader)
+                self.logger.info(f"数据库连接池已启用: 1个写连接, {self.pool_size}个读连接 "
+                                 f"(journal_mode={self.journal_mode})")
+            
+            if self.write_behind:
+                self._write_queue = asyncio.Queue()
+                self._flush_task = asyncio.create_task(self._flush_loop())
+                self.logger.info(f"写回队列已启用: 每 {self.batch_interval * 1000:.0f}ms "
+                                 f"或 {self.batch_max_statements} 条语句提交一次")
+            
             self.logger.info(f"数据库连接成功: {self.db_path}")
         except Exception as e:
             self.logger.error(f"数据库连接失败: {e}")
+            await self.disconnect()
             raise
     
     async def disconnect(self):
         """断开数据库连接"""
+        if self._flush_task:
+            # 先把队列中的写操作全部提交，再停止后台任务
+            if self._connection:
+                await self.flush()
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+            self._write_queue = None
+        
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
+        
         if self._connection:
             await self._connection.close()
             self._connection = None
             self.logger.info("数据库连接已关闭")
     
+    async def _apply_pragmas(self, connection: aiosqlite.Connection):
+        """为连接设置 PRAGMA 参数"""
+        await connection.execute("PRAGMA foreign_keys = ON")
+        await connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        if self.synchronous:
+            await connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        if self.mmap_size is not None:
+            await connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        if self.cache_size is not None:
+            await connection.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+    
+    @asynccontextmanager
+    async def _reader(self):
+        """
+        获取一个读连接
+        
+        连接池模式下从空闲队列中借出一个只读连接，读操作不会排在写操作之后；
+        单连接模式下直接返回写连接。
+        """
+        if not self._readers:
+            yield self._connection
+            return
+        
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
+    
     async def init_tables(self):
         """初始化数据库表结构"""
         try:
@@ -59,6 +235,14 @@ class DatabaseManager(LoggerMixin):
                     file_path TEXT NOT NULL,
                     tags TEXT,
                     category TEXT,
+                    content_hash TEXT,
+                    search_tokens TEXT,
+                    file_mtime INTEGER,
+                    file_inode INTEGER,
+                    pcm_path TEXT,
+                    pcm_sample_rate INTEGER,
+                    pcm_channels INTEGER,
+                    pcm_gain_db REAL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
@@ -107,6 +291,24 @@ class DatabaseManager(LoggerMixin):
                 )
             """)
             
+            # 音频分析结果表（波形 BLOB 单独存放，避免拖慢 audio_files 的列表查询）
+            await self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS audio_analysis (
+                    audio_file_id INTEGER PRIMARY KEY,
+                    loudness REAL,
+                    true_peak REAL,
+                    sample_peak REAL,
+                    leading_silence REAL,
+                    trailing_silence REAL,
+                    duration REAL,
+                    waveform_resolution REAL,
+                    waveform BLOB,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (audio_file_id) REFERENCES audio_files (id) ON DELETE CASCADE
+                )
+            """)
+            
             # 用户信息表
             await self._connection.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -148,12 +350,29 @@ class DatabaseManager(LoggerMixin):
                 )
             """)
             
+            # 为旧版本数据库补充新增的列
+            await self._ensure_columns('audio_files', {
+                'content_hash': 'TEXT', 'search_tokens': 'TEXT',
+                'file_mtime': 'INTEGER', 'file_inode': 'INTEGER',
+                'pcm_path': 'TEXT', 'pcm_sample_rate': 'INTEGER',
+                'pcm_channels': 'INTEGER', 'pcm_gain_db': 'REAL'
+            })
+            
             # 创建索引
-            await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_category ON audio_files(category)")
+            # 列表按 (created_at, id) 倒序做键集分页，复合索引可直接按序扫描，无需额外排序
+            await self._connection.execute("DROP INDEX IF EXISTS idx_audio_files_category")
+            await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_category_created ON audio_files(category, created_at, id)")
+            await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_created ON audio_files(created_at, id)")
+            await self._connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_audio_files_content_hash ON audio_files(content_hash)")
+            await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_file_path ON audio_files(file_path)")
+            await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_file_inode ON audio_files(file_inode)")
             await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_playlist_items_playlist_id ON playlist_items(playlist_id)")
             await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_users_platform ON users(platform)")
             await self._connection.execute("CREATE INDEX IF NOT EXISTS idx_play_history_played_at ON play_history(played_at)")
             
+            # 全文检索索引
+            await self._init_search_index()
+            
             await self._connection.commit()
             self.logger.info("数据库表结构初始化完成")
             
@@ -161,27 +380,209 @@ class DatabaseManager(LoggerMixin):
             self.logger.error(f"数据库表初始化失败: {e}")
             raise
     
-    async def execute(self, sql: str, params: tuple = None) -> int:
+    async def _init_search_index(self):
+        """
+        创建 audio_files 的 FTS5 全文检索索引（外部内容表），并用触发器保持同步
+        
+        SQLite 未编译 FTS5 时记录警告并禁用全文检索，搜索退回到 LIKE 查询。
+        """
+        cursor = await self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audio_files_fts'"
+        )
+        exists = await cursor.fetchone() is not None
+        
+        try:
+            await self._connection.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS audio_files_fts USING fts5(
+                    title, filename, category, tags, search_tokens,
+                    content='audio_files', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            self.fts_enabled = False
+            self.logger.warning(f"SQLite 不支持 FTS5，全文检索已禁用: {e}")
+            return
+        
+        columns = "title, filename, category, tags, search_tokens"
+        new_values = "new.title, new.filename, new.category, new.tags, new.search_tokens"
+        old_values = "old.title, old.filename, old.category, old.tags, old.search_tokens"
+        
+        await self._connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS audio_files_fts_insert AFTER INSERT ON audio_files BEGIN
+                INSERT INTO audio_files_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        """)
+        await self._connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS audio_files_fts_delete AFTER DELETE ON audio_files BEGIN
+                INSERT INTO audio_files_fts(audio_files_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END
+        """)
+        await self._connection.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS audio_files_fts_update AFTER UPDATE OF {columns} ON audio_files BEGIN
+                INSERT INTO audio_files_fts(audio_files_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO audio_files_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        """)
+        
+        if not exists:
+            # 新建索引时为已有数据建立索引
+            await self._connection.execute("INSERT INTO audio_files_fts(audio_files_fts) VALUES ('rebuild')")
+        
+        self.fts_enabled = True
+    
+    async def _ensure_columns(self, table: str, columns: Dict[str, str]):
+        """
+        为已存在的表补充缺失的列（简单的结构迁移）
+        
+        Args:
+            table: 表名
+            columns: 列名到列定义的映射
+        """
+        cursor = await self._connection.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in await cursor.fetchall()}
+        
+        for column, definition in columns.items():
+            if column not in existing:
+                await self._connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                self.logger.info(f"数据表 {table} 新增列: {column}")
+        
+        self._table_columns.pop(table, None)
+    
+    async def execute(self, sql: str, params: tuple = None, durable: bool = False) -> int:
         """
         执行SQL语句
         
         Args:
             sql: SQL语句
             params: 参数
+            durable: 写回模式下是否立即提交所在批次（持久化屏障）
             
         Returns:
             int: 影响的行数
         """
         try:
+            return await self._write(sql, params, 'rowcount', durable)
+        except Exception as e:
+            self.logger.error(f"SQL执行失败: {sql}, 错误: {e}")
+            raise
+    
+    async def flush(self):
+        """
+        提交写回队列中所有已排队的写操作
+        
+        返回时，调用 flush() 之前排队的写操作均已提交（或已失败）。
+        未启用写回队列时为空操作。
+        """
+        if not self._write_queue:
+            return
+        
+        barrier = _PendingWrite(None, None, None, asyncio.get_running_loop().create_future(), durable=True)
+        self._write_queue.put_nowait(barrier)
+        await barrier.future
+    
+    def get_write_stats(self) -> Dict[str, int]:
+        """获取写回队列统计信息"""
+        stats = dict(self._write_stats)
+        stats['pending'] = self._write_queue.qsize() if self._write_queue else 0
+        return stats
+    
+    async def _write(self, sql: str, params: Optional[tuple], result: str,
+                     durable: bool = False) -> int:
+        """
+        执行一条写语句
+        
+        Args:
+            sql: SQL语句
+            params: 参数
+            result: 返回值类型（lastrowid 或 rowcount）
+            durable: 写回模式下是否立即提交所在批次
+            
+        Returns:
+            int: lastrowid 或 rowcount（写回模式下在批次提交后返回）
+        """
+        if self._write_queue is not None:
+            future = asyncio.get_running_loop().create_future()
+            self._write_queue.put_nowait(_PendingWrite(sql, params, result, future, durable))
+            return await future
+        
+        async with self._write_lock:
             if params:
                 cursor = await self._connection.execute(sql, params)
             else:
                 cursor = await self._connection.execute(sql)
             await self._connection.commit()
-            return cursor.rowcount
-        except Exception as e:
-            self.logger.error(f"SQL执行失败: {sql}, 错误: {e}")
-            raise
+            return getattr(cursor, result)
+    
+    async def _flush_loop(self):
+        """写回队列后台任务：攒批并以单个事务提交"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + self.batch_interval
+            
+            while len(batch) < self.batch_max_statements and not batch[-1].durable:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._commit_batch(batch)
+    
+    async def _commit_batch(self, batch: List['_PendingWrite']):
+        """以单个事务执行一批写操作，并在提交后通知等待方"""
+        statements = [item for item in batch if item.sql is not None]
+        
+        async with self._write_lock:
+            if statements:
+                try:
+                    await self._connection.execute("BEGIN")
+                    for item in statements:
+                        # 每条语句使用独立的保存点，单条语句失败不影响同批次的其他语句
+                        await self._connection.execute("SAVEPOINT write_behind")
+                        try:
+                            if item.params:
+                                cursor = await self._connection.execute(item.sql, item.params)
+                            else:
+                                cursor = await self._connection.execute(item.sql)
+                            item.value = getattr(cursor, item.result)
+                            await self._connection.execute("RELEASE write_behind")
+                        except Exception as e:
+                            await self._connection.execute("ROLLBACK TO write_behind")
+                            await self._connection.execute("RELEASE write_behind")
+                            item.error = e
+                    await self._connection.commit()
+                except Exception as e:
+                    self.logger.error(f"写回批次提交失败: {e}")
+                    try:
+                        await self._connection.rollback()
+                    except Exception:
+                        pass
+                    for item in statements:
+                        if item.error is None:
+                            item.error = e
+                
+                self._write_stats['batches'] += 1
+                self._write_stats['statements'] += len(statements)
+                self._write_stats['failed_statements'] += sum(1 for item in statements if item.error)
+        
+        for item in batch:
+            if item.future.done():
+                continue
+            if item.error is not None:
+                item.future.set_exception(item.error)
+            else:
+                item.future.set_result(item.value)
     
     async def fetchone(self, sql: str, params: tuple = None) -> Optional[Dict[str, Any]]:
         """
@@ -195,16 +596,17 @@ class DatabaseManager(LoggerMixin):
             Optional[Dict[str, Any]]: 查询结果
         """
         try:
-            if params:
-                cursor = await self._connection.execute(sql, params)
-            else:
-                cursor = await self._connection.execute(sql)
-            
-            row = await cursor.fetchone()
-            if row:
-                columns = [description[0] for description in cursor.description]
-                return dict(zip(columns, row))
-            return None
+            async with self._reader() as connection:
+                if params:
+                    cursor = await connection.execute(sql, params)
+                else:
+                    cursor = await connection.execute(sql)
+                
+                row = await cursor.fetchone()
+                if row:
+                    columns = [description[0] for description in cursor.description]
+                    return dict(zip(columns, row))
+                return None
         except Exception as e:
             self.logger.error(f"查询失败: {sql}, 错误: {e}")
             raise
@@ -221,27 +623,29 @@ class DatabaseManager(LoggerMixin):
             List[Dict[str, Any]]: 查询结果列表
         """
         try:
-            if params:
-                cursor = await self._connection.execute(sql, params)
-            else:
-                cursor = await self._connection.execute(sql)
-            
-            rows = await cursor.fetchall()
-            if rows:
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
-            return []
+            async with self._reader() as connection:
+                if params:
+                    cursor = await connection.execute(sql, params)
+                else:
+                    cursor = await connection.execute(sql)
+                
+                rows = await cursor.fetchall()
+                if rows:
+                    columns = [description[0] for description in cursor.description]
+                    return [dict(zip(columns, row)) for row in rows]
+                return []
         except Exception as e:
             self.logger.error(f"查询失败: {sql}, 错误: {e}")
             raise
     
-    async def insert(self, table: str, data: Dict[str, Any]) -> int:
+    async def insert(self, table: str, data: Dict[str, Any], durable: bool = False) -> int:
         """
         插入数据
         
         Args:
             table: 表名
             data: 数据字典
+            durable: 写回模式下是否立即提交所在批次
             
         Returns:
             int: 插入记录的ID
@@ -250,11 +654,10 @@ class DatabaseManager(LoggerMixin):
         placeholders = ', '.join(['?' for _ in columns])
         sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
         
-        cursor = await self._connection.execute(sql, tuple(data.values()))
-        await self._connection.commit()
-        return cursor.lastrowid
+        return await self._write(sql, tuple(data.values()), 'lastrowid', durable)
     
-    async def update(self, table: str, data: Dict[str, Any], where: str, params: tuple = None) -> int:
+    async def update(self, table: str, data: Dict[str, Any], where: str, params: tuple = None,
+                     durable: bool = False) -> int:
         """
         更新数据
         
@@ -263,6 +666,7 @@ class DatabaseManager(LoggerMixin):
             data: 更新的数据字典
             where: WHERE条件
             params: WHERE条件参数
+            durable: 写回模式下是否立即提交所在批次
             
         Returns:
             int: 影响的行数
@@ -274,11 +678,10 @@ class DatabaseManager(LoggerMixin):
         if params:
             update_params.extend(params)
         
-        cursor = await self._connection.execute(sql, tuple(update_params))
-        await self._connection.commit()
-        return cursor.rowcount
+        return await self._write(sql, tuple(update_params), 'rowcount', durable)
     
-    async def delete(self, table: str, where: str, params: tuple = None) -> int:
+    async def delete(self, table: str, where: str, params: tuple = None,
+                     durable: bool = False) -> int:
         """
         删除数据
         
@@ -286,16 +689,171 @@ class DatabaseManager(LoggerMixin):
             table: 表名
             where: WHERE条件
             params: WHERE条件参数
+            durable: 写回模式下是否立即提交所在批次
             
         Returns:
             int: 影响的行数
         """
         sql = f"DELETE FROM {table} WHERE {where}"
         
-        if params:
-            cursor = await self._connection.execute(sql, params)
-        else:
-            cursor = await self._connection.execute(sql)
+        return await self._write(sql, params, 'rowcount', durable)
+    
+    async def insert_many(self, table: str, rows: Sequence[Dict[str, Any]]) -> int:
+        """
+        批量插入数据（单个事务内 executemany）
+        
+        Args:
+            table: 表名
+            rows: 数据字典列表，列集合不同的行会按列签名分组执行
+            
+        Returns:
+            int: 插入的行数
+        """
+        groups = []
+        for columns, params in self._group_rows(rows):
+            sql = self._cached_sql(('insert', table, columns), lambda: (
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['?'] * len(columns))})"
+            ))
+            groups.append((sql, params))
+        
+        return await self._executemany(groups)
+    
+    async def upsert_many(self, table: str, rows: Sequence[Dict[str, Any]],
+                          conflict_keys: Sequence[str] = None) -> int:
+        """
+        批量插入或更新数据（INSERT ... ON CONFLICT DO UPDATE）
+        
+        Args:
+            table: 表名
+            rows: 数据字典列表，必须包含冲突键对应的列
+            conflict_keys: 冲突键，默认使用 UPSERT_CONFLICT_KEYS 中的配置
+            
+        Returns:
+            int: 插入或更新的行数
+        """
+        keys = tuple(conflict_keys or self.UPSERT_CONFLICT_KEYS.get(table, ()))
+        if not keys:
+            raise ValueError(f"表 {table} 未定义 upsert 冲突键")
+        
+        table_columns = await self._get_table_columns(table)
+        
+        groups = []
+        for columns, params in self._group_rows(rows):
+            missing = [key for key in keys if key not in columns]
+            if missing:
+                raise ValueError(f"upsert 数据缺少冲突键: {', '.join(missing)}")
+            
+            def build_sql():
+                updates = [f"{column} = excluded.{column}" for column in columns if column not in keys]
+                if 'updated_at' in table_columns and 'updated_at' not in columns:
+                    updates.append("updated_at = CURRENT_TIMESTAMP")
+                sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                       f"VALUES ({', '.join(['?'] * len(columns))}) "
+                       f"ON CONFLICT ({', '.join(keys)}) DO ")
+                return sql + (f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING")
+            
+            groups.append((self._cached_sql(('upsert', table, columns, keys), build_sql), params))
+        
+        return await self._executemany(groups)
+    
+    async def update_many(self, table: str, rows: Sequence[Dict[str, Any]], key: str = 'id') -> int:
+        """
+        按主键批量更新数据
+        
+        Args:
+            table: 表名
+            rows: 数据字典列表，每行必须包含 key 对应的列
+            key: 定位记录的列名
+            
+        Returns:
+            int: 影响的行数
+        """
+        table_columns = await self._get_table_columns(table)
+        
+        groups = []
+        for columns, params in self._group_rows(rows, key=key):
+            def build_sql():
+                assignments = [f"{column} = ?" for column in columns]
+                if 'updated_at' in table_columns and 'updated_at' not in columns:
+                    assignments.append("updated_at = CURRENT_TIMESTAMP")
+                return f"UPDATE {table} SET {', '.join(assignments)} WHERE {key} = ?"
+            
+            groups.append((self._cached_sql(('update', table, columns, key), build_sql), params))
+        
+        return await self._executemany(groups)
+    
+    def _group_rows(self, rows: Sequence[Dict[str, Any]],
+                    key: str = None) -> List[Tuple[Tuple[str, ...], List[tuple]]]:
+        """
+        按列签名对数据行分组
+        
+        Args:
+            rows: 数据字典列表
+            key: 若指定，则从列中移除该列并将其值追加到参数末尾（用于 WHERE 条件）
+            
+        Returns:
+            List[Tuple[Tuple[str, ...], List[tuple]]]: (列名元组, 参数列表) 列表
+        """
+        groups: Dict[Tuple[str, ...], List[tuple]] = {}
+        
+        for row in rows:
+            if key is not None:
+                if key not in row:
+                    raise ValueError(f"批量更新数据缺少键列: {key}")
+                columns = tuple(column for column in row if column != key)
+                params = tuple(row[column] for column in columns) + (row[key],)
+            else:
+                columns = tuple(row)
+                params = tuple(row.values())
+            
+            if not columns:
+                continue
+            groups.setdefault(columns, []).append(params)
+        
+        return list(groups.items())
+    
+    def _cached_sql(self, signature: Tuple, build) -> str:
+        """获取缓存的SQL语句，相同签名复用同一条SQL（sqlite3 会复用其预编译语句）"""
+        sql = self._sql_cache.get(signature)
+        if sql is None:
+            sql = self._sql_cache[signature] = build()
+        return sql
+    
+    async def _get_table_columns(self, table: str) -> Tuple[str, ...]:
+        """获取表的列名（带缓存）"""
+        columns = self._table_columns.get(table)
+        if columns is None:
+            rows = await self.fetchall(f"PRAGMA table_info({table})")
+            columns = self._table_columns[table] = tuple(row['name'] for row in rows)
+        return columns
+    
+    async def _executemany(self, groups: List[Tuple[str, List[tuple]]]) -> int:
+        """
+        在单个事务内执行多组 executemany
+        
+        Args:
+            groups: (SQL语句, 参数列表) 列表
+            
+        Returns:
+            int: 影响的总行数
+        """
+        if not groups:
+            return 0
+        
+        # 保证批量操作排在之前已入队的写操作之后
+        await self.flush()
         
-        await self._connection.commit()
-        return cursor.rowcount
+        async with self._write_lock:
+            try:
+                await self._connection.execute("BEGIN")
+                total = 0
+                for sql, params in groups:
+                    cursor = await self._connection.executemany(sql, params)
+                    total += cursor.rowcount
+                await self._connection.commit()
+                return total
+            except Exception as e:
+                await self._connection.rollback()
+                self.logger.error(f"批量写入失败: {e}")
+                raise
@@ -0,0 +1,461 @@
+"""
+进程内异步事件总线
+
+发布者把消息按主题（MessageType）投递到每个订阅者自己的有界队列后立即返回，
+订阅者由各自的工作任务并发消费，一个慢处理器（数据库、TTS、LLM）不会拖慢消息采集
+和其它订阅者。队列满时按订阅者的背压策略处理：
+
+- drop_oldest: 丢弃队列中最旧的消息（默认，适合弹幕这类只关心最新内容的处理器）
+- coalesce: 与队列中键相同的消息合并（例如连续的点赞数），否则丢弃最旧的消息
+- block: 发布者等待队列腾出空间（最多 block_timeout 秒，超时后丢弃），适合不允许丢失的记录器
+"""
+
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Optional, Dict, Any, Callable, Iterable, List, Hashable, Deque, Awaitable
+
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+
+
+# 计算延迟分位数时保留的最近样本数
+METRIC_SAMPLES = 1024
+
+
+class BackpressurePolicy(Enum):
+    """队列满时的背压策略"""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    BLOCK = "block"
+
+
+class _Envelope:
+    """队列中的一条消息"""
+    __slots__ = ('topic', 'message', 'published_at', 'key')
+
+    def __init__(self, topic: Any, message: Any, published_at: float, key: Hashable = None):
+        self.topic = topic
+        self.message = message
+        self.published_at = published_at
+        self.key = key
+
+
+def _topic_name(topic: Any) -> str:
+    """主题的显示名称（MessageType 取值，(直播间, MessageType) 写作 "直播间/类型"）"""
+    if isinstance(topic, tuple):
+        return '/'.join(_topic_name(part) for part in topic)
+    return getattr(topic, 'value', str(topic))
+
+
+def _percentile(samples: Iterable[float], fraction: float) -> float:
+    """样本的分位数（最近邻取整）"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Subscription(LoggerMixin):
+    """
+    一个订阅者：有界队列 + 若干工作任务
+
+    由 EventBus.subscribe() 创建。
+    """
+
+    def __init__(self, bus: 'EventBus', handler: Callable, topics: Optional[Iterable[Any]] = None,
+                 name: str = None, maxsize: int = 1000, concurrency: int = 1,
+                 policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+                 coalesce_key: Callable[[Any, Any], Hashable] = None,
+                 merge: Callable[[Any, Any], Any] = None, block_timeout: float = 1.0,
+                 with_topic: bool = False):
+        """
+        初始化订阅者
+
+        Args:
+            bus: 所属事件总线
+            handler: 处理函数（同步或异步），参数为消息（with_topic 时为主题和消息）
+            topics: 订阅的主题，None 表示全部
+            name: 名称（用于统计和日志）
+            maxsize: 队列容量
+            concurrency: 并发处理数
+            policy: 队列满时的背压策略
+            coalesce_key: coalesce 策略的合并键 (topic, message) -> key，默认按主题合并
+            merge: 合并函数 (队列中的消息, 新消息) -> 合并后的消息，默认保留新消息
+            block_timeout: block 策略下发布者最多等待的时间（秒）
+            with_topic: 处理函数是否同时接收主题
+        """
+        self.bus = bus
+        self.handler = handler
+        self.topics = frozenset(topics) if topics is not None else None
+        self.name = name or getattr(handler, '__qualname__', repr(handler))
+        self.maxsize = max(1, maxsize)
+        self.concurrency = max(1, concurrency)
+        self.policy = BackpressurePolicy(policy)
+        self.coalesce_key = coalesce_key or (lambda topic, message: topic)
+        self.merge = merge
+        self.block_timeout = block_timeout
+        self.with_topic = with_topic
+        self._is_coroutine = asyncio.iscoroutinefunction(handler)
+
+        self._queue: Deque[_Envelope] = deque()
+        self._pending_keys: Dict[Hashable, _Envelope] = {}
+        self._not_empty: Optional[asyncio.Event] = None
+        self._not_full: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._active = 0
+        self._idle: Optional[asyncio.Event] = None
+        self.closed = False
+
+        self._stats = {
+            'published': 0, 'delivered': 0, 'dropped': 0, 'coalesced': 0,
+            'blocked': 0, 'errors': 0, 'max_depth': 0
+        }
+        self._lag = deque(maxlen=METRIC_SAMPLES)
+        self._latency = deque(maxlen=METRIC_SAMPLES)
+        self._lag_max = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def depth(self) -> int:
+        """队列中等待处理的消息数"""
+        return len(self._queue)
+
+    def accepts(self, topic: Any) -> bool:
+        """是否订阅了该主题"""
+        return self.topics is None or topic in self.topics
+
+    def offer(self, envelope: _Envelope) -> bool:
+        """
+        不等待地投递一条消息
+
+        Returns:
+            bool: 是否已放入队列（block 策略下队列满时返回 False，由调用方决定是否等待）
+        """
+        if self.closed:
+            return True
+        self._ensure_started()
+        self._stats['published'] += 1
+
+        if self.policy is BackpressurePolicy.COALESCE:
+            envelope.key = self.coalesce_key(envelope.topic, envelope.message)
+            queued = self._pending_keys.get(envelope.key)
+            if queued is not None:
+                # 原地合并，保留原来的排队位置和发布时间
+                queued.message = (self.merge(queued.message, envelope.message) if self.merge
+                                  else envelope.message)
+                self._stats['coalesced'] += 1
+                return True
+
+        if len(self._queue) >= self.maxsize:
+            if self.policy is BackpressurePolicy.BLOCK:
+                self._stats['published'] -= 1
+                return False
+            self._discard(self._queue.popleft())
+
+        self._enqueue(envelope)
+        return True
+
+    async def put(self, envelope: _Envelope):
+        """投递一条消息，block 策略下队列满时等待（超时后丢弃）"""
+        if self.offer(envelope):
+            return
+
+        self._stats['blocked'] += 1
+        deadline = time.monotonic() + self.block_timeout
+        while not self.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._not_full.clear()
+            try:
+                await asyncio.wait_for(self._not_full.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if self.offer(envelope):
+                return
+
+        self._stats['published'] += 1
+        self._stats['dropped'] += 1
+        self.logger.warning(f"订阅者 {self.name} 处理过慢，阻塞超时后丢弃消息")
+
+    def put_nowait(self, envelope: _Envelope):
+        """投递一条消息，从不等待（block 策略下队列满时丢弃新消息）"""
+        if not self.offer(envelope):
+            self._stats['published'] += 1
+            self._stats['dropped'] += 1
+
+    async def join(self):
+        """等待队列中的消息全部处理完"""
+        while (self._queue or self._active) and not self.closed:
+            self._idle.clear()
+            await self._idle.wait()
+
+    def cancel(self):
+        """停止工作任务，丢弃未处理的消息（不等待任务结束）"""
+        self.closed = True
+        for task in self._workers:
+            task.cancel()
+        self._queue.clear()
+        self._pending_keys.clear()
+        if self._not_full is not None:
+            self._not_full.set()
+        if self._idle is not None:
+            self._idle.set()
+
+    async def close(self):
+        """停止工作任务并等待其结束"""
+        workers = list(self._workers)
+        self.cancel()
+        self._workers = []
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取订阅者统计信息（延迟单位为毫秒）"""
+        lag = list(self._lag)
+        latency = list(self._latency)
+        return {
+            'name': self.name,
+            'topics': sorted(_topic_name(t) for t in self.topics) if self.topics else None,
+            'policy': self.policy.value,
+            'depth': len(self._queue),
+            **self._stats,
+            'lag_ms_avg': sum(lag) / len(lag) if lag else 0.0,
+            'lag_ms_p95': _percentile(lag, 0.95),
+            'lag_ms_max': self._lag_max,
+            'latency_ms_avg': sum(latency) / len(latency) if latency else 0.0,
+            'latency_ms_p95': _percentile(latency, 0.95),
+            'latency_ms_max': self._latency_max
+        }
+
+    def _ensure_started(self):
+        """首次投递时在当前事件循环中启动工作任务"""
+        if self._workers or self.closed:
+            return
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def _enqueue(self, envelope: _Envelope):
+        self._queue.append(envelope)
+        if envelope.key is not None:
+            self._pending_keys[envelope.key] = envelope
+        self._stats['max_depth'] = max(self._stats['max_depth'], len(self._queue))
+        self._not_empty.set()
+
+    def _discard(self, envelope: _Envelope):
+        self._forget(envelope)
+        self._stats['dropped'] += 1
+
+    def _forget(self, envelope: _Envelope):
+        if envelope.key is not None and self._pending_keys.get(envelope.key) is envelope:
+            del self._pending_keys[envelope.key]
+
+    async def _worker(self):
+        """从队列取出消息并调用处理函数"""
+        while True:
+            while not self._queue:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+
+            envelope = self._queue.popleft()
+            self._forget(envelope)
+            self._not_full.set()
+            self._active += 1
+
+            started = time.monotonic()
+            lag = (started - envelope.published_at) * 1000
+            self._lag.append(lag)
+            self._lag_max = max(self._lag_max, lag)
+
+            args = (envelope.topic, envelope.message) if self.with_topic else (envelope.message,)
+            try:
+                if self._is_coroutine:
+                    await self.handler(*args)
+                else:
+                    self.handler(*args)
+                self._stats['delivered'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats['errors'] += 1
+                self.logger.error(f"订阅者 {self.name} 处理消息出错: {e}")
+            finally:
+                latency = (time.monotonic() - started) * 1000
+                self._latency.append(latency)
+                self._latency_max = max(self._latency_max, latency)
+                self._active -= 1
+                if not self._queue and not self._active:
+                    self._idle.set()
+
+
+class EventBus(LoggerMixin):
+    """按主题路由的进程内事件总线"""
+
+    def __init__(self, maxsize: int = 1000, concurrency: int = 1,
+                 policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+                 block_timeout: float = 1.0):
+        """
+        初始化事件总线
+
+        Args:
+            maxsize: 订阅者队列的默认容量
+            concurrency: 订阅者的默认并发处理数
+            policy: 默认背压策略
+            block_timeout: block 策略下发布者最多等待的时间（秒）
+        """
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.policy = BackpressurePolicy(policy)
+        self.block_timeout = block_timeout
+
+        self._subscriptions: List[Subscription] = []
+        self._routes: Dict[Any, List[Subscription]] = {}
+        self._published = 0
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'EventBus':
+        """
+        根据 event_bus.* 配置创建事件总线
+
+        Args:
+            config: 配置对象
+
+        Returns:
+            EventBus: 事件总线
+        """
+        return cls(
+            maxsize=config.get('event_bus.queue_size', 1000),
+            concurrency=config.get('event_bus.concurrency', 1),
+            policy=config.get('event_bus.policy', 'drop_oldest'),
+            block_timeout=config.get('event_bus.block_timeout', 1.0)
+        )
+
+    def subscribe(self, handler: Callable, topics: Optional[Iterable[Any]] = None,
+                  name: str = None, maxsize: int = None, concurrency: int = None,
+                  policy: BackpressurePolicy = None, coalesce_key: Callable = None,
+                  merge: Callable = None, with_topic: bool = False) -> Subscription:
+        """
+        订阅主题
+
+        Args:
+            handler: 处理函数（同步或异步），参数为消息（with_topic 时为主题和消息）
+            topics: 订阅的主题（MessageType），None 表示全部
+            name: 名称
+            maxsize: 队列容量，默认使用总线配置
+            concurrency: 并发处理数，默认使用总线配置
+            policy: 背压策略，默认使用总线配置
+            coalesce_key: coalesce 策略的合并键 (topic, message) -> key
+            merge: coalesce 策略的合并函数 (旧消息, 新消息) -> 消息
+            with_topic: 处理函数是否同时接收主题
+
+        Returns:
+            Subscription: 订阅者（用于取消订阅和查看统计）
+        """
+        subscription = Subscription(
+            self, handler, topics, name,
+            maxsize=maxsize or self.maxsize,
+            concurrency=concurrency or self.concurrency,
+            policy=policy or self.policy,
+            coalesce_key=coalesce_key,
+            merge=merge,
+            block_timeout=self.block_timeout,
+            with_topic=with_topic
+        )
+        self._subscriptions.append(subscription)
+        self._routes.clear()
+        self.logger.debug(f"添加订阅者: {subscription.name}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> Optional[Awaitable]:
+        """
+        取消订阅（未处理的消息被丢弃）
+
+        工作任务只是被取消，需要确认其已结束时 await 返回值
+        （或使用 await subscription.close()）。
+
+        Args:
+            subscription: 订阅者
+
+        Returns:
+            Optional[Awaitable]: 等待工作任务结束的 Future；在事件循环外调用且
+            订阅者尚未启动工作任务时为 None
+        """
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._routes.clear()
+        workers = list(subscription._workers)
+        subscription.cancel()
+        subscription._workers = []
+        if not workers:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return None
+        return asyncio.gather(*workers, return_exceptions=True)
+
+    async def publish(self, topic: Any, message: Any) -> int:
+        """
+        发布消息
+
+        只有 block 策略的订阅者队列已满时才会等待，其余情况立即返回。
+
+        Args:
+            topic: 主题
+            message: 消息
+
+        Returns:
+            int: 接收该消息的订阅者数量
+        """
+        subscribers = self._subscribers(topic)
+        published_at = time.monotonic()
+        self._published += 1
+        for subscription in subscribers:
+            await subscription.put(_Envelope(topic, message, published_at))
+        return len(subscribers)
+
+    def publish_nowait(self, topic: Any, message: Any) -> int:
+        """
+        发布消息，从不等待（block 策略的订阅者队列已满时丢弃）
+
+        Args:
+            topic: 主题
+            message: 消息
+
+        Returns:
+            int: 接收该消息的订阅者数量
+        """
+        subscribers = self._subscribers(topic)
+        published_at = time.monotonic()
+        self._published += 1
+        for subscription in subscribers:
+            subscription.put_nowait(_Envelope(topic, message, published_at))
+        return len(subscribers)
+
+    async def join(self):
+        """等待所有订阅者处理完已发布的消息"""
+        for subscription in list(self._subscriptions):
+            if subscription._workers:
+                await subscription.join()
+
+    async def close(self):
+        """关闭所有订阅者"""
+        subscriptions, self._subscriptions = self._subscriptions, []
+        self._routes.clear()
+        await asyncio.gather(*[subscription.close() for subscription in subscriptions])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取总线和各订阅者的统计信息"""
+        return {
+            'published': self._published,
+            'subscribers': [subscription.get_stats() for subscription in self._subscriptions]
+        }
+
+    def _subscribers(self, topic: Any) -> List[Subscription]:
+        """主题对应的订阅者（按主题缓存路由表）"""
+        subscribers = self._routes.get(topic)
+        if subscribers is None:
+            subscribers = self._routes[topic] = [s for s in self._subscriptions if s.accepts(topic)]
+        return subscribers
@@ -0,0 +1,447 @@
+"""
+礼物答谢调度
+
+礼物刷屏时答谢音效远比礼物慢。调度器把同一用户在连击窗口内连续送出的同一礼物
+合并为一次答谢，按 礼物价值 × 映射优先级 × VIP 倍数 排序，队列满时淘汰优先级
+最低的答谢，保证价值最高的答谢先播放、积压有上限。
+
+内部用三个惰性删除的堆：连击截止时间堆（窗口结束后转入就绪）、就绪最大堆
+（取出最高优先级）、全部待处理的最小堆（淘汰最低优先级）。合并会更新答谢的
+版本号，堆中版本号不一致的旧项在弹出时跳过。
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
+
+from ..utils.logger import LoggerMixin
+from ..utils.config import Config
+from ..platforms.models import GiftMessage, CompactGiftMessage, User
+
+
+@dataclass
+class GiftMapping:
+    """礼物到答谢音效的映射"""
+    gift_name: str
+    audio_file_id: Optional[int] = None
+    audio_filename: Optional[str] = None
+    gift_value: Optional[float] = None  # 单个礼物的价值，页面上拿不到价格时使用
+    priority: int = 1
+    enabled: bool = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'gift_name': self.gift_name,
+            'audio_file_id': self.audio_file_id,
+            'audio_filename': self.audio_filename,
+            'gift_value': self.gift_value,
+            'priority': self.priority,
+            'enabled': self.enabled
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GiftMapping':
+        """从字典创建"""
+        return cls(
+            gift_name=data['gift_name'],
+            audio_file_id=data.get('audio_file_id'),
+            audio_filename=data.get('audio_filename'),
+            gift_value=data.get('gift_value'),
+            priority=data.get('priority') or 1,
+            enabled=bool(data.get('enabled', True))
+        )
+
+
+@dataclass
+class GiftReaction:
+    """一次礼物答谢（可能由多条连击消息合并而成）"""
+    user: User
+    gift_name: str
+    mapping: GiftMapping
+    count: int = 0
+    combo_count: int = 0
+    total_value: float = 0.0
+    messages: int = 0
+    priority: float = 0.0
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+    ready: bool = False
+    version: int = field(default=0, repr=False)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """合并键（用户 + 礼物）"""
+        return self.user.user_id, self.gift_name
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'user': self.user.to_dict(),
+            'gift_name': self.gift_name,
+            'mapping': self.mapping.to_dict(),
+            'count': self.count,
+            'combo_count': self.combo_count,
+            'total_value': self.total_value,
+            'messages': self.messages,
+            'priority': self.priority
+        }
+
+
+class GiftMappingIndex(LoggerMixin):
+    """gift_mappings 表的内存索引（按礼物名 O(1) 查找）"""
+
+    def __init__(self, db_manager=None, mappings: Dict[str, str] = None, default_audio: str = None):
+        """
+        初始化索引
+
+        Args:
+            db_manager: 数据库管理器，为空时只使用配置中的映射
+            mappings: 礼物名到音频文件名的映射（配置 gift_mapping.mappings）
+            default_audio: 未配置映射的礼物使用的音频文件名
+        """
+        self.db_manager = db_manager
+        self.mappings = dict(mappings or {})
+        self.default_audio = default_audio
+        self._index: Dict[str, GiftMapping] = {}
+        self._default = GiftMapping('*', audio_filename=default_audio) if default_audio else None
+        self._build_from_config()
+
+    @classmethod
+    def from_config(cls, config: Config, db_manager=None) -> 'GiftMappingIndex':
+        """
+        根据 gift_mapping.* 配置创建索引
+
+        Args:
+            config: 配置对象
+            db_manager: 数据库管理器
+
+        Returns:
+            GiftMappingIndex: 索引
+        """
+        return cls(
+            db_manager,
+            mappings=config.get('gift_mapping.mappings', {}),
+            default_audio=config.get('gift_mapping.default_audio')
+        )
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _build_from_config(self):
+        self._index = {
+            name: GiftMapping(name, audio_filename=filename)
+            for name, filename in self.mappings.items()
+        }
+
+    async def load(self) -> int:
+        """
+        从数据库重新加载映射（数据库中的映射覆盖配置中的同名映射）
+
+        Returns:
+            int: 映射数量
+        """
+        self._build_from_config()
+        if self.db_manager is not None:
+            rows = await self.db_manager.fetchall("""
+                SELECT g.gift_name, g.gift_value, g.audio_file_id, g.priority, g.enabled,
+                       a.filename AS audio_filename
+                FROM gift_mappings g
+                LEFT JOIN audio_files a ON a.id = g.audio_file_id
+            """)
+            for row in rows:
+                mapping = GiftMapping.from_dict(row)
+                if mapping.audio_filename is None and mapping.gift_name in self.mappings:
+                    mapping.audio_filename = self.mappings[mapping.gift_name]
+                self._index[mapping.gift_name] = mapping
+
+        self.logger.info(f"已加载 {len(self._index)} 个礼物映射")
+        return len(self._index)
+
+    def get(self, gift_name: str) -> Optional[GiftMapping]:
+        """
+        查找礼物映射
+
+        Args:
+            gift_name: 礼物名
+
+        Returns:
+            Optional[GiftMapping]: 映射，未配置时返回默认映射（没有默认音频时为 None）
+        """
+        return self._index.get(gift_name, self._default)
+
+    async def upsert(self, mapping: GiftMapping):
+        """
+        保存映射到数据库并更新索引
+
+        Args:
+            mapping: 礼物映射
+        """
+        if self.db_manager is not None:
+            await self.db_manager.upsert_many('gift_mappings', [{
+                'gift_name': mapping.gift_name,
+                'gift_value': mapping.gift_value,
+                'audio_file_id': mapping.audio_file_id,
+                'priority': mapping.priority,
+                'enabled': mapping.enabled
+            }])
+        self._index[mapping.gift_name] = mapping
+
+
+class GiftScheduler(LoggerMixin):
+    """礼物答谢优先队列"""
+
+    def __init__(self, mapping_index: GiftMappingIndex, max_queue_size: int = 10,
+                 priority_multiplier: float = 2.0, min_gift_value: float = 0.0,
+                 combo_window: float = 2.0, combo_max_delay: float = 10.0):
+        """
+        初始化调度器
+
+        Args:
+            mapping_index: 礼物映射索引
+            max_queue_size: 最多保留的待答谢数量，超出时淘汰优先级最低的答谢
+            priority_multiplier: VIP 用户的优先级倍数
+            min_gift_value: 低于该价值的礼物不答谢
+            combo_window: 连击窗口（秒），同一用户的同一礼物在窗口内到达时合并
+            combo_max_delay: 连击持续不断时，第一次送出之后最多等待的时间（秒）
+        """
+        self.mapping_index = mapping_index
+        self.max_queue_size = max(1, max_queue_size)
+        self.priority_multiplier = priority_multiplier
+        self.min_gift_value = min_gift_value
+        self.combo_window = combo_window
+        self.combo_max_delay = max(combo_window, combo_max_delay)
+
+        self._pending: Dict[Tuple[str, str], GiftReaction] = {}
+        self._deadlines: List[tuple] = []  # (截止时间, 序号, 键, 版本)
+        self._ready: List[tuple] = []      # (-优先级, 序号, 键, 版本)
+        self._lowest: List[tuple] = []     # (优先级, -序号, 键, 版本)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+
+        self._stats = {
+            'received': 0, 'accepted': 0, 'coalesced': 0, 'filtered': 0,
+            'unmapped': 0, 'evicted': 0, 'dispatched': 0
+        }
+
+    @classmethod
+    def from_config(cls, config: Config, mapping_index: GiftMappingIndex) -> 'GiftScheduler':
+        """
+        根据 gift_mapping.rules.* 配置创建调度器
+
+        Args:
+            config: 配置对象
+            mapping_index: 礼物映射索引
+
+        Returns:
+            GiftScheduler: 调度器
+        """
+        return cls(
+            mapping_index,
+            max_queue_size=config.get('gift_mapping.rules.max_queue_size', 10),
+            priority_multiplier=config.get('gift_mapping.rules.priority_multiplier', 2.0),
+            min_gift_value=config.get('gift_mapping.rules.min_gift_value', 0.0),
+            combo_window=config.get('gift_mapping.rules.combo_window', 2.0),
+            combo_max_delay=config.get('gift_mapping.rules.combo_max_delay', 10.0)
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def offer(self, message: GiftMessage, now: float = None) -> bool:
+        """
+        加入一条礼物消息（可直接作为 GIFT 消息回调）
+
+        Args:
+            message: 礼物消息（GiftMessage 或 CompactGiftMessage）
+            now: 当前时间（time.monotonic()），默认取当前值
+
+        Returns:
+            bool: 是否进入队列（被过滤或立即被淘汰时为 False）
+        """
+        if now is None:
+            now = time.monotonic()
+        self._stats['received'] += 1
+        if isinstance(message, CompactGiftMessage):
+            message = message.to_message()
+
+        mapping = self.mapping_index.get(message.gift.name)
+        if mapping is None:
+            self._stats['unmapped'] += 1
+            return False
+        if not mapping.enabled:
+            self._stats['filtered'] += 1
+            return False
+
+        # 连击消息的数量是累计值（页面上依次显示 x1、x2、x3…，或数量为 1、combo_count 递增），
+        # 同一连击合并时取最大值而不是相加
+        count = max(message.count, message.combo_count)
+        # 页面上拿不到礼物价格，映射中配置了价值时以映射为准
+        if mapping.gift_value:
+            unit_value = mapping.gift_value
+        else:
+            unit_value = message.total_value / message.count if message.count else message.gift.price
+        value = unit_value * count
+        if value < self.min_gift_value:
+            self._stats['filtered'] += 1
+            return False
+
+        key = (message.user.user_id, message.gift.name)
+        reaction = self._pending.get(key)
+        if reaction is None:
+            reaction = GiftReaction(user=message.user, gift_name=message.gift.name, mapping=mapping,
+                                    first_seen=now)
+            self._pending[key] = reaction
+            self._stats['accepted'] += 1
+        else:
+            self._stats['coalesced'] += 1
+
+        reaction.messages += 1
+        reaction.count = max(reaction.count, count)
+        reaction.combo_count = max(reaction.combo_count, message.combo_count, reaction.messages)
+        reaction.total_value = max(reaction.total_value, value)
+        reaction.last_seen = now
+        if message.user.vip_level > reaction.user.vip_level:
+            reaction.user = message.user
+        reaction.priority = self._priority(reaction)
+        reaction.version += 1
+        self._push(reaction)
+
+        if len(self._pending) > self.max_queue_size:
+            evicted = self._evict_lowest()
+            if evicted is reaction:
+                return False
+
+        self._wakeup.set()
+        return True
+
+    def pop(self, now: float = None) -> Optional[GiftReaction]:
+        """
+        取出优先级最高的就绪答谢（连击窗口已结束）
+
+        Args:
+            now: 当前时间（time.monotonic()），默认取当前值
+
+        Returns:
+            Optional[GiftReaction]: 答谢，没有就绪的答谢时返回 None
+        """
+        self._promote(time.monotonic() if now is None else now)
+        while self._ready:
+            _, _, key, version = heapq.heappop(self._ready)
+            reaction = self._pending.get(key)
+            if reaction is None or reaction.version != version:
+                continue
+            del self._pending[key]
+            self._stats['dispatched'] += 1
+            return reaction
+        return None
+
+    async def get(self) -> GiftReaction:
+        """
+        等待并取出下一个答谢
+
+        Returns:
+            GiftReaction: 答谢
+        """
+        while True:
+            now = time.monotonic()
+            reaction = self.pop(now)
+            if reaction is not None:
+                return reaction
+
+            self._wakeup.clear()
+            delay = self._next_deadline()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if delay is None else max(0.0, delay - now))
+            except asyncio.TimeoutError:
+                pass
+
+    def clear(self):
+        """清空队列"""
+        self._pending.clear()
+        self._deadlines.clear()
+        self._ready.clear()
+        self._lowest.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计信息"""
+        return {
+            **self._stats,
+            'queue_size': len(self._pending),
+            'max_queue_size': self.max_queue_size,
+            'ready': sum(1 for reaction in self._pending.values() if reaction.ready)
+        }
+
+    def _priority(self, reaction: GiftReaction) -> float:
+        """答谢优先级：礼物总价值 × 映射优先级 × VIP 倍数"""
+        weight = max(1, reaction.mapping.priority)
+        if reaction.user.vip_level > 0:
+            weight *= self.priority_multiplier
+        return reaction.total_value * weight
+
+    def _push(self, reaction: GiftReaction):
+        """把答谢的当前版本加入各个堆"""
+        seq = next(self._seq)
+        key, version = reaction.key, reaction.version
+        heapq.heappush(self._lowest, (reaction.priority, -seq, key, version))
+        if reaction.ready:
+            heapq.heappush(self._ready, (-reaction.priority, seq, key, version))
+        else:
+            deadline = min(reaction.last_seen + self.combo_window, reaction.first_seen + self.combo_max_delay)
+            heapq.heappush(self._deadlines, (deadline, seq, key, version))
+
+        if len(self._lowest) > 4 * max(len(self._pending), 16):
+            self._compact()
+
+    def _promote(self, now: float):
+        """连击窗口已结束的答谢转入就绪堆"""
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, seq, key, version = heapq.heappop(self._deadlines)
+            reaction = self._pending.get(key)
+            if reaction is None or reaction.version != version:
+                continue
+            reaction.ready = True
+            heapq.heappush(self._ready, (-reaction.priority, seq, key, version))
+
+    def _next_deadline(self) -> Optional[float]:
+        """最近的有效连击截止时间"""
+        while self._deadlines:
+            _, _, key, version = self._deadlines[0]
+            reaction = self._pending.get(key)
+            if reaction is not None and reaction.version == version:
+                return self._deadlines[0][0]
+            heapq.heappop(self._deadlines)
+        return None
+
+    def _evict_lowest(self) -> Optional[GiftReaction]:
+        """淘汰优先级最低的答谢（优先级相同时淘汰较新的）"""
+        while self._lowest:
+            _, _, key, version = heapq.heappop(self._lowest)
+            reaction = self._pending.get(key)
+            if reaction is None or reaction.version != version:
+                continue
+            del self._pending[key]
+            self._stats['evicted'] += 1
+            self.logger.debug(f"礼物答谢队列已满，丢弃: {reaction.user.nickname} 的 {reaction.gift_name}")
+            return reaction
+        return None
+
+    def _compact(self):
+        """重建堆，清除旧版本项"""
+        deadlines = []
+        ready = []
+        lowest = []
+        for key, reaction in self._pending.items():
+            seq = next(self._seq)
+            lowest.append((reaction.priority, -seq, key, reaction.version))
+            if reaction.ready:
+                ready.append((-reaction.priority, seq, key, reaction.version))
+            else:
+                deadline = min(reaction.last_seen + self.combo_window, reaction.first_seen + self.combo_max_delay)
+                deadlines.append((deadline, seq, key, reaction.version))
+        for heap in (deadlines, ready, lowest):
+            heapq.heapify(heap)
+        self._deadlines, self._ready, self._lowest = deadlines, ready, lowest
@@ -0,0 +1,169 @@
+"""
+消息去重
+
+直播间页面会重复呈现同一条消息：轮询模式每次都读到最近的几个节点，
+页面重新渲染时同一条消息会换成新的节点。去重分两层：
+
+1. 节点标识（WebElement 引用或推送脚本分配的序号），在 TTL 内见过即为重复；
+2. 内容指纹（消息类型 + 用户 + 内容），在较短的时间窗口内见过即为重复，
+   用于识别重新渲染产生的新节点。
+
+两层都是"有界环形队列 + 字典"，按插入顺序过期，容量满时淘汰最旧的记录，
+单次检查为均摊 O(1)。
+"""
+
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Hashable
+
+from ..utils.config import Config
+
+
+class _ExpiringSet:
+    """带 TTL 和容量上限的集合（环形队列记录插入顺序，字典记录过期时间）"""
+
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = max(1, capacity)
+        self.ttl = ttl
+        self._expires: Dict[Hashable, float] = {}
+        self._order = deque()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def contains(self, key: Hashable, now: float) -> bool:
+        """是否包含未过期的 key"""
+        expires = self._expires.get(key)
+        return expires is not None and expires > now
+
+    def add(self, key: Hashable, now: float):
+        """加入 key（已存在时刷新过期时间）"""
+        expires = now + self.ttl
+        self._expires[key] = expires
+        self._order.append((expires, key))
+        self.expire(now)
+
+    def expire(self, now: float):
+        """移除过期记录，超出容量时淘汰最旧的记录"""
+        order = self._order
+        while order:
+            expires, key = order[0]
+            current = self._expires.get(key)
+            if current != expires:
+                # 该 key 之后被刷新过，这是旧的队列项
+                order.popleft()
+            elif expires <= now:
+                order.popleft()
+                del self._expires[key]
+            elif len(self._expires) > self.capacity:
+                order.popleft()
+                del self._expires[key]
+                self.evicted += 1
+            else:
+                break
+
+
+class MessageDeduplicator:
+    """直播间消息去重器"""
+
+    def __init__(self, capacity: int = 4096, ttl: float = 300.0, window: float = 3.0):
+        """
+        初始化去重器
+
+        Args:
+            capacity: 每层最多记录的条目数
+            ttl: 节点标识的保留时间（秒）
+            window: 内容指纹的去重窗口（秒），窗口内相同用户发送的相同内容视为重复
+        """
+        self.window = window
+        self._nodes = _ExpiringSet(capacity, ttl)
+        self._fingerprints = _ExpiringSet(capacity, window)
+
+        self._stats = {'checked': 0, 'unique': 0, 'node_duplicates': 0, 'fingerprint_duplicates': 0}
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'MessageDeduplicator':
+        """
+        根据 douyin.dedup.* 配置创建去重器
+
+        Args:
+            config: 配置对象
+
+        Returns:
+            MessageDeduplicator: 去重器
+        """
+        return cls(
+            capacity=config.get('douyin.dedup.capacity', 4096),
+            ttl=config.get('douyin.dedup.ttl', 300.0),
+            window=config.get('douyin.dedup.window', 3.0)
+        )
+
+    def seen_node(self, node_id: Hashable, now: float = None) -> bool:
+        """
+        节点是否已处理过（只查询，不记录）
+
+        轮询模式下先用它跳过已处理的节点，避免再读取节点文本。
+
+        Args:
+            node_id: 节点标识
+            now: 当前时间（time.monotonic()），默认取当前值
+
+        Returns:
+            bool: 是否已处理过
+        """
+        return self._nodes.contains(node_id, time.monotonic() if now is None else now)
+
+    def is_duplicate(self, kind: str, user: str, content: str, node_id: Optional[Hashable] = None,
+                     now: float = None) -> bool:
+        """
+        检查并记录一条消息
+
+        Args:
+            kind: 消息类型
+            user: 用户标识（昵称）
+            content: 消息内容（礼物为礼物名和数量）
+            node_id: 节点标识，没有时只按内容指纹判断
+            now: 当前时间（time.monotonic()），默认取当前值
+
+        Returns:
+            bool: 是否为重复消息（重复消息不会被记录）
+        """
+        if now is None:
+            now = time.monotonic()
+        self._stats['checked'] += 1
+
+        if node_id is not None and self._nodes.contains(node_id, now):
+            self._stats['node_duplicates'] += 1
+            return True
+
+        fingerprint = (kind, user, content)
+        if self._fingerprints.contains(fingerprint, now):
+            self._stats['fingerprint_duplicates'] += 1
+            # 重新渲染出的新节点也记下，之后不必再比对内容
+            if node_id is not None:
+                self._nodes.add(node_id, now)
+            return True
+
+        if node_id is not None:
+            self._nodes.add(node_id, now)
+        self._fingerprints.add(fingerprint, now)
+        self._stats['unique'] += 1
+        return False
+
+    def clear(self):
+        """清空记录（切换直播间时调用）"""
+        self._nodes = _ExpiringSet(self._nodes.capacity, self._nodes.ttl)
+        self._fingerprints = _ExpiringSet(self._fingerprints.capacity, self._fingerprints.ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取去重统计信息"""
+        checked = self._stats['checked']
+        duplicates = self._stats['node_duplicates'] + self._stats['fingerprint_duplicates']
+        return {
+            **self._stats,
+            'duplicate_rate': duplicates / checked if checked else 0.0,
+            'nodes': len(self._nodes),
+            'fingerprints': len(self._fingerprints),
+            'evicted': self._nodes.evicted + self._fingerprints.evicted
+        }
@@ -0,0 +1,95 @@
+"""
+直播间 DOM 推送式采集脚本
+
+注入页面的 MutationObserver 在浏览器内把新增的弹幕、礼物节点解析为普通对象并缓冲，
+客户端每个周期只需一次 execute_script 取回整批数据（同时读取点赞数），
+不再逐个元素 find_element / text 往返 WebDriver。
+"""
+
+# 弹幕和礼物节点的 class 片段（与轮询模式的 XPath 一致）
+CHAT_ITEM_CLASS = 'webcast-chatroom___item'
+GIFT_ITEM_CLASS = 'gift-message'
+LIKE_COUNT_CLASS = 'like-count'
+
+# 安装采集器；参数为 (缓冲上限, 弹幕 class, 礼物 class)，已安装时直接返回 true
+CAPTURE_INSTALL_SCRIPT = r"""
+var maxBuffer = arguments[0], chatClass = arguments[1], giftClass = arguments[2];
+var existing = window.__asmrCapture;
+if (existing && existing.observer) { return true; }
+if (!document.body) { return false; }
+
+var state = {queue: [], dropped: 0, seq: 0, seen: new WeakSet(), observer: null};
+var selector = '[class*="' + chatClass + '"], [class*="' + giftClass + '"]';
+
+function kindOf(node) {
+    var name = typeof node.className === 'string' ? node.className : '';
+    if (name.indexOf(chatClass) >= 0) { return 'chat'; }
+    if (name.indexOf(giftClass) >= 0) { return 'gift'; }
+    return null;
+}
+
+function text(node, part) {
+    var el = node.querySelector('[class*="' + part + '"]');
+    return el ? el.textContent.trim() : '';
+}
+
+function capture(node, kind) {
+    if (state.seen.has(node)) { return; }
+    state.seen.add(node);
+    var item = {kind: kind, seq: ++state.seq, ts: Date.now(), user: text(node, 'username')};
+    if (kind === 'chat') {
+        item.content = text(node, 'content');
+        if (!item.content) { return; }
+    } else {
+        item.gift = text(node, 'gift-name');
+        item.count = text(node, 'gift-count');
+    }
+    if (state.queue.length >= maxBuffer) {
+        state.queue.shift();
+        state.dropped++;
+    }
+    state.queue.push(item);
+}
+
+function scan(node, emit) {
+    if (node.nodeType !== 1) { return; }
+    var kind = kindOf(node);
+    var nodes = kind ? [node] : node.querySelectorAll(selector);
+    for (var i = 0; i < nodes.length; i++) {
+        var k = kindOf(nodes[i]);
+        if (!k) { continue; }
+        if (emit) { capture(nodes[i], k); } else { state.seen.add(nodes[i]); }
+    }
+}
+
+// 注入前已经在页面上的历史消息不再上报
+scan(document.body, false);
+
+state.observer = new MutationObserver(function (mutations) {
+    for (var i = 0; i < mutations.length; i++) {
+        var added = mutations[i].addedNodes;
+        for (var j = 0; j < added.length; j++) { scan(added[j], true); }
+    }
+});
+state.observer.observe(document.body, {childList: true, subtree: true});
+
+state.drain = function () {
+    var result = {items: state.queue, dropped: state.dropped};
+    state.queue = [];
+    state.dropped = 0;
+    return result;
+};
+
+window.__asmrCapture = state;
+return true;
+"""
+
+# 取回缓冲的消息和当前点赞数；参数为点赞数 class；采集器不存在（页面已刷新）时返回 null
+CAPTURE_DRAIN_SCRIPT = r"""
+var state = window.__asmrCapture;
+if (!state || !state.drain) { return null; }
+var result = state.drain();
+var like = document.querySelector('[class*="' + arguments[0] + '"]');
+result.likes = like ? like.textContent : null;
+return result;
+"""
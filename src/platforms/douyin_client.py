@@ -3,6 +3,7 @@
 """
 
 import asyncio
+import dataclasses
 import json
 import time
 import re
@@ -12,42 +13,58 @@ from urllib.parse import urlparse, parse_qs
 
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from ..core.event_bus import EventBus, Subscription, BackpressurePolicy
 from ..utils.logger import LoggerMixin
 from ..utils.config import Config
 from .models import (
     User, ChatMessage, GiftMessage, LikeMessage, FollowMessage,
-    Gift, GiftType, LiveRoomInfo, ConnectionStatus, MessageType
+    Gift, GiftType, LiveRoomInfo, ConnectionStatus, MessageType,
+    CompactChatMessage, CompactGiftMessage, CompactLikeMessage
+)
+from .dedup import MessageDeduplicator
+from .webdriver_executor import AsyncWebDriver
+from .dom_capture import (
+    CAPTURE_INSTALL_SCRIPT, CAPTURE_DRAIN_SCRIPT, CHAT_ITEM_CLASS, GIFT_ITEM_CLASS, LIKE_COUNT_CLASS
 )
 
 
 class DouyinClient(LoggerMixin):
     """抖音客户端"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, event_bus: EventBus = None, room_key: str = None):
         """
         初始化抖音客户端
         
         Args:
             config: 配置对象
+            event_bus: 事件总线（多个客户端可以共享），默认创建自己的总线
+            room_key: 共享总线时区分直播间的键，消息主题为 (room_key, MessageType)
         """
         self.config = config
-        self.driver = None
+        # 所有 WebDriver 调用都在专用线程中执行，不阻塞事件循环
+        self.browser = AsyncWebDriver(
+            timeout=config.get('douyin.webdriver.timeout', 30.0),
+            page_load_timeout=config.get('douyin.webdriver.page_load_timeout', 60.0)
+        )
         self.is_logged_in = False
         self.is_connected = False
         self.room_info = None
         self.connection_status = ConnectionStatus()
         
-        # 回调函数
+        # 回调函数（每个回调是事件总线上的一个订阅者，有自己的队列，互不阻塞）
         self.message_callbacks: Dict[MessageType, List[Callable]] = {
             MessageType.CHAT: [],
             MessageType.GIFT: [],
             MessageType.LIKE: [],
             MessageType.FOLLOW: [],
         }
+        self.room_key = room_key
+        self._owns_event_bus = event_bus is None
+        self.event_bus = event_bus or EventBus.from_config(config)
+        self._subscriptions: Dict[tuple, Subscription] = {}
         
         # 配置参数
         self.username = config.get('douyin.username')
@@ -56,8 +73,37 @@ class DouyinClient(LoggerMixin):
         self.headless = config.get('douyin.headless', False)
         self.auto_login = config.get('douyin.auto_login', True)
         
+        # 消息采集：push 为页面内 MutationObserver 推送、每周期一次批量取回；poll 为 XPath 轮询
+        self.capture_mode = config.get('douyin.capture.mode', 'push')
+        self.capture_interval = config.get('douyin.capture.interval', 0.2)
+        self.poll_interval = config.get('douyin.capture.poll_interval', 0.5)
+        self.capture_buffer_size = config.get('douyin.capture.buffer_size', 2000)
+        # 回调收到紧凑消息（CompactChatMessage 等）而不是完整的数据类
+        self.compact_messages = config.get('douyin.capture.compact_messages', False)
+        self.capture_stats = {
+            'ticks': 0,
+            'round_trips': 0,
+            'captured': 0,
+            'dropped': 0,
+            'reinstalls': 0,
+            'last_latency_ms': 0.0,
+            'max_latency_ms': 0.0
+        }
+        # 推送脚本的序号在每次注入后重新计数，节点标识需要带上注入批次
+        self._capture_epoch = 0
+        self.deduplicator = MessageDeduplicator.from_config(config)
+        
         self.logger.info("抖音客户端初始化完成")
     
+    @property
+    def driver(self):
+        """底层 WebDriver（只能在驱动线程中调用，事件循环中请使用 self.browser）"""
+        return self.browser.driver
+    
+    @driver.setter
+    def driver(self, driver):
+        self.browser.driver = driver
+    
     async def start(self):
         """启动客户端"""
         try:
@@ -83,9 +129,16 @@ class DouyinClient(LoggerMixin):
             
             self.is_connected = False
             
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            try:
+                await self.browser.quit()
+            finally:
+                # 浏览器关闭失败也要释放回调，并等待被取消的工作任务结束
+                pending = [self.event_bus.unsubscribe(subscription)
+                           for subscription in self._subscriptions.values()]
+                self._subscriptions.clear()
+                await asyncio.gather(*[future for future in pending if future is not None])
+                if self._owns_event_bus:
+                    await self.event_bus.close()
             
             self.logger.info("抖音客户端已停止")
             
@@ -114,8 +167,8 @@ class DouyinClient(LoggerMixin):
             options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
             
             # 创建驱动
-            self.driver = uc.Chrome(options=options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            await self.browser.create(lambda: uc.Chrome(options=options))
+            await self.browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
             self.logger.info("浏览器初始化完成")
             
@@ -138,7 +191,7 @@ class DouyinClient(LoggerMixin):
                 return False
             
             # 访问抖音登录页面
-            self.driver.get("https://www.douyin.com/")
+            await self.browser.get("https://www.douyin.com/")
             await asyncio.sleep(3)
             
             # 检查是否已经登录
@@ -149,31 +202,30 @@ class DouyinClient(LoggerMixin):
             
             # 点击登录按钮
             try:
-                login_btn = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), '登录')]"))
+                login_btn = await self.browser.wait_until(
+                    EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), '登录')]")), 10
                 )
-                login_btn.click()
+                await self.browser.run(login_btn.click)
                 await asyncio.sleep(2)
             except TimeoutException:
                 self.logger.warning("未找到登录按钮，尝试其他方式")
             
             # 切换到密码登录
             try:
-                password_login = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), '密码登录')]"))
+                password_login = await self.browser.wait_until(
+                    EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), '密码登录')]")), 5
                 )
-                password_login.click()
+                await self.browser.run(password_login.click)
                 await asyncio.sleep(2)
             except TimeoutException:
                 self.logger.warning("未找到密码登录选项")
             
             # 输入用户名
             try:
-                username_input = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//input[@placeholder='请输入手机号']"))
+                username_input = await self.browser.wait_until(
+                    EC.presence_of_element_located((By.XPATH, "//input[@placeholder='请输入手机号']")), 10
                 )
-                username_input.clear()
-                username_input.send_keys(self.username)
+                await self.browser.run(self._fill_input, username_input, self.username)
                 await asyncio.sleep(1)
             except TimeoutException:
                 self.logger.error("未找到用户名输入框")
@@ -181,11 +233,10 @@ class DouyinClient(LoggerMixin):
             
             # 输入密码
             try:
-                password_input = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//input[@placeholder='请输入密码']"))
+                password_input = await self.browser.wait_until(
+                    EC.presence_of_element_located((By.XPATH, "//input[@placeholder='请输入密码']")), 10
                 )
-                password_input.clear()
-                password_input.send_keys(self.password)
+                await self.browser.run(self._fill_input, password_input, self.password)
                 await asyncio.sleep(1)
             except TimeoutException:
                 self.logger.error("未找到密码输入框")
@@ -193,10 +244,10 @@ class DouyinClient(LoggerMixin):
             
             # 点击登录
             try:
-                submit_btn = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), '登录') and contains(@class, 'btn')]"))
+                submit_btn = await self.browser.wait_until(
+                    EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), '登录') and contains(@class, 'btn')]")), 10
                 )
-                submit_btn.click()
+                await self.browser.run(submit_btn.click)
                 await asyncio.sleep(3)
             except TimeoutException:
                 self.logger.error("未找到登录提交按钮")
@@ -222,12 +273,12 @@ class DouyinClient(LoggerMixin):
         """检查登录状态"""
         try:
             # 检查页面中是否有用户头像或用户名等登录标识
-            user_elements = self.driver.find_elements(By.XPATH, "//img[contains(@class, 'avatar')]")
+            user_elements = await self.browser.find_elements(By.XPATH, "//img[contains(@class, 'avatar')]")
             if user_elements:
                 return True
             
             # 检查是否有登录按钮（如果有说明未登录）
-            login_elements = self.driver.find_elements(By.XPATH, "//div[contains(text(), '登录')]")
+            login_elements = await self.browser.find_elements(By.XPATH, "//div[contains(text(), '登录')]")
             return len(login_elements) == 0
             
         except Exception as e:
@@ -259,7 +310,8 @@ class DouyinClient(LoggerMixin):
             self.logger.info(f"连接到直播间: {room_url}")
             
             # 访问直播间
-            self.driver.get(room_url)
+            self.deduplicator.clear()
+            await self.browser.get(room_url)
             await asyncio.sleep(5)
             
             # 获取直播间信息
@@ -282,21 +334,11 @@ class DouyinClient(LoggerMixin):
     async def _get_room_info(self) -> Optional[LiveRoomInfo]:
         """获取直播间信息"""
         try:
-            # 获取直播间标题
-            title_element = self.driver.find_element(By.XPATH, "//h1[@data-e2e='live-title']")
-            title = title_element.text if title_element else "未知直播间"
-            
-            # 获取主播昵称
-            owner_element = self.driver.find_element(By.XPATH, "//span[@data-e2e='live-anchor-name']")
-            owner_nickname = owner_element.text if owner_element else "未知主播"
-            
-            # 获取观看人数
-            viewer_element = self.driver.find_element(By.XPATH, "//span[contains(@class, 'viewer-count')]")
-            viewer_count = 0
-            if viewer_element:
-                viewer_text = viewer_element.text
-                # 解析观看人数（可能包含"万"等单位）
-                viewer_count = self._parse_count(viewer_text)
+            # 标题、主播昵称、观看人数在驱动线程中一次读取
+            title, owner_nickname, viewer_text = await self.browser.run(self._read_room_header)
+            
+            # 解析观看人数（可能包含"万"等单位）
+            viewer_count = self._parse_count(viewer_text) if viewer_text else 0
             
             room_info = LiveRoomInfo(
                 room_id=self.room_id or "unknown",
@@ -313,6 +355,23 @@ class DouyinClient(LoggerMixin):
             self.logger.warning(f"获取直播间信息时出错: {e}")
             return None
     
+    def _read_room_header(self) -> tuple:
+        """读取直播间标题、主播昵称和观看人数文本（在驱动线程中执行）"""
+        title_element = self.driver.find_element(By.XPATH, "//h1[@data-e2e='live-title']")
+        owner_element = self.driver.find_element(By.XPATH, "//span[@data-e2e='live-anchor-name']")
+        viewer_element = self.driver.find_element(By.XPATH, "//span[contains(@class, 'viewer-count')]")
+        return (
+            title_element.text if title_element else "未知直播间",
+            owner_element.text if owner_element else "未知主播",
+            viewer_element.text if viewer_element else ""
+        )
+    
+    @staticmethod
+    def _fill_input(element, value: str):
+        """清空输入框并输入内容（在驱动线程中执行）"""
+        element.clear()
+        element.send_keys(value)
+    
     def _parse_count(self, count_text: str) -> int:
         """解析数量文本（如"1.2万"）"""
         try:
@@ -327,16 +386,29 @@ class DouyinClient(LoggerMixin):
         except:
             return 0
     
-    def add_message_callback(self, message_type: MessageType, callback: Callable):
+    def add_message_callback(self, message_type: MessageType, callback: Callable, **options):
         """
         添加消息回调函数
         
+        回调在事件总线的独立队列中执行，处理慢不会阻塞消息采集。点赞消息默认
+        使用 coalesce 策略，积压时把多条点赞合并为一条（数量相加）。
+        
         Args:
             message_type: 消息类型
             callback: 回调函数
+            **options: 订阅参数（maxsize、concurrency、policy、coalesce_key、merge），
+                见 EventBus.subscribe()
         """
         if message_type in self.message_callbacks:
+            if message_type == MessageType.LIKE and 'policy' not in options:
+                options.update(policy=BackpressurePolicy.COALESCE, merge=self._merge_likes)
+            
             self.message_callbacks[message_type].append(callback)
+            self._subscriptions[(message_type, callback)] = self.event_bus.subscribe(
+                callback, topics=[self.topic(message_type)],
+                name=f"{message_type.value}:{getattr(callback, '__qualname__', repr(callback))}",
+                **options
+            )
             self.logger.info(f"添加 {message_type.value} 消息回调函数")
     
     def remove_message_callback(self, message_type: MessageType, callback: Callable):
@@ -350,21 +422,27 @@ class DouyinClient(LoggerMixin):
         if message_type in self.message_callbacks:
             try:
                 self.message_callbacks[message_type].remove(callback)
+                subscription = self._subscriptions.pop((message_type, callback), None)
+                if subscription:
+                    self.event_bus.unsubscribe(subscription)
                 self.logger.info(f"移除 {message_type.value} 消息回调函数")
             except ValueError:
                 pass
     
+    def topic(self, message_type: MessageType) -> Any:
+        """消息类型在事件总线上的主题"""
+        return message_type if self.room_key is None else (self.room_key, message_type)
+    
     async def _trigger_callbacks(self, message_type: MessageType, message: Any):
-        """触发回调函数"""
-        callbacks = self.message_callbacks.get(message_type, [])
-        for callback in callbacks:
-            try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(message)
-                else:
-                    callback(message)
-            except Exception as e:
-                self.logger.error(f"回调函数执行出错: {e}")
+        """触发回调函数（投递到事件总线，不等待回调执行）"""
+        await self.event_bus.publish(self.topic(message_type), message)
+    
+    @staticmethod
+    def _merge_likes(queued: LikeMessage, latest: LikeMessage) -> LikeMessage:
+        """合并积压的点赞消息（返回新对象，同一条消息会投递给多个订阅者）"""
+        if isinstance(latest, CompactLikeMessage):
+            return latest._replace(count=latest.count + queued.count)
+        return dataclasses.replace(latest, count=latest.count + queued.count)
     
     def get_connection_status(self) -> ConnectionStatus:
         """获取连接状态"""
@@ -387,59 +465,240 @@ class DouyinClient(LoggerMixin):
 
     async def _message_listener_loop(self):
         """消息监听循环"""
+        push = self.capture_mode == 'push' and await self._install_capture()
+        if self.capture_mode == 'push' and not push:
+            self.logger.warning("推送式采集安装失败，退回轮询模式")
+
         while self.is_connected:
             try:
-                # 监听弹幕消息
-                await self._listen_chat_messages()
+                if push:
+                    # 一次往返取回弹幕、礼物和点赞数
+                    if not await self._drain_capture():
+                        # 页面刷新后采集器丢失，重新注入
+                        self.capture_stats['reinstalls'] += 1
+                        push = await self._install_capture()
+                        if not push:
+                            self.logger.warning("推送式采集失效，退回轮询模式")
+                else:
+                    # 监听弹幕消息
+                    await self._listen_chat_messages()
 
-                # 监听礼物消息
-                await self._listen_gift_messages()
+                    # 监听礼物消息
+                    await self._listen_gift_messages()
 
-                # 监听点赞消息
-                await self._listen_like_messages()
+                    # 监听点赞消息
+                    await self._listen_like_messages()
 
                 # 更新心跳
                 self.connection_status.last_heartbeat = datetime.now()
+                self.capture_stats['ticks'] += 1
 
                 # 短暂休眠避免过度占用CPU
-                await asyncio.sleep(0.5)
+                await asyncio.sleep(self.capture_interval if push else self.poll_interval)
 
             except Exception as e:
                 self.logger.error(f"消息监听出错: {e}")
                 await asyncio.sleep(1)
 
+    async def _install_capture(self) -> bool:
+        """
+        向直播间页面注入 MutationObserver 采集器
+
+        Returns:
+            bool: 是否安装成功
+        """
+        try:
+            self.capture_stats['round_trips'] += 1
+            installed = await self.browser.execute_script(
+                CAPTURE_INSTALL_SCRIPT, self.capture_buffer_size, CHAT_ITEM_CLASS, GIFT_ITEM_CLASS
+            )
+            if installed:
+                self._capture_epoch += 1
+                self.logger.info("推送式消息采集已启动")
+            return bool(installed)
+        except Exception as e:
+            self.logger.warning(f"注入消息采集脚本失败: {e}")
+            return False
+
+    async def _drain_capture(self) -> bool:
+        """
+        取回页面中缓冲的新消息并触发回调
+
+        Returns:
+            bool: 采集器是否仍然有效
+        """
+        self.capture_stats['round_trips'] += 1
+        result = await self.browser.execute_script(CAPTURE_DRAIN_SCRIPT, LIKE_COUNT_CLASS)
+        if result is None:
+            return False
+
+        await self._process_capture_batch(result)
+        return True
+
+    async def _process_capture_batch(self, result: Dict[str, Any]):
+        """
+        把采集脚本返回的一批数据转换为消息对象并触发回调
+
+        Args:
+            result: 采集脚本的返回值（items、dropped、likes）
+        """
+        items = result.get('items') or []
+        dropped = result.get('dropped') or 0
+        self.capture_stats['captured'] += len(items)
+        if dropped:
+            self.capture_stats['dropped'] += dropped
+            self.logger.warning(f"页面采集缓冲已满，丢弃 {dropped} 条消息")
+
+        now_ms = time.time() * 1000
+        for item in items:
+            try:
+                timestamp_ms = item.get('ts') or now_ms
+                latency = max(0.0, now_ms - timestamp_ms)
+                self.capture_stats['last_latency_ms'] = latency
+                self.capture_stats['max_latency_ms'] = max(self.capture_stats['max_latency_ms'], latency)
+
+                username = item.get('user') or "匿名用户"
+                kind = item.get('kind')
+                content = item.get('content', '') if kind == 'chat' else f"{item.get('gift')}x{item.get('count')}"
+                if self.deduplicator.is_duplicate(kind, username, content,
+                                                  node_id=(self._capture_epoch, item.get('seq'))):
+                    continue
+
+                if kind == 'chat':
+                    message = self._make_chat_message(
+                        f"chat_{int(timestamp_ms)}_{item.get('seq')}", username,
+                        item.get('content', ''), timestamp_ms / 1000
+                    )
+                    await self._trigger_callbacks(MessageType.CHAT, message)
+
+                elif kind == 'gift':
+                    message = self._make_gift_message(
+                        f"gift_{int(timestamp_ms)}_{item.get('seq')}", username,
+                        item.get('gift') or "未知礼物", self._parse_gift_count(item.get('count')),
+                        timestamp_ms / 1000
+                    )
+                    await self._trigger_callbacks(MessageType.GIFT, message)
+
+            except Exception as e:
+                self.logger.debug(f"处理采集消息时出错: {e}")
+
+        if result.get('likes'):
+            await self._update_like_count(self._parse_count(result['likes']))
+
+    def _make_chat_message(self, message_id: str, username: str, content: str, timestamp: float):
+        """
+        创建弹幕消息（按配置创建紧凑或完整模型）
+
+        Args:
+            message_id: 消息ID
+            username: 用户昵称
+            content: 弹幕内容
+            timestamp: Unix 时间戳（秒）
+
+        Returns:
+            ChatMessage 或 CompactChatMessage
+        """
+        user_id = f"douyin_{hash(username)}"
+        if self.compact_messages:
+            return CompactChatMessage(message_id, user_id, username, content, timestamp)
+        return ChatMessage(
+            message_id=message_id,
+            user=User(user_id=user_id, nickname=username),
+            content=content,
+            timestamp=datetime.fromtimestamp(timestamp)
+        )
+
+    def _make_gift_message(self, message_id: str, username: str, gift_name: str, count: int,
+                           timestamp: float):
+        """
+        创建礼物消息（按配置创建紧凑或完整模型）
+
+        Args:
+            message_id: 消息ID
+            username: 用户昵称
+            gift_name: 礼物名
+            count: 数量
+            timestamp: Unix 时间戳（秒）
+
+        Returns:
+            GiftMessage 或 CompactGiftMessage
+        """
+        user_id = f"douyin_{hash(username)}"
+        price = 1.0  # 默认价值，实际应该从配置或API获取
+        if self.compact_messages:
+            return CompactGiftMessage(message_id, user_id, username, gift_name, timestamp,
+                                      count=count, total_value=price * count)
+        return GiftMessage(
+            message_id=message_id,
+            user=User(user_id=user_id, nickname=username),
+            gift=Gift(gift_id=f"gift_{hash(gift_name)}", name=gift_name, price=price),
+            count=count,
+            timestamp=datetime.fromtimestamp(timestamp)
+        )
+
+    def _parse_gift_count(self, count_text: Optional[str]) -> int:
+        """解析礼物数量文本（如"x3"），缺省为 1"""
+        digits = re.sub(r'[^\d]', '', count_text or '')
+        return max(1, int(digits)) if digits else 1
+
+    def get_capture_stats(self) -> Dict[str, Any]:
+        """获取消息采集统计信息"""
+        return {
+            'mode': self.capture_mode,
+            **self.capture_stats,
+            'dedup': self.deduplicator.get_stats(),
+            'webdriver': self.browser.get_stats()
+        }
+
+    @staticmethod
+    def _read_element_texts(element, parts: tuple, defaults: tuple) -> tuple:
+        """
+        读取消息节点内各部分的文本（在驱动线程中执行，一次线程切换完成多次往返）
+
+        Args:
+            element: 消息节点
+            parts: 子节点 class 片段
+            defaults: 子节点不存在时的默认值
+
+        Returns:
+            tuple: 各部分的文本
+        """
+        texts = []
+        for part, default in zip(parts, defaults):
+            child = element.find_element(By.XPATH, f".//span[contains(@class, '{part}')]")
+            texts.append(child.text if child else default)
+        return tuple(texts)
+
+    def _read_like_text(self) -> Optional[str]:
+        """读取点赞数文本（在驱动线程中执行）"""
+        like_elem = self.driver.find_element(By.XPATH, "//span[contains(@class, 'like-count')]")
+        return like_elem.text if like_elem else None
+
     async def _listen_chat_messages(self):
         """监听弹幕消息"""
         try:
             # 查找新的弹幕元素
-            chat_elements = self.driver.find_elements(
+            chat_elements = await self.browser.find_elements(
                 By.XPATH, "//div[contains(@class, 'webcast-chatroom___item')]"
             )
 
-            # 处理新消息（这里需要实现去重逻辑）
             for element in chat_elements[-5:]:  # 只处理最新的5条消息
                 try:
-                    # 提取用户信息
-                    username_elem = element.find_element(By.XPATH, ".//span[contains(@class, 'username')]")
-                    username = username_elem.text if username_elem else "匿名用户"
-
-                    # 提取消息内容
-                    content_elem = element.find_element(By.XPATH, ".//span[contains(@class, 'content')]")
-                    content = content_elem.text if content_elem else ""
-
-                    if content:  # 只处理有内容的消息
-                        # 创建用户对象
-                        user = User(
-                            user_id=f"douyin_{hash(username)}",
-                            nickname=username
-                        )
+                    # 已处理过的节点不再读取文本（每次读取都是一次 WebDriver 往返）
+                    node_id = ('chat', element.id)
+                    if self.deduplicator.seen_node(node_id):
+                        continue
+
+                    # 提取用户信息和消息内容
+                    username, content = await self.browser.run(
+                        self._read_element_texts, element, ('username', 'content'), ("匿名用户", "")
+                    )
 
+                    if content and not self.deduplicator.is_duplicate('chat', username, content, node_id):
                         # 创建消息对象
-                        message = ChatMessage(
-                            message_id=f"chat_{int(time.time() * 1000)}_{hash(content)}",
-                            user=user,
-                            content=content,
-                            timestamp=datetime.now()
+                        now = time.time()
+                        message = self._make_chat_message(
+                            f"chat_{int(now * 1000)}_{hash(content)}", username, content, now
                         )
 
                         # 触发回调
@@ -456,38 +715,28 @@ class DouyinClient(LoggerMixin):
         """监听礼物消息"""
         try:
             # 查找礼物消息元素
-            gift_elements = self.driver.find_elements(
+            gift_elements = await self.browser.find_elements(
                 By.XPATH, "//div[contains(@class, 'gift-message')]"
             )
 
             for element in gift_elements[-3:]:  # 只处理最新的3条礼物消息
                 try:
-                    # 提取礼物信息（这里需要根据实际页面结构调整）
-                    username_elem = element.find_element(By.XPATH, ".//span[contains(@class, 'username')]")
-                    username = username_elem.text if username_elem else "匿名用户"
+                    node_id = ('gift', element.id)
+                    if self.deduplicator.seen_node(node_id):
+                        continue
 
-                    gift_name_elem = element.find_element(By.XPATH, ".//span[contains(@class, 'gift-name')]")
-                    gift_name = gift_name_elem.text if gift_name_elem else "未知礼物"
-
-                    # 创建用户和礼物对象
-                    user = User(
-                        user_id=f"douyin_{hash(username)}",
-                        nickname=username
+                    # 提取礼物信息（这里需要根据实际页面结构调整）
+                    username, gift_name = await self.browser.run(
+                        self._read_element_texts, element, ('username', 'gift-name'), ("匿名用户", "未知礼物")
                     )
 
-                    gift = Gift(
-                        gift_id=f"gift_{hash(gift_name)}",
-                        name=gift_name,
-                        price=1.0  # 默认价值，实际应该从配置或API获取
-                    )
+                    if self.deduplicator.is_duplicate('gift', username, gift_name, node_id):
+                        continue
 
                     # 创建礼物消息对象
-                    message = GiftMessage(
-                        message_id=f"gift_{int(time.time() * 1000)}_{hash(gift_name)}",
-                        user=user,
-                        gift=gift,
-                        count=1,
-                        timestamp=datetime.now()
+                    now = time.time()
+                    message = self._make_gift_message(
+                        f"gift_{int(now * 1000)}_{hash(gift_name)}", username, gift_name, 1, now
                     )
 
                     # 触发回调
@@ -504,30 +753,33 @@ class DouyinClient(LoggerMixin):
         """监听点赞消息"""
         try:
             # 获取当前点赞数
-            like_elem = self.driver.find_element(By.XPATH, "//span[contains(@class, 'like-count')]")
-            if like_elem:
-                current_likes = self._parse_count(like_elem.text)
-
-                # 检查点赞数是否增加（简单实现）
-                if hasattr(self, '_last_like_count'):
-                    if current_likes > self._last_like_count:
-                        # 创建点赞消息
-                        user = User(
-                            user_id="system",
-                            nickname="系统"
-                        )
+            like_text = await self.browser.run(self._read_like_text)
+            if like_text:
+                await self._update_like_count(self._parse_count(like_text))
 
-                        message = LikeMessage(
-                            message_id=f"like_{int(time.time() * 1000)}",
-                            user=user,
-                            count=current_likes - self._last_like_count,
-                            timestamp=datetime.now()
-                        )
+        except Exception as e:
+            self.logger.debug(f"监听点赞消息时出错: {e}")
 
-                        # 触发回调
-                        await self._trigger_callbacks(MessageType.LIKE, message)
+    async def _update_like_count(self, current_likes: int):
+        """根据最新点赞数生成点赞消息"""
+        # 检查点赞数是否增加（简单实现）
+        if hasattr(self, '_last_like_count'):
+            if current_likes > self._last_like_count:
+                # 创建点赞消息
+                now = time.time()
+                message_id = f"like_{int(now * 1000)}"
+                count = current_likes - self._last_like_count
+                if self.compact_messages:
+                    message = CompactLikeMessage(message_id, "system", "系统", now, count)
+                else:
+                    message = LikeMessage(
+                        message_id=message_id,
+                        user=User(user_id="system", nickname="系统"),
+                        count=count,
+                        timestamp=datetime.fromtimestamp(now)
+                    )
 
-                self._last_like_count = current_likes
+                # 触发回调
+                await self._trigger_callbacks(MessageType.LIKE, message)
 
-        except Exception as e:
-            self.logger.debug(f"监听点赞消息时出错: {e}")
+        self._last_like_count = current_likes
@@ -0,0 +1,264 @@
+"""
+本地模拟直播间
+
+提供与抖音直播间页面结构一致的本地页面：_get_room_info 读取的标题、主播昵称、
+观看人数，_listen_* 和推送式采集读取的弹幕、礼物节点和点赞数。页面内的脚本按
+配置的速率生成消息，弹幕列表只保留最近的若干个节点（与真实直播间一样会滚动
+移除旧节点），也可以按一定比例重新渲染已有消息，用来衡量去重效果。
+
+每条弹幕的内容带有序号和生成时间（"弹幕 #序号 @毫秒时间戳"），页面在
+window.__mockRoom 中记录已生成的消息数，基准测试据此计算采集率、丢失率、
+重复率和采集延迟。
+"""
+
+import html
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from ..utils.logger import LoggerMixin
+from .dom_capture import CHAT_ITEM_CLASS, GIFT_ITEM_CLASS, LIKE_COUNT_CLASS
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body { font-family: sans-serif; margin: 0; display: flex; }
+#chat, #gifts { height: 100vh; overflow: hidden; flex: 1; }
+</style>
+</head>
+<body>
+<header>
+  <h1 data-e2e="live-title">__TITLE__</h1>
+  <span data-e2e="live-anchor-name">__ANCHOR__</span>
+  <span class="viewer-count">__VIEWERS__</span>
+  <span class="__LIKE_CLASS__">0</span>
+</header>
+<div id="chat"></div>
+<div id="gifts"></div>
+<script>
+(function () {
+  var opts = __OPTIONS__;
+  var gifts = ['小心心', '玫瑰', '棒棒糖', '爱心', '跑车', '火箭'];
+  var state = window.__mockRoom = {chat: 0, gift: 0, likes: 0, rerendered: 0, startedAt: Date.now()};
+  var chat = document.getElementById('chat');
+  var giftList = document.getElementById('gifts');
+  var likeNode = document.querySelector('.' + opts.likeClass);
+  var carry = {chat: 0, gift: 0, like: 0, rerender: 0};
+
+  function span(cls, text) {
+    var node = document.createElement('span');
+    node.className = cls;
+    node.textContent = text;
+    return node;
+  }
+
+  function append(list, node) {
+    list.appendChild(node);
+    while (list.childNodes.length > opts.maxNodes) { list.removeChild(list.firstChild); }
+  }
+
+  function chatNode(user, content) {
+    var item = document.createElement('div');
+    item.className = opts.chatClass + ' chat-item';
+    item.appendChild(span('username', user));
+    item.appendChild(span('content', content));
+    return item;
+  }
+
+  function emitChat() {
+    var seq = ++state.chat;
+    append(chat, chatNode('观众' + (seq % opts.users), '弹幕 #' + seq + ' @' + Date.now()));
+  }
+
+  function rerenderChat() {
+    // 同一条消息换成新的节点（页面重新渲染）
+    var items = chat.childNodes;
+    if (!items.length) { return; }
+    var old = items[Math.floor(Math.random() * items.length)];
+    var user = old.querySelector('.username').textContent;
+    var content = old.querySelector('.content').textContent;
+    chat.replaceChild(chatNode(user, content), old);
+    state.rerendered++;
+  }
+
+  function emitGift() {
+    var seq = ++state.gift;
+    var item = document.createElement('div');
+    item.className = opts.giftClass;
+    item.appendChild(span('username', '观众' + (seq % opts.users)));
+    item.appendChild(span('gift-name', gifts[seq % gifts.length]));
+    item.appendChild(span('gift-count', 'x' + (1 + seq % 3)));
+    append(giftList, item);
+  }
+
+  function due(kind, rate, dt) {
+    carry[kind] += rate * dt;
+    var n = Math.floor(carry[kind]);
+    carry[kind] -= n;
+    return n;
+  }
+
+  var last = performance.now();
+  setInterval(function () {
+    var now = performance.now();
+    var dt = (now - last) / 1000;
+    last = now;
+    var i, n;
+    for (i = 0, n = due('chat', opts.chatRate, dt); i < n; i++) { emitChat(); }
+    for (i = 0, n = due('gift', opts.giftRate, dt); i < n; i++) { emitGift(); }
+    for (i = 0, n = due('rerender', opts.chatRate * opts.rerender, dt); i < n; i++) { rerenderChat(); }
+    n = due('like', opts.likeRate, dt);
+    if (n) {
+      state.likes += n;
+      likeNode.textContent = String(state.likes);
+    }
+  }, opts.tick);
+})();
+</script>
+</body>
+</html>
+"""
+
+
+class MockLiveRoomServer(LoggerMixin):
+    """本地模拟直播间 HTTP 服务"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, chat_rate: float = 20.0,
+                 gift_rate: float = 2.0, like_rate: float = 5.0, rerender: float = 0.0,
+                 max_nodes: int = 200, users: int = 500, tick_ms: int = 50):
+        """
+        初始化模拟直播间
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0 表示自动分配
+            chat_rate: 每秒弹幕数
+            gift_rate: 每秒礼物数
+            like_rate: 每秒点赞数
+            rerender: 每条弹幕被重新渲染（产生重复节点）的平均次数
+            max_nodes: 弹幕、礼物列表保留的最多节点数
+            users: 模拟观众数
+            tick_ms: 页面生成消息的间隔（毫秒）
+        """
+        self.host = host
+        self.port = port
+        self.defaults = {
+            'chat': chat_rate, 'gift': gift_rate, 'like': like_rate, 'rerender': rerender,
+            'max_nodes': max_nodes, 'users': users, 'tick': tick_ms
+        }
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        """服务地址"""
+        return f"http://{self.host}:{self.port}"
+
+    def room_url(self, room_id: str = 'mock', **params) -> str:
+        """
+        直播间页面地址
+
+        Args:
+            room_id: 直播间ID（显示在标题中）
+            **params: 覆盖默认参数（chat、gift、like、rerender、max_nodes、users、tick）
+
+        Returns:
+            str: 页面地址
+        """
+        query = f"?{urlencode(params)}" if params else ''
+        return f"{self.base_url}/{room_id}{query}"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        if self._server is not None:
+            return
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                url = urlparse(self.path)
+                room_id = url.path.strip('/') or 'mock'
+                if room_id == 'favicon.ico':
+                    self.send_error(404)
+                    return
+                body = server.render_page(room_id, {k: v[-1] for k, v in parse_qs(url.query).items()})
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-live-room', daemon=True)
+        self._thread.start()
+        self.logger.info(f"模拟直播间已启动: {self.base_url}")
+
+    def stop(self):
+        """停止服务"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+        self.logger.info("模拟直播间已停止")
+
+    def render_page(self, room_id: str, params: Dict[str, Any] = None) -> str:
+        """
+        生成直播间页面
+
+        Args:
+            room_id: 直播间ID
+            params: 覆盖默认参数
+
+        Returns:
+            str: HTML
+        """
+        values = dict(self.defaults)
+        for key, value in (params or {}).items():
+            if key in values:
+                values[key] = float(value)
+
+        options = {
+            'chatRate': values['chat'],
+            'giftRate': values['gift'],
+            'likeRate': values['like'],
+            'rerender': values['rerender'],
+            'maxNodes': int(values['max_nodes']),
+            'users': max(1, int(values['users'])),
+            'tick': max(1, int(values['tick'])),
+            'chatClass': CHAT_ITEM_CLASS,
+            'giftClass': GIFT_ITEM_CLASS,
+            'likeClass': LIKE_COUNT_CLASS
+        }
+        replacements = {
+            '__TITLE__': html.escape(f"模拟直播间 {room_id}"),
+            '__ANCHOR__': html.escape(f"主播{room_id}"),
+            '__VIEWERS__': '1.2万',
+            '__LIKE_CLASS__': LIKE_COUNT_CLASS,
+            '__OPTIONS__': json.dumps(options)
+        }
+        page = PAGE_TEMPLATE
+        for placeholder, value in replacements.items():
+            page = page.replace(placeholder, value)
+        return page
+
+    def __enter__(self) -> 'MockLiveRoomServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
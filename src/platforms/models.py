@@ -3,10 +3,12 @@
 """
 
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, NamedTuple
 from datetime import datetime
 from enum import Enum
 
+from ..utils.codec import register_model
+
 
 class MessageType(Enum):
     """消息类型枚举"""
@@ -210,3 +212,134 @@ class ConnectionStatus:
             'reconnect_count': self.reconnect_count,
             'error_message': self.error_message
         }
+
+
+class CompactChatMessage(NamedTuple):
+    """弹幕消息（紧凑）"""
+    message_id: str
+    user_id: str
+    nickname: str
+    content: str
+    timestamp: float
+    platform: str = "douyin"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（与 ChatMessage.to_dict() 结构相同）"""
+        return {
+            'message_id': self.message_id,
+            'user': {'user_id': self.user_id, 'nickname': self.nickname},
+            'content': self.content,
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'platform': self.platform
+        }
+
+    def to_message(self) -> ChatMessage:
+        """展开为完整模型"""
+        return ChatMessage(
+            message_id=self.message_id,
+            user=User(user_id=self.user_id, nickname=self.nickname),
+            content=self.content,
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            platform=self.platform
+        )
+
+    @classmethod
+    def from_message(cls, message: ChatMessage) -> 'CompactChatMessage':
+        """从完整模型创建"""
+        return cls(message.message_id, message.user.user_id, message.user.nickname,
+                   message.content, message.timestamp.timestamp(), message.platform)
+
+
+class CompactGiftMessage(NamedTuple):
+    """礼物消息（紧凑）"""
+    message_id: str
+    user_id: str
+    nickname: str
+    gift_name: str
+    timestamp: float
+    count: int = 1
+    combo_count: int = 1
+    total_value: float = 0.0
+    vip_level: int = 0
+    platform: str = "douyin"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（与 GiftMessage.to_dict() 的主要字段相同）"""
+        return {
+            'message_id': self.message_id,
+            'user': {'user_id': self.user_id, 'nickname': self.nickname, 'vip_level': self.vip_level},
+            'gift': {'name': self.gift_name},
+            'count': self.count,
+            'combo_count': self.combo_count,
+            'total_value': self.total_value,
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'platform': self.platform
+        }
+
+    def to_message(self) -> GiftMessage:
+        """展开为完整模型"""
+        price = self.total_value / self.count if self.count else 0.0
+        return GiftMessage(
+            message_id=self.message_id,
+            user=User(user_id=self.user_id, nickname=self.nickname, vip_level=self.vip_level),
+            gift=Gift(gift_id=f"gift_{hash(self.gift_name)}", name=self.gift_name, price=price),
+            count=self.count,
+            combo_count=self.combo_count,
+            total_value=self.total_value,
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            platform=self.platform
+        )
+
+    @classmethod
+    def from_message(cls, message: GiftMessage) -> 'CompactGiftMessage':
+        """从完整模型创建"""
+        return cls(message.message_id, message.user.user_id, message.user.nickname, message.gift.name,
+                   message.timestamp.timestamp(), message.count, message.combo_count,
+                   message.total_value, message.user.vip_level, message.platform)
+
+
+class CompactLikeMessage(NamedTuple):
+    """点赞消息（紧凑）"""
+    message_id: str
+    user_id: str
+    nickname: str
+    timestamp: float
+    count: int = 1
+    platform: str = "douyin"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（与 LikeMessage.to_dict() 结构相同）"""
+        return {
+            'message_id': self.message_id,
+            'user': {'user_id': self.user_id, 'nickname': self.nickname},
+            'count': self.count,
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'platform': self.platform
+        }
+
+    def to_message(self) -> LikeMessage:
+        """展开为完整模型"""
+        return LikeMessage(
+            message_id=self.message_id,
+            user=User(user_id=self.user_id, nickname=self.nickname),
+            count=self.count,
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            platform=self.platform
+        )
+
+    @classmethod
+    def from_message(cls, message: LikeMessage) -> 'CompactLikeMessage':
+        """从完整模型创建"""
+        return cls(message.message_id, message.user.user_id, message.user.nickname,
+                   message.timestamp.timestamp(), message.count, message.platform)
+
+
+# 注册到序列化编解码（类型标签写入编码结果，不要修改）
+register_model('chat', ChatMessage)
+register_model('gift', GiftMessage)
+register_model('like', LikeMessage)
+register_model('follow', FollowMessage)
+register_model('room', LiveRoomInfo)
+register_model('chat_compact', CompactChatMessage)
+register_model('gift_compact', CompactGiftMessage)
+register_model('like_compact', CompactLikeMessage)
@@ -0,0 +1,406 @@
+"""
+消息录制与回放
+
+MessageRecorder 把客户端产生的消息（ChatMessage、GiftMessage、LikeMessage 及其
+紧凑模型）追加写入录制文件；MessageReplayer 读取录制文件，按原始时间间隔
+（1 倍速、N 倍速或不等待）经 DouyinClient._trigger_callbacks 重新投递，
+不需要登录和直播间即可对消息管线做压测。合成生成器可以直接产生弹幕刷屏、
+礼物刷屏的消息流。
+
+文件格式（只追加）：
+
+    文件头: b'ASMRREC' + 版本字节 + 编解码名长度字节 + 编解码名
+    记录:   4 字节大端长度 + codec.pack([到达时间(Unix 秒), encode_model(消息)])
+
+进程中途退出时最后一条记录可能不完整：读取时忽略，再次打开追加前截掉。
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple, Callable, Union
+
+from ..utils.codec import Codec, get_codec, encode_model, decode_model
+from ..utils.logger import LoggerMixin
+from .models import (
+    User, Gift, ChatMessage, GiftMessage, LikeMessage, MessageType,
+    CompactChatMessage, CompactGiftMessage, CompactLikeMessage
+)
+
+MAGIC = b'ASMRREC'
+FORMAT_VERSION = 1
+_LENGTH = struct.Struct('>I')
+
+# 模型类型对应的消息类型
+MESSAGE_TYPES = {
+    ChatMessage: MessageType.CHAT,
+    GiftMessage: MessageType.GIFT,
+    LikeMessage: MessageType.LIKE,
+    CompactChatMessage: MessageType.CHAT,
+    CompactGiftMessage: MessageType.GIFT,
+    CompactLikeMessage: MessageType.LIKE,
+}
+
+
+class MessageRecorder(LoggerMixin):
+    """消息录制器（追加写入）"""
+
+    def __init__(self, path: Union[str, Path], codec: Union[str, Codec] = 'json'):
+        """
+        初始化录制器
+
+        Args:
+            path: 录制文件路径，已存在时追加（编解码格式以文件头为准）
+            codec: 新文件使用的编解码格式或编解码器
+        """
+        self.path = Path(path)
+        self.codec = get_codec(codec) if isinstance(codec, str) else codec
+        self._file = None
+        self._subscriptions: List[Tuple[Any, MessageType, Callable]] = []
+        self._stats = {'records': 0, 'bytes': 0}
+
+    def open(self):
+        """打开录制文件（新文件写入文件头）"""
+        if self._file is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, 'r+b') as f:
+                self.codec = get_codec(_read_header(f))
+                end = _last_record_end(f)
+                if end < self.path.stat().st_size:
+                    # 上次录制中途退出留下的不完整记录，否则其长度前缀会吞掉新追加的记录
+                    self.logger.warning(f"截掉录制文件末尾不完整的记录: {self.path}")
+                    f.truncate(end)
+            self._file = open(self.path, 'ab')
+        else:
+            self._file = open(self.path, 'wb')
+            name = self.codec.name.encode('ascii')
+            self._file.write(MAGIC + bytes([FORMAT_VERSION, len(name)]) + name)
+
+    def record(self, message: Any, timestamp: float = None):
+        """
+        追加一条消息（可直接作为消息回调）
+
+        Args:
+            message: 消息模型
+            timestamp: 到达时间（Unix 秒），默认为当前时间
+        """
+        if self._file is None:
+            self.open()
+        payload = self.codec.pack([time.time() if timestamp is None else timestamp, encode_model(message)])
+        self._file.write(_LENGTH.pack(len(payload)) + payload)
+        self._stats['records'] += 1
+        self._stats['bytes'] += _LENGTH.size + len(payload)
+
+    def attach(self, client, message_types: Iterable[MessageType] = (
+            MessageType.CHAT, MessageType.GIFT, MessageType.LIKE)):
+        """
+        录制客户端的消息（注册为消息回调）
+
+        Args:
+            client: DouyinClient
+            message_types: 要录制的消息类型
+        """
+        self.open()
+        for message_type in message_types:
+            client.add_message_callback(message_type, self.record)
+            self._subscriptions.append((client, message_type, self.record))
+
+    def flush(self):
+        """把缓冲的数据写入文件"""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """停止录制并关闭文件"""
+        for client, message_type, callback in self._subscriptions:
+            client.remove_message_callback(message_type, callback)
+        self._subscriptions.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.logger.info(f"录制完成: {self.path}（{self._stats['records']} 条消息）")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取录制统计信息"""
+        return dict(self._stats)
+
+    def __enter__(self) -> 'MessageRecorder':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _read_header(f) -> str:
+    """读取文件头，返回编解码名"""
+    header = f.read(len(MAGIC) + 2)
+    if len(header) < len(MAGIC) + 2 or not header.startswith(MAGIC):
+        raise ValueError("不是消息录制文件")
+    version, name_length = header[len(MAGIC)], header[len(MAGIC) + 1]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"不支持的录制文件版本: {version}")
+    return f.read(name_length).decode('ascii')
+
+
+def _last_record_end(f) -> int:
+    """从文件头之后逐条跳过记录，返回最后一条完整记录的结束位置"""
+    end = f.tell()
+    size = f.seek(0, 2)
+    f.seek(end)
+    while True:
+        prefix = f.read(_LENGTH.size)
+        if len(prefix) < _LENGTH.size:
+            return end
+        record_end = end + _LENGTH.size + _LENGTH.unpack(prefix)[0]
+        if record_end > size:
+            return end
+        end = f.seek(record_end)
+
+
+class MessageReplayer(LoggerMixin):
+    """消息回放器"""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        初始化回放器
+
+        Args:
+            path: 录制文件路径
+        """
+        self.path = Path(path)
+
+    def read(self) -> Iterator[Tuple[float, Any]]:
+        """
+        顺序读取录制的消息
+
+        Returns:
+            Iterator[Tuple[float, Any]]: (到达时间, 消息)
+        """
+        with open(self.path, 'rb') as f:
+            codec = get_codec(_read_header(f))
+            while True:
+                prefix = f.read(_LENGTH.size)
+                if not prefix:
+                    break
+                length = _LENGTH.unpack(prefix)[0] if len(prefix) == _LENGTH.size else -1
+                payload = f.read(length) if length >= 0 else b''
+                if length < 0 or len(payload) < length:
+                    self.logger.warning(f"录制文件末尾的记录不完整，已忽略: {self.path}")
+                    break
+                try:
+                    timestamp, data = codec.unpack(payload)
+                    message = decode_model(data)
+                except (ValueError, TypeError, IndexError) as e:
+                    self.logger.warning(f"录制文件中的记录无法解码，停止读取: {self.path}（{e}）")
+                    break
+                yield timestamp, message
+
+    async def replay(self, target, speed: Optional[float] = 1.0, limit: int = None,
+                     yield_every: int = 100) -> Dict[str, Any]:
+        """
+        按录制时的时间间隔回放消息
+
+        Args:
+            target: DouyinClient（经 _trigger_callbacks 投递），或 async 函数 (message_type, message)
+            speed: 回放倍速；None 或 0 表示不等待，尽快回放
+            limit: 最多回放的消息数
+            yield_every: 不等待时每回放多少条让出一次事件循环
+
+        Returns:
+            Dict[str, Any]: 回放统计（消息数、耗时、吞吐量、相对计划时间的延迟）
+        """
+        publish = getattr(target, '_trigger_callbacks', target)
+        return await replay_stream(publish, self.read(), speed=speed, limit=limit, yield_every=yield_every)
+
+
+async def replay_stream(publish: Callable, stream: Iterable[Tuple[float, Any]], speed: Optional[float] = 1.0,
+                        limit: int = None, yield_every: int = 100) -> Dict[str, Any]:
+    """
+    回放 (时间, 消息) 流
+
+    Args:
+        publish: async 函数 (message_type, message)
+        stream: 按时间排序的 (Unix 秒, 消息) 序列
+        speed: 回放倍速；None 或 0 表示不等待
+        limit: 最多回放的消息数
+        yield_every: 不等待时每回放多少条让出一次事件循环
+
+    Returns:
+        Dict[str, Any]: 回放统计
+    """
+    loop = asyncio.get_running_loop()
+    counts = {message_type: 0 for message_type in (MessageType.CHAT, MessageType.GIFT, MessageType.LIKE)}
+    lags: List[float] = []
+    start = loop.time()
+    first = None
+    total = 0
+
+    for timestamp, message in itertools.islice(stream, limit):
+        if speed:
+            if first is None:
+                first = timestamp
+            due = start + (timestamp - first) / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lags.append(max(0.0, loop.time() - due))
+        elif total % yield_every == 0:
+            await asyncio.sleep(0)
+
+        message_type = MESSAGE_TYPES[type(message)]
+        await publish(message_type, message)
+        counts[message_type] += 1
+        total += 1
+
+    elapsed = loop.time() - start
+    lags.sort()
+    return {
+        'messages': total,
+        'chat': counts[MessageType.CHAT],
+        'gift': counts[MessageType.GIFT],
+        'like': counts[MessageType.LIKE],
+        'elapsed': elapsed,
+        'throughput': total / elapsed if elapsed > 0 else 0.0,
+        'lag_ms_p95': lags[min(len(lags) - 1, int(len(lags) * 0.95))] * 1000 if lags else 0.0,
+        'lag_ms_max': lags[-1] * 1000 if lags else 0.0
+    }
+
+
+# ---------------------------------------------------------------------------
+# 合成消息流
+# ---------------------------------------------------------------------------
+
+DEFAULT_GIFTS = [('小心心', 1.0), ('玫瑰', 1.0), ('棒棒糖', 9.0), ('爱心', 10.0),
+                 ('跑车', 1200.0), ('火箭', 5000.0)]
+
+CHAT_PHRASES = ['主播晚上好', '好放松', '来了来了', '这个声音好舒服', '求敲击', '晚安', '哈哈哈', '666']
+
+
+def generate_chat_flood(rate: float, duration: float, users: int = 500, start: float = None,
+                        seed: int = 0) -> Iterator[Tuple[float, ChatMessage]]:
+    """
+    生成弹幕刷屏（泊松到达）
+
+    Args:
+        rate: 平均每秒弹幕数
+        duration: 时长（秒）
+        users: 发言用户数
+        start: 起始时间（Unix 秒），默认为当前时间
+        seed: 随机种子
+
+    Returns:
+        Iterator[Tuple[float, ChatMessage]]: (时间, 消息)
+    """
+    rng = random.Random(seed)
+    start = time.time() if start is None else start
+    t = start
+    for seq in itertools.count():
+        t += rng.expovariate(rate)
+        if t >= start + duration:
+            break
+        uid = rng.randrange(users)
+        content = rng.choice(CHAT_PHRASES)
+        if rng.random() < 0.3:
+            content = f"{content} {seq}"  # 部分弹幕内容不重复
+        user = User(user_id=f"sim_{uid}", nickname=f"观众{uid}")
+        yield t, ChatMessage(f"chat_sim_{seq}", user, content, datetime.fromtimestamp(t))
+
+
+def generate_gift_storm(rate: float, duration: float, users: int = 200, start: float = None,
+                        gifts: List[Tuple[str, float]] = None, combo_probability: float = 0.6,
+                        max_combo: int = 30, combo_interval: float = 0.15, vip_ratio: float = 0.1,
+                        seed: int = 0) -> Iterator[Tuple[float, GiftMessage]]:
+    """
+    生成礼物刷屏：每次送礼以一定概率展开为连击（同一用户、同一礼物、递增的 combo_count）
+
+    Args:
+        rate: 平均每秒送礼次数（不含连击的后续消息）
+        duration: 时长（秒）
+        users: 送礼用户数
+        start: 起始时间（Unix 秒），默认为当前时间
+        gifts: (礼物名, 单价) 列表，越靠前越常见
+        combo_probability: 送礼展开为连击的概率
+        max_combo: 连击最大次数
+        combo_interval: 连击消息的平均间隔（秒）
+        vip_ratio: VIP 用户比例
+        seed: 随机种子
+
+    Returns:
+        Iterator[Tuple[float, GiftMessage]]: 按时间排序的 (时间, 消息)
+    """
+    rng = random.Random(seed)
+    gifts = gifts or DEFAULT_GIFTS
+    weights = [1.0 / (index + 1) ** 1.5 for index in range(len(gifts))]
+    start = time.time() if start is None else start
+    pending: List[Tuple[float, int, GiftMessage]] = []
+    seq = itertools.count()
+
+    t = start
+    while True:
+        t += rng.expovariate(rate)
+        if t >= start + duration:
+            break
+        uid = rng.randrange(users)
+        user = User(user_id=f"sim_{uid}", nickname=f"观众{uid}",
+                    vip_level=rng.randint(1, 5) if uid < users * vip_ratio else 0)
+        name, price = rng.choices(gifts, weights)[0]
+        gift = Gift(gift_id=f"gift_{name}", name=name, price=price)
+        combo = rng.randint(2, max_combo) if rng.random() < combo_probability else 1
+
+        hit_time = t
+        for combo_count in range(1, combo + 1):
+            number = next(seq)
+            heapq.heappush(pending, (hit_time, number, GiftMessage(
+                f"gift_sim_{number}", user, gift, count=1, combo_count=combo_count,
+                timestamp=datetime.fromtimestamp(hit_time)
+            )))
+            hit_time += rng.expovariate(1.0 / combo_interval)
+
+        # 输出已经不会再被更早的消息插队的部分
+        while pending and pending[0][0] <= t:
+            hit_time, _, message = heapq.heappop(pending)
+            yield hit_time, message
+
+    while pending:
+        hit_time, _, message = heapq.heappop(pending)
+        if hit_time < start + duration:
+            yield hit_time, message
+
+
+def merge_streams(*streams: Iterable[Tuple[float, Any]]) -> Iterator[Tuple[float, Any]]:
+    """
+    按时间合并多个消息流
+
+    Args:
+        *streams: 各自按时间排序的 (时间, 消息) 序列
+
+    Returns:
+        Iterator[Tuple[float, Any]]: 合并后的序列
+    """
+    return heapq.merge(*streams, key=lambda item: item[0])
+
+
+def write_stream(path: Union[str, Path], stream: Iterable[Tuple[float, Any]], codec: str = 'json') -> int:
+    """
+    把消息流写入录制文件
+
+    Args:
+        path: 录制文件路径
+        stream: (时间, 消息) 序列
+        codec: 编解码格式
+
+    Returns:
+        int: 写入的消息数
+    """
+    with MessageRecorder(path, codec) as recorder:
+        for timestamp, message in stream:
+            recorder.record(message, timestamp)
+        return recorder.get_stats()['records']
@@ -0,0 +1,484 @@
+"""
+多直播间管理
+
+RoomManager 为每个直播间创建一个 DouyinClient（一个浏览器进程），所有客户端
+共享同一个事件总线，消息主题为 (room_id, MessageType)；subscribe() 订阅合并后的
+消息流，处理函数收到带直播间标签的 RoomMessage。
+
+- 并发浏览器数上限按可用内存和 CPU 核数计算（也可在配置中进一步限制），
+  超出上限的直播间排队，等有直播间停止后再启动；
+- 浏览器依次启动，两次启动之间至少间隔 stagger 秒，避免同时登录和加载页面；
+- 健康检查定期查看每个直播间的心跳和消息速率，心跳超时的直播间重启
+  （最多 max_restarts 次）；合并消息流的订阅者积压时，放慢所有直播间的
+  取回间隔（页面内缓冲暂存消息），积压消除后恢复。
+"""
+
+import asyncio
+import copy
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Callable, Iterable, NamedTuple, Union
+
+from ..core.event_bus import EventBus, Subscription
+from ..utils.config import Config
+from ..utils.logger import LoggerMixin
+from .douyin_client import DouyinClient
+from .models import MessageType
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class RoomMessage(NamedTuple):
+    """带直播间标签的消息"""
+    room_id: str
+    message_type: MessageType
+    message: Any
+
+
+@dataclass
+class RoomSpec:
+    """直播间配置"""
+    room_id: str
+    url: Optional[str] = None
+    options: Dict[str, Any] = field(default_factory=dict)  # 覆盖 douyin.* 的配置
+
+    @classmethod
+    def from_dict(cls, data: Union[str, Dict[str, Any]]) -> 'RoomSpec':
+        """从配置项创建（可以只写直播间ID）"""
+        if isinstance(data, str):
+            return cls(room_id=data)
+        options = {k: v for k, v in data.items() if k not in ('room_id', 'url')}
+        return cls(room_id=str(data['room_id']), url=data.get('url'), options=options)
+
+
+@dataclass
+class RoomHealth:
+    """直播间运行状态"""
+    room_id: str
+    state: str = 'pending'  # pending / queued / starting / running / stalled / failed / stopped
+    started_at: Optional[float] = None
+    restarts: int = 0
+    last_error: Optional[str] = None
+    messages: int = 0
+    message_rate: float = 0.0
+    page_dropped: int = 0
+    heartbeat_age: Optional[float] = None
+    capture_interval: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'room_id': self.room_id,
+            'state': self.state,
+            'uptime': time.monotonic() - self.started_at if self.started_at else 0.0,
+            'restarts': self.restarts,
+            'last_error': self.last_error,
+            'messages': self.messages,
+            'message_rate': self.message_rate,
+            'page_dropped': self.page_dropped,
+            'heartbeat_age': self.heartbeat_age,
+            'capture_interval': self.capture_interval
+        }
+
+
+def browser_capacity(memory_per_browser_mb: float = 600.0, cpus_per_browser: float = 0.5,
+                     reserve_memory_mb: float = 1024.0) -> int:
+    """
+    按可用内存和 CPU 核数估算可以同时运行的浏览器数
+
+    Args:
+        memory_per_browser_mb: 每个浏览器占用的内存（MB）
+        cpus_per_browser: 每个浏览器占用的 CPU 核数
+        reserve_memory_mb: 为音频引擎和系统保留的内存（MB）
+
+    Returns:
+        int: 浏览器数上限（至少为 1）
+    """
+    cpu_limit = int((os.cpu_count() or 1) / max(cpus_per_browser, 0.01))
+
+    available = None
+    if psutil is not None:
+        available = psutil.virtual_memory().available
+    elif hasattr(os, 'sysconf'):
+        try:
+            available = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (ValueError, OSError):
+            available = None
+
+    if available is None:
+        return max(1, cpu_limit)
+    memory_limit = int((available / 1024 / 1024 - reserve_memory_mb) / max(memory_per_browser_mb, 1.0))
+    return max(1, min(cpu_limit, memory_limit))
+
+
+class _Room:
+    """管理器内部的直播间记录"""
+
+    def __init__(self, spec: RoomSpec):
+        self.spec = spec
+        self.health = RoomHealth(spec.room_id)
+        self.client: Optional[DouyinClient] = None
+        self.task: Optional[asyncio.Task] = None
+        self.restart: Optional[asyncio.Event] = None
+        self.last_count = 0
+        self.last_check: Optional[float] = None
+
+
+class RoomManager(LoggerMixin):
+    """多直播间管理器"""
+
+    def __init__(self, config: Config, rooms: Iterable[Union[RoomSpec, str, Dict[str, Any]]] = (),
+                 event_bus: EventBus = None, max_browsers: int = None, stagger: float = 5.0,
+                 health_interval: float = 10.0, stale_after: float = 60.0, max_restarts: int = 3,
+                 backlog_high: float = 0.8, backlog_low: float = 0.2, max_capture_interval: float = 2.0,
+                 client_factory: Callable[..., DouyinClient] = None):
+        """
+        初始化管理器
+
+        Args:
+            config: 配置对象（各直播间在 douyin.* 的基础上合并自己的配置）
+            rooms: 直播间列表
+            event_bus: 共享的事件总线，默认根据配置创建
+            max_browsers: 同时运行的浏览器数上限，默认按可用内存和 CPU 估算
+            stagger: 两次浏览器启动之间的最短间隔（秒）
+            health_interval: 健康检查间隔（秒）
+            stale_after: 心跳超过该时间（秒）视为卡住并重启
+            max_restarts: 每个直播间最多重启的次数
+            backlog_high: 订阅者队列占用超过该比例时放慢取回
+            backlog_low: 订阅者队列占用低于该比例时恢复取回间隔
+            max_capture_interval: 放慢后的最大取回间隔（秒）
+            client_factory: 创建客户端的函数 (config, event_bus, room_key)，默认为 DouyinClient
+        """
+        self.config = config
+        self.event_bus = event_bus or EventBus.from_config(config)
+        self.capacity = max(1, max_browsers or browser_capacity())
+        self.stagger = stagger
+        self.health_interval = health_interval
+        self.stale_after = stale_after
+        self.max_restarts = max_restarts
+        self.backlog_high = backlog_high
+        self.backlog_low = backlog_low
+        self.max_capture_interval = max_capture_interval
+        self.client_factory = client_factory or DouyinClient
+
+        self._rooms: Dict[str, _Room] = {}
+        # 在事件循环中创建（start 时）
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._last_launch: Optional[float] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._throttle = 1.0
+        self.is_running = False
+
+        for room in rooms:
+            self.add_room(room)
+
+    @classmethod
+    def from_config(cls, config: Config, event_bus: EventBus = None) -> 'RoomManager':
+        """
+        根据 douyin.rooms 和 douyin.room_manager.* 配置创建管理器
+
+        Args:
+            config: 配置对象
+            event_bus: 共享的事件总线
+
+        Returns:
+            RoomManager: 管理器
+        """
+        capacity = browser_capacity(
+            memory_per_browser_mb=config.get('douyin.room_manager.memory_per_browser_mb', 600.0),
+            cpus_per_browser=config.get('douyin.room_manager.cpus_per_browser', 0.5),
+            reserve_memory_mb=config.get('douyin.room_manager.reserve_memory_mb', 1024.0)
+        )
+        configured = config.get('douyin.room_manager.max_browsers', 0)
+        return cls(
+            config,
+            rooms=config.get('douyin.rooms', []) or [],
+            event_bus=event_bus,
+            max_browsers=min(capacity, configured) if configured else capacity,
+            stagger=config.get('douyin.room_manager.stagger', 5.0),
+            health_interval=config.get('douyin.room_manager.health_interval', 10.0),
+            stale_after=config.get('douyin.room_manager.stale_after', 60.0),
+            max_restarts=config.get('douyin.room_manager.max_restarts', 3),
+            max_capture_interval=config.get('douyin.room_manager.max_capture_interval', 2.0)
+        )
+
+    @property
+    def room_ids(self) -> List[str]:
+        """直播间ID列表"""
+        return list(self._rooms)
+
+    def add_room(self, room: Union[RoomSpec, str, Dict[str, Any]]):
+        """
+        添加直播间（管理器运行中时立即排队启动）
+
+        Args:
+            room: 直播间配置或直播间ID
+        """
+        spec = room if isinstance(room, RoomSpec) else RoomSpec.from_dict(room)
+        if spec.room_id in self._rooms:
+            raise ValueError(f"直播间已存在: {spec.room_id}")
+        self._rooms[spec.room_id] = _Room(spec)
+        if self.is_running:
+            self._launch(self._rooms[spec.room_id])
+
+    async def remove_room(self, room_id: str):
+        """
+        停止并移除直播间
+
+        Args:
+            room_id: 直播间ID
+        """
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            await self._cancel(room)
+
+    def subscribe(self, handler: Callable[[RoomMessage], Any], message_types: Iterable[MessageType] = None,
+                  rooms: Iterable[str] = None, **options) -> Subscription:
+        """
+        订阅合并后的消息流
+
+        Args:
+            handler: 处理函数（同步或异步），参数为 RoomMessage
+            message_types: 消息类型，默认全部
+            rooms: 直播间ID，默认全部（包括之后添加的直播间）
+            **options: 传给 EventBus.subscribe 的参数（maxsize、policy 等）
+
+        Returns:
+            Subscription: 订阅者
+        """
+        types = frozenset(message_types) if message_types is not None else None
+        topics = None
+        if rooms is not None:
+            topics = [(room_id, message_type) for room_id in rooms
+                      for message_type in (types or MessageType)]
+
+        def accepts(topic) -> bool:
+            return isinstance(topic, tuple) and (types is None or topic[1] in types)
+
+        if asyncio.iscoroutinefunction(handler):
+            async def deliver(topic, message):
+                if accepts(topic):
+                    await handler(RoomMessage(topic[0], topic[1], message))
+        else:
+            def deliver(topic, message):
+                if accepts(topic):
+                    handler(RoomMessage(topic[0], topic[1], message))
+
+        options.setdefault('name', f"rooms:{getattr(handler, '__qualname__', repr(handler))}")
+        return self.event_bus.subscribe(deliver, topics=topics, with_topic=True, **options)
+
+    async def start(self):
+        """启动所有直播间（依次启动，超出浏览器上限的排队）"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._slots = asyncio.Semaphore(self.capacity)
+        self._launch_lock = asyncio.Lock()
+        self.logger.info(f"启动 {len(self._rooms)} 个直播间，浏览器上限 {self.capacity}")
+        for room in self._rooms.values():
+            self._launch(room)
+        self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self):
+        """停止所有直播间"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        await asyncio.gather(*(self._cancel(room) for room in self._rooms.values()))
+        self.logger.info("所有直播间已停止")
+
+    async def close(self):
+        """停止所有直播间并关闭事件总线"""
+        await self.stop()
+        await self.event_bus.close()
+
+    def get_health(self, room_id: str) -> RoomHealth:
+        """获取直播间运行状态"""
+        return self._rooms[room_id].health
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取管理器统计信息"""
+        states = [room.health.state for room in self._rooms.values()]
+        return {
+            'capacity': self.capacity,
+            'rooms': len(self._rooms),
+            'running': states.count('running'),
+            'queued': states.count('queued'),
+            'throttle': self._throttle,
+            'room_health': [room.health.to_dict() for room in self._rooms.values()],
+            'event_bus': self.event_bus.get_stats()
+        }
+
+    def _launch(self, room: _Room):
+        room.health.state = 'queued'
+        room.task = asyncio.create_task(self._run_room(room))
+
+    async def _cancel(self, room: _Room):
+        if room.task is not None:
+            room.task.cancel()
+            await asyncio.gather(room.task, return_exceptions=True)
+            room.task = None
+        room.health.state = 'stopped'
+
+    def _room_config(self, spec: RoomSpec) -> Config:
+        """直播间的配置：douyin.* 合并直播间自己的配置"""
+        data = copy.deepcopy(self.config.to_dict())
+        douyin = data.setdefault('douyin', {})
+        _merge(douyin, spec.options)
+        douyin['room_id'] = spec.room_id
+        douyin.pop('rooms', None)
+        return Config(data)
+
+    async def _run_room(self, room: _Room):
+        """运行一个直播间：占用浏览器名额，出错或卡住时重启"""
+        health = room.health
+        async with self._slots:
+            while self.is_running:
+                room.restart = asyncio.Event()
+                client = None
+                try:
+                    await self._wait_launch_turn()
+                    health.state = 'starting'
+                    client = room.client = self.client_factory(
+                        self._room_config(room.spec), event_bus=self.event_bus, room_key=room.spec.room_id
+                    )
+                    await client.start()
+                    if not await client.connect_to_room(room.spec.url):
+                        raise RuntimeError("连接直播间失败")
+                    await client.start_message_listener()
+
+                    health.state = 'running'
+                    health.started_at = time.monotonic()
+                    health.capture_interval = client.capture_interval
+                    room.last_count, room.last_check = self._message_count(client), time.monotonic()
+                    self.logger.info(f"直播间 {room.spec.room_id} 已启动")
+                    await room.restart.wait()
+                    self.logger.warning(f"直播间 {room.spec.room_id} 需要重启: {health.last_error}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    health.last_error = str(e)
+                    self.logger.error(f"直播间 {room.spec.room_id} 运行出错: {e}")
+                finally:
+                    room.client = None
+                    if client is not None:
+                        client.is_connected = False
+                        await client.stop()
+
+                if health.restarts >= self.max_restarts:
+                    health.state = 'failed'
+                    self.logger.error(f"直播间 {room.spec.room_id} 重启次数过多，已放弃")
+                    return
+                health.restarts += 1
+                health.state = 'queued'
+
+    async def _wait_launch_turn(self):
+        """错开浏览器启动时间"""
+        async with self._launch_lock:
+            now = time.monotonic()
+            if self._last_launch is not None:
+                delay = self._last_launch + self.stagger - now
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._last_launch = time.monotonic()
+
+    @staticmethod
+    def _message_count(client: DouyinClient) -> int:
+        """客户端已产生的消息数（去重后的弹幕和礼物）"""
+        return client.deduplicator.get_stats()['unique']
+
+    async def _monitor_loop(self):
+        """定期检查各直播间"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                self.check_health()
+            except Exception as e:
+                self.logger.error(f"直播间健康检查出错: {e}")
+
+    def check_health(self, now: float = None):
+        """
+        检查心跳、更新消息速率，并根据订阅者积压调整取回间隔
+
+        Args:
+            now: 当前时间（time.monotonic()），默认取当前值
+        """
+        now = time.monotonic() if now is None else now
+        wall = time.time()
+
+        for room in self._rooms.values():
+            client, health = room.client, room.health
+            if client is None or health.state != 'running':
+                continue
+
+            count = self._message_count(client)
+            elapsed = now - (room.last_check or now)
+            if elapsed > 0:
+                health.message_rate = (count - room.last_count) / elapsed
+            health.messages += count - room.last_count
+            room.last_count, room.last_check = count, now
+            health.page_dropped = client.capture_stats['dropped']
+
+            heartbeat = client.connection_status.last_heartbeat
+            if heartbeat is not None:
+                health.heartbeat_age = wall - heartbeat.timestamp()
+                if health.heartbeat_age > self.stale_after:
+                    health.state = 'stalled'
+                    health.last_error = f"心跳超时 {health.heartbeat_age:.0f} 秒"
+                    if room.restart is not None:
+                        room.restart.set()
+
+        self._apply_backpressure()
+
+    def _apply_backpressure(self):
+        """合并消息流积压时放慢所有直播间的取回间隔"""
+        fill = 0.0
+        for subscription in self.event_bus._subscriptions:
+            fill = max(fill, subscription.depth / subscription.maxsize)
+
+        clients = [room.client for room in self._rooms.values() if room.client is not None]
+        bases = {
+            client: (client.config.get('douyin.capture.interval', 0.2),
+                     client.config.get('douyin.capture.poll_interval', 0.5))
+            for client in clients
+        }
+        # 倍数超过使最短间隔达到上限的值后不再有效果，限制住才能在积压消除后立即回落
+        shortest = min((min(intervals) for intervals in bases.values()), default=0.0)
+        limit = max(1.0, self.max_capture_interval / shortest) if shortest > 0 else 1.0
+
+        throttle = self._throttle
+        if fill >= self.backlog_high:
+            throttle = min(limit, throttle * 2)
+        elif fill <= self.backlog_low:
+            throttle = max(1.0, min(limit, throttle) / 2)
+        if throttle == self._throttle:
+            return
+
+        self._throttle = throttle
+        for room in self._rooms.values():
+            client = room.client
+            if client is None:
+                continue
+            capture_base, poll_base = bases[client]
+            client.capture_interval = min(self.max_capture_interval, max(capture_base, capture_base * throttle))
+            client.poll_interval = min(self.max_capture_interval, max(poll_base, poll_base * throttle))
+            room.health.capture_interval = client.capture_interval
+        self.logger.info(f"订阅者队列占用 {fill:.0%}，取回间隔倍数调整为 {throttle:g}")
+
+
+def _merge(target: Dict[str, Any], overrides: Dict[str, Any]):
+    """递归合并配置字典"""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
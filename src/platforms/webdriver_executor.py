@@ -0,0 +1,133 @@
+"""
+WebDriver 异步封装
+
+Selenium 的每个调用都是阻塞的 HTTP 往返（页面加载可达数秒）。AsyncWebDriver 把
+驱动的创建和所有调用放到一个专用线程中顺序执行（WebDriver 不是线程安全的），
+事件循环只等待结果，音频调度和数据库任务在页面加载、轮询期间照常运行。
+每个调用都有超时；超时后事件循环不再等待，但该调用仍在驱动线程中执行完毕，
+后续调用排在它之后。
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Any, Callable, Dict, List
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from ..utils.logger import LoggerMixin
+
+
+class AsyncWebDriver(LoggerMixin):
+    """在专用线程中执行 WebDriver 调用的异步外观"""
+
+    def __init__(self, driver: Any = None, timeout: float = 30.0, page_load_timeout: float = 60.0):
+        """
+        初始化
+
+        Args:
+            driver: 已创建的 WebDriver（也可以稍后通过 create() 创建）
+            timeout: 普通调用的超时时间（秒）
+            page_load_timeout: 打开页面和创建浏览器的超时时间（秒）
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.page_load_timeout = page_load_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._stats = {'calls': 0, 'timeouts': 0, 'errors': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='webdriver')
+        return self._executor
+
+    async def run(self, func: Callable, *args, timeout: float = None, **kwargs) -> Any:
+        """
+        在驱动线程中执行任意函数（可把多次 WebDriver 调用合并为一次线程切换）
+
+        Args:
+            func: 函数
+            *args: 位置参数
+            timeout: 超时时间（秒），默认使用 self.timeout
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: 函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        self._stats['calls'] += 1
+        future = loop.run_in_executor(self._get_executor(), partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            self.logger.warning(f"WebDriver 调用超时: {getattr(func, '__name__', func)}")
+            raise
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+
+    async def create(self, factory: Callable[[], Any]) -> Any:
+        """
+        在驱动线程中创建浏览器
+
+        Args:
+            factory: 创建 WebDriver 的函数
+
+        Returns:
+            Any: WebDriver
+        """
+        self.driver = await self.run(factory, timeout=self.page_load_timeout)
+        return self.driver
+
+    async def get(self, url: str):
+        """打开页面"""
+        await self.run(self.driver.get, url, timeout=self.page_load_timeout)
+
+    async def find_element(self, by: str, value: str) -> Any:
+        """查找元素"""
+        return await self.run(self.driver.find_element, by, value)
+
+    async def find_elements(self, by: str, value: str) -> List[Any]:
+        """查找元素列表"""
+        return await self.run(self.driver.find_elements, by, value)
+
+    async def execute_script(self, script: str, *args) -> Any:
+        """执行页面脚本"""
+        return await self.run(self.driver.execute_script, script, *args)
+
+    async def text(self, element: Any) -> str:
+        """读取元素文本"""
+        return await self.run(lambda: element.text)
+
+    async def wait_until(self, condition: Callable, timeout: float) -> Any:
+        """
+        在驱动线程中执行 WebDriverWait
+
+        Args:
+            condition: expected_conditions 条件
+            timeout: 等待时间（秒），超时抛出 selenium 的 TimeoutException
+
+        Returns:
+            Any: 条件的返回值（通常是元素）
+        """
+        return await self.run(
+            lambda: WebDriverWait(self.driver, timeout).until(condition),
+            timeout=timeout + self.timeout
+        )
+
+    async def quit(self):
+        """关闭浏览器并停止驱动线程（排在已超时但仍在执行的调用之后）"""
+        driver, self.driver = self.driver, None
+        try:
+            if driver is not None:
+                await self.run(driver.quit, timeout=self.page_load_timeout)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调用统计信息"""
+        return dict(self._stats)
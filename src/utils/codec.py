@@ -0,0 +1,270 @@
+"""
+模型序列化编解码
+
+to_dict() 为每个字段构建字典、把 datetime 格式化为 ISO 字符串，from_dict()
+再逐个字段解析，适合配置和调试输出，但不适合消息日志、回放和推送到 Web 界面
+这类高频场景。这里的编解码把已注册的模型编码为按字段顺序排列的数组：
+
+    [版本号, 类型标签, [字段1, 字段2, ...]]
+
+- 普通字段一次 attrgetter 取出，只有 datetime（编码为 Unix 秒）、枚举和嵌套
+  模型需要额外转换；
+- 版本号用于识别旧数据。新字段只能追加在末尾：旧数据的数组较短，缺少的
+  字段取默认值；字段顺序变化时需要提高 SCHEMA_VERSION；
+- 编码后的数组交给 JSON（有 orjson 时使用 orjson）或 msgpack 输出字节。
+"""
+
+import dataclasses
+import json
+import operator
+import typing
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from .config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 编码格式版本
+SCHEMA_VERSION = 1
+
+
+def _encode_datetime(value: datetime) -> float:
+    return value.timestamp()
+
+
+def _decode_datetime(value: float) -> datetime:
+    return datetime.fromtimestamp(value)
+
+
+class _ModelSchema:
+    """一个模型类型的字段顺序和需要转换的字段"""
+
+    def __init__(self, tag: str, cls: type):
+        self.tag = tag
+        self.cls = cls
+        self.is_tuple = issubclass(cls, tuple)
+        if self.is_tuple:
+            names = list(cls._fields)
+            hints = {}
+        else:
+            names = [f.name for f in dataclasses.fields(cls) if f.init]
+            hints = typing.get_type_hints(cls)
+        self.names = names
+        self._getter = operator.attrgetter(*names) if len(names) > 1 else (lambda obj: (getattr(obj, names[0]),))
+
+        # (字段位置, 编码函数, 解码函数)
+        self.converters: List[Tuple[int, Callable, Callable]] = []
+        for index, name in enumerate(names):
+            converter = self._converter_for(hints.get(name))
+            if converter:
+                self.converters.append((index,) + converter)
+
+    @staticmethod
+    def _converter_for(hint) -> Optional[Tuple[Callable, Callable]]:
+        """根据字段类型选择转换函数"""
+        if hint is None:
+            return None
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        origin = typing.get_origin(hint)
+        if origin is typing.Union and len(args) == 1:
+            hint, origin, args = args[0], typing.get_origin(args[0]), typing.get_args(args[0])
+
+        if hint is datetime:
+            return _encode_datetime, _decode_datetime
+        if isinstance(hint, type) and issubclass(hint, Enum):
+            return operator.attrgetter('value'), hint
+        if isinstance(hint, type) and dataclasses.is_dataclass(hint):
+            return (lambda value, t=hint: _schema_for(t).encode(value),
+                    lambda value, t=hint: _schema_for(t).decode(value))
+        if origin in (list, List) and args and dataclasses.is_dataclass(args[0]):
+            item = args[0]
+            return (lambda values, t=item: [_schema_for(t).encode(v) for v in values],
+                    lambda values, t=item: [_schema_for(t).decode(v) for v in values])
+        return None
+
+    def encode(self, obj: Any) -> list:
+        """编码为字段数组"""
+        if self.is_tuple:
+            return list(obj)
+        values = list(self._getter(obj))
+        for index, encode, _ in self.converters:
+            value = values[index]
+            if value is not None:
+                values[index] = encode(value)
+        return values
+
+    def decode(self, values: list) -> Any:
+        """从字段数组解码（数组较短时缺少的字段取默认值）"""
+        if len(values) > len(self.names):
+            values = values[:len(self.names)]
+        if self.converters:
+            values = list(values)
+            count = len(values)
+            for index, _, decode in self.converters:
+                if index < count and values[index] is not None:
+                    values[index] = decode(values[index])
+        return self.cls(*values)
+
+
+_schemas_by_tag: Dict[str, _ModelSchema] = {}
+_schemas_by_type: Dict[type, _ModelSchema] = {}
+
+
+def _schema_for(cls: type) -> _ModelSchema:
+    schema = _schemas_by_type.get(cls)
+    if schema is None:
+        # 嵌套模型（如 User、Gift）不需要标签
+        schema = _schemas_by_type[cls] = _ModelSchema(cls.__name__, cls)
+    return schema
+
+
+def register_model(tag: str, cls: type):
+    """
+    注册可编码的模型类型
+
+    Args:
+        tag: 类型标签（写入编码结果，注册后不要修改）
+        cls: 数据类或 NamedTuple
+    """
+    if tag in _schemas_by_tag and _schemas_by_tag[tag].cls is not cls:
+        raise ValueError(f"类型标签已被占用: {tag}")
+    schema = _ModelSchema(tag, cls)
+    _schemas_by_tag[tag] = schema
+    _schemas_by_type[cls] = schema
+
+
+def encode_model(obj: Any) -> list:
+    """
+    把已注册的模型编码为 [版本号, 类型标签, 字段数组]
+
+    Args:
+        obj: 模型实例
+
+    Returns:
+        list: 编码结果（只包含 JSON/msgpack 可表示的基本类型）
+    """
+    schema = _schemas_by_type.get(type(obj))
+    if schema is None or schema.tag not in _schemas_by_tag:
+        raise TypeError(f"未注册的模型类型: {type(obj).__name__}")
+    return [SCHEMA_VERSION, schema.tag, schema.encode(obj)]
+
+
+def decode_model(data: list) -> Any:
+    """
+    从 encode_model() 的结果还原模型
+
+    Args:
+        data: 编码结果
+
+    Returns:
+        Any: 模型实例
+    """
+    version, tag, values = data
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"不支持的编码版本: {version}（当前版本 {SCHEMA_VERSION}）")
+    schema = _schemas_by_tag.get(tag)
+    if schema is None:
+        raise ValueError(f"未知的类型标签: {tag}")
+    return schema.decode(values)
+
+
+class Codec(ABC):
+    """编解码器基类"""
+
+    name = ''
+    binary = True
+
+    def dumps(self, obj: Any) -> bytes:
+        """编码模型"""
+        return self.pack(encode_model(obj))
+
+    def loads(self, data: bytes) -> Any:
+        """解码模型"""
+        return decode_model(self.unpack(data))
+
+    @abstractmethod
+    def pack(self, value: Any) -> bytes:
+        """编码基本类型（列表、字典、数字、字符串）"""
+
+    @abstractmethod
+    def unpack(self, data: bytes) -> Any:
+        """解码基本类型"""
+
+
+class JSONCodec(Codec):
+    """JSON 编解码（有 orjson 时使用 orjson）"""
+
+    name = 'json'
+    binary = False
+
+    def pack(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def unpack(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """msgpack 二进制编解码（需要 msgpack）"""
+
+    name = 'msgpack'
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("msgpack 编解码需要安装 msgpack")
+
+    def pack(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def unpack(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS: Dict[str, Type[Codec]] = {
+    JSONCodec.name: JSONCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+
+def get_codec(name: str = 'json') -> Codec:
+    """
+    按名称创建编解码器
+
+    Args:
+        name: json 或 msgpack
+
+    Returns:
+        Codec: 编解码器
+    """
+    codec_class = CODECS.get(name)
+    if codec_class is None:
+        raise ValueError(f"未知的编解码格式: {name}（可选: {', '.join(CODECS)}）")
+    return codec_class()
+
+
+def codec_from_config(config: Config) -> Codec:
+    """
+    根据 serialization.codec 配置创建编解码器
+
+    Args:
+        config: 配置对象
+
+    Returns:
+        Codec: 编解码器
+    """
+    return get_codec(config.get('serialization.codec', 'json'))
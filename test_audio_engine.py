@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+音频引擎测试脚本
+"""
+
+import asyncio
+import sys
+import wave
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.database import DatabaseManager
+from src.audio.file_manager import AudioFileManager
+from src.audio.playlist_manager import PlaylistManager
+from src.audio.pcm_cache import PCMCache
+from src.audio.mixer import AudioMixer, NullSink, WavFileSink
+from src.audio.pcm import load_pcm
+from src.audio.playlist_player import PlaylistPlayer
+from src.audio.stream import open_pcm_stream, MemmapPCMStream, SoundFilePCMStream, FFmpegPCMStream
+from src.audio import stream as stream_module
+from src.utils.logger import setup_logger
+from test_audio_import import write_test_wav
+
+
+async def import_clips(file_manager: AudioFileManager, work_dir: Path, names, seconds: float = 0.5):
+    """生成并导入测试音频，返回 {名称: AudioFile}"""
+    clips = {}
+    for i, name in enumerate(names):
+        source = work_dir / "source" / f"{name}.wav"
+        write_test_wav(source, seconds=seconds, sample_rate=8000, frequency=220.0 + 110 * i)
+        clips[name] = await file_manager.import_audio_file(str(source))
+    return clips
+
+
+async def test_pcm_cache(logger, work_dir: Path):
+    """测试PCM缓存"""
+    logger.info("测试PCM缓存...")
+
+    db_manager = DatabaseManager(str(work_dir / "cache.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        file_manager = AudioFileManager(db_manager, str(work_dir / "cache_storage"))
+        playlist_manager = PlaylistManager(db_manager)
+        clips = await import_clips(file_manager, work_dir, ["rose_thanks", "heart_thanks", "rain", "brush", "tap"])
+
+        # 每个片段 0.5s -> 44100Hz 立体声 float32 约 176KB，预算只够放 3 个
+        cache = PCMCache(file_manager, memory_budget=3 * 180 * 1024, sample_rate=44100, channels=2)
+
+        samples = await cache.get(clips["rain"].id)
+        assert samples.shape == (22050, 2) and samples.dtype.name == 'float32'
+        assert not samples.flags.writeable
+
+        # 并发请求只解码一次
+        await asyncio.gather(*[cache.get(clips["brush"].id) for _ in range(5)])
+        assert cache.get_stats()['entries'] == 2
+
+        # 礼物音效按标题匹配后固定，不会被淘汰
+        pinned = await cache.pin_gift_clips({"玫瑰": "rose_thanks.mp3", "爱心": "heart_thanks.mp3"})
+        assert pinned == 2
+        await cache.get(clips["tap"].id)
+        stats = cache.get_stats()
+        assert stats['bytes'] <= cache.memory_budget and stats['evictions'] >= 2, stats
+        assert cache.get_nowait(clips["rose_thanks"].id) is not None
+        assert cache.get_nowait(clips["heart_thanks"].id) is not None
+
+        # 命中路径远低于 50ms
+        started = time.perf_counter()
+        for _ in range(1000):
+            cache.get_nowait(clips["rose_thanks"].id)
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+        # 预加载激活的播放列表
+        playlist = await playlist_manager.create_playlist("夜间")
+        await playlist_manager.add_audio_to_playlist(playlist.id, clips["rain"].id)
+        await playlist_manager.set_active_playlist(playlist.id)
+        cache.unpin([clips["heart_thanks"].id])
+        assert await cache.preload_playlist(playlist_manager) == 1
+        assert cache.get_nowait(clips["rain"].id) is not None
+
+        stats = cache.get_stats()
+        assert stats['hits'] > 0 and stats['misses'] > 0 and 0 < stats['hit_rate'] < 1
+        logger.info(f"PCM缓存统计: {stats}")
+        logger.info("PCM缓存测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_mixer(logger, work_dir: Path):
+    """测试实时混音引擎"""
+    logger.info("测试混音引擎...")
+
+    sample_rate = 8000
+    tone = np.full((sample_rate, 2), 0.5, dtype=np.float32)
+
+    # 离线渲染到 WAV：环境音循环 + 带淡入淡出的音效
+    wav_path = work_dir / "mix.wav"
+    mixer = AudioMixer(WavFileSink(str(wav_path)), sample_rate=sample_rate, buffer_size=400)
+    mixer.sink.open(mixer.sample_rate, mixer.channels, mixer.buffer_size)
+    ambient = mixer.play(tone[:1000], gain=0.4, loop=True, bus='ambient')
+    mixer.play(tone, gain=1.0, fade_in=0.1, fade_out=0.1)
+    mixer.process(30)  # 1.5s
+
+    mixer.stop_voice(ambient, fade_out=0.05)
+    mixer.process(5)
+    assert mixer.active_voices() == 0
+    mixer.sink.close()
+
+    with wave.open(str(wav_path), 'rb') as wav:
+        assert wav.getnframes() == 35 * 400 and wav.getframerate() == sample_rate
+    mixed = load_pcm(str(wav_path), sample_rate, 2)[:, 0]
+    assert abs(mixed[0] - 0.2) < 0.01 and abs(mixed[1000] - 0.7) < 0.01  # 环境音 0.4*0.5，淡入结束后再加 0.5
+    assert np.all(np.diff(mixed[:800]) >= -1e-4)  # 淡入单调上升，没有跳变
+    assert abs(mixed[sample_rate + 100] - 0.2) < 0.01  # 音效结束后只剩循环的环境音
+    assert np.all(mixed[-400:] == 0)
+
+    # 循环声部只在第一次播放时淡入，回到开头后保持原增益
+    mixer = AudioMixer(NullSink(), sample_rate=sample_rate, buffer_size=400)
+    mixer.play(tone[:500], loop=True, fade_in=0.02)
+    looped = render_seconds(mixer, 0.25)
+    assert looped[0] == 0 and looped[100] < 0.5
+    assert np.allclose(looped[160:], 0.5)
+
+    # 主音量、静音与增益渐变
+    mixer = AudioMixer(NullSink(), sample_rate=sample_rate, buffer_size=400)
+    voice = mixer.play(tone, loop=True)
+    mixer.set_volume(0.5)
+    mixer.process(2)
+    assert abs(mixer.render()[0, 0] - 0.25) < 1e-6
+    mixer.set_muted(True)
+    mixer.process(1)
+    assert not mixer.render().any()
+    mixer.set_muted(False)
+    mixer.process(1)
+    mixer.set_voice_gain(voice, 0.0)
+    block = mixer.render()[:, 0].copy()
+    assert block[0] > block[-1] and np.all(np.diff(block) <= 0)
+
+    # 输出线程实时运行，asyncio 侧等待声部结束
+    cache_mixer = AudioMixer(NullSink(), sample_rate=44100, buffer_size=1024)
+    cache_mixer.start()
+    try:
+        voice = cache_mixer.play(np.full((4410, 2), 0.1, dtype=np.float32))
+        await asyncio.wait_for(cache_mixer.wait_voice(voice), timeout=2)
+        assert cache_mixer.state.is_playing and cache_mixer.state.current_position > 0
+    finally:
+        cache_mixer.stop()
+    stats = cache_mixer.get_stats()
+    assert stats['blocks'] >= 4 and stats['max_render_ms'] < stats['block_ms'], stats
+    assert cache_mixer.sink.frames_written >= 4410
+
+    # 32 个声部一次渲染远低于块时长
+    many = AudioMixer(NullSink(), sample_rate=44100, buffer_size=1024)
+    for _ in range(32):
+        many.play(np.zeros((44100, 2), dtype=np.float32), fade_in=0.5, fade_out=0.5)
+    many.process(100)
+    stats = many.get_stats()
+    logger.info(f"混音统计: {stats}")
+    assert stats['avg_render_ms'] < stats['block_ms'], stats
+
+    logger.info("混音引擎测试通过")
+
+
+def render_seconds(mixer: AudioMixer, seconds: float) -> np.ndarray:
+    """离线渲染指定时长，返回左声道"""
+    blocks = int(np.ceil(seconds * mixer.sample_rate / mixer.buffer_size))
+    return np.concatenate([mixer.render()[:, 0].copy() for _ in range(blocks)])
+
+
+async def test_playlist_player(logger, work_dir: Path):
+    """测试播放列表调度"""
+    logger.info("测试播放列表调度...")
+
+    db_manager = DatabaseManager(str(work_dir / "playlist.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        file_manager = AudioFileManager(db_manager, str(work_dir / "playlist_storage"))
+        playlist_manager = PlaylistManager(db_manager)
+        clips = await import_clips(file_manager, work_dir, ["pl_a", "pl_b", "pl_c"], seconds=0.3)
+        pcm = {name: load_pcm(clip.file_path, 8000, 2)[:, 0] for name, clip in clips.items()}
+
+        playlist = await playlist_manager.create_playlist("无缝")
+        for name in ("pl_a", "pl_b", "pl_c"):
+            await playlist_manager.add_audio_to_playlist(playlist.id, clips[name].id)
+
+        # 无淡化时逐帧无缝拼接
+        mixer = AudioMixer(NullSink(), sample_rate=8000, buffer_size=256)
+        player = PlaylistPlayer(mixer, playlist_manager, lookahead=3)
+        assert await player.play(playlist.id)
+        await asyncio.sleep(0.05)
+        output = render_seconds(mixer, 1.0)
+        expected = np.concatenate([pcm["pl_a"], pcm["pl_b"], pcm["pl_c"]])
+        assert np.allclose(output[:len(expected)], expected, atol=1e-6)
+        assert not output[len(expected):].any()
+        await asyncio.sleep(0.01)
+        assert mixer.active_voices() == 0 and player.get_stats()['underruns'] == 0
+
+        # 交叉淡化：A 的 fade_out 与 B 的 fade_in 重叠
+        await playlist_manager.delete_playlist(playlist.id)
+        crossfade = await playlist_manager.create_playlist("交叉淡化")
+        await playlist_manager.add_audio_to_playlist(crossfade.id, clips["pl_a"].id, fade_out=0.1)
+        await playlist_manager.add_audio_to_playlist(crossfade.id, clips["pl_b"].id, fade_in=0.1)
+        assert await player.play(crossfade.id)
+        await asyncio.sleep(0.05)
+        output = render_seconds(mixer, 1.0)
+        overlap = 800
+        a, b = pcm["pl_a"], pcm["pl_b"]
+        head = len(a) - overlap
+        ramp = np.arange(overlap, dtype=np.float32)
+        expected = np.concatenate([
+            a[:head],
+            a[head:] * (len(a) - (head + ramp)) / overlap + b[:overlap] * ramp / overlap,
+            b[overlap:]
+        ])
+        assert np.allclose(output[:len(expected)], expected, atol=1e-4)
+        assert not output[len(expected):].any()
+
+        # 流式播放的项目同样逐帧衔接
+        player.stream_threshold = 0
+        assert await player.play(crossfade.id)
+        await asyncio.sleep(0.05)
+        streamed = []
+        for _ in range(32):
+            streamed.append(mixer.render()[:, 0].copy())
+            time.sleep(0.001)  # 给预读线程留出时间
+        streamed = np.concatenate(streamed)
+        assert np.allclose(streamed[:len(expected)], expected, atol=1e-4)
+        assert player.get_stats()['streamed'] == 2
+        player.stream_threshold = 120
+
+        # 列表循环 + 随机：预取窗口受限，每一轮包含全部项目
+        items = (await playlist_manager.get_playlist(crossfade.id)).items
+        await playlist_manager.add_audio_to_playlist(crossfade.id, clips["pl_c"].id)
+        player.lookahead = 1
+        player.set_repeat_mode('playlist')
+        player.set_shuffle(True)
+        started = []
+        await player.play(crossfade.id)
+        notify = player._voice.on_item_started
+        player._voice.on_item_started = lambda item: (started.append(item.audio_file_id), notify(item))
+        for _ in range(60):
+            mixer.process(4)
+            assert player.get_stats()['queued'] <= 1
+            await asyncio.sleep(0.002)
+        assert len(started) >= 6, started
+        assert set(started[:3]) == {clip.id for clip in clips.values()}
+
+        # 单曲循环只解码一次
+        player.set_shuffle(False)
+        player.set_repeat_mode('single')
+        await player.play(crossfade.id, start_item_id=items[1].id)
+        decoded = player.get_stats()['decoded']
+        for _ in range(20):
+            mixer.process(4)
+            await asyncio.sleep(0.002)
+        assert player.get_stats()['decoded'] == decoded
+        assert mixer.state.current_item_id == items[1].id
+
+        await player.stop(fade_out=0.05)
+        mixer.process(4)
+        assert mixer.active_voices() == 0
+        await player.close()
+
+        logger.info(f"播放列表统计: {player.get_stats()}")
+        logger.info("播放列表调度测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+def write_long_wav(path: Path, seconds: float, sample_rate: int = 22050, channels: int = 1):
+    """用 NumPy 生成较长的测试WAV"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (np.sin(2 * np.pi * 330 * t) * 0.3 * 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.repeat(samples, channels).tobytes())
+
+
+async def test_stream(logger, work_dir: Path):
+    """测试流式解码"""
+    logger.info("测试流式解码...")
+
+    wav_path = work_dir / "rain_ambient.wav"
+    write_long_wav(wav_path, seconds=20)
+    full = load_pcm(str(wav_path), 44100, 2)
+
+    # 内存映射读取 + 重采样，与整段解码结果一致
+    with open_pcm_stream(str(wav_path), 44100, 2) as stream:
+        assert isinstance(stream, MemmapPCMStream) and stream.frames == len(full)
+        blocks = []
+        while True:
+            block = stream.read(4096)
+            if not len(block):
+                break
+            blocks.append(block)
+        assert np.allclose(np.concatenate(blocks), full, atol=1e-5)
+
+        stream.seek(441000)
+        assert np.allclose(stream.read(1000), full[441000:442000], atol=1e-5)
+        stream.seek(len(full) - 10)
+        assert len(stream.read(4096)) == 10
+
+    # FLAC 通过 soundfile 顺序解码
+    if stream_module.soundfile is not None:
+        flac_path = work_dir / "library_ambient.flac"
+        stream_module.soundfile.write(str(flac_path), full[:, :1], 44100)
+        with open_pcm_stream(str(flac_path), 22050, 2) as stream:
+            assert isinstance(stream, SoundFilePCMStream)
+            decoded = np.concatenate([stream.read(1000) for _ in range(int(np.ceil(stream.frames / 1000)))])
+            expected = load_pcm(str(wav_path), 22050, 2)
+            assert abs(len(decoded) - len(expected)) <= 1
+            assert np.allclose(decoded[:len(expected) - 1], expected[:len(decoded) - 1], atol=1e-3)
+
+    # 文件头无法识别时 ffmpeg 管道解码到输出结束（用输出固定 PCM 的脚本代替 ffmpeg）
+    fake_ffmpeg = work_dir / "fake_ffmpeg.py"
+    fake_ffmpeg.write_text(
+        f"#!{sys.executable}\nimport sys\n"
+        "sys.stdout.buffer.write(bytes(range(200)) * 80)\n"  # 16000 字节 = 8000 帧 s16le 单声道
+    )
+    fake_ffmpeg.chmod(0o755)
+    (work_dir / "mystery.ape").write_bytes(b"MAC " + b"\x00" * 64)
+    with FFmpegPCMStream(str(work_dir / "mystery.ape"), 8000, 1, ffmpeg_path=str(fake_ffmpeg)) as stream:
+        assert not stream.length_known
+        decoded = [stream.read(3000) for _ in range(4)]
+        assert [len(block) for block in decoded] == [3000, 3000, 2000, 0]
+        assert stream.length_known and stream.frames == 8000
+
+    # 混音引擎流式播放：内存占用固定，定位后从新位置继续
+    mixer = AudioMixer(NullSink(), sample_rate=44100, buffer_size=1024)
+    voice_id = await mixer.play_stream(str(wav_path), gain=1.0)
+    mixer._drain_commands()
+    voice = mixer._voices[voice_id]
+    assert voice.nbytes < full.nbytes / 20
+
+    output = []
+    for _ in range(100):
+        output.append(mixer.render()[:, 0].copy())
+        time.sleep(0.001)
+    output = np.concatenate(output)
+    assert voice.underruns == 0
+    assert np.allclose(output, full[:len(output), 0], atol=1e-5)
+
+    mixer.seek_voice(voice_id, 10.0)
+    mixer.render()
+    time.sleep(0.05)
+    block = mixer.render()[:, 0].copy()
+    assert np.allclose(block, full[441000 + 1024:441000 + 2048, 0], atol=1e-5)
+
+    mixer.stop_voice(voice_id)
+    mixer.render()
+    assert mixer.active_voices() == 0
+    voice._reader.join(timeout=1)
+    assert not voice._reader.is_alive()
+
+    # 循环的流式声部回到开头后不再淡入
+    short_path = work_dir / "drip_ambient.wav"
+    write_long_wav(short_path, seconds=0.05, sample_rate=44100)
+    short = load_pcm(str(short_path), 44100, 2)[:, 0]
+    voice_id = await mixer.play_stream(str(short_path), fade_in=0.01, loop=True)
+    mixer._drain_commands()
+    time.sleep(0.05)
+    output = []
+    for _ in range(8):
+        output.append(mixer.render()[:, 0].copy())
+        time.sleep(0.005)
+    output = np.concatenate(output)
+    assert mixer._voices[voice_id].underruns == 0
+    wrap = len(short)
+    assert np.allclose(output[wrap:2 * wrap], short, atol=1e-5)
+    mixer.stop_voice(voice_id)
+    mixer.render()
+
+    logger.info("流式解码测试通过")
+
+
+async def test_audio_engine():
+    """测试音频引擎"""
+    logger = setup_logger()
+    logger.info("开始测试音频引擎...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        await test_pcm_cache(logger, work_dir)
+        await test_mixer(logger, work_dir)
+        await test_playlist_player(logger, work_dir)
+        await test_stream(logger, work_dir)
+
+    logger.info("音频引擎测试完成！所有功能正常工作。")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_audio_engine())
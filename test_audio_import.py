@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+音频批量导入测试脚本
+"""
+
+import asyncio
+import math
+import struct
+import sys
+import tempfile
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.database import DatabaseManager
+from src.audio.file_manager import AudioFileManager, _probe_audio_file
+from src.audio.probe import probe_audio_header
+from src.audio.loudness import integrated_loudness, normalization_gain
+from src.audio.pcm import load_cached_pcm
+from src.audio.pcm_cache import PCMCache
+from src.audio.transcode import AudioTranscoder, transcode_to_cache
+from src.audio.mixer import AudioMixer, NullSink
+from src.audio.models import AudioAnalysis
+from src.audio.storage_watcher import StorageWatcher, _StorageEventHandler
+from src.utils.logger import setup_logger
+
+
+def write_test_wav(path: Path, seconds: float = 0.5, sample_rate: int = 8000,
+                   channels: int = 1, frequency: float = 440.0, amplitude: int = 8000):
+    """生成测试用的正弦波WAV文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frames = int(seconds * sample_rate)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        samples = bytearray()
+        for i in range(frames):
+            value = int(amplitude * math.sin(2 * math.pi * frequency * i / sample_rate))
+            samples += struct.pack('<h', value) * channels
+        wav.writeframes(bytes(samples))
+
+
+def _atom(atom_type: bytes, payload: bytes) -> bytes:
+    """构建 MP4 atom"""
+    return struct.pack('>I4s', 8 + len(payload), atom_type) + payload
+
+
+def write_test_m4a(path: Path, seconds: float, sample_rate: int = 44100, channels: int = 2):
+    """构建只包含头部信息的最小 M4A 文件（moov 位于 mdat 之后）"""
+    hdlr = _atom(b'hdlr', b'\x00' * 8 + b'soun' + b'\x00' * 13)
+    mdhd = _atom(b'mdhd', struct.pack('>IIIII', 0, 0, 0, sample_rate, int(seconds * sample_rate)) + b'\x00' * 4)
+    mp4a = _atom(b'mp4a', b'\x00' * 6 + struct.pack('>H', 1) + b'\x00' * 8 +
+                 struct.pack('>HHHHI', channels, 16, 0, 0, sample_rate << 16))
+    stsd = _atom(b'stsd', struct.pack('>II', 0, 1) + mp4a)
+    minf = _atom(b'minf', _atom(b'stbl', stsd))
+    moov = _atom(b'moov', _atom(b'trak', _atom(b'mdia', hdlr + mdhd + minf)))
+    path.write_bytes(_atom(b'ftyp', b'M4A \x00\x00\x00\x00') + _atom(b'mdat', b'\x00' * 4096) + moov)
+
+
+def write_test_flac(path: Path, seconds: float, sample_rate: int = 48000, channels: int = 2):
+    """构建只包含 STREAMINFO 的最小 FLAC 文件"""
+    total_samples = int(seconds * sample_rate)
+    packed = (sample_rate << 44) | ((channels - 1) << 41) | (15 << 36) | total_samples
+    streaminfo = struct.pack('>HH', 4096, 4096) + b'\x00' * 6 + packed.to_bytes(8, 'big') + b'\x00' * 16
+    path.write_bytes(b'fLaC' + bytes([0x80, 0, 0, 34]) + streaminfo)
+
+
+async def test_probe(logger, work_dir: Path):
+    """测试文件头探测"""
+    logger.info("测试文件头探测...")
+
+    write_test_wav(work_dir / "probe.wav", seconds=1.5, sample_rate=16000, channels=2)
+    info = probe_audio_header(str(work_dir / "probe.wav"))
+    assert info['probe_method'] == 'header'
+    assert (info['duration'], info['channels'], info['frame_rate'], info['sample_width']) == (1.5, 2, 16000, 2)
+
+    # 两小时的 FLAC 只需读取 STREAMINFO
+    write_test_flac(work_dir / "rain.flac", seconds=7200)
+    info = probe_audio_header(str(work_dir / "rain.flac"))
+    assert (info['duration'], info['channels'], info['frame_rate']) == (7200, 2, 48000), info
+
+    write_test_m4a(work_dir / "whisper.m4a", seconds=90.0)
+    info = probe_audio_header(str(work_dir / "whisper.m4a"))
+    assert (info['duration'], info['channels'], info['frame_rate']) == (90.0, 2, 44100), info
+
+    (work_dir / "unknown.mp3").write_bytes(b"\x00" * 1024)
+    assert probe_audio_header(str(work_dir / "unknown.mp3")) is None
+
+    # 截断或损坏的文件头返回 None，导入时退回到完整解码
+    (work_dir / "truncated.wav").write_bytes(b"RIFF\x24\x00\x00\x00WAVEfmt \x10\x00\x00\x00\x01\x00")
+    ogg_page = b"OggS\x00\x02" + b"\x00" * 20 + b"\x01\x1e"
+    (work_dir / "short.ogg").write_bytes(ogg_page + b"\x01vorbis\x00\x00")
+    for name in ("truncated.wav", "short.ogg"):
+        assert probe_audio_header(str(work_dir / name)) is None, name
+        try:
+            _probe_audio_file(str(work_dir / name), decode_fallback=False)
+            assert False, name
+        except ValueError as e:
+            assert "无法从文件头识别" in str(e)
+
+    logger.info("文件头探测测试通过")
+
+
+async def test_import_directory(logger, work_dir: Path):
+    """测试目录批量导入"""
+    logger.info("测试目录批量导入...")
+
+    source_dir = work_dir / "pack"
+    for i in range(12):
+        write_test_wav(source_dir / f"rain_{i}.wav")
+    for i in range(3):
+        write_test_wav(source_dir / "nested" / f"tap_{i}.wav", seconds=0.25)
+    (source_dir / "broken.wav").write_bytes(b"not a wav file")
+    (source_dir / "readme.txt").write_text("ignored")
+
+    db_manager = DatabaseManager(str(work_dir / "import.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        file_manager = AudioFileManager(db_manager, str(work_dir / "storage"))
+
+        events = []
+        report = await file_manager.import_directory(
+            str(source_dir), recursive=True, workers=2, category="测试",
+            batch_size=5, queue_size=4, progress=events.append
+        )
+
+        assert report.scanned == 16, report.scanned
+        assert len(report.imported) == 15, len(report.imported)
+        assert [failure.file_path for failure in report.failures] == [str(source_dir / "broken.wav")]
+        assert report.failures[0].stage == 'probe'
+        assert all(audio_file.id for audio_file in report.imported)
+        assert all(Path(audio_file.file_path).exists() for audio_file in report.imported)
+        assert events and events[-1].stage == 'done' and events[-1].imported == 15
+        assert report.probe_methods == {'header': 15}, report.probe_methods
+
+        row = await db_manager.fetchone("SELECT COUNT(*) AS n FROM audio_files WHERE category = '测试'")
+        assert row['n'] == 15
+
+        # 非递归模式只导入顶层文件
+        report = await file_manager.import_directory(
+            str(source_dir), recursive=False, workers=1, use_processes=False
+        )
+        assert len(report.imported) == 12, len(report.imported)
+
+        # 写入数据库出错时中止整个导入：扫描线程不会阻塞在已满的队列上
+        async def broken_insert(batch, report, fail):
+            raise RuntimeError("磁盘已满")
+
+        file_manager._insert_import_batch = broken_insert
+        try:
+            await asyncio.wait_for(file_manager.import_directory(
+                str(source_dir), workers=2, batch_size=1, queue_size=1, use_processes=False
+            ), timeout=10)
+            assert False, "导入应当失败"
+        except RuntimeError as e:
+            assert str(e) == "磁盘已满"
+        assert not file_manager._importing
+
+        logger.info("目录批量导入测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_content_addressed(logger, work_dir: Path):
+    """测试内容寻址存储与去重"""
+    logger.info("测试内容寻址存储...")
+
+    source_dir = work_dir / "cas_pack"
+    for i in range(4):
+        write_test_wav(source_dir / f"unique_{i}.wav", frequency=200.0 + i * 50)
+    # 内容相同、文件名不同的重复文件
+    (source_dir / "copy_of_unique_0.wav").write_bytes((source_dir / "unique_0.wav").read_bytes())
+
+    db_manager = DatabaseManager(str(work_dir / "cas.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        file_manager = AudioFileManager(db_manager, str(work_dir / "cas_storage"), content_addressed=True)
+
+        first = await file_manager.import_audio_file(str(source_dir / "unique_0.wav"), title="原始")
+        assert first.content_hash and first.filename.startswith(first.content_hash)
+        assert Path(first.file_path).parent.name == first.content_hash[:2]
+
+        # 重复导入返回已有记录，不再复制
+        again = await file_manager.import_audio_file(str(source_dir / "copy_of_unique_0.wav"))
+        assert again.id == first.id
+
+        report = await file_manager.import_directory(str(source_dir), workers=2, use_processes=False)
+        assert len(report.imported) == 3, len(report.imported)
+        assert len(report.duplicates) == 2 and all(dup.id == first.id for dup in report.duplicates)
+
+        # 再次导入整个目录不会产生任何新文件
+        report = await file_manager.import_directory(str(source_dir), workers=2)
+        assert not report.imported and len(report.duplicates) == 5
+
+        stored = [p for p in (work_dir / "cas_storage").rglob("*") if p.is_file()]
+        assert len(stored) == 4, stored
+        row = await db_manager.fetchone("SELECT COUNT(*) AS n FROM audio_files")
+        assert row['n'] == 4
+
+        logger.info("内容寻址存储测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_transcode(logger, work_dir: Path):
+    """测试导入后的转码缓存与分析"""
+    logger.info("测试转码缓存...")
+
+    # BS.1770：0dBFS 997Hz 单声道正弦波为 -3.01 LUFS
+    t = np.arange(48000 * 3) / 48000
+    assert abs(integrated_loudness(np.sin(2 * np.pi * 997 * t)[:, None], 48000) + 3.01) < 0.05
+    # 增益受峰值上限约束：-30 LUFS、峰值 0.5 的片段最多提升到 -1dBFS
+    assert abs(normalization_gain(-30.0, 0.5, -14.0, -1.0) - (-1.0 + 20 * math.log10(2))) < 1e-9
+    assert normalization_gain(float('-inf'), 0.0, -14.0, -1.0) == 0.0
+
+    db_manager = DatabaseManager(str(work_dir / "transcode.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        transcoder = AudioTranscoder(db_manager, sample_rate=22050, channels=2,
+                                     target_loudness=-20.0, use_processes=False)
+        transcoder.start()
+        file_manager = AudioFileManager(db_manager, str(work_dir / "transcode_storage"),
+                                        transcoder=transcoder)
+
+        source_dir = work_dir / "transcode_source"
+        write_test_wav(source_dir / "loud.wav", seconds=1.0, amplitude=20000)
+        write_test_wav(source_dir / "soft.wav", seconds=1.0, amplitude=2000, frequency=660.0)
+        write_test_wav(source_dir / "whisper.wav", seconds=1.0, amplitude=30, frequency=880.0)
+        # 前 0.5s、后 0.25s 为静音
+        tone = (np.sin(2 * np.pi * 440 * np.arange(8000) / 8000) * 8000).astype('<i2')
+        with wave.open(str(source_dir / "padded.wav"), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(8000)
+            wav.writeframes(np.concatenate([np.zeros(4000, '<i2'), tone, np.zeros(2000, '<i2')]).tobytes())
+
+        # 解码结果为空时转码失败，不写入空缓存
+        empty_path = work_dir / "empty.wav"
+        write_test_wav(empty_path, seconds=0.0)
+        try:
+            transcode_to_cache(str(empty_path), str(work_dir / "empty.f32"), 22050, 2)
+            assert False, "空文件的转码应当失败"
+        except ValueError:
+            assert not (work_dir / "empty.f32").exists()
+
+        report = await file_manager.import_directory(str(source_dir), use_processes=False)
+        await transcoder.join()
+        assert transcoder.get_stats()['transcoded'] == 4
+        clips = {audio_file.title: audio_file for audio_file in report.imported}
+
+        # 缓存与原文件同目录，按引擎格式内存映射；原始音量相差 60dB 的片段归一化后响度一致
+        for audio_file in report.imported:
+            audio_file = await file_manager.get_audio_file(audio_file.id)
+            assert Path(audio_file.pcm_path).parent == Path(audio_file.file_path).parent
+            assert audio_file.pcm_sample_rate == 22050 and audio_file.pcm_channels == 2
+
+            samples = load_cached_pcm(audio_file, 22050, 2)
+            assert isinstance(samples, np.memmap) and len(samples) == round(audio_file.duration * 22050)
+            assert abs(integrated_loudness(np.asarray(samples), 22050) + 20.0) < 0.1
+            assert np.abs(samples).max() <= 10 ** (-1.0 / 20)
+
+        # 分析结果：响度差与音量差一致，首尾静音和缩略波形
+        loud = await file_manager.get_analysis(clips["loud"].id)
+        soft = await file_manager.get_analysis(clips["soft"].id)
+        assert abs((loud.loudness - soft.loudness) - 20.0) < 0.1
+        assert loud.true_peak >= loud.sample_peak - 1e-6
+        assert abs(loud.sample_peak - 20 * math.log10(20000 / 32768)) < 0.05
+        assert len(loud.waveform_peaks) == 21 and abs(loud.waveform_resolution - 20) < 0.01
+        assert max(loud.waveform_peaks) > max(soft.waveform_peaks) > 0
+
+        padded = await file_manager.get_analysis(clips["padded"].id)
+        assert abs(padded.leading_silence - 0.5) < 0.01 and abs(padded.trailing_silence - 0.25) < 0.01
+        assert padded.waveform_peaks[:9] == [0] * 9 and padded.waveform_peaks[12] > 0
+        assert padded.to_dict()['waveform_rms'] == padded.waveform_rms
+        assert AudioAnalysis.from_dict(padded.to_dict()).waveform == padded.waveform
+
+        # 混音时按分析结果跳过首尾静音
+        mixer = AudioMixer(NullSink(), sample_rate=22050, channels=2, buffer_size=512)
+        cache = PCMCache(file_manager, sample_rate=22050, channels=2)
+        await mixer.play_audio_file(cache, clips["padded"].id, analysis=padded)
+        mixer._drain_commands()
+        assert abs(next(iter(mixer._voices.values())).length - 22050) < 50
+        assert np.abs(mixer.render()[:64]).max() > 0
+
+        # 未启用转码器时单独分析
+        reanalyzed = await file_manager.analyze_audio_file(clips["loud"].id, force=True)
+        assert abs(reanalyzed.loudness - loud.loudness) < 0.2
+
+        # PCM缓存直接使用内存映射
+        assert isinstance(await cache.get(report.imported[0].id), np.memmap)
+
+        # 引擎采样率变更后重新转码，旧缓存被删除
+        old_path = (await file_manager.get_audio_file(report.imported[0].id)).pcm_path
+        transcoder.sample_rate = 44100
+        assert await transcoder.enqueue_missing() == 4
+        await transcoder.join()
+        audio_file = await file_manager.get_audio_file(report.imported[0].id)
+        assert audio_file.pcm_sample_rate == 44100 and not Path(old_path).exists()
+        assert await transcoder.enqueue_missing() == 0
+
+        await file_manager.delete_audio_file(audio_file.id)
+        assert not Path(audio_file.pcm_path).exists()
+        assert await file_manager.get_analysis(audio_file.id) is None
+
+        await transcoder.stop()
+        logger.info(f"转码统计: {transcoder.get_stats()}")
+        logger.info("转码缓存测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_storage_sync(logger, work_dir: Path):
+    """测试存储目录增量同步与监视模式的去抖批处理"""
+    logger.info("测试存储目录增量同步...")
+
+    source_dir = work_dir / "sync_source"
+    for i in range(4):
+        write_test_wav(source_dir / f"clip_{i}.wav", seconds=0.5, frequency=300.0 + i * 100)
+
+    db_manager = DatabaseManager(str(work_dir / "sync.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    transcoder = AudioTranscoder(db_manager, sample_rate=8000, channels=1, use_processes=False)
+    transcoder.start()
+
+    try:
+        storage = work_dir / "sync_storage"
+        file_manager = AudioFileManager(db_manager, str(storage), transcoder=transcoder)
+        clips = [await file_manager.import_audio_file(str(source_dir / f"clip_{i}.wav")) for i in range(4)]
+        await transcoder.join()
+        assert all(clip.file_mtime and clip.file_inode for clip in clips)
+
+        # 没有变化时不重新读取任何文件
+        report = await file_manager.sync_storage()
+        assert report.scanned == 4 and report.unchanged == 4 and not report.changed
+
+        # 旧版本导入的记录只补全签名
+        await db_manager.execute("UPDATE audio_files SET file_mtime = NULL, file_inode = NULL WHERE id = ?",
+                                 (clips[0].id,))
+        report = await file_manager.sync_storage()
+        assert report.backfilled == 1 and report.unchanged == 3 and not report.updated
+
+        # 内容变化：重新探测时长，作废缓存和分析结果并重新转码
+        old_pcm = (await file_manager.get_audio_file(clips[1].id)).pcm_path
+        write_test_wav(Path(clips[1].file_path), seconds=1.5, frequency=700.0)
+        # 重命名：同一条记录，文件名和检索词随之更新
+        renamed_path = storage / "renamed_rain.wav"
+        Path(clips[2].file_path).rename(renamed_path)
+        # 删除和新增（子目录中的文件就地登记）
+        Path(clips[3].file_path).unlink()
+        write_test_wav(storage / "extra" / "dropped.wav", seconds=0.25)
+
+        report = await file_manager.sync_storage(remove_missing=False)
+        assert report.updated == [clips[1].id], report.to_dict()
+        assert report.renamed == [clips[2].id] and report.missing == [clips[3].id]
+        assert [f.filename for f in report.imported] == ["extra/dropped.wav"]
+        assert not report.failures and not Path(old_pcm).exists()
+
+        updated = await file_manager.get_audio_file(clips[1].id)
+        assert abs(updated.duration - 1.5) < 0.01 and updated.pcm_path is None
+        renamed = await file_manager.get_audio_file(clips[2].id)
+        assert renamed.file_path == str(renamed_path) and renamed.filename == "renamed_rain.wav"
+        assert [f.id for f in await file_manager.search_audio_files("renamed_rain")] == [clips[2].id]
+
+        await transcoder.join()
+        analysis = await file_manager.get_analysis(clips[1].id)
+        assert abs(analysis.duration - 1.5) < 0.01
+        assert (await file_manager.get_audio_file(clips[1].id)).pcm_path
+
+        report = await file_manager.sync_storage()
+        assert report.removed == [clips[3].id] and report.unchanged == 4
+        assert await file_manager.get_audio_file(clips[3].id) is None
+
+        # 监视模式：多个事件合并为一批，只同步涉及的路径
+        watcher = StorageWatcher(file_manager, debounce=0.05, max_delay=1.0, sync_on_start=False)
+        moved_path = storage / "extra" / "moved.wav"
+        renamed_path.rename(moved_path)
+        write_test_wav(storage / "late.wav", seconds=0.25)
+        (storage / "late.wav.8000x1.f32").write_bytes(b"")
+        for path in (renamed_path, moved_path, storage / "late.wav", storage / "late.wav.8000x1.f32"):
+            watcher.notify(str(path))
+        for _ in range(3):
+            watcher.notify(str(storage / "late.wav"))
+        await asyncio.sleep(0.3)
+
+        stats = watcher.get_stats()
+        assert stats['batches'] == 1 and stats['paths'] == 3 and stats['pending'] == 0, stats
+        report = watcher.last_report
+        assert report.renamed == [clips[2].id] and [f.filename for f in report.imported] == ["late.wav"]
+        assert await watcher.flush() is None
+
+        # 只收到移动目标路径时按 inode 找回原记录
+        (storage / "late.wav").rename(storage / "extra" / "late_moved.wav")
+        report = await file_manager.sync_paths([str(storage / "extra" / "late_moved.wav")])
+        assert len(report.renamed) == 1 and not report.imported and not report.removed
+
+        # watchdog 事件：inotify 在目录中每次增删文件时都会产生目录修改事件，不能因此全量同步
+        try:
+            from watchdog.events import (
+                DirCreatedEvent, DirModifiedEvent, DirMovedEvent, FileClosedEvent, FileCreatedEvent
+            )
+        except ImportError:
+            DirCreatedEvent = None
+        if DirCreatedEvent is not None:
+            watcher = StorageWatcher(file_manager, debounce=0.05, max_delay=1.0, sync_on_start=False)
+            handler = _StorageEventHandler(watcher)
+            write_test_wav(storage / "drizzle.wav", seconds=0.25)
+            (storage / "drizzle.wav.8000x1.f32").write_bytes(b"")
+            for event in (FileCreatedEvent(str(storage / "drizzle.wav")), DirModifiedEvent(str(storage)),
+                          FileCreatedEvent(str(storage / "drizzle.wav.8000x1.f32")), DirModifiedEvent(str(storage)),
+                          FileClosedEvent(str(storage / "drizzle.wav"))):
+                handler.on_any_event(event)
+            await asyncio.sleep(0.3)
+            stats = watcher.get_stats()
+            assert stats['subtree_syncs'] == 0 and stats['batches'] == 1 and stats['paths'] == 1, stats
+            assert [f.filename for f in watcher.last_report.imported] == ["drizzle.wav"]
+
+            # 新建目录只同步该子目录
+            pack = storage / "rain_pack"
+            pack.mkdir()
+            write_test_wav(pack / "pour.wav", seconds=0.25)
+            for event in (DirCreatedEvent(str(pack)), DirModifiedEvent(str(storage)),
+                          FileCreatedEvent(str(pack / "pour.wav")), DirModifiedEvent(str(pack))):
+                handler.on_any_event(event)
+            await asyncio.sleep(0.3)
+            report = watcher.last_report
+            assert watcher.get_stats()['subtree_syncs'] == 1
+            assert report.scanned == 1 and [f.filename for f in report.imported] == ["rain_pack/pour.wav"]
+
+            # 目录移动按 inode 识别为重命名
+            pack.rename(storage / "storm_pack")
+            handler.on_any_event(DirMovedEvent(str(pack), str(storage / "storm_pack")))
+            await asyncio.sleep(0.3)
+            report = watcher.last_report
+            assert len(report.renamed) == 1 and not report.imported and not report.removed
+            assert watcher.get_stats()['subtree_syncs'] == 2
+
+        logger.info(f"监视统计: {stats}")
+        logger.info("存储目录增量同步测试通过")
+    finally:
+        await transcoder.stop()
+        await db_manager.disconnect()
+
+
+async def test_audio_import():
+    """测试音频导入"""
+    logger = setup_logger()
+    logger.info("开始测试音频导入...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        await test_probe(logger, work_dir)
+        await test_import_directory(logger, work_dir)
+        await test_content_addressed(logger, work_dir)
+        await test_transcode(logger, work_dir)
+        await test_storage_sync(logger, work_dir)
+
+    logger.info("音频导入测试完成！所有功能正常工作。")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_audio_import())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+音频库检索测试脚本
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.database import DatabaseManager
+from src.audio.file_manager import AudioFileManager
+from src.audio.models import AudioFile
+from src.utils.logger import setup_logger
+
+
+async def create_library(db_manager: DatabaseManager, file_manager: AudioFileManager):
+    """创建测试用的音频库记录"""
+    clips = [
+        ("夏夜雨声助眠", "rain_night.mp3", "雨声", ["雨声", "助眠"]),
+        ("雨打芭蕉", "rain_leaves.mp3", "雨声", ["自然"]),
+        ("图书馆翻书声", "library_pages.mp3", "环境音", ["学习"]),
+        ("Glass tapping", "glass_tap.mp3", "敲击", ["tapping"]),
+        ("Wood tapping slow", "wood_tap.mp3", "敲击", ["tapping", "慢速"]),
+        ("耳边轻声细语", "close_whisper.mp3", "耳语", ["whisper", "助眠"]),
+    ]
+    rows = [
+        file_manager._audio_file_row(AudioFile(
+            filename=filename, title=title, category=category,
+            tags=json.dumps(tags), file_path=f"/tmp/{filename}", format="mp3"
+        ))
+        for title, filename, category, tags in clips
+    ]
+    await db_manager.insert_many('audio_files', rows)
+
+
+async def test_search(logger, work_dir: Path):
+    """测试全文检索"""
+    logger.info("测试全文检索...")
+
+    db_manager = DatabaseManager(str(work_dir / "search.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        file_manager = AudioFileManager(db_manager, str(work_dir / "storage"))
+        await create_library(db_manager, file_manager)
+        assert db_manager.fts_enabled
+
+        # 中文分词：标题中间的词也能命中，标题命中排在仅标签命中之前
+        results = await file_manager.search_audio_files("雨声")
+        assert [r.filename for r in results][:1] == ["rain_night.mp3"], [r.title for r in results]
+        assert {r.filename for r in results} == {"rain_night.mp3", "rain_leaves.mp3"}
+
+        results = await file_manager.search_audio_files("助眠")
+        assert {r.filename for r in results} == {"rain_night.mp3", "close_whisper.mp3"}
+
+        # 英文前缀、文件名和标签
+        assert len(await file_manager.search_audio_files("tap")) == 2
+        assert len(await file_manager.search_audio_files("Wood tapping")) == 1
+        assert len(await file_manager.search_audio_files("library")) == 1
+
+        # 分页
+        page1 = await file_manager.search_audio_files("tapping", limit=1)
+        page2 = await file_manager.search_audio_files("tapping", limit=1, offset=1)
+        assert len(page1) == 1 and len(page2) == 1 and page1[0].id != page2[0].id
+
+        # 更新和删除后索引保持同步
+        whisper = (await file_manager.search_audio_files("耳语"))[0]
+        await file_manager.update_audio_file(whisper.id, title="深夜掏耳朵", tags=["掏耳"])
+        assert not await file_manager.search_audio_files("轻声")
+        assert len(await file_manager.search_audio_files("掏耳")) == 1
+        await file_manager.delete_audio_file(whisper.id, delete_file=False)
+        assert not await file_manager.search_audio_files("掏耳")
+
+        assert await file_manager.search_audio_files("   ") == []
+        assert await file_manager.rebuild_search_index() == 5
+
+        logger.info("全文检索测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_pagination(logger, work_dir: Path):
+    """测试键集分页与流式遍历"""
+    logger.info("测试键集分页...")
+
+    db_manager = DatabaseManager(str(work_dir / "pagination.db"))
+    await db_manager.connect()
+    await db_manager.init_tables()
+
+    try:
+        file_manager = AudioFileManager(db_manager, str(work_dir / "storage"))
+        await db_manager.insert_many('audio_files', [
+            {'filename': f'clip_{i}.mp3', 'file_path': f'/tmp/clip_{i}.mp3',
+             'category': '雨声' if i % 3 else '敲击',
+             'created_at': f'2024-01-{1 + i % 28:02d} 00:00:00'}
+            for i in range(250)
+        ])
+
+        expected = [f.id for f in await file_manager.list_audio_files(category='雨声')]
+        assert len(expected) == 166
+
+        # 按游标翻页结果与一次性查询一致（created_at 相同的记录按 id 排序）
+        paged = []
+        after = None
+        while True:
+            page = await file_manager.list_audio_files(category='雨声', limit=20, after=after)
+            paged.extend(f.id for f in page)
+            if len(page) < 20:
+                break
+            after = (page[-1].created_at, page[-1].id)
+        assert paged == expected
+
+        streamed = [f.id async for f in file_manager.iter_audio_files(category='雨声', chunk_size=32)]
+        assert streamed == expected
+        assert len([f async for f in file_manager.iter_audio_files(chunk_size=100)]) == 250
+
+        # 查询计划：沿复合索引扫描，不需要临时排序
+        plan = await db_manager.fetchall(
+            "EXPLAIN QUERY PLAN SELECT * FROM audio_files WHERE category = ? "
+            "AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT 20",
+            ('雨声', '2024-01-15 00:00:00', 100)
+        )
+        details = ' '.join(row['detail'] for row in plan)
+        assert 'idx_audio_files_category_created' in details and 'TEMP B-TREE' not in details, details
+
+        logger.info("键集分页测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_audio_library():
+    """测试音频库"""
+    logger = setup_logger()
+    logger.info("开始测试音频库...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        await test_search(logger, work_dir)
+        await test_pagination(logger, work_dir)
+
+    logger.info("音频库测试完成！所有功能正常工作。")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_audio_library())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+模型序列化编解码测试脚本
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.utils import codec
+from src.utils.codec import get_codec, codec_from_config, encode_model, decode_model, SCHEMA_VERSION
+from src.utils.config import Config
+from src.utils.logger import setup_logger
+from codec_samples import sample_models
+
+
+async def test_round_trip(logger):
+    """测试各编解码格式的往返"""
+    logger.info("测试编解码往返...")
+
+    codecs = [get_codec('json')]
+    if codec.msgpack is not None:
+        codecs.append(get_codec('msgpack'))
+    else:
+        logger.warning("未安装 msgpack，跳过 msgpack 往返测试")
+        try:
+            get_codec('msgpack')
+            raise AssertionError("未安装 msgpack 时应当报错")
+        except RuntimeError:
+            pass
+
+    for current in codecs:
+        for model in sample_models():
+            data = current.dumps(model)
+            assert isinstance(data, bytes)
+            restored = current.loads(data)
+            assert restored == model, (current.name, model, restored)
+            assert type(restored) is type(model)
+        logger.info(f"{current.name} 往返测试通过")
+
+    assert codec_from_config(Config({'serialization': {'codec': 'json'}})).name == 'json'
+    try:
+        get_codec('xml')
+        raise AssertionError("未知格式应当报错")
+    except ValueError:
+        pass
+
+
+async def test_schema_version(logger):
+    """测试版本标签和旧数据兼容"""
+    logger.info("测试编码版本...")
+
+    message = sample_models()[0]
+    version, tag, values = encode_model(message)
+    assert version == SCHEMA_VERSION and tag == 'chat'
+    assert values[1][1] == '小明'  # 嵌套的 User 编码为数组
+
+    # 旧版本写入的数据缺少末尾新增的字段时取默认值
+    restored = decode_model([version, tag, values[:-1]])
+    assert restored.platform == 'douyin' and restored.content == message.content
+
+    # 更高版本的数据拒绝解码
+    for bad in ([SCHEMA_VERSION + 1, tag, values], [version, 'unknown', values]):
+        try:
+            decode_model(bad)
+            raise AssertionError("应当拒绝解码")
+        except ValueError:
+            pass
+
+    try:
+        encode_model(object())
+        raise AssertionError("未注册的类型应当报错")
+    except TypeError:
+        pass
+
+    logger.info("编码版本测试通过")
+
+
+async def test_codec():
+    """测试序列化编解码"""
+    logger = setup_logger()
+    logger.info("开始测试序列化编解码...")
+
+    await test_round_trip(logger)
+    await test_schema_version(logger)
+
+    logger.info("序列化编解码测试完成！所有功能正常工作。")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_codec())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+数据库管理器测试脚本
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.database import DatabaseManager
+from src.utils.config import Config
+from src.utils.logger import setup_logger
+
+
+async def test_pooled_mode(logger, work_dir: Path):
+    """测试读写分离连接池"""
+    logger.info("测试连接池模式...")
+
+    config = Config({
+        'database': {
+            'path': str(work_dir / "pooled.db"),
+            'pool_size': 2,
+            'synchronous': 'normal',
+            'mmap_size': 1024 * 1024,
+            'cache_size': -2000
+        }
+    })
+    db_manager = DatabaseManager.from_config(config)
+
+    # 非法的 journal_mode 会在构造时被拒绝（它会被拼接进 PRAGMA 语句）
+    try:
+        DatabaseManager(str(work_dir / "bad.db"), journal_mode='wal; DROP TABLE playlists')
+        assert False, "非法 journal_mode 应抛出 ValueError"
+    except ValueError:
+        pass
+
+    try:
+        await db_manager.connect()
+        await db_manager.init_tables()
+        assert db_manager.is_pooled
+
+        mode = await db_manager.fetchone("PRAGMA journal_mode")
+        assert mode['journal_mode'].lower() == 'wal', mode
+
+        playlist_id = await db_manager.insert('playlists', {'name': '连接池测试'})
+
+        # 并发读取应使用不同的只读连接，且能看到已提交的写入
+        results = await asyncio.gather(*[
+            db_manager.fetchone("SELECT name FROM playlists WHERE id = ?", (playlist_id,))
+            for _ in range(5)
+        ])
+        assert all(row['name'] == '连接池测试' for row in results)
+
+        # 只读连接不允许写入
+        try:
+            async with db_manager._reader() as reader:
+                await reader.execute("DELETE FROM playlists")
+            raise AssertionError("只读连接不应允许写入")
+        except Exception as e:
+            if isinstance(e, AssertionError):
+                raise
+
+        logger.info("连接池模式测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_write_behind(logger, work_dir: Path):
+    """测试写回队列"""
+    logger.info("测试写回队列...")
+
+    db_manager = DatabaseManager(
+        str(work_dir / "write_behind.db"), pool_size=1,
+        write_behind=True, batch_interval_ms=20, batch_max_statements=50
+    )
+
+    try:
+        await db_manager.connect()
+        await db_manager.init_tables()
+
+        # 并发写入会被合并到少量事务中，每个等待方都能拿到自己的 lastrowid
+        ids = await asyncio.gather(*[
+            db_manager.insert('playlists', {'name': f'批量{i}'}) for i in range(120)
+        ])
+        assert len(set(ids)) == 120
+        stats = db_manager.get_write_stats()
+        assert stats['statements'] == 120
+        assert stats['batches'] < 120, stats
+
+        # 同一批次中失败的语句只影响自己的等待方
+        results = await asyncio.gather(
+            db_manager.insert('system_config', {'key': 'k', 'value': '1'}),
+            db_manager.insert('system_config', {'key': 'k', 'value': '2'}),
+            db_manager.insert('system_config', {'key': 'k2', 'value': '3'}),
+            return_exceptions=True
+        )
+        assert isinstance(results[1], Exception), results
+        assert not isinstance(results[0], Exception) and not isinstance(results[2], Exception)
+
+        # rowcount 在批次提交后返回
+        rows = await db_manager.update('playlists', {'description': 'x'}, 'id <= ?', (10,))
+        assert rows == 10
+
+        # flush() 之后读连接可以看到所有已排队的写入
+        pending = asyncio.ensure_future(db_manager.execute("DELETE FROM system_config WHERE key = 'k2'"))
+        await asyncio.sleep(0)
+        await db_manager.flush()
+        row = await db_manager.fetchone("SELECT COUNT(*) AS n FROM system_config")
+        assert row['n'] == 1
+        assert await pending == 1
+
+        # 持久化屏障：立即提交所在批次
+        await db_manager.insert('playlists', {'name': 'durable'}, durable=True)
+        logger.info(f"写回队列统计: {db_manager.get_write_stats()}")
+        logger.info("写回队列测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_bulk_operations(logger, work_dir: Path):
+    """测试批量写入接口"""
+    logger.info("测试批量写入...")
+
+    db_manager = DatabaseManager(str(work_dir / "bulk.db"))
+
+    try:
+        await db_manager.connect()
+        await db_manager.init_tables()
+
+        rows = [
+            {'filename': f'clip_{i}.mp3', 'title': f'片段{i}', 'file_path': f'/tmp/clip_{i}.mp3'}
+            for i in range(1000)
+        ]
+        assert await db_manager.insert_many('audio_files', rows) == 1000
+
+        # 冲突时更新已有记录，新记录正常插入
+        upserts = [
+            {'filename': 'clip_0.mp3', 'title': '新标题', 'file_path': '/tmp/clip_0.mp3'},
+            {'filename': 'clip_new.mp3', 'title': '新片段', 'file_path': '/tmp/clip_new.mp3'},
+        ]
+        await db_manager.upsert_many('audio_files', upserts)
+        row = await db_manager.fetchone("SELECT title FROM audio_files WHERE filename = 'clip_0.mp3'")
+        assert row['title'] == '新标题'
+        row = await db_manager.fetchone("SELECT COUNT(*) AS n FROM audio_files")
+        assert row['n'] == 1001
+
+        # 复合冲突键
+        users = [
+            {'platform_user_id': 'u1', 'platform': 'douyin', 'username': 'a', 'interaction_count': 1},
+            {'platform_user_id': 'u1', 'platform': 'douyin', 'username': 'b', 'interaction_count': 2},
+        ]
+        await db_manager.upsert_many('users', users)
+        row = await db_manager.fetchone("SELECT username, interaction_count FROM users")
+        assert row == {'username': 'b', 'interaction_count': 2}, row
+
+        # 按主键批量更新（列签名不同的行分组执行）
+        updated = await db_manager.update_many('audio_files', [
+            {'id': 1, 'category': '雨声'},
+            {'id': 2, 'category': '雨声'},
+            {'id': 3, 'category': '敲击', 'title': '敲击声'},
+        ])
+        assert updated == 3
+
+        # 失败时整个批次回滚
+        try:
+            await db_manager.insert_many('audio_files', [
+                {'filename': 'ok.mp3', 'file_path': '/tmp/ok.mp3'},
+                {'filename': 'clip_1.mp3', 'file_path': '/tmp/clip_1.mp3'},
+            ])
+            raise AssertionError("重复文件名应导致批量插入失败")
+        except Exception as e:
+            if isinstance(e, AssertionError):
+                raise
+        row = await db_manager.fetchone("SELECT COUNT(*) AS n FROM audio_files WHERE filename = 'ok.mp3'")
+        assert row['n'] == 0
+
+        logger.info("批量写入测试通过")
+    finally:
+        await db_manager.disconnect()
+
+
+async def test_database():
+    """测试数据库管理器"""
+    logger = setup_logger()
+    logger.info("开始测试数据库管理器...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        await test_pooled_mode(logger, work_dir)
+        await test_write_behind(logger, work_dir)
+        await test_bulk_operations(logger, work_dir)
+
+    logger.info("数据库管理器测试完成！所有功能正常工作。")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_database())
@@ -0,0 +1,728 @@
+#!/usr/bin/env python3
+"""
+抖音消息管线离线测试脚本（不需要浏览器和登录）
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.database import DatabaseManager
+from src.core.event_bus import EventBus, BackpressurePolicy
+from src.core.gift_scheduler import GiftMapping, GiftMappingIndex, GiftScheduler
+from src.platforms.dedup import MessageDeduplicator
+from src.platforms.douyin_client import DouyinClient
+from src.platforms.models import (
+    MessageType, User, Gift, GiftMessage, ChatMessage, LikeMessage,
+    CompactChatMessage, CompactGiftMessage, CompactLikeMessage
+)
+from src.platforms.mock_live_room import MockLiveRoomServer
+from src.platforms.replay import (
+    MessageRecorder, MessageReplayer, generate_chat_flood, generate_gift_storm, merge_streams, write_stream
+)
+from src.platforms.room_manager import RoomManager, RoomMessage, RoomSpec
+from src.platforms.webdriver_executor import AsyncWebDriver
+from src.utils.config import Config
+from src.utils.logger import setup_logger
+
+
+class ScriptedDriver:
+    """按顺序返回预设结果的 WebDriver 替身，只记录 execute_script 调用"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        return self.results.pop(0) if self.results else {'items': [], 'dropped': 0, 'likes': None}
+
+    def quit(self):
+        pass
+
+
+def create_client(**capture) -> DouyinClient:
+    """创建不启动浏览器的客户端"""
+    return DouyinClient(Config({'douyin': {'capture': capture}}))
+
+
+async def test_push_capture(logger):
+    """测试推送式采集的批量取回"""
+    logger.info("测试推送式采集...")
+
+    client = create_client(mode='push')
+    received = {MessageType.CHAT: [], MessageType.GIFT: [], MessageType.LIKE: []}
+    for message_type, messages in received.items():
+        client.add_message_callback(message_type, messages.append)
+
+    now = int(time.time() * 1000)
+    client.driver = ScriptedDriver([
+        True,  # 安装采集器
+        {'items': [
+            {'kind': 'chat', 'seq': 1, 'ts': now - 40, 'user': '小明', 'content': '晚上好'},
+            {'kind': 'gift', 'seq': 2, 'ts': now - 20, 'user': '小红', 'gift': '小心心', 'count': 'x3'},
+            {'kind': 'chat', 'seq': 3, 'ts': now, 'user': '', 'content': '来了'},
+        ], 'dropped': 0, 'likes': '1.2万'},
+        {'items': [], 'dropped': 5, 'likes': '1.3万'},
+        None,  # 页面刷新，采集器丢失
+        True,  # 重新注入
+    ])
+
+    assert await client._install_capture()
+    assert await client._drain_capture()
+    assert await client._drain_capture()
+    assert not await client._drain_capture()
+    assert await client._install_capture()
+    await client.event_bus.join()
+
+    chats = received[MessageType.CHAT]
+    assert [m.content for m in chats] == ['晚上好', '来了']
+    assert chats[1].user.nickname == '匿名用户'
+    assert chats[0].message_id != chats[1].message_id
+    assert chats[0].timestamp.timestamp() * 1000 == now - 40
+
+    gift = received[MessageType.GIFT][0]
+    assert gift.gift.name == '小心心' and gift.count == 3 and gift.total_value == 3.0
+
+    # 第一次读取点赞数只作为基准，之后按差值生成点赞消息
+    assert [m.count for m in received[MessageType.LIKE]] == [1000]
+
+    stats = client.get_capture_stats()
+    assert stats['captured'] == 3 and stats['dropped'] == 5
+    # 每个周期只有一次 WebDriver 往返
+    assert stats['round_trips'] == client.driver.calls == 5
+
+    await client.stop()
+
+    logger.info(f"采集统计: {stats}")
+    logger.info("推送式采集测试通过")
+
+
+async def test_dedup(logger):
+    """测试消息去重"""
+    logger.info("测试消息去重...")
+
+    dedup = MessageDeduplicator(capacity=3, ttl=60.0, window=3.0)
+
+    # 同一节点反复读取
+    assert not dedup.is_duplicate('chat', '小明', '晚上好', node_id=1, now=0.0)
+    assert dedup.seen_node(1, now=1.0)
+    assert dedup.is_duplicate('chat', '小明', '晚上好', node_id=1, now=10.0)
+
+    # 重新渲染产生的新节点在窗口内按内容指纹去重，窗口外视为用户重复发送
+    assert dedup.is_duplicate('chat', '小明', '晚上好', node_id=2, now=1.0)
+    assert dedup.seen_node(2, now=1.5)
+    assert not dedup.is_duplicate('chat', '小明', '晚上好', node_id=3, now=5.0)
+    # 其他用户的相同内容不是重复
+    assert not dedup.is_duplicate('chat', '小红', '晚上好', node_id=4, now=5.0)
+
+    # 容量满时淘汰最旧的节点，过期后自动清理
+    assert not dedup.seen_node(1, now=5.0)
+    assert dedup.is_duplicate('chat', '小红', '晚上好', now=6.0)
+    assert not dedup.is_duplicate('chat', '小红', '晚上好', now=100.0)
+
+    stats = dedup.get_stats()
+    assert stats['checked'] == 7 and stats['unique'] == 4
+    assert stats['node_duplicates'] == 1 and stats['fingerprint_duplicates'] == 2
+    assert stats['nodes'] <= 3 and stats['fingerprints'] <= 3 and stats['evicted'] >= 1
+
+    # 客户端：推送批次中重新渲染的消息只触发一次回调
+    client = create_client(mode='push')
+    chats = []
+    client.add_message_callback(MessageType.CHAT, chats.append)
+    now = int(time.time() * 1000)
+    client.driver = ScriptedDriver([True, {'items': [
+        {'kind': 'chat', 'seq': 1, 'ts': now, 'user': '小明', 'content': '666'},
+        {'kind': 'chat', 'seq': 2, 'ts': now, 'user': '小明', 'content': '666'},
+        {'kind': 'chat', 'seq': 3, 'ts': now, 'user': '小红', 'content': '666'},
+        {'kind': 'gift', 'seq': 4, 'ts': now, 'user': '小红', 'gift': '玫瑰', 'count': 'x1'},
+        {'kind': 'gift', 'seq': 5, 'ts': now, 'user': '小红', 'gift': '玫瑰', 'count': 'x2'},
+    ], 'dropped': 0, 'likes': None}])
+    gifts = []
+    client.add_message_callback(MessageType.GIFT, gifts.append)
+    await client._install_capture()
+    await client._drain_capture()
+    await client.event_bus.join()
+    assert [m.user.nickname for m in chats] == ['小明', '小红']
+    # 连击的每一档数量不同，不会被去重
+    assert [m.count for m in gifts] == [1, 2]
+    assert client.get_capture_stats()['dedup']['fingerprint_duplicates'] == 1
+    await client.stop()
+
+    logger.info(f"去重统计: {stats}")
+    logger.info("消息去重测试通过")
+
+
+async def test_event_bus(logger):
+    """测试事件总线的路由、并发和背压策略"""
+    logger.info("测试事件总线...")
+
+    bus = EventBus(maxsize=4)
+    fast, slow, everything = [], [], []
+    release = asyncio.Event()
+
+    async def slow_handler(message):
+        await release.wait()
+        slow.append(message)
+
+    bus.subscribe(fast.append, topics=[MessageType.CHAT], name='fast', maxsize=100)
+    slow_sub = bus.subscribe(slow_handler, topics=[MessageType.CHAT], name='slow')
+    bus.subscribe(everything.append, name='all', maxsize=100)
+
+    # 慢订阅者不阻塞发布者和其它订阅者；队列满时丢弃最旧的消息
+    started = time.monotonic()
+    for i in range(10):
+        assert await bus.publish(MessageType.CHAT, i) == 3
+    assert await bus.publish(MessageType.GIFT, 'gift') == 1
+    assert time.monotonic() - started < 0.1
+    await asyncio.sleep(0.01)
+    assert fast == list(range(10)) and everything == list(range(10)) + ['gift']
+    release.set()
+    await bus.join()
+    # 发布期间没有让出事件循环，慢订阅者的队列只保留最新的 4 条
+    assert slow == [6, 7, 8, 9], slow
+    assert slow_sub.get_stats()['dropped'] == 6
+
+    # coalesce：积压的点赞合并为一条，数量相加
+    likes = []
+    gate = asyncio.Event()
+
+    async def like_handler(message):
+        await gate.wait()
+        likes.append(message)
+
+    bus.subscribe(like_handler, topics=[MessageType.LIKE], name='likes',
+                  policy=BackpressurePolicy.COALESCE, merge=lambda old, new: old + new)
+    bus.publish_nowait(MessageType.LIKE, 1)
+    await asyncio.sleep(0)  # 第一条已被取走，正在处理
+    for count in (2, 3, 4):
+        bus.publish_nowait(MessageType.LIKE, count)
+    gate.set()
+    await bus.join()
+    assert likes == [1, 9], likes
+
+    # 客户端的点赞合并：多个订阅者共享同一条消息，合并时不能修改它
+    client = create_client(mode='push')
+    like_gate = asyncio.Event()
+    received = {'a': [], 'b': []}
+
+    def like_receiver(name):
+        async def receive(message):
+            await like_gate.wait()
+            received[name].append(message.count)
+        return receive
+
+    for name in received:
+        client.add_message_callback(MessageType.LIKE, like_receiver(name))
+    for i in range(4):
+        await client._trigger_callbacks(MessageType.LIKE, LikeMessage(f'like_{i}', User('u1', '小明')))
+        await asyncio.sleep(0)
+    like_gate.set()
+    await client.event_bus.join()
+    assert all(sum(counts) == 4 for counts in received.values()), received
+    await client.stop()
+
+    # block：发布者等待队列腾出空间，超时后丢弃
+    recorded = []
+
+    async def recorder(message):
+        await asyncio.sleep(0.02)
+        recorded.append(message)
+
+    bus.block_timeout = 0.5
+    recorder_sub = bus.subscribe(recorder, topics=[MessageType.FOLLOW], name='recorder', maxsize=2,
+                                 policy=BackpressurePolicy.BLOCK)
+    for i in range(6):
+        await bus.publish(MessageType.FOLLOW, i)
+    await bus.join()
+    assert recorded == list(range(6))
+    assert recorder_sub.get_stats()['blocked'] > 0 and recorder_sub.get_stats()['dropped'] == 0
+
+    stuck_gate = asyncio.Event()
+
+    async def stuck_handler(message):
+        await stuck_gate.wait()
+
+    bus.block_timeout = 0.01
+    stuck = bus.subscribe(stuck_handler, topics=['stuck'], maxsize=1, policy=BackpressurePolicy.BLOCK)
+    for i in range(3):
+        await bus.publish('stuck', i)
+    # 第一条被取走处理，第二条排队，第三条等待超时后丢弃
+    assert stuck.get_stats()['dropped'] == 1
+    stuck_gate.set()
+
+    # 并发处理
+    active, peak = [0], [0]
+
+    async def worker(message):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+
+    bus.subscribe(worker, topics=['parallel'], concurrency=4, maxsize=100)
+    for i in range(20):
+        bus.publish_nowait('parallel', i)
+    await bus.join()
+    assert peak[0] == 4
+
+    stats = bus.get_stats()
+    slow_stats = next(s for s in stats['subscribers'] if s['name'] == 'slow')
+    assert slow_stats['lag_ms_max'] > 0 and slow_stats['latency_ms_p95'] >= 0
+    assert slow_stats['topics'] == ['chat']
+
+    slow_workers = list(slow_sub._workers)
+    await bus.unsubscribe(slow_sub)
+    assert slow_workers and all(task.done() for task in slow_workers)
+    assert await bus.publish(MessageType.CHAT, 'after') == 2
+    await bus.close()
+
+    logger.info(f"慢订阅者统计: {slow_stats}")
+    logger.info("事件总线测试通过")
+
+
+class SlowDriver:
+    """每次调用都阻塞一段时间的 WebDriver 替身"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.quit_called = False
+
+    def execute_script(self, script, *args):
+        time.sleep(self.delay)
+        return {'items': [], 'dropped': 0, 'likes': None}
+
+    def quit(self):
+        self.quit_called = True
+
+
+async def test_webdriver_offload(logger):
+    """测试 WebDriver 调用不阻塞事件循环"""
+    logger.info("测试 WebDriver 线程化...")
+
+    client = create_client(mode='push')
+    driver = SlowDriver(0.3)
+    client.driver = driver
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    assert await client._drain_capture()
+    task.cancel()
+    # 阻塞调用期间事件循环仍在调度其他任务
+    assert ticks >= 10, ticks
+
+    # 超时后事件循环不再等待
+    browser = AsyncWebDriver(driver, timeout=0.05)
+    try:
+        await browser.execute_script('return 1')
+        assert False, "应当超时"
+    except asyncio.TimeoutError:
+        pass
+    assert browser.get_stats()['timeouts'] == 1
+    await browser.quit()
+
+    await client.stop()
+    assert driver.quit_called and client.driver is None
+    assert client.get_capture_stats()['webdriver']['calls'] == 2
+
+    logger.info(f"阻塞调用期间事件循环调度了 {ticks} 次")
+    logger.info("WebDriver 线程化测试通过")
+
+
+async def test_compact_messages(logger):
+    """测试紧凑消息模型"""
+    logger.info("测试紧凑消息...")
+
+    client = create_client(mode='push', compact_messages=True)
+    received = {MessageType.CHAT: [], MessageType.GIFT: [], MessageType.LIKE: []}
+    for message_type, messages in received.items():
+        client.add_message_callback(message_type, messages.append)
+
+    now = int(time.time() * 1000)
+    client._last_like_count = 100
+    await client._process_capture_batch({'items': [
+        {'kind': 'chat', 'seq': 1, 'ts': now, 'user': '小明', 'content': '晚上好'},
+        {'kind': 'gift', 'seq': 2, 'ts': now, 'user': '小红', 'gift': '小心心', 'count': 'x3'},
+    ], 'dropped': 0, 'likes': '120'})
+    await client.event_bus.join()
+
+    chat, = received[MessageType.CHAT]
+    gift, = received[MessageType.GIFT]
+    like, = received[MessageType.LIKE]
+    assert isinstance(chat, CompactChatMessage) and chat.content == '晚上好'
+    assert isinstance(gift, CompactGiftMessage) and gift.count == 3 and gift.total_value == 3.0
+    assert isinstance(like, CompactLikeMessage) and like.count == 20
+    assert not hasattr(chat, '__dict__')
+
+    # 与完整模型互相转换，to_dict() 结构一致
+    full = chat.to_message()
+    assert isinstance(full, ChatMessage) and CompactChatMessage.from_message(full) == chat
+    assert chat.to_dict() == {**full.to_dict(), 'user': {'user_id': chat.user_id, 'nickname': '小明'}}
+    assert CompactGiftMessage.from_message(gift.to_message()) == gift
+    restored = CompactLikeMessage.from_message(like.to_message())  # datetime 精度为微秒
+    assert abs(restored.timestamp - like.timestamp) < 1e-5 and restored._replace(timestamp=like.timestamp) == like
+
+    # 点赞合并返回新的元组
+    merged = client._merge_likes(like, like._replace(count=5))
+    assert merged.count == 25 and like.count == 20
+
+    await client.stop()
+    logger.info("紧凑消息测试通过")
+
+
+def gift_message(user: User, name: str, price: float = 1.0, count: int = 1, combo: int = 1) -> GiftMessage:
+    """创建礼物消息"""
+    return GiftMessage(message_id=f"{user.user_id}_{name}_{combo}", user=user,
+                       gift=Gift(gift_id=name, name=name, price=price), count=count, combo_count=combo)
+
+
+async def test_gift_scheduler(logger, work_dir: Path):
+    """测试礼物答谢优先队列"""
+    logger.info("测试礼物答谢调度...")
+
+    db_manager = DatabaseManager(str(work_dir / "gifts.db"))
+    await db_manager.connect()
+    try:
+        await db_manager.init_tables()
+        index = GiftMappingIndex(db_manager, mappings={'玫瑰': 'rose.mp3', '火箭': 'rocket.mp3'},
+                                 default_audio='thanks.mp3')
+        await index.upsert(GiftMapping('火箭', gift_value=500.0, priority=2))
+        await index.upsert(GiftMapping('气泡', enabled=False))
+
+        index = GiftMappingIndex(db_manager, mappings={'玫瑰': 'rose.mp3', '火箭': 'rocket.mp3'},
+                                 default_audio='thanks.mp3')
+        assert await index.load() == 3
+        assert index.get('火箭').priority == 2 and index.get('火箭').audio_filename == 'rocket.mp3'
+        assert index.get('小心心').audio_filename == 'thanks.mp3'
+    finally:
+        await db_manager.disconnect()
+
+    scheduler = GiftScheduler(index, max_queue_size=3, priority_multiplier=2.0, min_gift_value=1.0,
+                              combo_window=1.0, combo_max_delay=3.0)
+    fan, vip = User('u1', '路人'), User('u2', '大哥', vip_level=3)
+
+    # 连击合并：窗口内的同一用户同一礼物合并为一次答谢
+    for combo in range(1, 6):
+        assert scheduler.offer(gift_message(fan, '玫瑰', combo=combo), now=combo * 0.5)
+    assert len(scheduler) == 1 and scheduler.pop(now=3.0) is None  # 窗口未结束
+    reaction = scheduler.pop(now=3.6)
+    assert reaction.count == 5 and reaction.combo_count == 5 and reaction.total_value == 5.0
+
+    # 客户端产生的连击消息：数量是累计的 x1、x2、x3，合并后为 3 个而不是 6 个
+    client = create_client(mode='push')
+    client.add_message_callback(MessageType.GIFT, lambda message: scheduler.offer(message, now=4.0))
+    now = int(time.time() * 1000)
+    await client._process_capture_batch({'items': [
+        {'kind': 'gift', 'seq': seq, 'ts': now + seq, 'user': '小红', 'gift': '玫瑰', 'count': f'x{seq}'}
+        for seq in (1, 2, 3)
+    ], 'dropped': 0, 'likes': None})
+    await client.event_bus.join()
+    await client.stop()
+    reaction = scheduler.pop(now=6.0)
+    assert reaction.messages == 3 and reaction.count == 3 and reaction.combo_count == 3
+    assert reaction.total_value == 3.0 and reaction.priority == 3.0
+
+    # 过滤：价值不足、禁用的礼物
+    assert not scheduler.offer(gift_message(fan, '玫瑰', price=0.1), now=10.0)
+    assert not scheduler.offer(gift_message(fan, '气泡'), now=10.0)
+
+    # 刷屏：按价值和 VIP 倍数排序，队列满时淘汰优先级最低的答谢
+    scheduler.offer(gift_message(fan, '玫瑰', price=1.0), now=10.0)
+    scheduler.offer(gift_message(fan, '小心心', price=3.0), now=10.0)
+    scheduler.offer(gift_message(vip, '小心心', price=2.0), now=10.0)   # 2 × 2 = 4
+    scheduler.offer(gift_message(fan, '火箭', price=1.0), now=10.0)     # 500 × 2 = 1000
+    assert len(scheduler) == 3
+
+    order = []
+    while True:
+        reaction = scheduler.pop(now=20.0)
+        if reaction is None:
+            break
+        order.append((reaction.user.user_id, reaction.gift_name, reaction.priority))
+    assert order == [('u1', '火箭', 1000.0), ('u2', '小心心', 4.0), ('u1', '小心心', 3.0)], order
+
+    # 持续连击不会无限推迟答谢
+    for i in range(7):
+        scheduler.offer(gift_message(vip, '玫瑰', combo=i + 1), now=30.0 + i * 0.5)
+        if i < 6:
+            assert scheduler.pop(now=30.0 + i * 0.5) is None
+    assert scheduler.pop(now=33.0).combo_count == 7
+
+    # 异步等待连击窗口结束
+    scheduler = GiftScheduler(index, combo_window=0.05)
+    scheduler.offer(gift_message(fan, '玫瑰'))
+    reaction = await asyncio.wait_for(scheduler.get(), 1.0)
+    assert reaction.gift_name == '玫瑰'
+
+    stats = scheduler.get_stats()
+    assert stats['dispatched'] == 1 and stats['queue_size'] == 0
+    logger.info("礼物答谢调度测试通过")
+
+
+async def test_record_replay(logger, work_dir: Path):
+    """测试消息录制与回放"""
+    logger.info("测试录制与回放...")
+
+    # 录制客户端产生的消息
+    path = work_dir / "session.rec"
+    client = create_client(mode='push')
+    recorder = MessageRecorder(path)
+    recorder.attach(client)
+    now = int(time.time() * 1000)
+    client._last_like_count = 10
+    await client._process_capture_batch({'items': [
+        {'kind': 'chat', 'seq': 1, 'ts': now, 'user': '小明', 'content': '晚上好'},
+        {'kind': 'gift', 'seq': 2, 'ts': now, 'user': '小红', 'gift': '玫瑰', 'count': 'x2'},
+    ], 'dropped': 0, 'likes': '15'})
+    await client.event_bus.join()
+    recorder.close()
+    await client.stop()
+    assert recorder.get_stats()['records'] == 3
+
+    # 追加写入，文件末尾的不完整记录被忽略
+    with MessageRecorder(path) as appender:
+        appender.record(ChatMessage('c9', User('u9', '小刚'), '追加', datetime.now()))
+    with open(path, 'ab') as f:
+        f.write(b'\x00\x00\x01\x00{')
+
+    replayer = MessageReplayer(path)
+    records = list(replayer.read())
+    assert [type(m).__name__ for _, m in records] == ['ChatMessage', 'GiftMessage', 'LikeMessage', 'ChatMessage']
+    assert records[1][1].count == 2 and records[2][1].count == 5
+
+    # 中途退出后再次追加：先截掉不完整的记录，新记录不会被其长度前缀吞掉
+    crashed = work_dir / "crashed.rec"
+    crashed.write_bytes(path.read_bytes()[:-10])
+    assert len(list(MessageReplayer(crashed).read())) == 3
+    with MessageRecorder(crashed) as appender:
+        for i in range(3):
+            appender.record(ChatMessage(f'r{i}', User('u9', '小刚'), f'恢复 {i}', datetime.now()))
+    resumed = [m for _, m in MessageReplayer(crashed).read()]
+    assert len(resumed) == 6 and [m.message_id for m in resumed[3:]] == ['r0', 'r1', 'r2']
+
+    # 长度完整但内容损坏的记录：停止读取而不是抛出异常
+    with open(crashed, 'ab') as f:
+        f.write(b'\x00\x00\x00\x03{x}')
+    assert len(list(MessageReplayer(crashed).read())) == 6
+
+    # 回放到新的客户端
+    client = create_client(mode='push')
+    received = []
+    for message_type in (MessageType.CHAT, MessageType.GIFT, MessageType.LIKE):
+        client.add_message_callback(message_type, received.append)
+    stats = await replayer.replay(client, speed=None)
+    await client.event_bus.join()
+    assert stats['messages'] == 4 and stats['chat'] == 2
+    # 每种消息类型是独立的订阅者，跨类型的到达顺序不固定
+    assert sorted(m.message_id for m in received) == sorted(m.message_id for _, m in records)
+    assert records[0][1] in received
+    await client.stop()
+
+    # 合成流：时间有序、连击递增，按倍速回放
+    storm = list(generate_gift_storm(rate=50, duration=1.0, start=0.0, seed=1))
+    flood = list(generate_chat_flood(rate=500, duration=1.0, start=0.0, seed=1))
+    assert all(a[0] <= b[0] for a, b in zip(storm, storm[1:]))
+    assert any(m.combo_count > 1 for _, m in storm) and 400 < len(flood) < 600
+
+    synthetic = work_dir / "storm.rec"
+    total = write_stream(synthetic, merge_streams(storm, flood))
+    assert total == len(storm) + len(flood)
+
+    published = []
+
+    async def publish(message_type, message):
+        published.append(message_type)
+
+    stats = await MessageReplayer(synthetic).replay(publish, speed=10.0)
+    assert stats['messages'] == total and 0.05 < stats['elapsed'] < 0.5, stats
+    assert stats['gift'] == len(storm)
+
+    logger.info(f"合成流回放: {stats['messages']} 条，{stats['throughput']:.0f} 条/秒，"
+                f"延迟 p95 {stats['lag_ms_p95']:.1f}ms")
+    logger.info("录制与回放测试通过")
+
+
+async def test_mock_live_room(logger):
+    """测试本地模拟直播间页面"""
+    logger.info("测试模拟直播间...")
+
+    with MockLiveRoomServer(chat_rate=50) as server:
+        url = server.room_url('r1', chat=300, rerender=0.2)
+        page = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: urllib.request.urlopen(url, timeout=5).read().decode('utf-8')
+        )
+        assert server.requests == 1
+
+    # 与 _get_room_info、_listen_* 和推送式采集读取的结构一致
+    for marker in ('data-e2e="live-title">模拟直播间 r1', 'data-e2e="live-anchor-name"',
+                   'class="viewer-count"', 'class="like-count"', '"chatRate": 300.0', '"rerender": 0.2',
+                   '"chatClass": "webcast-chatroom___item"', '"giftClass": "gift-message"',
+                   "span('username'", "span('content'", "span('gift-name'", "span('gift-count'",
+                   'window.__mockRoom'):
+        assert marker in page, marker
+
+    logger.info("模拟直播间测试通过")
+
+
+class OfflineRoomClient(DouyinClient):
+    """不启动浏览器的直播间客户端：每个采集周期推送一条本直播间的弹幕"""
+
+    launches = []
+
+    async def start(self):
+        OfflineRoomClient.launches.append((self.room_id, time.monotonic()))
+        self.driver = LiveScriptedDriver(self.room_id)
+        self.is_logged_in = True
+
+    async def connect_to_room(self, room_url: str = None) -> bool:
+        self.is_connected = True
+        return True
+
+
+class LiveScriptedDriver(ScriptedDriver):
+    """持续产生弹幕的 WebDriver 替身"""
+
+    def __init__(self, room_id):
+        super().__init__([True])
+        self.room_id = room_id
+        self.seq = 0
+
+    def execute_script(self, script, *args):
+        if self.results:
+            return super().execute_script(script, *args)
+        self.calls += 1
+        self.seq += 1
+        return {'items': [{'kind': 'chat', 'seq': self.seq, 'ts': int(time.time() * 1000),
+                           'user': f'观众{self.seq}', 'content': f'{self.room_id} 弹幕 {self.seq}'}],
+                'dropped': 0, 'likes': None}
+
+
+async def wait_for(predicate, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+async def test_room_manager(logger):
+    """测试多直播间管理：合并消息流、浏览器上限、错开启动、卡住重启和背压"""
+    logger.info("测试多直播间管理...")
+
+    config = Config({'douyin': {'capture': {'mode': 'push', 'interval': 0.02}}})
+    manager = RoomManager(
+        config, rooms=['a', {'room_id': 'b', 'capture': {'interval': 0.04}}, RoomSpec('c')],
+        max_browsers=2, stagger=0.05, health_interval=60.0, stale_after=5.0, max_restarts=1,
+        client_factory=OfflineRoomClient
+    )
+    OfflineRoomClient.launches.clear()
+
+    merged, only_b = [], []
+    manager.subscribe(merged.append, message_types=[MessageType.CHAT], maxsize=10000)
+    manager.subscribe(only_b.append, rooms=['b'], maxsize=10000)
+
+    await manager.start()
+    await wait_for(lambda: manager.get_stats()['running'] == 2)
+    stats = manager.get_stats()
+    assert stats['capacity'] == 2 and stats['queued'] == 1
+    assert manager.get_health('c').state == 'queued'
+    # 直播间自己的配置覆盖 douyin.*
+    assert manager._rooms['b'].client.capture_interval == 0.04
+    assert manager._rooms['b'].client.room_id == 'b'
+
+    # 客户端自己的回调只收到本直播间的消息
+    own = []
+    manager._rooms['a'].client.add_message_callback(MessageType.CHAT, own.append)
+    await wait_for(lambda: len(own) >= 3 and any(m.room_id == 'b' for m in merged))
+    assert all(m.content.startswith('a ') for m in own)
+
+    # 合并消息流带直播间标签
+    assert all(isinstance(m, RoomMessage) and m.message_type == MessageType.CHAT for m in merged)
+    assert all(m.message.content.startswith(m.room_id + ' ') for m in merged)
+    assert only_b and all(m.room_id == 'b' for m in only_b)
+
+    # 停止一个直播间后排队的直播间启动，两次启动至少间隔 stagger
+    await manager.remove_room('a')
+    await wait_for(lambda: manager.get_health('c').state == 'running')
+    starts = [t for _, t in OfflineRoomClient.launches]
+    assert [room for room, _ in OfflineRoomClient.launches] == ['a', 'b', 'c']
+    assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+
+    # 心跳超时的直播间重启
+    client_c = manager._rooms['c'].client
+    client_c.connection_status.last_heartbeat = datetime.fromtimestamp(time.time() - 30)
+    manager.check_health()
+    assert manager.get_health('c').state == 'stalled'
+    await wait_for(lambda: manager._rooms['c'].client not in (None, client_c)
+                   and manager.get_health('c').state == 'running')
+    assert manager.get_health('c').restarts == 1
+
+    # 订阅者积压时放慢取回，消除后恢复
+    release = asyncio.Event()
+
+    async def stuck_handler(message):
+        await release.wait()
+
+    manager.subscribe(stuck_handler, maxsize=10)
+    await wait_for(lambda: manager.event_bus._subscriptions[-1].depth >= 9)
+    manager.check_health()
+    assert manager._rooms['b'].client.capture_interval == 0.08
+    # 持续积压时倍数封顶在使最短间隔达到 max_capture_interval 的值
+    for _ in range(30):
+        manager.check_health()
+    assert manager._throttle == 2.0 / 0.02
+    assert manager._rooms['c'].client.capture_interval == 2.0
+    release.set()
+    await wait_for(lambda: manager.event_bus._subscriptions[-1].depth == 0)
+    # 积压消除后的第一次检查就开始回落
+    manager.check_health()
+    assert manager._rooms['c'].client.capture_interval == 1.0
+    while manager._throttle > 1.0:
+        manager.check_health()
+    assert manager._rooms['b'].client.capture_interval == 0.04
+    assert manager._rooms['c'].client.capture_interval == 0.02
+
+    health = manager.get_health('b').to_dict()
+    assert health['messages'] > 0 and health['state'] == 'running'
+    await manager.close()
+    assert all(h['state'] == 'stopped' for h in manager.get_stats()['room_health'])
+
+    logger.info(f"多直播间统计: {health}")
+    logger.info("多直播间管理测试通过")
+
+
+async def test_douyin_pipeline():
+    """测试抖音消息管线"""
+    logger = setup_logger()
+    logger.info("开始测试抖音消息管线...")
+
+    await test_push_capture(logger)
+    await test_dedup(logger)
+    await test_event_bus(logger)
+    await test_webdriver_offload(logger)
+    await test_compact_messages(logger)
+    await test_mock_live_room(logger)
+    await test_room_manager(logger)
+    with tempfile.TemporaryDirectory() as tmp:
+        await test_gift_scheduler(logger, Path(tmp))
+        await test_record_replay(logger, Path(tmp))
+
+    logger.info("抖音消息管线测试完成！所有功能正常工作。")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_douyin_pipeline())